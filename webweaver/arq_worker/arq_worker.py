@@ -1,38 +1,33 @@
-from arq import create_pool
 from arq.connections import RedisSettings
 from tortoise import Tortoise
 
-import asyncio
 import logging
-from webweaver.webscraping.spiders.spider_launcher import SpiderLauncher
-from webweaver.webscraping.spiders.models import SpiderAsset
-from webweaver.webscraping.pipelines.pipeline_listener import PipelineListener
+from webweaver.config import REDIS_URL, ARQ_QUEUE_NAME, ARQ_MAX_JOBS, ARQ_JOB_TIMEOUT
+from webweaver.webscraping.jobs.job_queue import ScrapeShard
+from webweaver.webscraping.jobs.job_state import RedisJobStateStore
+from webweaver.webscraping.webscrape import WebScrape
 
 from webweaver.main import TORTOISE_ORM
 
 
-logger = logging.getLogger('scrape')
+logger = logging.getLogger('scraping')
 
 
-async def init():
+async def init(ctx):
     await Tortoise.init(config=TORTOISE_ORM)
-    await Tortoise.generate_schemas()  # if you need to
+    # await Tortoise.generate_schemas()  # if you need to
 
 
+async def run_scrape_shard(ctx, shard_data:dict) -> str:
+    """Runs one ScrapeShard queued by WebScrape.enqueue(). Start as many workers
+    as you like, on any host that can reach Redis and Postgres:
 
-async def launch_spiders(ctx):
-
-    queue = asyncio.Queue()
-    logger.debug('Async Queue object created')
-    active_spiders = await SpiderAsset.get_active()
-    sl = SpiderLauncher(queue, active_spiders)
-    pl = PipelineListener(queue, active_spiders)
-
-    logger.debug('Initialized Spider Launcher')
-    logger.debug('Initialized Pipeline Listener')
-    
-    await asyncio.gather(sl.launch(), pl.listen())
-    return "scraped it in arq or someshit"
+        arq webweaver.arq_worker.arq_worker.WorkerSettings
+    """
+    shard = ScrapeShard.from_dict(shard_data)
+    logger.info(f"Worker running ScrapeJob {shard.scrape_job_id} shard {shard.key}")
+    await WebScrape().run_shard(shard, RedisJobStateStore(ctx['redis']))
+    return shard.key
 
 
 async def shutdown(ctx):
@@ -40,18 +35,18 @@ async def shutdown(ctx):
     await Tortoise.close_connections()
 
 
-# context = {"db": None}  # You can store shared context here.
+class WorkerSettings:
+    functions = [run_scrape_shard]
+    on_startup = init
+    on_shutdown = shutdown
+    redis_settings = RedisSettings.from_dsn(REDIS_URL)
+    queue_name = ARQ_QUEUE_NAME
+    max_jobs = ARQ_MAX_JOBS  # each shard runs with its own ScrapingRegistry
+    job_timeout = ARQ_JOB_TIMEOUT
 
-worker_settings = {
-    "functions": [launch_spiders],  # List of functions to execute.
-    "on_startup": init,  # Function to call on startup.
-    "on_shutdown": shutdown,  # Function to call on shutdown.
-    "redis_settings": RedisSettings(),  # Your Redis connection settings.
-    # "ctx": context,  # Context passed to each function.
-}
 
-# if __name__ == "__main__":
-#     # This will run the Arq worker when this file is executed.
-#     from arq.worker import run_worker
+if __name__ == "__main__":
+    # This will run the Arq worker when this file is executed.
+    from arq.worker import run_worker
 
-#     run_worker(**worker_settings)
\ No newline at end of file
+    run_worker(WorkerSettings)
@@ -78,6 +78,7 @@ class DaysEnum(Enum):
 
 class FileFormatEnum(str, Enum):
     JSON = "json"
+    JSONL = "jsonl"
     XML = "xml"
     HTML = "html"
     EXCEL = "excel"
@@ -87,9 +88,22 @@ class FileFormatEnum(str, Enum):
     SQLITE = "sqlite"
     SQL = "dump"
     PARQUET = "parquet"
+    PARQUET_DATASET = "parquet_dataset"
     GOOGLE_SHEETS = "gsheets"
 
 
+class CacheModeEnum(str, Enum):
+    OFF = "off"
+    ON = "on"
+    REPLAY = "replay"
+
+
+class ScrapeBackendEnum(str, Enum):
+    INLINE = "inline"
+    LOCAL = "local"
+    ARQ = "arq"
+
+
 class LogLevel(Enum):
     EXCEPTION = "exception"
     CRITICAL = "critical"
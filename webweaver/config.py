@@ -34,12 +34,30 @@ if ENVIRONMENT == "prod":
 else:
     load_dotenv(".env.dev")
 HTTP_TIMEOUT = 5
+AIOHTTP_CONNECTION_LIMIT = 100  # total open connections in the shared aiohttp session
+AIOHTTP_LIMIT_PER_HOST = 10  # open connections per host (or per proxy endpoint)
+AIOHTTP_DNS_CACHE_TTL = 300  # seconds
+AIOHTTP_KEEPALIVE_TIMEOUT = 30  # seconds an idle keep-alive connection stays open
+PARSE_POOL_WORKERS = max((os.cpu_count() or 2) - 1, 1)  # processes Spider.parse() runs BeautifulSoup/lxml in. 0 parses on the event loop
+PARSE_POOL_INLINE_BELOW = 20_000  # characters, smaller markup is parsed on the event loop
+PARSE_POOL_START_METHOD = "spawn"  # multiprocessing start method of the parse pool
+FUZZY_MATCH_WORKERS = -1  # threads FuzzyHandler.best_matches() scores a batch with (rapidfuzz cdist), -1 = one per CPU
+FUZZY_MATCH_CACHE_SIZE = 10_000  # best_match() results memoized per FuzzyHandler
+FUZZY_MATCH_MAX_CELLS = 2_000_000  # query x candidate scores per cdist call, 8 bytes each
+TIRE_CODE_CACHE_SIZE = 20_000  # tire codes/product names tire_codes.parse() remembers the specs of
+BULK_UPSERT_MAX_PARAMS = 30_000  # bind parameters per ScrapeModel.bulk_upsert() statement, postgres and sqlite (3.32+) cap it at 32766
 PROXY = True
 SPIDER_MAX_ERRORS = 5
 ACCEPTABLE_SPIDER_DURATION = 10.0 #seconds
-SPIDER_DATA_BATCH_SIZE = 1
+SPIDER_DATA_BATCH_SIZE = 100  # PipelineListener batches records per spider when > 1. Set to 1 to save records one at a time.
+SPIDER_DATA_BATCH_TIMEOUT = 5.0  # seconds a partial batch may wait before it is flushed to the pipeline
+PIPELINE_WORKER_COUNT = 4  # number of PipelineListener workers consuming the scrape queue
+PIPELINE_WORKER_QUEUE_SIZE = 200  # max SpiderData waiting on each pipeline worker
+QUEUE_HIGH_WATERMARK = 1000  # spiders pause when this many SpiderData are queued. None for an unbounded queue.
+QUEUE_LOW_WATERMARK = 500  # paused spiders resume once the queue drains to this depth
 SCRAPING_MODULES = Path("webweaver.scraping_modules")
 SENTINEL = "__SENTINEL_VALUE__"  # value passed into async Queue to stop PipelineListener from listening.
+OUTFILE_CHUNK_SIZE = 5000  # rows read from the DB and written per chunk by StreamingOutFile
 RETURN_EXCEPTIONS = os.getenv("RETURN_EXCEPTIONS")  # for asyncio.gather() calls in SpiderLauncher
 
 # DB Config:
@@ -53,10 +71,84 @@ POSTGRES_DB = f"postgres://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 # Requests:
 REQUEST_WAIT_MAX = 3600  # 1 hour
 REQUEST_WAIT_BASE = 30  # 30 seconds
-
-# Semaphores (not yet implemented):
-SEMAPHORE_COUNT = 5
-PLAYWRIGHT_COUNT = 5
+RETRY_BASE_DELAY = 1  # seconds, decorrelated jitter backoff for connect/read errors
+RETRY_MAX_DELAY = 60  # seconds
+RETRY_MAX_CONNECT = 5  # retries per request for connect errors
+RETRY_MAX_READ = 3  # retries per request for read errors
+SPIDER_RETRY_BUDGET = 100  # total retries a spider may spend across all of its requests
+
+# Proxy endpoints (webscraping/proxy/providers.py). Each entry is a provider class path plus its kwargs,
+# e.g. {'provider': 'webweaver.webscraping.proxy.providers.FileProxyProvider', 'path': 'proxies.txt'}
+PROXY_PROVIDERS = [
+    {'provider': 'webweaver.webscraping.proxy.providers.SmartproxyProvider'},
+]
+PROXY_LEASE_TIMEOUT = 1800  # seconds before a sticky endpoint lease is reclaimed from a session that never released it
+
+# Proxy health (ProxyHealthTracker):
+PROXY_LATENCY_ALPHA = 0.2  # EWMA weight of the newest latency/error sample
+PROXY_DEFAULT_LATENCY = 1.0  # seconds, assumed for endpoints we haven't measured yet
+PROXY_COOLDOWN = 60  # seconds an endpoint rests after a ban signal (403/429), doubling per ban
+PROXY_MAX_COOLDOWN = 1800  # seconds
+PROXY_QUARANTINE_FAILURES = 5  # consecutive failures before an endpoint is quarantined
+PROXY_QUARANTINE = 900  # seconds
+
+# HTTP response cache (HttpCache):
+HTTP_CACHE_DIR = os.path.join(ROOT_DIR, "http_cache")
+HTTP_CACHE_MODE = os.getenv("HTTP_CACHE_MODE", "off")  # off | on | replay (dev mode: serve anything cached without revalidating). Opt in with on
+HTTP_CACHE_MAX_BYTES = 2 * 1024 ** 3  # least recently used responses are evicted past this size
+HTTP_CACHE_DEFAULT_TTL = 0  # seconds a response with no Cache-Control/Expires stays fresh. 0 = always revalidate
+
+# URL frontier (UrlFrontier):
+FRONTIER_DIR = os.path.join(ROOT_DIR, "frontier")  # persistent Bloom filters, one per spider
+FRONTIER_BLOOM_CAPACITY = 1_000_000  # URLs per spider before the false positive rate climbs
+FRONTIER_BLOOM_ERROR_RATE = 0.001
+FRONTIER_BLOOM_MAX_AGE = 30  # days before a spider's Bloom filter is thrown out and started fresh
+FRONTIER_DOMAIN_DELAY = 1.0  # seconds between URLs popped for the same domain
+
+# Distributed scraping (ScrapeJobQueue, arq_worker/arq_worker.py):
+SCRAPE_BACKEND = os.getenv("SCRAPE_BACKEND", "inline")  # inline (background task in the API process) | local (in-process shard queue, no Redis) | arq (Redis + worker processes)
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+ARQ_QUEUE_NAME = "webweaver:scrape_shards"
+ARQ_MAX_JOBS = 4  # shards one worker process (or the LocalScrapeJobQueue) runs at once
+ARQ_JOB_TIMEOUT = 6 * 3600  # seconds a shard may run before arq cancels it
+SCRAPE_JOB_STATE_TTL = 7 * 24 * 3600  # seconds a scrape job's shard states are kept in Redis
+JOB_PROGRESS_INTERVAL = 2.0  # seconds between progress counter updates sent to the job's JobStateStore
+
+# Semaphores (SpiderScheduler):
+SEMAPHORE_COUNT = 5  # max spiders running at once
+PLAYWRIGHT_COUNT = 5  # max Playwright spiders running at once (browsers come from the BrowserPool)
+DOMAIN_CONCURRENCY = 4  # max concurrent requests to any one domain
+
+# Adaptive per-domain rate limiting (AdaptiveRateLimiter, AIMD):
+RATE_LIMIT_STATE_PATH = os.path.join(ROOT_DIR, "rate_limits.json")  # learned rates are saved here between runs
+RATE_LIMIT_INITIAL = None  # requests/second for a domain we haven't learned a rate for yet. None = unlimited until it sends a 429/503
+RATE_LIMIT_MIN = 0.1  # requests/second
+RATE_LIMIT_MAX = 20.0  # requests/second
+RATE_LIMIT_BURST = 3  # requests a domain's bucket lets through back to back
+RATE_LIMIT_INCREASE = 0.25  # requests/second added after every RATE_LIMIT_SUCCESS_WINDOW successful responses
+RATE_LIMIT_SUCCESS_WINDOW = 20
+RATE_LIMIT_DECREASE = 0.5  # rate is multiplied by this on a 429/503
+
+# Playwright BrowserPool (shared by all PlaywrightSpiders):
+BROWSER_POOL_SIZE = 2  # browsers per (browser type, headless) combo
+BROWSER_MAX_PAGES = 20  # total open pages across every pooled browser
+BROWSER_CONTEXT_MAX_USES = 10  # leases before a context is closed and replaced
+BROWSER_MAX_CONTEXTS = 200  # contexts a browser creates before it is recycled
+BROWSER_MAX_IDLE_CONTEXTS = 10  # released contexts kept around for reuse
+
+# Playwright resource blocking (ResourcePolicy):
+# Rough average transfer size per blocked request, used to estimate bytes saved 
+# since an aborted request never tells us how big the response would have been.
+BLOCKED_RESOURCE_BYTES = {
+    'image': 60_000,
+    'media': 500_000,
+    'font': 40_000,
+    'stylesheet': 25_000,
+    'script': 30_000,
+    'xhr': 5_000,
+    'fetch': 5_000,
+    'other': 5_000,
+}
 
 # Logging
 # ====================================================
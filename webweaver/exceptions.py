@@ -65,6 +65,11 @@ class ProxyRequestError(ProxyException):
     pass
 
 
+class ProxyEndpointNotFound(ProxyException):
+    """Raised when the proxy providers gave the ProxyManager no endpoint of the kind asked for."""
+    pass
+
+
 
 # Middleware Exceptions
 # ========================================================
@@ -214,6 +219,10 @@ class BadMarkupError(SpiderSoupError):
         self.error_details = error_details
         super().__init__(f"{self.spider_name}: {self.error_details}")
 
+    def __reduce__(self):
+        # so it survives the trip back from a parse pool worker
+        return (self.__class__, (self.spider_name, self.error_details))
+
 
 # Pipeline Exceptions
 # ========================================================
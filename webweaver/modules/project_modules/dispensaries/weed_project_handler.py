@@ -33,9 +33,12 @@ class ProjectHandlerInterface:
 
     def check_strain(self, s:str, cutoff:float=100.0) -> bool:
         """Fuzzy-string matching to check if the strain name matches in our DB"""
-        score = self.project_handler.fuzzy_handler.best_match(s)[1]
-        print('fuzzy match score: ', score)
-        return bool(score >= cutoff)
+        return self.project_handler.fuzzy_handler.best_match(s, score_cutoff=cutoff) is not None
+
+
+    def check_strains(self, strings:list[str], cutoff:float=100.0) -> list[bool]:
+        """check_strain() for a whole list of product names at once."""
+        return [match is not None for match in self.project_handler.fuzzy_handler.best_matches(strings, score_cutoff=cutoff)]
 
 
     def get_dispensary_enum(self,spider_asset:SpiderAsset) -> DispensaryEnum | None:
@@ -36,15 +36,18 @@ class BrandHandler(BaseHandler):
 
     async def get_or_create_brand(self, brand_name:str) -> tuple[Brand, bool]:
         """Check the brand mapping to see if we already have an instance of this brand.
-        If the brand already exists, return it. If not, create a new brand.
+        If the brand already exists, return it. If not, create a new brand (and
+        add it to the mapping).
         """
-        is_created = False
-        brand_name_normalized = self.normalize_brand_name(brand_name)
-        brand = self.project_handler.brand_name_to_brand.get(brand_name_normalized)
-        if not brand:
-            brand, is_created = await Brand.get_or_create(brand_name=brand_name.strip())
+        return await self.project_handler.brands.get_or_create(brand_name)
 
-        return brand, is_created
+
+    async def resolve_brands(self, brand_names:list[str]) -> dict[str, Brand]:
+        """get_or_create_brand() for a whole pipeline batch: {brand_name: Brand},
+        with one query for the brands not in the mapping and one bulk_create
+        for the new ones.
+        """
+        return await self.project_handler.brands.resolve(brand_names)
 
 
     def match_brand(self, value:str) -> str|None:
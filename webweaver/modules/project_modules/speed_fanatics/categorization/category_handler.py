@@ -1,8 +1,9 @@
-from typing import ItemsView
+from typing import ItemsView, TYPE_CHECKING
 from collections import Counter
 from webweaver.modules.project_modules.speed_fanatics.categorization.base_handler import BaseHandler
 from webweaver.modules.project_modules.speed_fanatics.categorization.category_keywords import CategoryKeyWords
 from webweaver.modules.project_modules.speed_fanatics.categorization.categorization_regex import CategoryRegex
+from webweaver.modules.project_modules.speed_fanatics.categorization.keyword_index import KeywordIndex
 
 from webweaver.modules.project_modules.speed_fanatics.speed_enums import (
     CategoryEnum, 
@@ -11,6 +12,9 @@ from webweaver.modules.project_modules.speed_fanatics.speed_enums import (
 )
 # from webweaver.modules.project_modules.speed_fanatics.speed_mappings import
 
+if TYPE_CHECKING:
+    from webweaver.modules.project_modules.speed_fanatics.speed_project_handler import SpeedProjectHandler
+
 
 class CategoryHandler(BaseHandler):
 
@@ -18,24 +22,9 @@ class CategoryHandler(BaseHandler):
     regex = CategoryRegex
 
     
-    @property
-    def keyword_sets(self) -> dict[CategoryEnum, set]:
-        keyword_sets = {}
-        for category_enum, wordlist_enums_dict in self.keywords.categories.items():
-            for wordlist_enum, wordlist in wordlist_enums_dict.items():
-                if wordlist_enum == MatchMode.KEYWORDS:
-                    keyword_sets[category_enum] = wordlist
-        return keyword_sets
-
-
-    @property
-    def substring_sets(self) -> dict[CategoryEnum, set]:
-        substring_sets = {}
-        for category_enum, wordlist_enums_dict in self.keywords.categories.items():
-            for wordlist_enum, wordlist in wordlist_enums_dict.items():
-                if wordlist_enum == MatchMode.SUBSTRINGS:
-                    substring_sets[category_enum] = wordlist
-        return substring_sets
+    def __init__(self, project_handler:"SpeedProjectHandler"):
+        super().__init__(project_handler)
+        self.index = KeywordIndex(self.keywords.categories)
 
 
     def get_category_enum(
@@ -77,25 +66,17 @@ class CategoryHandler(BaseHandler):
 
     def check_keywords_in_set(self, product_name:str, category_name:str=None) -> list[CategoryEnum]:
         """Check for direct keyword matches."""
-        category_enums = []
-        for category_enum, keyword_set in self.keyword_sets.items():
-            if self.contains_keywords(product_name, keyword_set):
-                category_enums.append(category_enum)
-            if category_name:
-                if self.contains_keywords(category_name, keyword_set):
-                    category_enums.append(category_enum)
-        return category_enums
+        return self.index.ranked(
+            self.index.keyword_matches(product_name),
+            self.index.keyword_matches(category_name) if category_name else set(),
+        )
 
 
     def keyword_set_substrings(self, product_name:str, category_name:str=None) -> list[CategoryEnum]:
         """Check for substrings"""
         product_name = self.project_handler.fuzzy_handler.preprocess(product_name)
-        category_name = self.project_handler.fuzzy_handler.preprocess(category_name)
-        category_enums = []
-        for category_enum, keyword_set in self.substring_sets.items():
-            if self.search_substrings(product_name, keyword_set):
-                category_enums.append(category_enum)
-            if category_name:
-                if self.search_substrings(category_name, keyword_set):
-                    category_enums.append(category_enum)
-        return category_enums
\ No newline at end of file
+        category_name = self.project_handler.fuzzy_handler.preprocess(category_name) if category_name else None
+        return self.index.ranked(
+            self.index.substring_matches(product_name),
+            self.index.substring_matches(category_name) if category_name else set(),
+        )
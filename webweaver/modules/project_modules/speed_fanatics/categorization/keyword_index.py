@@ -0,0 +1,140 @@
+from enum import Enum
+import re
+from typing import Iterable
+
+from webweaver.modules.project_modules.speed_fanatics.speed_enums import MatchMode
+
+
+Rules = dict[Enum, dict[MatchMode, set | list]]
+
+
+def trie_regex(words:set[str]) -> str:
+    """One regex matching any of the words, built as a trie ('brake(?:kit|pad)'
+    rather than 'brakekit|brakepad') so re only walks each shared prefix once.
+    Where a word is a prefix of another the longer one is tried first, so a
+    match is always the longest word starting at that position.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[None] = True
+
+    def pattern(node:dict) -> str:
+        branches = [re.escape(char) + pattern(child) for char, child in sorted((k, v) for k, v in node.items() if k is not None)]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        if None in node:
+            return f"(?:{body})?"
+        return body
+
+    return pattern(trie)
+
+
+class KeywordIndex:
+    """A category/subcategory ruleset compiled for matching:
+        {CategoryEnum.BRAKES: {MatchMode.KEYWORDS: {...}, MatchMode.SUBSTRINGS: {...}}, ...}
+
+    - keywords: inverted index, word -> the enums having it as a keyword. A
+      text's words are looked up once each instead of intersecting the text
+      with every enum's keyword set.
+    - substrings: every substring of every enum in one trie regex, run as a
+      lookahead at each position of the text (an Aho-Corasick pass, done by re
+      in C). Each hit maps to the enums of that substring and of every other
+      substring it starts with, so overlapping substrings aren't missed.
+    - regex: each enum's patterns, in ruleset order, plus all of them combined
+      into one pattern so texts that match none are rejected in one search.
+
+    Several rulesets (SubCategoryHandler's CategoryEnum.UNKNOWN index) are
+    merged per match mode, the way the old walk did: an enum's words for a
+    mode are the last ruleset's, and it's ordered where it first has that mode.
+    So each mode has its own order, and ranked() keeps to it.
+
+    Built once when the handlers are created in SpeedProjectHandler.initialize_project().
+    """
+    def __init__(self, *rulesets:Rules):
+        by_mode = self.merge(rulesets)
+        # enums are tracked by their position in their mode's ruleset, hashing ints is a lot cheaper than Enum.__hash__.
+        # Keyword ranks come first, then substring ranks, ranked() never gets both
+        keyword_rules, substring_rules = by_mode[MatchMode.KEYWORDS], by_mode[MatchMode.SUBSTRINGS]
+        self.enums:list[Enum] = [*keyword_rules, *substring_rules]
+        self.keywords:dict[str, tuple[int, ...]] = {}
+        substring_ranks:dict[str, list[int]] = {}
+        self.regexes:list[tuple[Enum, re.Pattern]] = [
+            (enum, pattern) for enum, patterns in by_mode[MatchMode.REGEX].items() for pattern in patterns
+        ]
+
+        for rank, keywords in enumerate(keyword_rules.values()):
+            for keyword in keywords:
+                self.keywords[keyword] = (*self.keywords.get(keyword, ()), rank)
+        for rank, substrings in enumerate(substring_rules.values(), start=len(keyword_rules)):
+            for substring in substrings:
+                substring_ranks.setdefault(substring, []).append(rank)
+
+        self.keyword_set:frozenset[str] = frozenset(self.keywords)
+        # '' is in every string, those enums always match
+        self.always:frozenset[int] = frozenset(substring_ranks.pop('', ()))
+        self.substring_ranks:dict[str, frozenset[int]] = {
+            substring: frozenset(rank for prefix, ranks in substring_ranks.items() if substring.startswith(prefix) for rank in ranks)
+            for substring in substring_ranks
+        }
+        self.substrings:re.Pattern | None = re.compile(f"(?=({trie_regex(set(substring_ranks))}))") if substring_ranks else None
+        self.regex:re.Pattern | None = self.combine(pattern for _enum, pattern in self.regexes)
+
+
+    @staticmethod
+    def merge(rulesets:Iterable[Rules]) -> dict[MatchMode, dict[Enum, set | list]]:
+        """{match mode: {enum: its words/patterns}} over every ruleset."""
+        by_mode = {MatchMode.KEYWORDS: {}, MatchMode.SUBSTRINGS: {}, MatchMode.REGEX: {}}
+        for rules in rulesets:
+            for enum, match_modes in rules.items():
+                for match_mode, words in match_modes.items():
+                    if match_mode in by_mode:
+                        by_mode[match_mode][enum] = words
+        return by_mode
+
+
+    @staticmethod
+    def combine(patterns) -> re.Pattern | None:
+        """(?:p1)|(?:p2)|... or None if there are no patterns or their flags differ."""
+        patterns = list(patterns)
+        if not patterns or len({pattern.flags for pattern in patterns}) > 1:
+            return None
+        return re.compile('|'.join(f"(?:{pattern.pattern})" for pattern in patterns), patterns[0].flags)
+
+
+    def keyword_matches(self, text:str) -> set[int]:
+        """Enums (ranks) with a keyword among the text's words, BaseHandler.contains_keywords() for every enum at once."""
+        matches = set()
+        for word in self.keyword_set.intersection(text.split()):
+            matches.update(self.keywords[word])
+        return matches
+
+
+    def substring_matches(self, text:str) -> set[int]:
+        """Enums (ranks) with a substring in the text, BaseHandler.search_substrings() for every enum at once."""
+        matches = set(self.always)
+        if self.substrings is not None:
+            for match in self.substrings.finditer(text):
+                matches.update(self.substring_ranks[match.group(1)])
+        return matches
+
+
+    def regex_match(self, text:str) -> Enum | None:
+        """The first enum (in ruleset order) with a pattern that matches the text."""
+        if not self.regexes or (self.regex is not None and not self.regex.search(text)):
+            return None
+        for enum, pattern in self.regexes:
+            if pattern.search(text):
+                return enum
+
+
+    def ranked(self, *matches:set[int]) -> list[Enum]:
+        """The matched enums in ruleset order, each once per set it's in. Same
+        list as looping over the ruleset and appending on every hit, so
+        Counter.most_common() breaks ties the same way. The sets are either all
+        keyword_matches() or all substring_matches().
+        """
+        return [self.enums[rank] for rank in sorted(set().union(*matches)) for found in matches if rank in found]
@@ -1,6 +1,8 @@
 from collections import Counter
+from typing import TYPE_CHECKING
 
 from webweaver.modules.project_modules.speed_fanatics.categorization.base_handler import BaseHandler
+from webweaver.modules.project_modules.speed_fanatics.categorization.keyword_index import KeywordIndex
 from webweaver.modules.project_modules.speed_fanatics.categorization.subcategory_ruleset import SubCategoryRuleset
 from webweaver.modules.project_modules.speed_fanatics.speed_enums import (
     CategoryEnum, 
@@ -8,65 +10,28 @@ from webweaver.modules.project_modules.speed_fanatics.speed_enums import (
     MatchMode
 )
 
+if TYPE_CHECKING:
+    from webweaver.modules.project_modules.speed_fanatics.speed_project_handler import SpeedProjectHandler
+
 
 class SubCategoryHandler(BaseHandler):
     """Attempts to determine SubCategory by fuzzy matching, regex, and keyword checking"""
 
     ruleset = SubCategoryRuleset
 
-    def get_rules(self, category_enum:CategoryEnum, match_mode:MatchMode)-> dict[SubCategoryEnum, set | list]:
-        """Returns a set/list of keywords, substrings, or regex patterns 
-            -should this method return a dict with values of type set for 
-            keywords/substrings (yes) and a list for regex? (maybe no)
+    def __init__(self, project_handler:"SpeedProjectHandler"):
+        super().__init__(project_handler)
+        self.indexes = self.build_indexes()
+
+
+    def build_indexes(self) -> dict[CategoryEnum, KeywordIndex]:
+        """A KeywordIndex per category's subcategory rules, and one of every
+        category's rules merged for CategoryEnum.UNKNOWN.
         """
-        rules = {}
-        if category_enum != CategoryEnum.UNKNOWN:
-            for subcategory_enum, match_mode_dict in self.ruleset.category_enum_to_subcategory_rules[category_enum].items():
-                for match_mode_enum, wordlist in match_mode_dict.items():
-                    if match_mode_enum == match_mode:
-                        rules[subcategory_enum] = wordlist
-        else:
-            for _category_enum, subcategory_enums in self.ruleset.category_enum_to_subcategory_rules.items():
-                for subcategory_enum, match_mode_dict in subcategory_enums.items():
-                    for match_mode_enum, wordlist in match_mode_dict.items():
-                        if match_mode_enum == match_mode:
-                            rules[subcategory_enum] = wordlist
-        return rules
-
-
-
-    def keyword_sets(self, category_enum:CategoryEnum) -> dict[SubCategoryEnum, set | list]:
-        keyword_sets = {}
-        if category_enum != CategoryEnum.UNKNOWN:
-            for subcategory_enum, wordlist_enums_dict in self.ruleset.category_enum_to_subcategory_rules[category_enum].items():
-                for wordlist_enum, wordlist in wordlist_enums_dict.items():
-                    if wordlist_enum == MatchMode.KEYWORDS:
-                        keyword_sets[subcategory_enum] = wordlist
-        else:
-            for _category_enum, subcategory_enums in self.ruleset.category_enum_to_subcategory_rules.items():
-                for subcategory_enum, wordlist_enums_dict in subcategory_enums.items():
-                    for wordlist_enum, wordlist in wordlist_enums_dict.items():
-                        if wordlist_enum == MatchMode.KEYWORDS:
-                            keyword_sets[subcategory_enum] = wordlist
-
-        return keyword_sets
-
-
-    def substring_sets(self, category_enum:CategoryEnum) -> dict[SubCategoryEnum, set]:
-        substring_sets = {}
-        if category_enum != CategoryEnum.UNKNOWN:
-            for subcategory_enum, wordlist_enums_dict in self.ruleset.category_enum_to_subcategory_rules[category_enum].items():
-                for wordlist_enum, wordlist in wordlist_enums_dict.items():
-                    if wordlist_enum == MatchMode.SUBSTRINGS:
-                        substring_sets[subcategory_enum] = wordlist
-        else:
-            for _category_enum, subcategory_enums in self.ruleset.category_enum_to_subcategory_rules.items():
-                for subcategory_enum, wordlist_enums_dict in subcategory_enums.items():
-                    for wordlist_enum, wordlist in wordlist_enums_dict.items():
-                        if wordlist_enum == MatchMode.SUBSTRINGS:
-                            substring_sets[subcategory_enum] = wordlist
-
-        return substring_sets
+        rules = self.ruleset.category_enum_to_subcategory_rules
+        indexes = {category_enum: KeywordIndex(subcategory_rules) for category_enum, subcategory_rules in rules.items()}
+        indexes[CategoryEnum.UNKNOWN] = KeywordIndex(*rules.values())
+        return indexes
 
 
     def get_subcategory_enum(
@@ -108,41 +73,29 @@ class SubCategoryHandler(BaseHandler):
 
 
     def try_regex(self, product_name:str, category_enum:CategoryEnum) -> SubCategoryEnum | None:
-        """Iterate through the rules and try the regex patterns. If one matches,
-        return the corresponding SubCategoryEnum
+        """Try the regex patterns of the rules. If one matches, return the
+        corresponding SubCategoryEnum
         """
-        for subcategory_enum, regex_list in self.get_rules(
-            category_enum=category_enum, 
-            match_mode=MatchMode.REGEX
-        ).items():
-            for regex_pattern in regex_list:
-                if self.regex_search(s=product_name, pattern=regex_pattern):
-                    return subcategory_enum
+        return self.indexes[category_enum].regex_match(product_name)
 
 
     def check_keywords_in_set(self, product_name:str, category_enum:CategoryEnum, category_name:str=None) -> list[SubCategoryEnum]:
-        subcategory_enums = []
-        for subcategory_enum, keyword_set in self.keyword_sets(category_enum).items():
-            if self.contains_keywords(product_name, keyword_set):
-                subcategory_enums.append(subcategory_enum)
-            if category_name:
-                if self.contains_keywords(category_name, keyword_set):
-                    subcategory_enums.append(subcategory_enum)
-        return subcategory_enums
+        index = self.indexes[category_enum]
+        return index.ranked(
+            index.keyword_matches(product_name),
+            index.keyword_matches(category_name) if category_name else set(),
+        )
 
 
     def keyword_set_substrings(self, product_name:str, category_enum:CategoryEnum, category_name:str=None) -> list[SubCategoryEnum]:
 
         product_name = self.project_handler.fuzzy_handler.preprocess(product_name)
-        category_name = self.project_handler.fuzzy_handler.preprocess(category_name)
-        subcategory_enums = []
-        for subcategory_enum, keyword_set in self.substring_sets(category_enum).items():
-            if self.search_substrings(product_name, keyword_set):
-                subcategory_enums.append(subcategory_enum)
-            if category_name:
-                if self.search_substrings(category_name, keyword_set):
-                    subcategory_enums.append(subcategory_enum)
-        return subcategory_enums
+        category_name = self.project_handler.fuzzy_handler.preprocess(category_name) if category_name else None
+        index = self.indexes[category_enum]
+        return index.ranked(
+            index.substring_matches(product_name),
+            index.substring_matches(category_name) if category_name else set(),
+        )
 
 
     def force_subcategory(self, category_enum:CategoryEnum) -> SubCategoryEnum:
@@ -62,8 +62,11 @@ class Brand(ScrapeModel):
     brand_name      = fields.CharField(max_length=255, unique=True)
     date_created    = fields.DatetimeField(auto_now_add=True)
 
-    async def save(self, *args, **kwargs):
+    def clean(self):
         self.brand_name = self.brand_name.strip()
+
+    async def save(self, *args, **kwargs):
+        self.clean()
         await super().save(*args, **kwargs)
 
     # @classmethod
@@ -111,13 +114,15 @@ class Product(ScrapeModel):
         cost = await Cost.current_cost(product=self)
         return cost.cost
 
-    @classmethod
-    async def save(self, *args, **kwargs):
+    def clean(self):
         self.product_name = self.product_name.strip()
         if self.description:
             self.description = self.description.strip()
         if self.description_long:
             self.description_long = self.description_long.strip()
+
+    async def save(self, *args, **kwargs):
+        self.clean()
         await super().save(*args, **kwargs)
 
 
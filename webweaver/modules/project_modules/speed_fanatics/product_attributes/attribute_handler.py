@@ -2,7 +2,7 @@ import logging
 import re
 from typing import TYPE_CHECKING
 from webweaver.modules.project_modules.speed_fanatics.speed_enums import CategoryEnum
-from webweaver.modules.project_modules.speed_fanatics.tire_codes import TireCodeParser, TireSpecs
+from webweaver.modules.project_modules.speed_fanatics.tire_codes import TireSpecs, parse
 from webweaver.modules.project_modules.speed_fanatics.product_attributes.attribute_dataclasses import (
     TireAttributeData,
     WheelAttributeData
@@ -59,8 +59,9 @@ class AttributeHandler:
         the data it scraped.
         *Will not override data that has already been populated.
         """
-        parser = TireCodeParser(s, use_search=True, **kwargs)
-        self.tire_data_from_specs(parser.specs)
+        tire_specs = parse(s, use_search=True, **kwargs)
+        if tire_specs:
+            self.tire_data_from_specs(tire_specs)
 
 
     def scrape_wheel_data_from_string(self, product_name:str):
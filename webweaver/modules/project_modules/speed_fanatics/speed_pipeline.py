@@ -1,10 +1,11 @@
 import logging
 from pydantic import BaseModel
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Hashable
 
 from tortoise.exceptions import IntegrityError, TransactionManagementError
 from tortoise.transactions import in_transaction
 from webweaver.webscraping.pipelines.pipeline_base import Pipeline
+from webweaver.webscraping.spiders.spider_data import SpiderData
 from webweaver.exceptions import PipelineError
 from webweaver.webscraping.registry.scraping_registry import scraping_registry
 from webweaver.modules.project_modules.speed_fanatics.constants import MIN_PRICE
@@ -15,6 +16,9 @@ from webweaver.modules.project_modules.speed_fanatics.speed_validation import (
     VerusValidation,
     SoulPPValidation,
     FastcoValidation,
+    ProductValidation,
+    TireAttributeValidation,
+    WheelAttributeValidation,
 )
 from webweaver.modules.project_modules.speed_fanatics.models import (
     Supplier,
@@ -47,6 +51,17 @@ class SpeedPipeline(Pipeline):
     # schema = SoulPPValidation
     schema = FastcoValidation
 
+    @classmethod
+    def partition_key(cls, spider_data:SpiderData) -> Hashable:
+        """Products are upserted on (product_name, supplier), so every record for
+        the same product must go to the same pipeline worker.
+        """
+        try:
+            return (spider_data.spider_id, spider_data.data['product']['product_name'].strip())
+        except (KeyError, TypeError, AttributeError):
+            return spider_data.spider_id
+
+
     def get_supplier_enum(self, data_to_save:EssexPartsValidation=None) -> SupplierEnum:
         # NOTE  data_to_save is any speed validation model and will be changed once
         #       i have created the unified model for all suppliers
@@ -83,59 +98,107 @@ class SpeedPipeline(Pipeline):
 
 
 
-    async def save_fastco(self, data_to_save:FastcoValidation, supplier:Supplier):
-
-        # tire_attrs = data_to_save.tire_attributes.model_dump()
-        # for key, value in data_to_save.model_dump().items():
-        #     if key != 'categories':
-        #         print(key, " : ", value)
-        #     else:
-        #         for key2, value2 in value.items():
-        #             print("\t", key2, " : ", value2.__str__())
-
+    async def save_batch(self) -> tuple[int, int]:
+        """Fastco catalogs are saved with bulk upserts. Every other supplier 
+        falls back to saving one record at a time via save_data().
+        """
+        fastco_batch = []
+        other_batch = []
+        for data_to_save in self.batch_data_to_save:
+            if data_to_save.supplier.supplier_name == SupplierEnum.FASTCO:
+                fastco_batch.append(data_to_save)
+            else:
+                other_batch.append(data_to_save)
+
+        saved = failed = 0
+        if fastco_batch:
+            await self.save_fastco_batch(fastco_batch)
+            saved += len(fastco_batch)
+        if other_batch:
+            self.batch_data_to_save = other_batch
+            other_saved, failed = await super().save_batch()
+            saved += other_saved
+        return saved, failed
+
+
+    async def save_fastco_batch(self, batch:list[FastcoValidation]):
+        """Bulk version of save_fastco(). Products are upserted with a single 
+        INSERT .. ON CONFLICT .. RETURNING statement (ScrapeModel.bulk_upsert()),
+        which also gives back their IDs, and then each child table is upserted
+        with one statement as well.
+        The batch's brands are resolved up front, outside the transaction.
+        """
+        brands = await self.project_handler.brand_handler.resolve_brands([data_to_save.brand.brand_name for data_to_save in batch])
         async with in_transaction():
-
-            categories = data_to_save.categories.model_dump()
-
-            brand_tuple = await self.project_handler.brand_handler.get_or_create_brand(data_to_save.brand.brand_name)
-            brand = brand_tuple[0]
-
-            product_name = data_to_save.product.product_name
-
-            product, created, updated = await Product.get_create_or_update(
-                # **data_to_save.product.model_dump(), 
-                supplier=supplier, 
-                brand=brand,
-                product_name=product_name,
-                category=categories.get('category'),
-                subcategory=categories.get('subcategory')
+            products:dict[tuple[int, str], Product] = {}
+            product_keys:list[tuple[int, str]] = []
+            for data_to_save in batch:
+                product = Product(
+                    **data_to_save.product.model_dump(),
+                    supplier=data_to_save.supplier,
+                    brand=brands[data_to_save.brand.brand_name],
+                    category=data_to_save.categories.category,
+                    subcategory=data_to_save.categories.subcategory,
+                )
+                product.clean()  # what Product.save() would do, so the key is the saved product_name
+                product_keys.append((data_to_save.supplier.id, product.product_name))
+                products[product_keys[-1]] = product  # last one wins
+
+            product_update_fields = [
+                'brand_id', 'category_id', 'subcategory_id',
+                *ProductValidation.model_fields.keys(),
+            ]
+            saved_products = await Product.bulk_upsert(
+                products.values(),
+                conflict_fields=['product_name', 'supplier_id'],
+                update_fields=[field for field in product_update_fields if field != 'product_name'],
             )
-            print('product id: ', product.id)
-
-            if not created:
-                for field_name, field_value in data_to_save.product.model_dump().items():
-                    if getattr(product, field_name, None) != field_value:
-                        setattr(product, field_name, field_value)
-                await product.save()
+            product_lookup = {(product.supplier_id, product.product_name): product for product in saved_products.objects}
+
+            prices, costs, image_urls = [], [], []
+            tire_attributes:dict[int, TireAttribute] = {}
+            wheel_attributes:dict[int, WheelAttribute] = {}
+            for data_to_save, product_key in zip(batch, product_keys):
+                product = product_lookup[product_key]
+                prices.append(Price(**data_to_save.price.model_dump(), product=product))
+                costs.append(Cost(**data_to_save.cost.model_dump(), product=product))
+                image_urls.append(ProductImageUrl(**data_to_save.image_url.model_dump(), product=product))
+                if data_to_save.tire_attributes:
+                    tire_attributes[product.id] = TireAttribute(
+                        **self.model_kwargs(TireAttribute, data_to_save.tire_attributes.model_dump()), 
+                        product=product
+                    )
+                elif data_to_save.wheel_attributes:
+                    wheel_attributes[product.id] = WheelAttribute(
+                        **self.model_kwargs(WheelAttribute, data_to_save.wheel_attributes.model_dump()), 
+                        product=product
+                    )
 
+            # update_fields are what get_create_or_update() would have changed: the validated fields that aren't part of the key
+            await Price.bulk_upsert(prices, update_fields=['is_old'])
+            await Cost.bulk_upsert(costs, update_fields=[])
+            await ProductImageUrl.bulk_upsert(image_urls, update_fields=[])
+            if tire_attributes:
+                await TireAttribute.bulk_upsert(
+                    tire_attributes.values(),
+                    update_fields=list(TireAttributeValidation.model_fields.keys()),
+                )
+            if wheel_attributes:
+                await WheelAttribute.bulk_upsert(
+                    wheel_attributes.values(),
+                    update_fields=[field for field in WheelAttributeValidation.model_fields.keys() if field in WheelAttribute._meta.fields_map],
+                )
+            logger.info(
+                f"Saved batch of {len(products)} Fastco products "
+                f"({saved_products.created} created, {saved_products.updated} updated)"
+            )
 
-            await Price.get_create_or_update(**data_to_save.price.model_dump(), product=product)
 
-            await Cost.get_create_or_update(**data_to_save.cost.model_dump(), product=product)
-            # await Cost.get_or_create(**data_to_save.cost.model_dump(), product=product)
-            
-            if data_to_save.tire_attributes:
-                await TireAttribute.get_create_or_update(**data_to_save.tire_attributes.model_dump(), product=product)
-            elif data_to_save.wheel_attributes:
-                await WheelAttribute.get_create_or_update(**data_to_save.wheel_attributes.model_dump(), product=product)
-            await ProductImageUrl.get_create_or_update(**data_to_save.image_url.model_dump(), product=product)
-
-            # print("SAVED:")
-            # print(product.product_name)
-            # print(categories.get('category'))
-            # print(categories.get('subcategory'))
-            # print()
-            # print()
+    async def save_fastco(self, data_to_save:FastcoValidation, supplier:Supplier):
+        """One product is a batch of one, so it's saved with a handful of upsert
+        statements instead of a get_create_or_update() transaction per table.
+        """
+        await self.save_fastco_batch([data_to_save])
 
 
     async def save_soul_pp(self, data_to_save:SoulPPValidation, supplier:Supplier):
@@ -219,11 +282,12 @@ class SpeedPipeline(Pipeline):
         #     if key != 'images':
         #         print(key, " : ", value)
 
+        brand, _ = await self.project_handler.brand_handler.get_or_create_brand(data_to_save.brand.brand_name)
+
         async with in_transaction():
 
             category = data_to_save.categories.category
             subcategory = data_to_save.categories.subcategory
-            brand, _ = await self.project_handler.brand_handler.get_or_create_brand(data_to_save.brand.brand_name)
             
             product, _, _ = await Product.get_create_or_update(
                 **data_to_save.product.model_dump(), 
@@ -294,12 +358,19 @@ class SpeedPipeline(Pipeline):
         """Logic for saving data scraped from Essex Parts."""
 
         if data_to_save.price.msrp >= MIN_PRICE:
+            brand, _ = await self.project_handler.brand_handler.get_or_create_brand(data_to_save.brand.brand_name)
+            variation_types = {}
+            for variation in data_to_save.variations or []:
+                variation_type_name = variation.variation_type.variation_type_name
+                variation_types[variation_type_name], _ = await self.project_handler.variation_types.get_or_create(
+                    variation_type_name,
+                    is_required = variation.variation_type.is_required
+                )
+
             async with in_transaction():
                 category = data_to_save.categories.category
                 subcategory = data_to_save.categories.subcategory
 
-                brand, _ = await self.project_handler.brand_handler.get_or_create_brand(data_to_save.brand.brand_name)
-
                 product, _, _ = await Product.get_create_or_update(
                     **data_to_save.product.model_dump(), 
                     supplier=supplier, 
@@ -311,10 +382,7 @@ class SpeedPipeline(Pipeline):
                 await Price.get_create_or_update(**data_to_save.price.model_dump(), product=product)
                 if data_to_save.variations:
                     for variation in data_to_save.variations:
-                        variation_type, _ = await VariationType.get_or_create(
-                            variation_type_name=variation.variation_type.variation_type_name,
-                            is_required = variation.variation_type.is_required
-                        )
+                        variation_type = variation_types[variation.variation_type.variation_type_name]
                         for variation_value in variation.variation_values:
                             await ProductVariation.get_create_or_update(
                                 **variation_value.model_dump(),
@@ -32,6 +32,7 @@ from webweaver.modules.project_modules.speed_fanatics.speed_regex import SpeedRe
 from webweaver.webscraping.spiders.models import SpiderAsset
 from webweaver.webscraping.pipelines.pipeline_base import Pipeline 
 from webweaver.webscraping.registry.scraping_registry import scraping_registry
+from webweaver.project.entity_cache import EntityCache
 from webweaver.project.project_base import ProjectHandler
 
 
@@ -58,6 +59,12 @@ class SpeedProjectHandler(ProjectHandler):
     data_type_to_variation_type:dict[DataTypeEnum, VariationType] = {}
     vehicle_model_mapping = dict[str, VehicleModel]
 
+    # entity caches, the mappings above are their .entities
+    brands:EntityCache = None
+    categories:EntityCache = None
+    subcategories:EntityCache = None
+    variation_types:EntityCache = None
+
     supplier_enum = SupplierEnum
     regex = SpeedRegex
     category_enum = CategoryEnum
@@ -89,8 +96,9 @@ class SpeedProjectHandler(ProjectHandler):
         await self._populate_category_mapping()
         await self._populate_subcategory_mapping()
         await self._populate_brand_mapping()
+        await self._populate_variation_type_name_mapping()
         await self._populate_vehicle_mapping()
-        # await self._populate_variation_type_mapping()
+        # await self._populate_variation_type_name_mapping()
 
 
     async def _populate_vehicle_mapping(self):
@@ -101,29 +109,40 @@ class SpeedProjectHandler(ProjectHandler):
         """Maps the following:
             brandname : Brand
         """
-        brands = await Brand.all()
-        for brand in brands:
-            brand_name_text = self.brand_handler.normalize_brand_name(brand.brand_name)
-            fuzzy_brand_name = self.fuzzy_handler.preprocess(brand_name_text)
-            self.brand_name_to_brand[fuzzy_brand_name] = brand
+        self.brands = EntityCache(
+            Brand,
+            'brand_name',
+            key=self.brand_handler.normalize_brand_name,
+            clean=str.strip,
+        )
+        await self.brands.load()
+        self.brand_name_to_brand = self.brands.entities
 
 
     async def _populate_category_mapping(self):
         """Maps the following:
             CategoryEnum : Category
         """
-        categories = await Category.filter(is_active=True)
-        for category in categories:
-            self.category_enum_to_category[category.category_name] = category
+        self.categories = EntityCache(Category, 'category_name')
+        await self.categories.load(is_active=True)
+        self.category_enum_to_category = self.categories.entities
 
 
     async def _populate_subcategory_mapping(self):
         """Maps the following:
             SubCategoryEnum : SubCategory
         """
-        subcategories = await SubCategory.filter(is_active=True)
-        for subcategory in subcategories:
-            self.subcategory_enum_to_subcategory[subcategory.subcategory_name] = subcategory
+        self.subcategories = EntityCache(SubCategory, 'subcategory_name')
+        await self.subcategories.load(is_active=True)
+        self.subcategory_enum_to_subcategory = self.subcategories.entities
+
+
+    async def _populate_variation_type_name_mapping(self):
+        """Maps the following:
+            variation_type_name : VariationType
+        """
+        self.variation_types = EntityCache(VariationType, 'variation_type_name', clean=str.strip)
+        await self.variation_types.load()
 
 
     async def _populate_spider_asset_mapping(self):
@@ -1 +1 @@
-from .parser import TireCodeParser, TireSpecs
\ No newline at end of file
+from .parser import TireCodeParser, TireCodeParsingError, TireSpecs, parse, parse_many
\ No newline at end of file
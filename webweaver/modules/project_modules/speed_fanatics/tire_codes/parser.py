@@ -1,5 +1,11 @@
-from re import Pattern, Match
-from typing import Callable
+from dataclasses import dataclass
+from functools import lru_cache
+import re
+from re import Pattern
+import sys
+from typing import Callable, Iterable
+
+from webweaver.config import TIRE_CODE_CACHE_SIZE
 from .regex import TireCodeRegex
 
 
@@ -8,17 +14,179 @@ class TireCodeParsingError(Exception):
     pass
 
 
+@dataclass(frozen=True)
 class TireSpecs:
-
-    def __init__(self):
-        self.SERVICE_TYPE = None
-        self.TIRE_WIDTH = None
-        self.ASPECT_RATIO = None
-        self.WHEEL_DIAMETER = None
-        self.OVERALL_DIAMETER = None
-        self.LOAD_INDEX = None
-        self.LOAD_INDEX_DUAL = None
-        self.SPEED_RATING = None
+    """Frozen because parse() hands the same instance to everyone parsing the same string."""
+    SERVICE_TYPE: str | None = None
+    TIRE_WIDTH: str | None = None
+    ASPECT_RATIO: str | None = None
+    WHEEL_DIAMETER: str | None = None
+    OVERALL_DIAMETER: str | None = None
+    LOAD_INDEX: str | None = None
+    LOAD_INDEX_DUAL: str | None = None
+    SPEED_RATING: str | None = None
+
+
+def inch_to_mm(inches:float) -> float:
+    """Converts inches to mm"""
+    return inches * 25.4
+
+
+def preprocess(tire_code:str) -> str:
+    if not isinstance(tire_code, str):
+        raise ValueError(
+            f"tire_code must be of type 'str', not '{type(tire_code).__name__}'")
+    return tire_code.upper().strip().replace('(', '').replace(')', '')
+
+
+# Not all tire codes contain the same information. Each of these turns the groups
+# of its TireCodeRegex format into TireSpecs.
+
+def _from_tire_code(groups:tuple) -> TireSpecs:
+    width, aspect_ratio, wheel_diameter, load_index, load_index_dual, speed_rating = groups
+    return TireSpecs(
+        TIRE_WIDTH=width,
+        ASPECT_RATIO=aspect_ratio,
+        WHEEL_DIAMETER=wheel_diameter,
+        LOAD_INDEX=load_index,
+        LOAD_INDEX_DUAL=load_index_dual,
+        SPEED_RATING=speed_rating,
+    )
+
+
+def _from_tire_code_2(groups:tuple) -> TireSpecs:
+    width, _construction, wheel_diameter, service_type, load_index, load_index_dual, speed_rating = groups
+    return TireSpecs(
+        SERVICE_TYPE=service_type,
+        TIRE_WIDTH=width,
+        WHEEL_DIAMETER=wheel_diameter,
+        LOAD_INDEX=load_index,
+        LOAD_INDEX_DUAL=load_index_dual,
+        SPEED_RATING=speed_rating,
+    )
+
+
+def _from_tire_code_3(groups:tuple) -> TireSpecs:
+    width, aspect_ratio, wheel_diameter, service_type, load_index, load_index_dual, speed_rating = groups
+    return TireSpecs(
+        SERVICE_TYPE=service_type,
+        TIRE_WIDTH=width,
+        ASPECT_RATIO=aspect_ratio,
+        WHEEL_DIAMETER=wheel_diameter,
+        LOAD_INDEX=load_index,
+        LOAD_INDEX_DUAL=load_index_dual,
+        SPEED_RATING=speed_rating,
+    )
+
+
+def _from_tire_code_offroad(groups:tuple) -> TireSpecs:
+    """tire width is converted from inch to mm if its value is less than 50"""
+    overall_diameter, width, _decimals, wheel_diameter, service_type, load_index, speed_rating = groups
+    width_inches = float(width)
+    return TireSpecs(
+        SERVICE_TYPE=service_type,
+        TIRE_WIDTH=str(inch_to_mm(width_inches)) if width_inches <= 50 else str(width_inches),
+        WHEEL_DIAMETER=wheel_diameter,
+        OVERALL_DIAMETER=overall_diameter,
+        LOAD_INDEX=load_index,
+        SPEED_RATING=speed_rating,
+    )
+
+
+def _from_tire_code_reinf(groups:tuple) -> TireSpecs:
+    width, aspect_ratio, wheel_diameter = groups
+    return TireSpecs(
+        TIRE_WIDTH=width,
+        ASPECT_RATIO=aspect_ratio,
+        WHEEL_DIAMETER=wheel_diameter,
+    )
+
+
+class TireCodeMatcher:
+    """Every TireCodeRegex format compiled into one regex, so a tire code is
+    matched in a single call instead of trying the formats one after the other:
+
+        (?P<tire_code>...)|(?P<tire_code_2>...)|...
+
+    re tries the alternatives in order, so the first format that matches still
+    wins. For searching, each alternative starts with a lazy (?s:.*?) and the
+    whole thing is matched from pos, that's format 1 searched through the
+    string, then format 2 etc. Same result as calling search() on each format
+    in turn, not the leftmost match of any of them.
+
+    The format that matched is the outer group that closed last (lastindex), its
+    own groups are the ones right after it.
+    """
+    def __init__(self, formats:dict[str, Pattern], builders:dict[str, Callable[[tuple], TireSpecs]]):
+        self.match_pattern = self.combine(formats, '')
+        self.search_pattern = self.combine(formats, r'(?s:.*?)')
+        self.layout:dict[int, tuple[slice, Callable[[tuple], TireSpecs]]] = {}
+        for name, pattern in formats.items():
+            index = self.match_pattern.groupindex[name]
+            # groups() starts at group 1, so group index + 1 is at groups()[index]
+            self.layout[index] = (slice(index, index + pattern.groups), builders[name])
+
+
+    @staticmethod
+    def combine(formats:dict[str, Pattern], prefix:str) -> Pattern:
+        return re.compile('|'.join(f"{prefix}(?P<{name}>{pattern.pattern})" for name, pattern in formats.items()))
+
+
+    def specs(self, tire_code:str, use_search:bool=False, pos:int=0, endpos:int=sys.maxsize) -> TireSpecs | None:
+        pattern = self.search_pattern if use_search else self.match_pattern
+        match = pattern.match(tire_code, pos, endpos)
+        if match is None:
+            return None
+        groups, builder = self.layout[match.lastindex]
+        return builder(match.groups()[groups])
+
+
+matcher = TireCodeMatcher(
+    TireCodeRegex.formats,
+    {
+        'tire_code': _from_tire_code,
+        'tire_code_2': _from_tire_code_2,
+        'tire_code_3': _from_tire_code_3,
+        'tire_code_offroad': _from_tire_code_offroad,
+        'tire_code_reinf': _from_tire_code_reinf,
+    },
+)
+
+
+@lru_cache(maxsize=TIRE_CODE_CACHE_SIZE)
+def _parse(tire_code:str, use_search:bool, pos:int, endpos:int) -> TireSpecs | None:
+    return matcher.specs(preprocess(tire_code), use_search, pos, endpos)
+
+
+def parse(
+        tire_code:str,
+        use_search:bool=False,
+        raise_exc:bool=True,
+        pos:int=0,
+        endpos:int=sys.maxsize,
+) -> TireSpecs | None:
+    """The TireSpecs of a tire code (or of the first tire code in a product name
+    with use_search), memoized since the same sizes come up over and over.
+    None if it can't be parsed and raise_exc is False.
+    """
+    if not isinstance(tire_code, str):
+        preprocess(tire_code)
+    specs = _parse(tire_code, use_search, pos, endpos)
+    if specs is None and raise_exc:
+        raise TireCodeParsingError(
+            f"Can't parse tire code: '{preprocess(tire_code)}'")
+    return specs
+
+
+def parse_many(tire_codes:Iterable[str], use_search:bool=False, raise_exc:bool=True) -> list[TireSpecs | None]:
+    """parse() for a whole column of tire codes, each distinct one is parsed once."""
+    parsed:dict[str, TireSpecs | None] = {}
+    specs = []
+    for tire_code in tire_codes:
+        if tire_code not in parsed:
+            parsed[tire_code] = parse(tire_code, use_search, raise_exc)
+        specs.append(parsed[tire_code])
+    return specs
 
 
 class TireCodeParser:
@@ -26,7 +194,9 @@ class TireCodeParser:
     Params:
         use_search - use re.Pattern.search() instead of re.Pattern.match()
         raise_exc - Raise an exception (or not) if no tire-code data is found by any of the regex patterns.
-        *args/**kwargs - optional params you want passed to re.Pattern.match() / re.Pattern.search()
+        *args/**kwargs - optional pos/endpos you want passed to re.Pattern.match() / re.Pattern.search()
+
+    Kept for the callers that want an object, parse() does the work.
     """
     @property
     def specs_dict(self) -> dict:
@@ -46,95 +216,6 @@ class TireCodeParser:
     ):
         self._use_search = use_search
         self._raise_exc = raise_exc
-        self.tire_code = self._preprocess(tire_code)
+        self.tire_code = preprocess(tire_code)
         self.regex = TireCodeRegex
-        self.pattern_to_method = self._pattern_to_method_mapping()
-        self.specs = TireSpecs()
-        self._get_specs(*args, **kwargs)
-
-    def _inch_to_mm(self, inches: float) -> float:
-        """Converts inches to mm"""
-        return inches * 25.4
-
-    def _pattern_to_method_mapping(self) -> dict[Pattern, Callable]:
-        """Not all tire codes contain the same information. Different regex patterns
-        will match different sets of tire data. This mapping matches each regex pattern
-        to it's method for populating tire specs with its particular set of data.
-        """
-        return {
-            self.regex.tire_code: self._populate_from_tire_code,
-            self.regex.tire_code_2: self._populate_from_tire_code_2,
-            self.regex.tire_code_3: self._populate_from_tire_code_3,
-            self.regex.tire_code_offroad: self._populate_from_tire_code_offroad,
-            self.regex.tire_code_reinf: self._populate_from_tire_code_reinf,
-        }
-
-    def _preprocess(self, tire_code: str) -> str:
-        if not isinstance(tire_code, str):
-            raise ValueError(
-                f"tire_code must be of type 'str', not '{type(tire_code).__name__}'")
-        return tire_code.upper().strip().replace('(', '').replace(')', '')
-
-    def _get_specs(self, *args, **kwargs):
-        """Try each regex pattern until we get a match, then call that pattern's associated
-        method to populate TireSpec with the tire data.
-        """
-        for pattern, method in self.pattern_to_method.items():
-            if self._use_search:
-                regex_match = pattern.search(self.tire_code, *args, **kwargs)
-            else:
-                regex_match = pattern.match(self.tire_code, *args, **kwargs)
-            if regex_match:
-                method(regex_match)
-                return
-
-        if self._raise_exc:
-            raise TireCodeParsingError(
-                f"Can't parse tire code: '{self.tire_code}'")
-
-    def _populate_from_tire_code(self, match: Match):
-        self.specs.SERVICE_TYPE = None
-        self.specs.TIRE_WIDTH = match.group(1)
-        self.specs.ASPECT_RATIO = match.group(2)
-        self.specs.WHEEL_DIAMETER = match.group(3)
-        self.specs.LOAD_INDEX = match.group(4)
-        self.specs.LOAD_INDEX_DUAL = match.group(5)
-        self.specs.SPEED_RATING = match.group(6)
-
-    def _populate_from_tire_code_2(self, match: Match):
-        self.specs.TIRE_WIDTH = match.group(1)
-        self.specs.ASPECT_RATIO = None
-        self.specs.WHEEL_DIAMETER = match.group(3)
-        self.specs.SERVICE_TYPE = match.group(4)
-        self.specs.LOAD_INDEX = match.group(5)
-        self.specs.LOAD_INDEX_DUAL = match.group(6)
-        self.specs.SPEED_RATING = match.group(7)
-
-    def _populate_from_tire_code_3(self, match: Match):
-        self.specs.TIRE_WIDTH = match.group(1)
-        self.specs.ASPECT_RATIO = match.group(2)
-        self.specs.WHEEL_DIAMETER = match.group(3)
-        self.specs.SERVICE_TYPE = match.group(4)
-        self.specs.LOAD_INDEX = match.group(5)
-        self.specs.LOAD_INDEX_DUAL = match.group(6)
-        self.specs.SPEED_RATING = match.group(7)
-
-    def _populate_from_tire_code_offroad(self, match: Match):
-        """tire width is converted from inch to mm if its value is less than 50"""
-        width_inches = float(match.group(2))
-        self.specs.OVERALL_DIAMETER = match.group(1)
-        self.specs.ASPECT_RATIO = None
-        self.specs.TIRE_WIDTH = str(self._inch_to_mm(
-            width_inches)) if width_inches <= 50 else str(width_inches)
-        self.specs.WHEEL_DIAMETER = match.group(4)
-        self.specs.SERVICE_TYPE = match.group(5)
-        self.specs.LOAD_INDEX = match.group(6)
-        self.specs.SPEED_RATING = match.group(7)
-
-    def _populate_from_tire_code_reinf(self, match: Match):
-        self.specs.SERVICE_TYPE = None
-        self.specs.TIRE_WIDTH = match.group(1)
-        self.specs.ASPECT_RATIO = match.group(2)
-        self.specs.WHEEL_DIAMETER = match.group(3)
-        self.specs.LOAD_INDEX = None
-        self.specs. SPEED_RATING = None
+        self.specs = parse(tire_code, use_search, raise_exc, *args, **kwargs) or TireSpecs()
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+from typing import Any, Callable, Hashable, Iterable
+
+from tortoise.models import Model
+
+
+logger = logging.getLogger('scraping')
+
+
+class EntityCache:
+    """Project-level cache of the rows of a lookup table (Brand, Category...)
+    keyed by one of their unique fields, so pipelines don't hit the DB for
+    every product just to find its brand.
+
+    - key: turns a field value into the cache key, e.g. a normalized brand
+      name so 'Pirelli Tires' and 'PIRELLI' find the same Brand.
+    - clean: turns a value into what gets saved in the field.
+
+    Writes through: rows created by get_or_create()/resolve() go straight into
+    the cache. Concurrent misses on the same key are coalesced (single-flight),
+    only the first caller queries the DB and the others wait for its result.
+
+    Create rows outside of the product's transaction (resolve the batch's
+    brands before in_transaction()), otherwise a rollback leaves the cache
+    holding a row that doesn't exist.
+    """
+    def __init__(
+            self,
+            model:type[Model],
+            field:str,
+            key:Callable[[Any], Hashable]=None,
+            clean:Callable[[Any], Any]=None,
+    ):
+        self.model = model
+        self.field = field
+        self.key = key or (lambda value: value)
+        self.clean = clean or (lambda value: value)
+        self.entities:dict[Hashable, Model] = {}
+        self._pending:dict[Hashable, asyncio.Future] = {}
+
+
+    async def load(self, **filters):
+        """Fills the cache with every row (matching filters)."""
+        for entity in await self.model.filter(**filters):
+            self.add(entity)
+        logger.debug(f"{self.model.__name__} cache loaded ({len(self.entities)} rows)")
+
+
+    def add(self, entity:Model) -> Model:
+        self.entities[self.key(getattr(entity, self.field))] = entity
+        return entity
+
+
+    def get(self, value:Any) -> Model | None:
+        return self.entities.get(self.key(value))
+
+
+    async def get_or_create(self, value:Any, **defaults) -> tuple[Model, bool]:
+        """The cached row for value, or Model.get_or_create() on a miss."""
+        key = self.key(value)
+        await self._wait_for([key])
+        entity = self.entities.get(key)
+        if entity is not None:
+            return entity, False
+
+        self._claim([key])
+        try:
+            entity, created = await self.model.get_or_create(defaults=defaults or None, **{self.field: self.clean(value)})
+            self.add(entity)
+            return entity, created
+        finally:
+            self._release([key])
+
+
+    async def resolve(self, values:Iterable[Any]) -> dict[Any, Model]:
+        """{value: row} for every value, with one IN query for the ones not
+        cached and one bulk_create() for the ones not in the DB either.
+        """
+        keys = {value: self.key(value) for value in values}
+        await self._wait_for(keys.values())
+        missing:dict[Hashable, Any] = {}
+        for value, key in keys.items():
+            if key not in self.entities:
+                missing.setdefault(key, value)
+
+        if missing:
+            self._claim(missing)
+            try:
+                cleaned = {key: self.clean(value) for key, value in missing.items()}
+                for entity in await self.model.filter(**{f"{self.field}__in": set(cleaned.values())}):
+                    self.add(entity)
+                to_create = {key: value for key, value in cleaned.items() if key not in self.entities}
+                if to_create:
+                    # ignore_conflicts: another process may have created some since, and
+                    # bulk_create doesn't give back the ids, so the new rows are fetched again
+                    await self.model.bulk_create([self.model(**{self.field: value}) for value in to_create.values()], ignore_conflicts=True)
+                    for entity in await self.model.filter(**{f"{self.field}__in": set(to_create.values())}):
+                        self.add(entity)
+                    logger.info(f"Created {len(to_create)} {self.model.__name__} rows")
+            finally:
+                self._release(missing)
+
+        return {value: self.entities[key] for value, key in keys.items() if key in self.entities}
+
+
+    async def _wait_for(self, keys:Iterable[Hashable]):
+        """Waits until no other task is fetching/creating any of the keys."""
+        keys = list(keys)
+        while True:
+            pending = {self._pending[key] for key in keys if key in self._pending}
+            if not pending:
+                return
+            await asyncio.wait(pending)
+
+
+    def _claim(self, keys:Iterable[Hashable]):
+        loop = asyncio.get_running_loop()
+        for key in keys:
+            self._pending[key] = loop.create_future()
+
+
+    def _release(self, keys:Iterable[Hashable]):
+        """Wakes up whoever waits on the keys. They look at the cache again,
+        and if the lookup failed, try it themselves.
+        """
+        for key in keys:
+            future = self._pending.pop(key, None)
+            if future is not None and not future.done():
+                future.set_result(None)
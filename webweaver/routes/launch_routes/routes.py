@@ -17,6 +17,8 @@ from webweaver.schema.pydantic_schemas import (
     SpiderAssetDetailSchema, 
     LaunchCampaignSchema, 
     LaunchSpiderSchema, 
+    ScrapeJobLaunchedSchema,
+    ScrapeJobStatusSchema,
     SpiderAssetIdSchema,
     CreateParamsSchema
 )
@@ -33,6 +35,7 @@ from webweaver.webscraping.spiders.models import SpiderAsset, SpiderParameter
 
 from webweaver.webscraping.campaigns.models import ScrapeJob
 from webweaver.webscraping.outfile.outfile_base import OutFileData, OutFile
+from webweaver.webscraping.outfile.outfile_stream import StreamingOutFile
 from webweaver.webscraping.webscrape import WebScrape
 
 
@@ -50,6 +53,10 @@ async def save_job(input:LaunchCampaignSchema):
         raise HTTPException(status_code=404, detail="Can not save job.")
 
 
+    if await StreamingOutFile.can_stream(job, input.file_format):
+        await StreamingOutFile(job, input.file_format).save()
+        return{"Status code":200}
+
     # tables = await job.tables.all()
     # print([table.table_name for table in tables])
     outfile_data = OutFileData(job, file_format=input.file_format)
@@ -63,44 +70,53 @@ async def save_job(input:LaunchCampaignSchema):
 
 
 
-@router.post("/launch_project")
+@router.get("/jobs/{scrape_job_id}/status", response_model=ScrapeJobStatusSchema)
+async def job_status(scrape_job_id:int):
+    status = await WebScrape().job_status(scrape_job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Scrape job not found.")
+    return status
+
+
+
+@router.post("/launch_project", response_model=ScrapeJobLaunchedSchema)
 # async def launch_spider(launch_data:LaunchSpiderSchema, user:User = Depends((AuthRoute.spider_launch))):
 async def launch_project(launch_data:LaunchSpiderSchema):
 
     webscrape = WebScrape()
     # await webscrape.scrape(launch_data, is_proxy=False, is_campaign=False)
-    await webscrape.scrape(
+    scrape_job_id = await webscrape.launch(
         launch_data, 
         is_proxy=True, 
         is_campaign=False,
         project_id=1
     )
 
-    return {"asdffdsa": "fdafdsaf scrapppe"}
+    return {"scrape_job_id": scrape_job_id}
 
 
 
 
-@router.post("/launch_campaign")
+@router.post("/launch_campaign", response_model=ScrapeJobLaunchedSchema)
 async def launch_campaign(launch_data:LaunchCampaignSchema, user:User = Depends((AuthRoute.spider_launch))):
 # async def launch_campaign(launch_input:LaunchInputSchema):
 
     webscrape = WebScrape()
-    await webscrape.scrape(launch_data, is_proxy=False, is_campaign=True)
-    # await webscrape.scrape(launch_data, is_proxy=True, is_campaign=True)
+    scrape_job_id = await webscrape.launch(launch_data, is_proxy=False, is_campaign=True)
+    # scrape_job_id = await webscrape.launch(launch_data, is_proxy=True, is_campaign=True)
 
-    return {"asdffdsa": "fdafdsaf scrapppe"}
+    return {"scrape_job_id": scrape_job_id}
 
 
-@router.post("/launch_spider")
+@router.post("/launch_spider", response_model=ScrapeJobLaunchedSchema)
 # async def launch_spider(launch_data:LaunchSpiderSchema, user:User = Depends((AuthRoute.spider_launch))):
 async def launch_spider(launch_data:LaunchSpiderSchema):
 
     webscrape = WebScrape()
     # await webscrape.scrape(launch_data, is_proxy=False, is_campaign=False)
-    await webscrape.scrape(launch_data, is_proxy=True, is_campaign=False)
+    scrape_job_id = await webscrape.launch(launch_data, is_proxy=True, is_campaign=False)
 
-    return {"asdffdsa": "fdafdsaf scrapppe"}
+    return {"scrape_job_id": scrape_job_id}
 
 
 @router.post("/test_spider")
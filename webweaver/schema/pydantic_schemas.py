@@ -118,6 +118,19 @@ class ParamKeyValueSchema(BaseModel):
     param_value: str
 
 
+class ScrapeJobLaunchedSchema(BaseModel):
+    scrape_job_id: int
+
+
+class ScrapeJobStatusSchema(BaseModel):
+    scrape_job_id: int
+    state: Optional[str]  # QUEUED | RUNNING | COMPLETE | ERROR, None if unknown
+    shards: dict[str, str]  # shard key ("<spider id>.<shard>of<count>") -> state
+    counts: dict[str, int]  # records_scraped, records_saved, records_invalid, records_failed
+    started_at: Optional[float]
+    finished_at: Optional[float]
+
+
 class LaunchSpiderSchema(BaseModel):
     id: int
     file_format: Optional[FileFormatEnum]
@@ -1,4 +1,5 @@
 import asyncio
+import logging
 import random
 import re
 from playwright.async_api import ElementHandle
@@ -8,6 +9,10 @@ from webweaver.webscraping.spiders.spider_base import PlaywrightSpider
 from webweaver.webscraping.spiders.soup_base import SpiderTag, SpiderSoup
 from webweaver.webscraping.spiders.models import SpiderAsset
 
+
+logger = logging.getLogger('scraping')
+
+
 class EventsEyeSelectors:
 
     #index page
@@ -38,6 +43,68 @@ class EventsEyeSelectors:
     event_website = ".more-info a.ev-web" #href
 
 
+def extract_event(soup:SpiderSoup) -> dict:
+    """Scrapes an event page. Runs in the parse pool (EventsEyeSpider.parse()),
+    so it's a plain function returning plain dicts.
+    """
+    selectors = EventsEyeSelectors
+
+    description_element = soup.select_one(selectors.description)
+    cycle_element = soup.select_one(selectors.cycle)
+    audience_element = soup.select_one(selectors.audience)
+    try:
+        venue_name = soup.select_one(selectors.venue_name).text
+    except AttributeError:
+        venue_name = None
+
+    event_email = soup.select_one_attr(selectors.event_email, 'href', strip_text='mailto:')
+    event_website = soup.select_one_attr(selectors.event_website, 'href')
+    try:
+        country = soup.select_one(selectors.country).text
+    except AttributeError:
+        country = None  # the spider logs it and falls back on the index page's country
+
+    industries = [{'industry_name': industry_element.text} 
+                  for industry_element in soup.select(selectors.industries)]
+
+    organizers = []
+    organizer_elements = soup.select(selectors.organizers)
+    for organizer in organizer_elements:
+        d = {}
+        d['organizer_name'] = organizer.select_one_text(selectors.organizer_name)
+        d['phone'] = organizer.select_one_text(selectors.organizer_phone)
+        email = organizer.select_one_attr(selectors.organizer_email, 'href', strip_text='mailto:')
+        # eventseye has screwy html. if theres no email it just appears as hidden <a href="mailto:"> tag lol
+        if email == '':
+            email = None
+        d['email'] = email
+        d['website'] = organizer.select_one_attr(selectors.organizer_website, 'href')
+        organizers.append(d)
+
+    description_element.select_one_and_decompose('h2')
+    cycle_element.select_one_and_decompose('h2')
+    audience_element.select_one_and_decompose('h2')
+
+    data = {
+        'organizers': organizers,
+        'venue': {
+            'venue_name': venue_name,
+        },
+        'event': {
+            'event_name': soup.select_one(selectors.event_name).text.strip(),
+            'description': description_element.text.strip(),
+            'cycle': cycle_element.text.strip(),
+            'audience': audience_element.text,
+            'email': event_email,
+            'website': event_website,
+            'country' : country,
+        },
+        'industries': industries
+    }
+    logger.debug(f"EventsEye event: {data['event']['event_name']}")
+    return data
+
+
 class EventsEyeSpider(PlaywrightSpider):
     
     selectors = EventsEyeSelectors
@@ -64,6 +131,8 @@ class EventsEyeSpider(PlaywrightSpider):
         
         while True:
             await page.wait_for_load_state(state='load', timeout=100000)
+            if self.frontier is not None and not self.frontier.mark_seen(page.url):
+                break  # pagination looped back to a page we've already been through
             await page.wait_for_selector(self.selectors.table)
             trade_show_rows = await page.query_selector_all(self.selectors.tradeshow_rows)
             self.shuffle(trade_show_rows)
@@ -85,6 +154,8 @@ class EventsEyeSpider(PlaywrightSpider):
         outer_soup = self.get_soup(await trade_show_row.inner_html())
         href = outer_soup.select_one(self.selectors.event_link)['href']
         absolute_url = urljoin(base_url, href)
+        if self.frontier is not None and self.frontier.is_seen(absolute_url):
+            return  # scraped this event in this run or a previous one
         date, duration_days = self.get_date_and_duration(
             outer_soup.select_one(self.selectors.date_and_duration)
         )
@@ -95,16 +166,16 @@ class EventsEyeSpider(PlaywrightSpider):
         except AttributeError:
             city, state = (None, None)
 
-        new_spider_context = await self.new_context(stateful=False)
-        new_spider_page = await new_spider_context.new_spider_page()
-        new_page = new_spider_page.page
-        res = await new_spider_page.goto_or_none(absolute_url)
-        if res is None:
-            return
-        await new_page.wait_for_load_state(state='load', timeout=100000)
+        async with await self.new_context(stateful=False) as new_spider_context:
+            new_spider_page = await new_spider_context.new_spider_page()
+            new_page = new_spider_page.page
+            res = await new_spider_page.goto_or_none(absolute_url)
+            if res is None:
+                return
+            await new_page.wait_for_load_state(state='load', timeout=100000)
+            markup = await new_page.inner_html('body')
 
-        soup = self.get_soup(await new_page.inner_html('body'))
-        scraped_data = self.scrape_data(soup)
+        scraped_data = await self.parse(extract_event, markup)
         if scraped_data is None:
             return
         scraped_data['venue']['city'] = city
@@ -112,12 +183,12 @@ class EventsEyeSpider(PlaywrightSpider):
         scraped_data['event']['date'] = date
         scraped_data['event']['duration_days'] = duration_days
         # await self.random_delay(2, 7)
-        await new_page.close()
 
         if scraped_data['venue']['venue_name'] is None:
             scraped_data['venue'] = None
 
         if scraped_data['event']['country'] is None:
+            self.log(self.errors.ElementNotFound(f"{self.selectors.country} on {absolute_url}"))
             try:
                 country_element = outer_soup.select_one(self.selectors.country_backup)
                 country = re.search(r'\((.*?)\)', country_element.text).group(1)
@@ -125,70 +196,11 @@ class EventsEyeSpider(PlaywrightSpider):
                 return
             else:
                 scraped_data['event']['country'] = country
+        if self.frontier is not None:
+            self.frontier.mark_seen(absolute_url, persist=True)
         return scraped_data
 
 
-    def scrape_data(self, soup:SpiderSoup) -> dict:
-
-        print(soup.select_one(self.selectors.event_name).text.strip())
-
-        description_element = soup.select_one(self.selectors.description)
-        cycle_element = soup.select_one(self.selectors.cycle)
-        audience_element = soup.select_one(self.selectors.audience)
-        try:
-            venue_name = soup.select_one(self.selectors.venue_name).text
-        except AttributeError:
-            venue_name = None
-
-        event_email = soup.select_one_attr(self.selectors.event_email, 'href', strip_text='mailto:')
-        event_website = soup.select_one_attr(self.selectors.event_website, 'href')
-        try:
-            country = soup.select_one(self.selectors.country).text
-        except AttributeError as e:
-            self.log(self.errors.ElementNotFound(e))
-            country = None
-        
-        industries = [{'industry_name': industry_element.text} 
-                      for industry_element in soup.select(self.selectors.industries)]
-
-        organizers = []
-        organizer_elements = soup.select(self.selectors.organizers)
-        for organizer in organizer_elements:
-            d = {}
-            d['organizer_name'] = organizer.select_one_text(self.selectors.organizer_name)
-            d['phone'] = organizer.select_one_text(self.selectors.organizer_phone)
-            email = organizer.select_one_attr(self.selectors.organizer_email, 'href', strip_text='mailto:')
-            # eventseye has screwy html. if theres no email it just appears as hidden <a href="mailto:"> tag lol
-            if email == '':
-                email = None
-            d['email'] = email
-            d['website'] = organizer.select_one_attr(self.selectors.organizer_website, 'href')
-            organizers.append(d)
-
-        description_element.select_one_and_decompose('h2')
-        cycle_element.select_one_and_decompose('h2')
-        audience_element.select_one_and_decompose('h2')
-
-        data = {
-            'organizers': organizers,
-            'venue': {
-                'venue_name': venue_name,
-            },
-            'event': {
-                'event_name': soup.select_one(self.selectors.event_name).text.strip(),
-                'description': description_element.text.strip(),
-                'cycle': cycle_element.text.strip(),
-                'audience': audience_element.text,
-                'email': event_email,
-                'website': event_website,
-                'country' : country,
-            },
-            'industries': industries
-        }
-
-        return data
-
-
     def get_date_and_duration(self, date_and_duration:SpiderTag) -> tuple[str, str|None]:
         """Returns a tuple of the date and duration values.
         The "select_and_decompose" method is used because sometimes this element contains
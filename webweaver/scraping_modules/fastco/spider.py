@@ -1,11 +1,14 @@
 from playwright.async_api import ElementHandle, Page, TimeoutError as PlaywrightTimeoutError
+import logging
 import os
 import validators
 
 from webweaver.webscraping.spiders.models import SpiderAsset
 from webweaver.webscraping.spiders.spider_base import PlaywrightSpider
 from webweaver.webscraping.spiders.spider_page import SpiderPage
+from webweaver.webscraping.spiders.resource_policy import ResourcePolicy
 from webweaver.webscraping.spiders.soup_base import SpiderSoup, SpiderTag
+from webweaver.webscraping.spiders.extractor import Extractor, Text, Attr
 from webweaver.modules.project_modules.speed_fanatics.speed_spider import SpeedSpiderMixin
 from webweaver.modules.project_modules.speed_fanatics.speed_enums import (
     TireAttributeEnum, 
@@ -15,6 +18,9 @@ from webweaver.modules.project_modules.speed_fanatics.speed_enums import (
 )
 
 
+logger = logging.getLogger('scraping')
+
+
 class FastcoSelectors:
     
     # Login
@@ -67,6 +73,42 @@ class FastcoSelectors:
     next_page = 'ul.ngx-pagination > li.current + li'
 
 
+def first_segment(text:str) -> str:
+    return text.split('|')[0]
+
+
+def full_size_image_url(src:str) -> str:
+    """The image URL on a product row is a thumbnail. However there is a larger
+    image at an insecure endpoint that can be scraped later. The URL has to be
+    adjusted slightly.
+
+    Example:
+    https://fastcob2bstore.blob.core.windows.net/fastco-media/fastco/media/b2bThumb/NANKANG-AS-2PLUS-X.JPG
+    must become:
+    https://fastcob2bstore.blob.core.windows.net/fastco-media/fastco/media/b2b/NANKANG-AS-2PLUS.JPG
+    """
+    return (src[:-6] + src[-4:]).replace('Thumb','')
+
+
+class FastcoTireRow(Extractor):
+    """The values of every row of a tire product table, as strings. Runs in the
+    parse pool (FastcoSpider.extract()), FastcoSpider.scrape_tire() turns each
+    row into the tire's data.
+    """
+    rows = FastcoSelectors.product_rows
+    tire_code = Text(FastcoSelectors.tire_description, separator='|', strip=True, keep_blank=True, convert=first_segment)  # 245/60R18 105T
+    tire_type = Text(FastcoSelectors.tire_type, keep_blank=True)
+    utqg = Text(FastcoSelectors.tire_utqg, separator=' ', convert=str.strip)  # '' -> None
+    studdable = Text(FastcoSelectors.tire_studdable, keep_blank=True)
+    overall_diameter = Text(FastcoSelectors.tire_od, separator='|', strip=True, keep_blank=True, convert=first_segment)
+    product_name = Text(FastcoSelectors.tire_name, keep_blank=True)
+    description = Text(FastcoSelectors.tire_description, separator='\n', strip=True, keep_blank=True)
+    product_code = Text(FastcoSelectors.tire_product_code, keep_blank=True)
+    msrp = Text(FastcoSelectors.tire_msrp, keep_blank=True)
+    cost = Attr(FastcoSelectors.tire_msrp, 'data-original-title', keep_blank=True)
+    image_url = Attr(FastcoSelectors.image, 'src', convert=full_size_image_url)
+
+
 class FastcoSpider(PlaywrightSpider, SpeedSpiderMixin):
     """This spider should always scrape slowly since we have to login just to view the products.
     Product index will only show max 1000 results if you try to search tires or wheels by "all".
@@ -74,6 +116,10 @@ class FastcoSpider(PlaywrightSpider, SpeedSpiderMixin):
     brand must be filtered by 'tire type': summer, winter, all-weather, all-season.
     """
     selectors = FastcoSelectors
+    resource_policy = ResourcePolicy(
+        block_types=['image', 'media', 'font'],
+        block_urls=['*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*'],
+    )
 
     USERNAME = os.getenv('FASTCO_USER')
     PASSWORD = os.getenv('FASTCO_PASS')
@@ -203,19 +249,16 @@ class FastcoSpider(PlaywrightSpider, SpeedSpiderMixin):
             
             product_table = await spider_page.page.query_selector(self.selectors.product_table)
             if product_table:
-                soup = self.get_soup(await product_table.inner_html())
-
-                product_rows = soup.select(self.selectors.product_rows)
-                for product_row in product_rows:
-                    tire_data = self.scrape_tire(product_row)
+                # up to 1000 rows, parsed in the parse pool so the other spiders keep going meanwhile
+                tires = await self.extract(FastcoTireRow, await product_table.inner_html()) or []
+                for tire in tires:
+                    tire_data = self.scrape_tire(tire)
                     if tire_data:
                         tire_data['brand'] = {'brand_name': brand_name.strip()}
                         tire_data['supplier'] = self.supplier
 
                     yield tire_data
-                print()
-                print(len(product_rows))
-                print('----------------------')
+                logger.debug(f"Fastco {brand_name.strip()}: {len(tires)} tires")
 
 
     def get_inventory_qty(self, tire_row:SpiderTag) -> int:
@@ -235,40 +278,15 @@ class FastcoSpider(PlaywrightSpider, SpeedSpiderMixin):
         return 0
 
 
-    def get_tire_code(self, description_element:SpiderTag) -> str:
-        """Returns the tire size/code. Examples:
-
-            245/60R18 105T
-            305/30ZR19 102W
-            195/60R14 86H
-        """
-        return description_element.get_text(strip=True, separator='|').split('|')[0]
-
-
-    def scrape_overall_diameter(self, od_element:SpiderTag) -> str|None:
-        text_parts = od_element.get_text(strip=True, separator='|').split('|')
-        return text_parts[0]
-
-
-    def scrape_utqg(self, utqg_element:SpiderTag) -> str|None:
-        """Careful to ensure '' returns as None"""
-
-        # print('utqg element: ', utqg_element)
-
-        utqg = utqg_element.get_text(separator=' ').strip()
-        # print('utqg: ', utqg)
-        return utqg if utqg else None
-
-
-    def scrape_studdable(self, studdable_element:SpiderTag) -> bool:
-        match studdable_element.text.lower().strip():
+    def scrape_studdable(self, studdable:str) -> bool:
+        match studdable.lower().strip():
             case 'yes':
                 return True
             case 'no':
                 return False
             case _:
                 raise self.errors.WebScrapingError(
-                    f"Can't determine bool from studdable value: {studdable_element.text.lower().strip()}"
+                    f"Can't determine bool from studdable value: {studdable.lower().strip()}"
                 )
 
     def scrape_cost(self, price_element:SpiderTag) -> str:
@@ -279,7 +297,10 @@ class FastcoSpider(PlaywrightSpider, SpeedSpiderMixin):
         
         A pox on whoever wrote Fastco's HTML.
         """
-        cost_string = price_element.get('data-original-title')
+        return self.parse_cost(price_element.get('data-original-title'))
+
+
+    def parse_cost(self, cost_string:str) -> str:
         try:
             cost =  cost_string.split(':')[1].strip()
         except (AttributeError, IndexError) as e:
@@ -291,57 +312,38 @@ class FastcoSpider(PlaywrightSpider, SpeedSpiderMixin):
 
 
     def scrape_image_url(self, img_element:SpiderTag) -> str|None:
-        """The image URL for this img_element will be a thumbnail. However
-        there is a larger image at an insecure endpoint that can be scraped later.
-        The URL has to be adjusted slightly.
-
-        Example:
-        https://fastcob2bstore.blob.core.windows.net/fastco-media/fastco/media/b2bThumb/NANKANG-AS-2PLUS-X.JPG
-        must become:
-        https://fastcob2bstore.blob.core.windows.net/fastco-media/fastco/media/b2b/NANKANG-AS-2PLUS.JPG
-        """
+        """The full size image URL, see full_size_image_url()."""
         src = img_element.get('src') if img_element else None
         if src:
-            return (src[:-6] + src[-4:]).replace('Thumb','')
+            return full_size_image_url(src)
 
 
-    def scrape_product_name(self, product_name_element:SpiderTag, tire_code:str) -> str:
+    def scrape_product_name(self, product_name:str|None, tire_code:str) -> str:
         """Fastco products sometimes have identical names.
         The tire code is appended to the product name to keep
         product names unique & descriptive.
         """
-        if not product_name_element:
+        if product_name is None:
             raise self.errors.WebScrapingError(f"No product name found for tire code '{tire_code}'")
-        return f"{product_name_element.text.strip()} {tire_code.strip()}"
+        return f"{product_name.strip()} {tire_code.strip()}"
 
 
-    def scrape_tire(self, tire_row:SpiderTag) -> dict:
-
-        img_element = tire_row.select_one(self.selectors.image)
-        tire_name_element = tire_row.select_one(self.selectors.tire_name)
-        description_element = tire_row.select_one(self.selectors.tire_description)
-        tire_type_element = tire_row.select_one(self.selectors.tire_type)
-        utqg_element = tire_row.select_one(self.selectors.tire_utqg)
-        overall_diameter_element = tire_row.select_one(self.selectors.tire_od)
-        studdable_element = tire_row.select_one(self.selectors.tire_studdable)
-        price_element = tire_row.select_one(self.selectors.tire_msrp)
-        product_code_element = tire_row.select_one(self.selectors.tire_product_code)
-        inventory_qty = self.get_inventory_qty(tire_row)
-
+    def scrape_tire(self, tire:dict) -> dict:
+        """Turns a FastcoTireRow record into the tire's data."""
         subcategory_enum = self.speed_mapping.text_to_subcategory_enum.get(
-            self.fuzzing.preprocess(tire_type_element.text)
+            self.fuzzing.preprocess(tire['tire_type'])
         )
 
-        tire_code = self.get_tire_code(description_element)
+        tire_code = tire['tire_code']
         try:
             tire_attributes = self.tire_attributes_from_tire_code(tire_code)
         except self.errors.WebScrapingError as e:
             self.log(msg=e)
             return
         
-        tire_attributes[TireAttributeEnum.UTQG] = self.scrape_utqg(utqg_element)
-        tire_attributes[TireAttributeEnum.STUDDABLE] = self.scrape_studdable(studdable_element)
-        tire_attributes[TireAttributeEnum.OVERALL_DIAMETER] = self.scrape_overall_diameter(overall_diameter_element)
+        tire_attributes[TireAttributeEnum.UTQG] = tire['utqg']
+        tire_attributes[TireAttributeEnum.STUDDABLE] = self.scrape_studdable(tire['studdable'])
+        tire_attributes[TireAttributeEnum.OVERALL_DIAMETER] = tire['overall_diameter']
 
         tire_attributes_dict = {key.value: value for key, value in tire_attributes.items()}
 
@@ -351,20 +353,20 @@ class FastcoSpider(PlaywrightSpider, SpeedSpiderMixin):
                 'subcategory' : self.get_subcategory_from_enum(subcategory_enum)
             },
             'product': {
-                'product_name': self.scrape_product_name(tire_name_element, tire_code),
-                'description': description_element.get_text(separator='\n', strip=True),
-                'product_code': product_code_element.text,
+                'product_name': self.scrape_product_name(tire['product_name'], tire_code),
+                'description': tire['description'],
+                'product_code': tire['product_code'],
             },
             'price': {
-                'msrp': price_element.text,
+                'msrp': tire['msrp'],
             },
             'cost': {
-                'cost': self.scrape_cost(price_element),
+                'cost': self.parse_cost(tire['cost']),
             },
             'tire_attributes' : tire_attributes_dict,
             'wheel_attributes' : None,
             'image_url': {
-                'image_url': self.scrape_image_url(img_element)
+                'image_url': tire['image_url']
             }
         }
 
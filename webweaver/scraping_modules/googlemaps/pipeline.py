@@ -26,5 +26,11 @@ class GoogleMapsPipeline(Pipeline):
             await GoogleMapsReview.bulk_create(reviews)
 
         return
+
+
+    async def save_batch(self) -> tuple[int, int]:
+        """save_data() already bulk-creates over self.batch_data_to_save."""
+        await self.save_data()
+        return len(self.batch_data_to_save), 0
     
 
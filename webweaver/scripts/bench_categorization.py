@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""speed_fanatics categorization with the precompiled KeywordIndex vs the old
+per-product walk over CategoryKeyWords/SubCategoryRuleset, plus a parity check
+that both pick the same CategoryEnum/SubCategoryEnum for every product.
+
+Pass a file of real product names, one per line with an optional tab separated
+category name after it (e.g. a CSV export of the product tables). Without one,
+it makes up --products names out of the ruleset's own words:
+
+    python -m webweaver.scripts.bench_categorization --names speed_product_names.tsv
+"""
+import argparse
+from collections import Counter
+from pathlib import Path
+import random
+import time
+
+from webweaver.modules.project_modules.speed_fanatics.categorization.category_handler import CategoryHandler
+from webweaver.modules.project_modules.speed_fanatics.categorization.category_keywords import CategoryKeyWords
+from webweaver.modules.project_modules.speed_fanatics.categorization.subcategory_handler import SubCategoryHandler
+from webweaver.modules.project_modules.speed_fanatics.categorization.subcategory_ruleset import SubCategoryRuleset
+from webweaver.modules.project_modules.speed_fanatics.speed_enums import CategoryEnum, SubCategoryEnum, MatchMode
+from webweaver.modules.project_modules.speed_fanatics.speed_fuzz import SpeedFuzzyHandler
+
+
+class BenchProjectHandler:
+    """All the handlers need from SpeedProjectHandler."""
+    fuzzy_handler = SpeedFuzzyHandler
+
+
+class LegacyCategoryHandler(CategoryHandler):
+    """CategoryHandler before the KeywordIndex: the keyword/substring dicts
+    are rebuilt and every category's sets scanned for every product.
+    """
+    @property
+    def keyword_sets(self) -> dict[CategoryEnum, set]:
+        return {category_enum: modes[MatchMode.KEYWORDS] for category_enum, modes in self.keywords.categories.items() if MatchMode.KEYWORDS in modes}
+
+    @property
+    def substring_sets(self) -> dict[CategoryEnum, set]:
+        return {category_enum: modes[MatchMode.SUBSTRINGS] for category_enum, modes in self.keywords.categories.items() if MatchMode.SUBSTRINGS in modes}
+
+    def check_keywords_in_set(self, product_name:str, category_name:str=None) -> list[CategoryEnum]:
+        category_enums = []
+        for category_enum, keyword_set in self.keyword_sets.items():
+            if self.contains_keywords(product_name, keyword_set):
+                category_enums.append(category_enum)
+            if category_name:
+                if self.contains_keywords(category_name, keyword_set):
+                    category_enums.append(category_enum)
+        return category_enums
+
+    def keyword_set_substrings(self, product_name:str, category_name:str=None) -> list[CategoryEnum]:
+        product_name = self.project_handler.fuzzy_handler.preprocess(product_name)
+        # the old code raised TypeError here for products without a category name
+        category_name = self.project_handler.fuzzy_handler.preprocess(category_name) if category_name else None
+        category_enums = []
+        for category_enum, keyword_set in self.substring_sets.items():
+            if self.search_substrings(product_name, keyword_set):
+                category_enums.append(category_enum)
+            if category_name:
+                if self.search_substrings(category_name, keyword_set):
+                    category_enums.append(category_enum)
+        return category_enums
+
+
+class LegacySubCategoryHandler(SubCategoryHandler):
+    """SubCategoryHandler before the KeywordIndex: get_rules() walks the
+    SubCategoryRuleset tree for every product.
+    """
+    def get_rules(self, category_enum:CategoryEnum, match_mode:MatchMode) -> dict[SubCategoryEnum, set | list]:
+        rules = {}
+        if category_enum != CategoryEnum.UNKNOWN:
+            categories = [self.ruleset.category_enum_to_subcategory_rules[category_enum]]
+        else:
+            categories = self.ruleset.category_enum_to_subcategory_rules.values()
+        for subcategory_rules in categories:
+            for subcategory_enum, match_mode_dict in subcategory_rules.items():
+                for match_mode_enum, wordlist in match_mode_dict.items():
+                    if match_mode_enum == match_mode:
+                        rules[subcategory_enum] = wordlist
+        return rules
+
+    def try_regex(self, product_name:str, category_enum:CategoryEnum) -> SubCategoryEnum | None:
+        for subcategory_enum, regex_list in self.get_rules(category_enum, MatchMode.REGEX).items():
+            for regex_pattern in regex_list:
+                if self.regex_search(s=product_name, pattern=regex_pattern):
+                    return subcategory_enum
+
+    def check_keywords_in_set(self, product_name:str, category_enum:CategoryEnum, category_name:str=None) -> list[SubCategoryEnum]:
+        subcategory_enums = []
+        for subcategory_enum, keyword_set in self.get_rules(category_enum, MatchMode.KEYWORDS).items():
+            if self.contains_keywords(product_name, keyword_set):
+                subcategory_enums.append(subcategory_enum)
+            if category_name:
+                if self.contains_keywords(category_name, keyword_set):
+                    subcategory_enums.append(subcategory_enum)
+        return subcategory_enums
+
+    def keyword_set_substrings(self, product_name:str, category_enum:CategoryEnum, category_name:str=None) -> list[SubCategoryEnum]:
+        product_name = self.project_handler.fuzzy_handler.preprocess(product_name)
+        # the old code raised TypeError here for products without a category name
+        category_name = self.project_handler.fuzzy_handler.preprocess(category_name) if category_name else None
+        subcategory_enums = []
+        for subcategory_enum, keyword_set in self.get_rules(category_enum, MatchMode.SUBSTRINGS).items():
+            if self.search_substrings(product_name, keyword_set):
+                subcategory_enums.append(subcategory_enum)
+            if category_name:
+                if self.search_substrings(category_name, keyword_set):
+                    subcategory_enums.append(subcategory_enum)
+        return subcategory_enums
+
+
+BRANDS = ['Brembo', 'StopTech', 'Michelin', 'Pirelli', 'BBS', 'Borla', 'K&N', 'KW', 'Eibach', 'Alpinestars', 'Gorilla', 'Verus Engineering', 'McGill']
+FILLER = ['Front', 'Rear', 'Pro', 'GT', 'Sport', 'Black', 'Chrome', 'Kit', 'Set of 4', 'for BMW M3', 'Honda Civic Type R', '–', 'Performance', 'Street', 'Race']
+SIZES = ['245/40ZR18 97Y', '12x1.5', '18x9.5 +35', '5x114.3', 'Size L', '4-Piston', '2.5"', '']
+CATEGORY_NAMES = ['', 'Brakes', 'Brake Kits', 'Exhaust Systems', 'Cat-Back Exhaust', 'Wheels', 'Wheel Accessories', 'Lug Nuts', 'Tires',
+                  'Summer Tires', 'Winter Tires', 'Racewear', 'Helmets', 'Suspension', 'Coilovers', 'Intake', 'Autobody', 'Parts']
+
+
+def rule_words() -> list[str]:
+    words = set()
+    for modes in CategoryKeyWords.categories.values():
+        words.update(modes.get(MatchMode.KEYWORDS, ()))
+        words.update(modes.get(MatchMode.SUBSTRINGS, ()))
+    for subcategory_rules in SubCategoryRuleset.category_enum_to_subcategory_rules.values():
+        for modes in subcategory_rules.values():
+            words.update(modes.get(MatchMode.KEYWORDS, ()))
+            words.update(modes.get(MatchMode.SUBSTRINGS, ()))
+    return sorted(words)
+
+
+def made_up_products(count:int, seed:int=0) -> list[tuple[str, str]]:
+    rng = random.Random(seed)
+    words = rule_words()
+    products = []
+    for _ in range(count):
+        name = [rng.choice(BRANDS), *rng.sample(FILLER, rng.randint(0, 3)), *rng.sample(words, rng.randint(0, 3)), rng.choice(SIZES)]
+        rng.shuffle(name)
+        name = ' '.join(word for word in name if word)
+        products.append((name.title() if rng.random() < 0.5 else name, rng.choice(CATEGORY_NAMES)))
+    return products
+
+
+def read_products(path:str) -> list[tuple[str, str]]:
+    products = []
+    for line in Path(path).read_text().splitlines():
+        if line.strip():
+            product_name, _, category_name = line.partition('\t')
+            products.append((product_name.strip(), category_name.strip()))
+    return products
+
+
+def categorize(category_handler:CategoryHandler, subcategory_handler:SubCategoryHandler, products:list[tuple[str, str]]) -> list[tuple]:
+    results = []
+    for product_name, category_name in products:
+        category_enum = category_handler.get_category_enum(product_name, category_name)
+        subcategory_enum = subcategory_handler.get_subcategory_enum(product_name, category_enum, category_name)
+        regex_enum = subcategory_handler.try_regex(subcategory_handler.normalize_text(product_name), category_enum)
+        results.append((category_enum, subcategory_enum, regex_enum))
+    return results
+
+
+def best_of(repeat:int, func, *args) -> tuple[float, object]:
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(args):
+    products = read_products(args.names) if args.names else made_up_products(args.products)
+    project_handler = BenchProjectHandler()
+
+    start = time.perf_counter()
+    category_handler, subcategory_handler = CategoryHandler(project_handler), SubCategoryHandler(project_handler)
+    compile_ms = (time.perf_counter() - start) * 1000
+    legacy_seconds, legacy = best_of(args.repeat, categorize, LegacyCategoryHandler(project_handler), LegacySubCategoryHandler(project_handler), products)
+    index_seconds, indexed = best_of(args.repeat, categorize, category_handler, subcategory_handler, products)
+
+    mismatches = [(product, old, new) for product, old, new in zip(products, legacy, indexed) if old != new]
+    print(f"{len(products)} products, best of {args.repeat} (indexes compiled in {compile_ms:.1f} ms)")
+    print(f"{'':<14}{'total ms':>10}{'us/product':>12}")
+    for name, seconds in (('rule walk', legacy_seconds), ('KeywordIndex', index_seconds)):
+        print(f"{name:<14}{seconds * 1000:>10.1f}{seconds / len(products) * 1e6:>12.1f}")
+    print(f"speedup {legacy_seconds / index_seconds:.1f}x, {len(mismatches)} mismatches")
+    for (product_name, category_name), old, new in mismatches[:10]:
+        print(f"  {product_name!r} ({category_name!r}): {old} != {new}")
+    categories = Counter(category_enum for category_enum, _subcategory_enum, _regex_enum in indexed)
+    print("categories:", ', '.join(f"{category_enum.value} {count}" for category_enum, count in categories.most_common()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--names", help="file of product names, optionally followed by a tab and the category name")
+    parser.add_argument("--products", type=int, default=5000, help="made up products when there's no --names file")
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
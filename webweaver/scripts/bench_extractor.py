@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""Extractor (compiled lxml XPath) vs SpiderSoup (BeautifulSoup + soupsieve) on
+Fastco tire tables and TheWheelShop collection pages, plus a parity check that
+both give the same records.
+
+Pass saved pages to benchmark the real thing, without them it makes up pages
+with --rows rows:
+
+    python -m webweaver.scripts.bench_extractor --fastco fastco_tires.html --wheelshop wheelshop_summer_tires.html
+"""
+import argparse
+from pathlib import Path
+import time
+
+from webweaver.scraping_modules.fastco.spider import FastcoSelectors, FastcoTireRow, full_size_image_url
+from webweaver.scraping_modules.thewheelshop.spider import TheWheelShopSelectors
+from webweaver.scripts.bench_parse_pool import product_table
+from webweaver.webscraping.spiders.extractor import Extractor, Text, Attr, Exists
+from webweaver.webscraping.spiders.soup_base import SpiderSoup
+
+
+CARD = """
+<div class="grid__item grid-product" data-product-id="{i}">
+  <div class="grid-product__content">
+    {tags}
+    <a href="/collections/summer-tires/products/tire-{i}" class="grid-product__link">
+      <div class="grid-product__image-mask"><img class="grid__image-contain" src="//cdn.example.com/tire-{i}_300x.jpg" alt=""></div>
+      <div class="grid-product__meta">
+        <div class="grid-product__title grid-product__title--body">Summer Tire {i} 245/40R18</div>
+        <div class="grid-product__vendor">Brand {b}</div>
+        <div class="grid-product__price">
+          <span class="visually-hidden">Regular price</span>
+          {old}<span class="visually-hidden">Sale price</span>${i}.99
+        </div>
+      </div>
+    </a>
+  </div>
+</div>"""
+
+
+def wheelshop_page(cards:int) -> str:
+    html = []
+    for i in range(cards):
+        on_sale = i % 3 == 0
+        html.append(CARD.format(
+            i=i,
+            b=i % 17,
+            tags=('<div class="grid-product__tag grid-product__tag--sale">Sale</div>' if on_sale else '')
+                + ('<div class="grid-product__tag grid-product__tag--sold-out">Sold Out</div>' if i % 11 == 0 else ''),
+            old=f'<span class="grid-product__price--original">${i + 20}.99</span>' if on_sale else '',
+        ))
+    return '<html><body><div class="grid grid--uniform">' + "".join(html) + '</div></body></html>'
+
+
+class WheelShopCard(Extractor):
+    rows = TheWheelShopSelectors.product_cards
+    product_name = Text(TheWheelShopSelectors.product_name, separator=' ', strip=True)
+    brand = Text(TheWheelShopSelectors.brand, separator=' ', strip=True)
+    price = Text(TheWheelShopSelectors.price, separator=' ', strip=True)
+    price_old = Text(TheWheelShopSelectors.price_old, separator=' ', strip=True)
+    sold_out = Exists(TheWheelShopSelectors.sold_out)
+    is_sale = Exists(TheWheelShopSelectors.is_sale)
+    pdp_link = Attr(TheWheelShopSelectors.pdp_link, 'href')
+    image = Attr(TheWheelShopSelectors.image_main, 'src')
+
+
+def soup_wheelshop(markup:str) -> list[dict]:
+    """The same records the SpiderSoup way."""
+    s = TheWheelShopSelectors
+    soup = SpiderSoup("BenchSpider", markup)
+    def text(card, selector):
+        element = card.select_one(selector)
+        return (element.get_text(separator=' ', strip=True) or None) if element else None
+    return [
+        {
+            'product_name': text(card, s.product_name),
+            'brand': text(card, s.brand),
+            'price': text(card, s.price),
+            'price_old': text(card, s.price_old),
+            'sold_out': bool(card.select_one(s.sold_out)),
+            'is_sale': bool(card.select_one(s.is_sale)),
+            'pdp_link': card.select_one_attr(s.pdp_link, 'href'),
+            'image': card.select_one_attr(s.image_main, 'src'),
+        }
+        for card in soup.select(s.product_cards)
+    ]
+
+
+def soup_fastco(markup:str) -> list[dict]:
+    """What fastco's tire rows looked like before FastcoTireRow."""
+    s = FastcoSelectors
+    soup = SpiderSoup("BenchSpider", markup)
+    tires = []
+    for row in soup.select(s.product_rows):
+        name = row.select_one(s.tire_name)
+        description = row.select_one(s.tire_description)
+        price = row.select_one(s.tire_msrp)
+        utqg = row.select_one(s.tire_utqg).get_text(separator=' ').strip()
+        img = row.select_one(s.image)
+        src = img.get('src') if img else None
+        tires.append({
+            'tire_code': description.get_text(strip=True, separator='|').split('|')[0],
+            'tire_type': row.select_one(s.tire_type).text,
+            'utqg': utqg if utqg else None,
+            'studdable': row.select_one(s.tire_studdable).text,
+            'overall_diameter': row.select_one(s.tire_od).get_text(strip=True, separator='|').split('|')[0],
+            'product_name': name.text if name else None,
+            'description': description.get_text(separator='\n', strip=True),
+            'product_code': row.select_one(s.tire_product_code).text,
+            'msrp': price.text,
+            'cost': price.get('data-original-title'),
+            'image_url': full_size_image_url(src) if src else None,
+        })
+    return tires
+
+
+def best_of(repeat:int, func, *args) -> tuple[float, object]:
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def mismatches(a:list[dict], b:list[dict]) -> int:
+    if len(a) != len(b):
+        return abs(len(a) - len(b)) + sum(x != y for x, y in zip(a, b))
+    return sum(x != y for x, y in zip(a, b))
+
+
+def bench(name:str, markup:str, soup_func, extractor:type[Extractor], repeat:int):
+    soup_seconds, soup_records = best_of(repeat, soup_func, markup)
+    extractor_seconds, extractor_records = best_of(repeat, extractor.extract, markup)
+    bad = mismatches(soup_records, extractor_records)
+    print(
+        f"{name:<12}{len(extractor_records):>7}{soup_seconds * 1000:>15.1f}{extractor_seconds * 1000:>15.1f}"
+        f"{soup_seconds / extractor_seconds:>10.1f}x{bad:>12}"
+    )
+    if bad:
+        for x, y in zip(soup_records, extractor_records):
+            if x != y:
+                print(f"  first mismatch:\n    SpiderSoup: {x}\n    Extractor:  {y}")
+                break
+
+
+def main(args):
+    fastco = Path(args.fastco).read_text() if args.fastco else product_table(args.rows)
+    wheelshop = Path(args.wheelshop).read_text() if args.wheelshop else wheelshop_page(args.rows)
+    print(f"best of {args.repeat}, parse + extract")
+    print(f"{'page':<12}{'rows':>7}{'SpiderSoup ms':>15}{'Extractor ms':>15}{'speedup':>11}{'mismatches':>12}")
+    bench("fastco", fastco, soup_fastco, FastcoTireRow, args.repeat)
+    bench("wheelshop", wheelshop, soup_wheelshop, WheelShopCard, args.repeat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fastco", help="saved Fastco product table HTML")
+    parser.add_argument("--wheelshop", help="saved TheWheelShop collection page HTML")
+    parser.add_argument("--rows", type=int, default=1000, help="rows of the made up pages")
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""FuzzyHandler.best_match()/best_matches() vs the old one process.extractOne()
+per product over the whole data set, plus a parity check that all of them give
+the same (choice, score, index).
+
+Pass files of real strain names and product names (one per line) to
+benchmark the dispensaries case, without them it makes up --strains strain
+names and --products product names:
+
+    python -m webweaver.scripts.bench_fuzzy --strains strains.txt --products product_names.txt --cutoff 100
+"""
+import argparse
+from pathlib import Path
+import random
+import time
+
+from rapidfuzz import process, fuzz
+
+from webweaver.webscraping.fuzzy_matching.fuzzy_handler import FuzzyHandler
+
+
+WORDS = ['blue', 'dream', 'og', 'kush', 'sour', 'diesel', 'gelato', 'girl', 'scout', 'cookies', 'wedding', 'cake', 'purple', 'haze',
+         'lemon', 'skunk', 'gorilla', 'glue', 'pineapple', 'express', 'northern', 'lights', 'jack', 'herer', 'white', 'widow',
+         'gsc', 'zkittlez', 'runtz', 'mac', 'banana', 'grape', 'ape', 'pink', 'bubba', 'chem', 'super', 'silver', 'trainwreck']
+PRODUCT_NOISE = ['3.5g', '7g', '28g', 'indica', 'sativa', 'hybrid', 'pre-roll', '1g', 'aaa', 'aaaa', 'live resin', 'shatter', '(h)', '-', 'bulk']
+
+
+def made_up_strains(count:int, rng:random.Random) -> list[str]:
+    strains = set()
+    while len(strains) < count:
+        strains.add(' '.join(rng.sample(WORDS, rng.randint(1, 3))).title() + ('' if rng.random() < 0.8 else f' #{rng.randint(1, 99)}'))
+    return sorted(strains)
+
+
+def made_up_products(count:int, strains:list[str], rng:random.Random) -> list[str]:
+    products = []
+    for _ in range(count):
+        name = rng.choice(strains) if rng.random() < 0.7 else ' '.join(rng.sample(WORDS, rng.randint(1, 3)))
+        noise = rng.sample(PRODUCT_NOISE, rng.randint(0, 3))
+        products.append(' '.join([name, *noise]) if rng.random() < 0.6 else name)
+    return products
+
+
+def read_lines(path:str) -> list[str]:
+    return [line.strip() for line in Path(path).read_text().splitlines() if line.strip()]
+
+
+def old_best_matches(handler:FuzzyHandler, strings:list[str], cutoff:float) -> list:
+    """What FuzzyHandler.best_match() did for each string before: extractOne over every string in the data set."""
+    return [process.extractOne(handler.preprocess(s), handler.data_set, scorer=fuzz.WRatio, score_cutoff=cutoff) for s in strings]
+
+
+def timed(func, *args, **kwargs) -> tuple[float, list]:
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main(args):
+    rng = random.Random(0)
+    strains = read_lines(args.strains) if args.strains else made_up_strains(args.strain_count, rng)
+    products = read_lines(args.products) if args.products else made_up_products(args.product_count, strains, rng)
+    print(f"{len(products)} products ({len(set(products))} distinct) against {len(strains)} strains, fuzz.WRatio")
+    print(f"{'cutoff':<8}{'extractOne s':>14}{'best_match s':>14}{'memoized s':>12}{'best_matches s':>16}{'speedup':>9}{'mismatches':>12}")
+    for cutoff in args.cutoff:
+        cutoff = cutoff or None
+        handler = FuzzyHandler(strains, preprocess=True)
+        old_seconds, old = timed(old_best_matches, handler, products, cutoff)
+        single_seconds, single = timed(lambda: [handler.best_match(s, score_cutoff=cutoff) for s in products])
+        memo_seconds, _memo = timed(lambda: [handler.best_match(s, score_cutoff=cutoff) for s in products])
+        batch_seconds, batch = timed(FuzzyHandler(strains, preprocess=True).best_matches, products, score_cutoff=cutoff, workers=args.workers)
+        mismatches = sum(o != s or o != b for o, s, b in zip(old, single, batch))
+        print(
+            f"{str(cutoff):<8}{old_seconds:>14.2f}{single_seconds:>14.2f}{memo_seconds:>12.3f}{batch_seconds:>16.2f}"
+            f"{old_seconds / min(single_seconds, batch_seconds):>8.1f}x{mismatches:>12}"
+        )
+        for product, o, s, b in zip(products, old, single, batch):
+            if o != s or o != b:
+                print(f"  first mismatch {product!r}:\n    extractOne:   {o}\n    best_match:   {s}\n    best_matches: {b}")
+                break
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--strains", help="file of strain names, one per line")
+    parser.add_argument("--products", help="file of product names, one per line")
+    parser.add_argument("--strain-count", type=int, default=5000, help="made up strains when there's no --strains file")
+    parser.add_argument("--product-count", type=int, default=3000, help="made up products when there's no --products file")
+    parser.add_argument("--cutoff", type=float, nargs="+", default=[0, 80, 95, 100], help="score cutoffs to run, 0 for none")
+    parser.add_argument("--workers", type=int, default=-1, help="cdist threads for best_matches()")
+    main(parser.parse_args())
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Event loop latency while spiders parse big pages, with and without the parse pool.
+
+A heartbeat task sleeps for --tick ms over and over and records how late it
+wakes up, which is how long any other spider's I/O would have waited. Meanwhile
+--spiders tasks each parse --pages Fastco-sized product tables (--rows rows).
+
+    python -m webweaver.scripts.bench_parse_pool --rows 1000 --pages 5 --spiders 4
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from webweaver.webscraping.spiders.parse_pool import ParsePoolManager
+from webweaver.webscraping.spiders.soup_base import SpiderSoup
+
+
+ROW = """
+<tr class="table-row">
+  <td><a href="#"><img src="https://example.com/media/b2bThumb/TIRE-{i}-X.JPG"></a></td>
+  <td></td><td></td><td></td>
+  <td><app-product-details-modal>Tire Model {i}</app-product-details-modal><span class="sku-tooltip">SKU{i:06d}</span></td>
+  <td>245/60R18 105T<br>All Season Touring {i}</td>
+  <td>All Season</td>
+  <td>500 A A</td>
+  <td>29.6"<br>752mm</td>
+  <td>No</td>
+  <td><div id="calgary-Qty"><span>{i}</span></div><div id="montreal-Qty"><span>4</span></div></td>
+  <td>2-3 days</td>
+  <td><span class="withoutPadding" data-original-title="Net Price: ${i}.80">${i}.99</span></td>
+</tr>"""
+
+
+def product_table(rows:int) -> str:
+    return '<table id="sortTable"><tbody>' + "".join(ROW.format(i=i) for i in range(rows)) + "</tbody></table>"
+
+
+def extract_rows(soup:SpiderSoup) -> list[dict]:
+    """Roughly what fastco's extract_tires() does."""
+    return [
+        {
+            'product_name': row.select_one_text('td:nth-of-type(5) app-product-details-modal'),
+            'product_code': row.select_one_text('td:nth-of-type(5) .sku-tooltip'),
+            'tire_code': row.select_one('td:nth-of-type(6)').get_text(strip=True, separator='|').split('|')[0],
+            'tire_type': row.select_one_text('td:nth-of-type(7)'),
+            'msrp': row.select_one_text('td:nth-of-type(13) .withoutPadding'),
+            'cost': row.select_one_attr('td:nth-of-type(13) .withoutPadding', 'data-original-title'),
+            'image_url': row.select_one_attr('a img', 'src'),
+        }
+        for row in soup.select('.table-row')
+    ]
+
+
+async def heartbeat(tick:float, lags:list[float], stop:asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(tick)
+        lags.append(time.perf_counter() - start - tick)
+
+
+async def spider(pool:ParsePoolManager, markup:str, pages:int) -> int:
+    rows = 0
+    for _ in range(pages):
+        rows += len(await pool.run(extract_rows, "BenchSpider", markup))
+        await asyncio.sleep(0.001)  # stands in for the request for the next page
+    return rows
+
+
+async def run(pool:ParsePoolManager, markup:str, args) -> dict:
+    lags:list[float] = []
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(args.tick / 1000, lags, stop))
+    start = time.perf_counter()
+    rows = await asyncio.gather(*(spider(pool, markup, args.pages) for _ in range(args.spiders)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+    lags.sort()
+    return {
+        'rows': sum(rows),
+        'seconds': elapsed,
+        'max_lag_ms': lags[-1] * 1000 if lags else 0.0,
+        'p99_lag_ms': lags[min(int(len(lags) * 0.99), len(lags) - 1)] * 1000 if lags else 0.0,
+        'mean_lag_ms': statistics.fmean(lags) * 1000 if lags else 0.0,
+    }
+
+
+async def main(args):
+    markup = product_table(args.rows)
+    print(f"{args.spiders} spiders x {args.pages} pages x {args.rows} rows ({len(markup) / 1e6:.1f} MB of HTML per page)")
+
+    inline = ParsePoolManager(workers=0)
+    pooled = ParsePoolManager(workers=args.workers, inline_below=0)
+    await pooled.run(extract_rows, "BenchSpider", product_table(1))  # start the workers before timing
+    try:
+        results = {
+            'event loop': await run(inline, markup, args),
+            f'parse pool ({args.workers} workers)': await run(pooled, markup, args),
+        }
+    finally:
+        await pooled.close(force=True)
+
+    print(f"{'':<26}{'rows':>8}{'total s':>10}{'max lag ms':>12}{'p99 lag ms':>12}{'mean lag ms':>13}")
+    for name, r in results.items():
+        print(f"{name:<26}{r['rows']:>8}{r['seconds']:>10.2f}{r['max_lag_ms']:>12.1f}{r['p99_lag_ms']:>12.1f}{r['mean_lag_ms']:>13.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000, help="rows per product table")
+    parser.add_argument("--pages", type=int, default=5, help="pages parsed by each spider")
+    parser.add_argument("--spiders", type=int, default=4, help="concurrent spiders")
+    parser.add_argument("--workers", type=int, default=4, help="parse pool processes")
+    parser.add_argument("--tick", type=float, default=5.0, help="heartbeat interval, ms")
+    asyncio.run(main(parser.parse_args()))
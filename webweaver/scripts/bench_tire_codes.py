@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""tire_codes.parse()/parse_many() (one combined regex, memoized) vs the old
+TireCodeParser that tried the TireCodeRegex formats one after the other for
+every string, plus a parity check that both give the same TireSpecs.
+
+The corpus is webweaver/tire_codes.txt (Fastco tire codes, matched) and the
+product names of webweaver/tire_code_strings_new.py (searched), pass other
+files of tire codes/product names, one per line, to use those instead:
+
+    python -m webweaver.scripts.bench_tire_codes --codes tire_codes.txt --names product_names.txt
+"""
+import argparse
+from dataclasses import asdict
+from pathlib import Path
+import time
+
+from webweaver.modules.project_modules.speed_fanatics.tire_codes import TireSpecs, parse, parse_many
+from webweaver.modules.project_modules.speed_fanatics.tire_codes.parser import _parse
+from webweaver.modules.project_modules.speed_fanatics.tire_codes.regex import TireCodeRegex
+
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+class LegacyTireCodeParser:
+    """TireCodeParser before the combined regex: the pattern -> method mapping
+    is rebuilt and each format tried in turn for every string.
+    """
+    def __init__(self, tire_code:str, use_search:bool=False):
+        self._use_search = use_search
+        self.tire_code = tire_code.upper().strip().replace('(', '').replace(')', '')
+        self.regex = TireCodeRegex
+        self.pattern_to_method = {
+            self.regex.tire_code: self._populate_from_tire_code,
+            self.regex.tire_code_2: self._populate_from_tire_code_2,
+            self.regex.tire_code_3: self._populate_from_tire_code_3,
+            self.regex.tire_code_offroad: self._populate_from_tire_code_offroad,
+            self.regex.tire_code_reinf: self._populate_from_tire_code_reinf,
+        }
+        self.specs = {field: None for field in TireSpecs.__dataclass_fields__}
+        for pattern, method in self.pattern_to_method.items():
+            match = pattern.search(self.tire_code) if self._use_search else pattern.match(self.tire_code)
+            if match:
+                method(match)
+                break
+
+    def _populate_from_tire_code(self, match):
+        self.specs.update(SERVICE_TYPE=None, TIRE_WIDTH=match.group(1), ASPECT_RATIO=match.group(2), WHEEL_DIAMETER=match.group(3),
+                          LOAD_INDEX=match.group(4), LOAD_INDEX_DUAL=match.group(5), SPEED_RATING=match.group(6))
+
+    def _populate_from_tire_code_2(self, match):
+        self.specs.update(TIRE_WIDTH=match.group(1), ASPECT_RATIO=None, WHEEL_DIAMETER=match.group(3), SERVICE_TYPE=match.group(4),
+                          LOAD_INDEX=match.group(5), LOAD_INDEX_DUAL=match.group(6), SPEED_RATING=match.group(7))
+
+    def _populate_from_tire_code_3(self, match):
+        self.specs.update(TIRE_WIDTH=match.group(1), ASPECT_RATIO=match.group(2), WHEEL_DIAMETER=match.group(3), SERVICE_TYPE=match.group(4),
+                          LOAD_INDEX=match.group(5), LOAD_INDEX_DUAL=match.group(6), SPEED_RATING=match.group(7))
+
+    def _populate_from_tire_code_offroad(self, match):
+        width_inches = float(match.group(2))
+        self.specs.update(OVERALL_DIAMETER=match.group(1), ASPECT_RATIO=None,
+                          TIRE_WIDTH=str(width_inches * 25.4) if width_inches <= 50 else str(width_inches),
+                          WHEEL_DIAMETER=match.group(4), SERVICE_TYPE=match.group(5), LOAD_INDEX=match.group(6), SPEED_RATING=match.group(7))
+
+    def _populate_from_tire_code_reinf(self, match):
+        self.specs.update(SERVICE_TYPE=None, TIRE_WIDTH=match.group(1), ASPECT_RATIO=match.group(2), WHEEL_DIAMETER=match.group(3),
+                          LOAD_INDEX=None, SPEED_RATING=None)
+
+
+def read_lines(path:Path) -> list[str]:
+    return [line.strip() for line in path.read_text().splitlines() if line.strip()]
+
+
+def product_names() -> list[str]:
+    from webweaver.tire_code_strings_new import product_names_tire_codes
+    return product_names_tire_codes
+
+
+def legacy(strings:list[str], use_search:bool) -> list[dict]:
+    return [LegacyTireCodeParser(s, use_search).specs for s in strings]
+
+
+def one_by_one(strings:list[str], use_search:bool) -> list[TireSpecs | None]:
+    return [parse(s, use_search, raise_exc=False) for s in strings]
+
+
+def best_of(repeat:int, func, *args, cold:bool=False) -> tuple[float, object]:
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        if cold:
+            _parse.cache_clear()
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def as_dict(specs:TireSpecs | None) -> dict:
+    return asdict(specs or TireSpecs())
+
+
+def bench(name:str, strings:list[str], use_search:bool, repeat:int):
+    legacy_seconds, old = best_of(repeat, legacy, strings, use_search)
+    cold_seconds, new = best_of(repeat, one_by_one, strings, use_search, cold=True)
+    warm_seconds, _warm = best_of(repeat, one_by_one, strings, use_search)
+    many_seconds, many = best_of(repeat, lambda: parse_many(strings, use_search, raise_exc=False), cold=True)
+    bad = [(s, o, as_dict(n)) for s, o, n, m in zip(strings, old, new, many) if o != as_dict(n) or n != m]
+    unparsed = sum(specs is None for specs in new)
+    print(
+        f"{name:<10}{len(strings):>7}{len(set(strings)):>10}{legacy_seconds * 1000:>12.1f}{cold_seconds * 1000:>10.1f}"
+        f"{warm_seconds * 1000:>10.2f}{many_seconds * 1000:>15.1f}{legacy_seconds / cold_seconds:>9.1f}x{unparsed:>10}{len(bad):>12}"
+    )
+    for s, o, n in bad[:5]:
+        print(f"  {s!r}:\n    old: {o}\n    new: {n}")
+
+
+def main(args):
+    codes = read_lines(Path(args.codes)) if args.codes else read_lines(ROOT / 'tire_codes.txt')
+    names = read_lines(Path(args.names)) if args.names else product_names()
+    print(f"best of {args.repeat}; cold = cache cleared first, warm = everything memoized")
+    print(f"{'corpus':<10}{'rows':>7}{'distinct':>10}{'old ms':>12}{'cold ms':>10}{'warm ms':>10}{'parse_many ms':>15}{'speedup':>10}{'unparsed':>10}{'mismatches':>12}")
+    bench("codes", codes, False, args.repeat)
+    bench("codes/s", codes, True, args.repeat)
+    bench("names/s", names, True, args.repeat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--codes", help="file of tire codes, one per line (matched)")
+    parser.add_argument("--names", help="file of product names, one per line (searched)")
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
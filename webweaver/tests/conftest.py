@@ -0,0 +1,27 @@
+import asyncio
+
+import pytest
+from tortoise import Model, Tortoise
+
+
+class ScrapeJob(Model):
+    """What ScrapeModel.scrape_job_id points to. The real one is in
+    campaigns.models, which needs the projects' models and everything they import.
+    """
+
+
+@pytest.fixture
+def run_in_db(request):
+    """Runs an async test function against a fresh in-memory SQLite database
+    holding the tables of the models defined in the test module.
+    """
+    def run(test):
+        async def main():
+            await Tortoise.init(db_url='sqlite://:memory:', modules={'models': [__name__, request.module.__name__]})
+            try:
+                await Tortoise.generate_schemas()
+                return await test()
+            finally:
+                await Tortoise.close_connections()
+        return asyncio.run(main())
+    return run
@@ -0,0 +1,121 @@
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+import pytest
+
+from webweaver.webscraping.frontier.bloom_filter import BloomFilter
+
+
+def urls(count:int, prefix:str='page') -> list[str]:
+    return [f"https://example.com/{prefix}/{i}" for i in range(count)]
+
+
+def test_no_false_negatives():
+    bloom_filter = BloomFilter(capacity=5000, error_rate=0.001)
+    added = urls(5000)
+    assert all(bloom_filter.add(url) for url in added[:100])
+    for url in added[100:]:
+        bloom_filter.add(url)
+    assert all(url in bloom_filter for url in added)
+    assert not bloom_filter.add(added[0])
+
+
+def test_false_positive_rate_is_about_the_error_rate():
+    bloom_filter = BloomFilter(capacity=5000, error_rate=0.01)
+    for url in urls(5000):
+        bloom_filter.add(url)
+    false_positives = sum(url in bloom_filter for url in urls(20000, prefix='other'))
+    assert false_positives / 20000 < 0.02
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / 'filters' / 'spider.bloom')
+    bloom_filter = BloomFilter(capacity=1000, error_rate=0.001)
+    for url in urls(500):
+        bloom_filter.add(url)
+    bloom_filter.save(path)
+
+    loaded = BloomFilter.load(path, capacity=1000, error_rate=0.001)
+    assert loaded.bits == bloom_filter.bits
+    assert (loaded.bit_count, loaded.hash_count, len(loaded)) == (bloom_filter.bit_count, bloom_filter.hash_count, 500)
+    assert loaded.created_at == bloom_filter.created_at
+    assert all(url in loaded for url in urls(500))
+    assert not list(tmp_path.joinpath('filters').glob('*.tmp'))
+
+
+def test_load_keeps_the_saved_size(tmp_path):
+    """A filter saved with other settings is loaded as it was saved, its bit positions must not move."""
+    path = str(tmp_path / 'spider.bloom')
+    bloom_filter = BloomFilter(capacity=100, error_rate=0.01)
+    bloom_filter.add('https://example.com/')
+    bloom_filter.save(path)
+    loaded = BloomFilter.load(path, capacity=1_000_000, error_rate=0.0001)
+    assert loaded.bit_count == bloom_filter.bit_count
+    assert 'https://example.com/' in loaded
+
+
+@pytest.mark.parametrize('content', [b'', b'WWBF', b'not a bloom filter at all, just some bytes'])
+def test_load_rejects_other_files(tmp_path, content):
+    path = tmp_path / 'spider.bloom'
+    path.write_bytes(content)
+    with pytest.raises(ValueError):
+        BloomFilter.load(str(path), capacity=100, error_rate=0.01)
+
+
+def test_load_rejects_truncated_file(tmp_path):
+    path = tmp_path / 'spider.bloom'
+    BloomFilter(capacity=1000, error_rate=0.01).save(str(path))
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(ValueError):
+        BloomFilter.load(str(path), capacity=1000, error_rate=0.01)
+
+
+def test_save_merges_the_filter_already_on_disk(tmp_path):
+    """Two jobs of the same spider load the same filter and save it in turn."""
+    path = str(tmp_path / 'spider.bloom')
+    BloomFilter(capacity=10_000, error_rate=0.001).save(path)
+    jobs = [BloomFilter.load(path, capacity=10_000, error_rate=0.001) for _ in range(2)]
+    for job, prefix in zip(jobs, ['a', 'b']):
+        for url in urls(1000, prefix):
+            job.add(url)
+    for job in jobs:
+        job.save(path)
+
+    loaded = BloomFilter.load(path, capacity=10_000, error_rate=0.001)
+    assert all(url in loaded for url in urls(1000, 'a') + urls(1000, 'b'))
+    assert 1900 < len(loaded) < 2100
+
+
+def test_concurrent_saves_keep_every_job_s_bits(tmp_path):
+    path = str(tmp_path / 'spider.bloom')
+    jobs = []
+    for i in range(8):
+        job = BloomFilter(capacity=10_000, error_rate=0.001)
+        for url in urls(200, f"job{i}"):
+            job.add(url)
+        jobs.append(job)
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda job: job.save(path), jobs))
+
+    loaded = BloomFilter.load(path, capacity=10_000, error_rate=0.001)
+    assert all(url in loaded for i in range(8) for url in urls(200, f"job{i}"))
+    assert not list(tmp_path.glob('*.tmp'))
+
+
+def test_save_replaces_an_expired_or_resized_filter(tmp_path):
+    path = str(tmp_path / 'spider.bloom')
+    old = BloomFilter(capacity=1000, error_rate=0.001)
+    old.add('https://example.com/old')
+    old.created_at = time.time() - 40 * 86400
+    old.save(path)
+
+    fresh = BloomFilter(capacity=1000, error_rate=0.001)
+    fresh.add('https://example.com/new')
+    fresh.save(path, max_age_days=30)
+    loaded = BloomFilter.load(path, capacity=1000, error_rate=0.001)
+    assert 'https://example.com/old' not in loaded
+    assert loaded.created_at == fresh.created_at and len(loaded) == 1
+
+    resized = BloomFilter(capacity=5000, error_rate=0.001)
+    resized.save(path)
+    assert 'https://example.com/new' not in BloomFilter.load(path, capacity=5000, error_rate=0.001)
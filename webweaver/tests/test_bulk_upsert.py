@@ -0,0 +1,111 @@
+from decimal import Decimal
+
+import pytest
+from tortoise import fields
+
+from webweaver.webscraping.models import ScrapeModel
+
+
+class Item(ScrapeModel):
+    name = fields.CharField(max_length=50, unique=True)
+    note = fields.CharField(max_length=50, null=True)
+    date_modified = fields.DatetimeField(auto_now=True)
+    date_created = fields.DatetimeField(auto_now_add=True)
+
+    def clean(self):
+        self.name = self.name.strip()
+
+
+class ItemPrice(ScrapeModel):
+    item = fields.ForeignKeyField('models.Item', related_name='prices')
+    msrp = fields.DecimalField(max_digits=16, decimal_places=2)
+    is_old = fields.BooleanField(default=False)
+
+    class Meta:
+        unique_together = (('item', 'msrp'),)
+
+
+class Sku(ScrapeModel):
+    code = fields.CharField(max_length=50, unique=True)
+    barcode = fields.CharField(max_length=50, unique=True)
+
+
+def items(count:int, **kwargs) -> list[Item]:
+    return [Item(name=f"item {i}", **kwargs) for i in range(count)]
+
+
+def test_created_updated_and_unchanged(run_in_db):
+    async def test():
+        inserted = await Item.bulk_upsert(items(5))
+        assert (inserted.created, inserted.updated) == (5, 0)
+        ids = [item.id for item in inserted.objects]
+        assert [item.name for item in inserted.objects] == [f"item {i}" for i in range(5)]
+
+        unchanged = await Item.bulk_upsert(items(5))
+        assert (unchanged.created, unchanged.updated) == (0, 0)
+        assert [item.id for item in unchanged.objects] == ids
+        assert [item.date_modified for item in unchanged.objects] == [item.date_modified for item in inserted.objects]
+
+        rows = items(7)
+        rows[1].note = 'changed'
+        saved = await Item.bulk_upsert(rows, batch_size=3)
+        assert (saved.created, saved.updated) == (2, 1)
+        assert [item.id for item in saved.objects][:5] == ids
+        assert saved.objects[1].note == 'changed'
+        assert saved.objects[1].date_modified > inserted.objects[1].date_modified
+        assert saved.objects[1].date_created == inserted.objects[1].date_created
+        assert await Item.all().count() == 7
+
+    run_in_db(test)
+
+
+def test_last_row_with_the_same_key_wins(run_in_db):
+    async def test():
+        saved = await Item.bulk_upsert([Item(name='a', note='first'), Item(name='b'), Item(name='a', note='last')])
+        assert [(item.name, item.note) for item in saved.objects] == [('a', 'last'), ('b', None)]
+        assert saved.created == 2
+
+    run_in_db(test)
+
+
+def test_keys_are_compared_after_clean(run_in_db):
+    async def test():
+        await Item.bulk_upsert([Item(name='a')])
+        saved = await Item.bulk_upsert([Item(name='  a ', note='x'), Item(name='b  ')])
+        assert (saved.created, saved.updated) == (1, 1)
+        assert sorted(await Item.all().values_list('name', 'note')) == [('a', 'x'), ('b', None)]
+
+    run_in_db(test)
+
+
+def test_update_fields(run_in_db):
+    async def test():
+        [item] = (await Item.bulk_upsert([Item(name='a')])).objects
+        prices = await ItemPrice.bulk_upsert([ItemPrice(item=item, msrp=Decimal('9.99')), ItemPrice(item=item, msrp=Decimal('12.50'))])
+        assert prices.created == 2
+
+        # only inserts: the existing price keeps is_old, the new one is created
+        saved = await ItemPrice.bulk_upsert([ItemPrice(item=item, msrp=Decimal('9.99'), is_old=True), ItemPrice(item=item, msrp=Decimal('1.00'))], update_fields=[])
+        assert (saved.created, saved.updated) == (1, 0)
+        assert [(price.msrp, price.is_old) for price in saved.objects] == [(Decimal('9.99'), False), (Decimal('1.00'), False)]
+
+        # '9.99' is the same conflict key as Decimal('9.99')
+        saved = await ItemPrice.bulk_upsert([ItemPrice(item=item, msrp='9.99', is_old=True)], update_fields=['is_old'])
+        assert (saved.created, saved.updated) == (0, 1)
+        assert saved.objects[0].id == prices.objects[0].id and saved.objects[0].is_old
+        assert await ItemPrice.all().count() == 3
+
+    run_in_db(test)
+
+
+def test_conflict_fields(run_in_db):
+    async def test():
+        assert (await Item.bulk_upsert([])).objects == []
+        with pytest.raises(ValueError):
+            await Sku.bulk_upsert([Sku(code='a', barcode='1')])
+        await Sku.bulk_upsert([Sku(code='a', barcode='1')], conflict_fields=['code'])
+        saved = await Sku.bulk_upsert([Sku(code='a', barcode='2')], conflict_fields=['code'])
+        assert (saved.created, saved.updated) == (0, 1)
+        assert await Sku.all().values_list('code', 'barcode') == [('a', '2')]
+
+    run_in_db(test)
@@ -0,0 +1,170 @@
+"""KeywordIndex vs the rule walk it replaced: the same matches, in the same
+order, for the same texts. The old walk is BaseHandler.contains_keywords() /
+search_substrings() over every enum, kept as the Legacy*Handler classes of
+scripts/bench_categorization.py.
+"""
+import random
+import re
+
+import pytest
+
+from webweaver.modules.project_modules.speed_fanatics.categorization.category_handler import CategoryHandler
+from webweaver.modules.project_modules.speed_fanatics.categorization.keyword_index import KeywordIndex, trie_regex
+from webweaver.modules.project_modules.speed_fanatics.categorization.subcategory_handler import SubCategoryHandler
+from webweaver.modules.project_modules.speed_fanatics.speed_enums import CategoryEnum, SubCategoryEnum, MatchMode
+from webweaver.scripts.bench_categorization import (
+    BenchProjectHandler,
+    LegacyCategoryHandler,
+    LegacySubCategoryHandler,
+    made_up_products,
+)
+
+
+# Overlapping substrings ('pad' in 'brakepad', 'rake' inside 'brake', 'brake' a
+# prefix of 'brakepad'), '' (in every string), words shared between enums and
+# a subcategory that's in two categories, with different match modes in each.
+RULES = {
+    CategoryEnum.BRAKES: {
+        SubCategoryEnum.BRAKE_PADS: {
+            MatchMode.KEYWORDS: {'pad', 'pads'},
+            MatchMode.SUBSTRINGS: {'brakepad', 'pad'},
+        },
+        SubCategoryEnum.BRAKE_DISCS: {
+            MatchMode.KEYWORDS: {'rotor', 'disc'},
+            MatchMode.SUBSTRINGS: {'brake', 'rake', 'disc'},
+            MatchMode.REGEX: [re.compile(r'\d+mm rotor')],
+        },
+        SubCategoryEnum.BRAKE_KITS: {
+            MatchMode.SUBSTRINGS: {'brakepad kit', ''},
+        },
+    },
+    CategoryEnum.WHEELS: {
+        SubCategoryEnum.WHEELS_AUTOMOTIVE: {
+            MatchMode.KEYWORDS: {'wheel', 'rim', 'disc'},
+            MatchMode.SUBSTRINGS: {'wheel', 'wheels', 'heel'},
+            MatchMode.REGEX: [re.compile(r'\d+x\d+(\.\d+)?'), re.compile(r'\d+mm')],
+        },
+        SubCategoryEnum.WHEEL_SPACERS: {
+            MatchMode.SUBSTRINGS: {'spacer', 'pacer', 'pad'},
+        },
+    },
+    CategoryEnum.WHEEL_ACCESSORIES: {
+        SubCategoryEnum.WHEEL_NUTS_BOLTS: {
+            MatchMode.KEYWORDS: {'lug', 'nut', 'nuts', 'spacer'},
+            MatchMode.SUBSTRINGS: {'lugnut', 'lug', 'nut'},
+        },
+        # also under WHEELS, with substrings only. Merged for UNKNOWN, its
+        # keywords rank after WHEEL_NUTS_BOLTS' like they did in the walk
+        SubCategoryEnum.WHEEL_SPACERS: {
+            MatchMode.KEYWORDS: {'adapter', 'spacer'},
+        },
+    },
+}
+
+WORDS = ['brake', 'brakepad', 'brakepads', 'pad', 'rotor', 'disc', 'wheel', 'wheels', 'rim', 'spacer', 'spacers',
+         'adapter', 'lug', 'nut', 'lugnut', 'kit', '18x9.5', '330mm', 'rotor', 'heel', 'front', 'rear', '-', '']
+CATEGORY_NAMES = ['', 'brakes', 'brake pads', 'wheels', 'wheel spacers', 'lug nuts', 'parts']
+
+
+class Ruleset:
+    category_enum_to_subcategory_rules = RULES
+
+
+class LegacyTestSubCategoryHandler(LegacySubCategoryHandler):
+    ruleset = Ruleset
+
+
+class TestSubCategoryHandler(SubCategoryHandler):
+    __test__ = False
+    ruleset = Ruleset
+
+
+def made_up_texts(count:int, seed:int=0) -> list[str]:
+    rng = random.Random(seed)
+    return [' '.join(rng.choices(WORDS, k=rng.randint(0, 5))) for _ in range(count)]
+
+
+def walk_ranked(rules:dict, text:str, category_name:str|None, mode:MatchMode) -> list:
+    """The old loop: every enum, appended once per text it matches."""
+    def matches(s:str, words) -> bool:
+        if mode == MatchMode.KEYWORDS:
+            return bool(set(s.split()).intersection(words))
+        return any(word in s for word in words)
+
+    enums = []
+    for enum, match_modes in rules.items():
+        if mode not in match_modes:
+            continue
+        if matches(text, match_modes[mode]):
+            enums.append(enum)
+        if category_name and matches(category_name, match_modes[mode]):
+            enums.append(enum)
+    return enums
+
+
+def test_trie_regex_matches_longest_word():
+    pattern = re.compile(trie_regex({'brake', 'brakepad', 'brakepads', 'rake'}))
+    assert pattern.match('brakepads front').group() == 'brakepads'
+    assert pattern.match('brakepa').group() == 'brake'
+    assert pattern.match('rakes').group() == 'rake'
+    assert pattern.match('pad') is None
+
+
+@pytest.mark.parametrize('category_enum', list(RULES))
+def test_index_matches_rule_walk(category_enum):
+    rules = RULES[category_enum]
+    index = KeywordIndex(rules)
+    rng = random.Random(1)
+    for text in made_up_texts(3000):
+        category_name = rng.choice(CATEGORY_NAMES) or None
+        for mode, matches in ((MatchMode.KEYWORDS, index.keyword_matches), (MatchMode.SUBSTRINGS, index.substring_matches)):
+            ranked = index.ranked(matches(text), matches(category_name) if category_name else set())
+            assert ranked == walk_ranked(rules, text, category_name, mode), (mode, text, category_name)
+
+        first_regex = next((enum for enum, modes in rules.items() for pattern in modes.get(MatchMode.REGEX, ()) if pattern.search(text)), None)
+        assert index.regex_match(text) == first_regex, text
+
+
+def test_empty_substring_always_matches():
+    index = KeywordIndex(RULES[CategoryEnum.BRAKES])
+    assert index.ranked(index.substring_matches('')) == [SubCategoryEnum.BRAKE_KITS]
+    assert SubCategoryEnum.BRAKE_KITS in index.ranked(index.substring_matches('anything at all'))
+
+
+def test_overlapping_substrings_all_match():
+    index = KeywordIndex(RULES[CategoryEnum.BRAKES])
+    # 'brakepad' starts with 'brake', which contains 'rake', and ends in 'pad'
+    assert index.ranked(index.substring_matches('brakepad')) == [
+        SubCategoryEnum.BRAKE_PADS, SubCategoryEnum.BRAKE_DISCS, SubCategoryEnum.BRAKE_KITS,
+    ]
+
+
+@pytest.mark.parametrize('category_enum', [*RULES, CategoryEnum.UNKNOWN])
+def test_subcategory_handler_matches_rule_walk(category_enum):
+    """UNKNOWN runs against every category's rules merged together."""
+    legacy = LegacyTestSubCategoryHandler(BenchProjectHandler())
+    handler = TestSubCategoryHandler(BenchProjectHandler())
+    rng = random.Random(2)
+    for text in made_up_texts(3000, seed=3):
+        text = text.strip() or 'parts'  # products always have a name, both crash on None
+        category_name = rng.choice(CATEGORY_NAMES) or None
+        assert handler.get_subcategory_enum(text, category_enum, category_name) == legacy.get_subcategory_enum(text, category_enum, category_name), (text, category_name)
+        assert handler.check_keywords_in_set(text, category_enum, category_name) == legacy.check_keywords_in_set(text, category_enum, category_name)
+        assert handler.keyword_set_substrings(text, category_enum, category_name) == legacy.keyword_set_substrings(text, category_enum, category_name)
+        assert handler.try_regex(text, category_enum) == legacy.try_regex(text, category_enum)
+
+
+def test_real_rules_match_rule_walk():
+    project_handler = BenchProjectHandler()
+    legacy_categories, categories = LegacyCategoryHandler(project_handler), CategoryHandler(project_handler)
+    legacy_subcategories, subcategories = LegacySubCategoryHandler(project_handler), SubCategoryHandler(project_handler)
+    for product_name, category_name in made_up_products(2000):
+        category_enum = categories.get_category_enum(product_name, category_name)
+        assert category_enum == legacy_categories.get_category_enum(product_name, category_name), (product_name, category_name)
+        for subcategory_category in {category_enum, CategoryEnum.UNKNOWN}:
+            assert (
+                subcategories.get_subcategory_enum(product_name, subcategory_category, category_name)
+                == legacy_subcategories.get_subcategory_enum(product_name, subcategory_category, category_name)
+            ), (product_name, category_name, subcategory_category)
+            text = subcategories.normalize_text(product_name)
+            assert subcategories.try_regex(text, subcategory_category) == legacy_subcategories.try_regex(text, subcategory_category)
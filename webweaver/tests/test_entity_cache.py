@@ -0,0 +1,108 @@
+import asyncio
+from collections import Counter
+
+import pytest
+from tortoise import fields
+
+from webweaver.project.entity_cache import EntityCache
+from webweaver.webscraping.models import ScrapeModel
+
+
+class Brand(ScrapeModel):
+    brand_name = fields.CharField(max_length=255, unique=True)
+
+
+@pytest.fixture
+def queries(monkeypatch) -> Counter:
+    """Counts Brand's get_or_create()/filter()/bulk_create() calls. Each one
+    yields to the loop first so concurrent callers all get to their miss.
+    """
+    calls = Counter()
+
+    def counted(name:str):
+        original = getattr(Brand, name)
+
+        async def query(*args, **kwargs):
+            calls[name] += 1
+            await asyncio.sleep(0.01)
+            return await original(*args, **kwargs)
+
+        monkeypatch.setattr(Brand, name, query)
+
+    for name in ('get_or_create', 'filter', 'bulk_create'):
+        counted(name)
+    return calls
+
+
+def brand_cache() -> EntityCache:
+    return EntityCache(Brand, 'brand_name', key=lambda value: value.strip().lower(), clean=str.strip)
+
+
+def test_concurrent_get_or_create_hits_the_db_once(run_in_db, queries):
+    async def test():
+        cache = brand_cache()
+        results = await asyncio.gather(*(cache.get_or_create(name) for name in [' Pirelli', 'PIRELLI', 'pirelli '] * 5))
+        assert len({brand.id for brand, _created in results}) == 1
+        assert sum(created for _brand, created in results) == 1
+        assert results[0][0].brand_name == 'Pirelli'
+        assert await Brand.all().count() == 1
+
+    run_in_db(test)
+    assert queries['get_or_create'] == 1
+
+
+def test_concurrent_resolve_creates_each_row_once(run_in_db, queries):
+    async def test():
+        await Brand.create(brand_name='Michelin')
+        cache = brand_cache()
+        batches = [['Pirelli', 'Michelin', 'Toyo'], ['toyo ', 'PIRELLI', 'Nitto'], ['Michelin', 'Nitto']]
+        results = await asyncio.gather(*(cache.resolve(batch) for batch in batches))
+        for batch, resolved in zip(batches, results):
+            assert list(resolved) == batch
+        assert results[0]['Toyo'] is results[1]['toyo ']
+        assert sorted(brand.brand_name for brand in await Brand.all()) == ['Michelin', 'Nitto', 'Pirelli', 'Toyo']
+        return Counter(queries)
+
+    calls = run_in_db(test)
+    # the 1st resolve() looks up its 3 brands and creates 2 (filter, bulk_create,
+    # filter), the 2nd waits for it and does the same for Nitto, the 3rd waits
+    # for both and finds everything cached
+    assert calls['bulk_create'] == 2
+    assert calls['filter'] == 4
+
+
+def test_waiters_retry_when_the_lookup_fails(run_in_db, monkeypatch):
+    async def test():
+        cache = brand_cache()
+        original = Brand.get_or_create
+        calls = []
+
+        async def flaky(*args, **kwargs):
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            if len(calls) == 1:
+                raise ConnectionError('connection lost')
+            return await original(*args, **kwargs)
+
+        monkeypatch.setattr(Brand, 'get_or_create', flaky)
+        first, second = await asyncio.gather(cache.get_or_create('Toyo'), cache.get_or_create('Toyo'), return_exceptions=True)
+        assert isinstance(first, ConnectionError)
+        assert second[0].brand_name == 'Toyo' and second[1]
+        assert len(calls) == 2
+        assert not cache._pending
+
+    run_in_db(test)
+
+
+def test_load_and_get(run_in_db, queries):
+    async def test():
+        await Brand.bulk_create([Brand(brand_name='Toyo'), Brand(brand_name='Nitto')])
+        cache = brand_cache()
+        await cache.load()
+        assert cache.get(' NITTO').brand_name == 'Nitto'
+        assert cache.get('Pirelli') is None
+        brand, created = await cache.get_or_create('toyo')
+        assert brand.brand_name == 'Toyo' and not created
+
+    run_in_db(test)
+    assert queries['get_or_create'] == 0
@@ -0,0 +1,45 @@
+"""FuzzyHandler.best_match()/best_matches() vs process.extractOne() over the
+whole data set, which is what best_match() did before the length bands and
+cdist batches.
+"""
+import random
+
+import pytest
+from rapidfuzz import fuzz, process
+
+from webweaver.scripts.bench_fuzzy import made_up_products, made_up_strains, old_best_matches
+from webweaver.webscraping.fuzzy_matching.fuzzy_handler import FuzzyHandler
+
+
+rng = random.Random(0)
+STRAINS = made_up_strains(500, rng)
+PRODUCTS = made_up_products(400, STRAINS, rng) + ['', '---', 'x', 'Blue Dream' * 20]
+
+
+@pytest.mark.parametrize('cutoff', [None, 50, 80, 95, 100])
+@pytest.mark.parametrize('workers', [1, 4])
+def test_best_matches_match_extract_one(cutoff, workers):
+    handler = FuzzyHandler(STRAINS)
+    expected = old_best_matches(handler, PRODUCTS, cutoff)
+    assert handler.best_matches(PRODUCTS, score_cutoff=cutoff, workers=workers) == expected
+    assert [handler.best_match(s, score_cutoff=cutoff) for s in PRODUCTS] == expected
+
+
+def test_ties_go_to_the_first_string():
+    handler = FuzzyHandler(['abc', 'abd', 'abc'], preprocess=False)
+    assert handler.best_match('abc') == ('abc', 100.0, 0)
+    assert handler.best_matches(['abx'], workers=2) == [process.extractOne('abx', handler.data_set, scorer=fuzz.WRatio)]
+
+
+def test_exact_match():
+    handler = FuzzyHandler(['Blue Dream', 'OG Kush'])
+    assert handler.exact_match('blue-dream!')
+    assert not handler.exact_match('blue dreams')
+    assert handler.best_match('og kush', score_cutoff=100) == ('ogkush', 100.0, 1)
+    assert handler.best_matches(['OG Kush', 'og', ''], score_cutoff=100, workers=2) == [('ogkush', 100.0, 1), None, None]
+
+
+def test_empty_data_set():
+    handler = FuzzyHandler([])
+    assert handler.best_match('blue dream') is None
+    assert handler.best_matches(['blue dream', 'og'], workers=2) == [None, None]
@@ -0,0 +1,74 @@
+import asyncio
+from collections import Counter
+
+from webweaver.webscraping.jobs.job_state import JobProgressReporter, JobStateStore, job_state
+from webweaver.webscraping.registry.scraping_registry import SpiderState
+
+
+def test_finish_shard_counts_down_to_the_last_shard():
+    async def run():
+        store = JobStateStore()
+        await store.start_job(1, ['a', 'b', 'c'])
+        assert (await store.get_job(1))['state'] == SpiderState.QUEUED.value
+
+        await store.set_state(1, 'a', SpiderState.RUNNING)
+        assert (await store.get_job(1))['state'] == SpiderState.RUNNING.value
+
+        assert await store.finish_shard(1, 'a', SpiderState.COMPLETE) == 2
+        assert await store.finish_shard(1, 'b', SpiderState.ERROR) == 1
+        assert (await store.get_job(1))['state'] == SpiderState.RUNNING.value
+        assert await store.finish_shard(1, 'c', SpiderState.COMPLETE) == 0
+
+        job = await store.get_job(1)
+        assert job['state'] == SpiderState.ERROR.value
+        assert job['shards'] == {'a': 'COMPLETE', 'b': 'ERROR', 'c': 'COMPLETE'}
+
+    asyncio.run(run())
+
+
+def test_concurrent_finishes_only_one_sees_zero():
+    async def run():
+        store = JobStateStore()
+        keys = [f"shard-{i}" for i in range(20)]
+        await store.start_job(1, keys)
+        remaining = await asyncio.gather(*(store.finish_shard(1, key, SpiderState.COMPLETE) for key in keys))
+        assert sorted(remaining) == list(range(20))
+        assert (await store.get_job(1))['state'] == SpiderState.COMPLETE.value
+
+    asyncio.run(run())
+
+
+def test_unknown_job():
+    async def run():
+        store = JobStateStore()
+        assert await store.finish_shard(99, 'a', SpiderState.COMPLETE) == 0
+        assert await store.get_job(99) is None
+        assert await store.get_states(99) == {}
+
+    asyncio.run(run())
+
+
+def test_job_state():
+    queued, running, complete, error = (state.value for state in (SpiderState.QUEUED, SpiderState.RUNNING, SpiderState.COMPLETE, SpiderState.ERROR))
+    assert job_state({'a': queued, 'b': queued}, 2) == SpiderState.QUEUED
+    assert job_state({'a': complete, 'b': queued}, 1) == SpiderState.RUNNING
+    assert job_state({'a': error, 'b': running}, 1) == SpiderState.RUNNING
+    assert job_state({'a': complete, 'b': complete}, 0) == SpiderState.COMPLETE
+    assert job_state({'a': complete, 'b': error}, 0) == SpiderState.ERROR
+
+
+def test_progress_reporter_sends_only_the_change():
+    async def run():
+        store = JobStateStore()
+        await store.start_job(1, ['a', 'b'])
+        progress_a, progress_b = Counter(), Counter()
+        async with JobProgressReporter(store, 1, progress_a, interval=60) as reporter_a:
+            async with JobProgressReporter(store, 1, progress_b, interval=60):
+                progress_a['records_saved'] += 5
+                await reporter_a.flush()
+                progress_a['records_saved'] += 2
+                progress_b['records_saved'] += 10
+                progress_b['records_failed'] += 1
+        assert (await store.get_job(1))['counts'] == {'records_saved': 17, 'records_failed': 1}
+
+    asyncio.run(run())
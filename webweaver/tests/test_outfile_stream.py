@@ -0,0 +1,161 @@
+import csv
+import datetime
+from decimal import Decimal
+from enum import Enum
+import json
+import sqlite3
+
+import pyarrow.parquet as pq
+import pytest
+from tortoise import fields
+from tortoise.models import Model
+
+from webweaver.webscraping.outfile.chunk_writers import (
+    CsvChunkWriter,
+    JsonChunkWriter,
+    JsonLinesChunkWriter,
+    ParquetChunkWriter,
+    SqlDumpChunkWriter,
+    SqliteChunkWriter,
+    copy_value,
+)
+from webweaver.webscraping.outfile.outfile_stream import RowDeduper
+
+
+class Kind(str, Enum):
+    TIRE = "tire"
+    WHEEL = "wheel"
+
+
+class Widget(Model):
+    id = fields.IntField(pk=True)
+    name = fields.CharField(max_length=255, index=True)
+    kind = fields.CharEnumField(Kind)
+    price = fields.DecimalField(max_digits=10, decimal_places=2, null=True)
+    data = fields.JSONField(null=True)
+    scraped_at = fields.DatetimeField()
+
+    class Meta:
+        app = 'tests'
+        unique_together = (('name', 'kind'),)
+
+
+COLUMNS = ['id', 'name', 'kind', 'price', 'data', 'scraped_at']
+SCRAPED_AT = datetime.datetime(2024, 5, 1, 12, 30, tzinfo=datetime.timezone.utc)
+
+
+def widgets(start:int, count:int) -> list[dict]:
+    return [
+        {
+            'id': i, 'name': f"Widget\t{i}\n\"quoted\"", 'kind': Kind.TIRE if i % 2 else Kind.WHEEL,
+            'price': Decimal(f"{i}.50") if i % 3 else None, 'data': {'i': i} if i % 4 else None, 'scraped_at': SCRAPED_AT,
+        }
+        for i in range(start, start + count)
+    ]
+
+
+def export(writer_class, tmp_path, chunks:list[list[dict]]):
+    writer = writer_class(lambda table_name: tmp_path / f"{table_name or 'export'}.{writer_class.extension}")
+    writer.begin_table('widget', Widget, COLUMNS)
+    for chunk in chunks:
+        writer.write(chunk)
+    writer.end_table()
+    writer.close()
+    return writer.paths
+
+
+CHUNKS = [widgets(1, 7), widgets(8, 5)]
+ROWS = [row for chunk in CHUNKS for row in chunk]
+
+
+def test_row_deduper_ignores_the_primary_key_across_chunks():
+    deduper = RowDeduper()
+    first = deduper([{'id': 1, 'name': 'a'}, {'id': 2, 'name': 'b'}, {'id': 3, 'name': 'a'}])
+    second = deduper([{'id': 4, 'name': 'b'}, {'id': 5, 'name': 'c'}])
+    assert [row['id'] for row in first + second] == [1, 2, 5]
+    assert deduper.dropped == 2
+    assert len(deduper.seen) == 3
+
+
+def test_row_deduper_compares_every_other_column():
+    deduper = RowDeduper(ignore=('id', 'date_created'))
+    rows = deduper([
+        {'id': 1, 'name': 'a', 'price': 1, 'date_created': 1},
+        {'id': 2, 'name': 'a', 'price': 2, 'date_created': 2},
+        {'id': 3, 'name': 'a', 'price': 1, 'date_created': 3},
+    ])
+    assert [row['id'] for row in rows] == [1, 2]
+
+
+def test_csv(tmp_path):
+    [path] = export(CsvChunkWriter, tmp_path, CHUNKS)
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == len(ROWS)
+    assert rows[0]['name'] == ROWS[0]['name']
+    assert rows[0]['kind'] == 'tire'
+    assert json.loads(rows[0]['data']) == {'i': 1}
+    assert rows[2]['price'] == ''
+
+
+@pytest.mark.parametrize('writer_class', [JsonChunkWriter, JsonLinesChunkWriter])
+def test_json(tmp_path, writer_class):
+    [path] = export(writer_class, tmp_path, CHUNKS)
+    text = path.read_text(encoding='utf-8')
+    rows = json.loads(text) if writer_class is JsonChunkWriter else [json.loads(line) for line in text.splitlines()]
+    assert [row['id'] for row in rows] == [row['id'] for row in ROWS]
+    assert rows[0] == {'id': 1, 'name': ROWS[0]['name'], 'kind': 'tire', 'price': '1.50', 'data': {'i': 1}, 'scraped_at': SCRAPED_AT.isoformat()}
+
+
+def test_json_empty_table(tmp_path):
+    [path] = export(JsonChunkWriter, tmp_path, [])
+    assert json.loads(path.read_text()) == []
+
+
+def test_parquet(tmp_path):
+    [path] = export(ParquetChunkWriter, tmp_path, CHUNKS)
+    parquet_file = pq.ParquetFile(path)
+    assert parquet_file.num_row_groups == 2
+    table = parquet_file.read()
+    assert str(table.schema.field('price').type) == 'decimal128(10, 2)'
+    assert str(table.schema.field('scraped_at').type) == 'timestamp[us, tz=UTC]'
+    rows = table.to_pylist()
+    assert [row['price'] for row in rows] == [row['price'] for row in ROWS]
+    assert rows[0]['kind'] == 'tire'
+    assert json.loads(rows[0]['data']) == {'i': 1}
+    assert rows[3]['data'] is None
+
+
+def test_sqlite(tmp_path):
+    [path] = export(SqliteChunkWriter, tmp_path, CHUNKS)
+    connection = sqlite3.connect(path)
+    try:
+        rows = connection.execute('SELECT id, name, kind, price FROM widget ORDER BY id').fetchall()
+        indexes = connection.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'widget'").fetchall()
+    finally:
+        connection.close()
+    assert rows == [(row['id'], row['name'], row['kind'].value, float(row['price']) if row['price'] is not None else None) for row in ROWS]
+    indexes = sorted(sql for (sql,) in indexes)
+    assert indexes == [
+        'CREATE INDEX "idx_widget_0" ON "widget" ("name")',
+        'CREATE UNIQUE INDEX "idx_widget_1" ON "widget" ("name", "kind")',
+    ]
+
+
+def test_sql_dump(tmp_path):
+    [path] = export(SqlDumpChunkWriter, tmp_path, CHUNKS)
+    text = path.read_text(encoding='utf-8')
+    copy_block = text.split('FROM stdin;\n')[1].split('\\.\n')[0]
+    lines = copy_block.splitlines()
+    assert len(lines) == len(ROWS)
+    assert lines[0].split('\t')[:4] == ['1', 'Widget\\t1\\n"quoted"', 'tire', '1.50']
+    assert lines[2].split('\t')[3] == '\\N'
+    assert 'ALTER TABLE "widget" ADD PRIMARY KEY ("id");' in text
+    assert 'CREATE UNIQUE INDEX "idx_widget_1" ON "widget" ("name", "kind");' in text
+
+
+def test_copy_value():
+    assert copy_value(None) == '\\N'
+    assert copy_value(True) == 't'
+    assert copy_value('a\\b\r\n') == 'a\\\\b\\r\\n'
+    assert copy_value(b'\x01\xff') == '\\\\x01ff'
@@ -0,0 +1,219 @@
+import asyncio
+import random
+import types
+
+import pytest
+
+from pydantic import BaseModel
+
+from webweaver.config import SENTINEL
+from webweaver.webscraping.pipelines.pipeline_base import Pipeline
+from webweaver.webscraping.pipelines.pipeline_listener import PipelineListener, PipelineListenerPool
+from webweaver.webscraping.registry.scraping_registry import ScrapingRegistry, use_registry
+from webweaver.webscraping.spiders import spider_data as spider_data_module
+from webweaver.webscraping.spiders.spider_data import BatchRegistry, SpiderData
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class Record(BaseModel):
+    value: int
+
+
+class OneByOnePipeline(Pipeline):
+    """No save_batch(), so batches go through save_data() one record at a time.
+    Records whose value is in fail can't be saved.
+    """
+    schema = Record
+    saved:list[int] = []
+    batches:list[list[int]] = []
+    fail:set[int] = set()
+
+    async def save_data(self):
+        await asyncio.sleep(0)
+        if self.data_to_save.value in self.fail:
+            raise ValueError(f"can't save {self.data_to_save.value}")
+        self.saved.append(self.data_to_save.value)
+
+
+class BulkPipeline(OneByOnePipeline):
+    """All or nothing, like a bulk_create()."""
+    async def save_batch(self) -> tuple[int, int]:
+        values = [data_to_save.value for data_to_save in self.batch_data_to_save]
+        self.batches.append(values)
+        if self.fail.intersection(values):
+            raise ValueError("batch failed")
+        self.saved.extend(values)
+        return len(values), 0
+
+
+def spider(spider_id:int, pipeline_class:type[Pipeline]):
+    return types.SimpleNamespace(id=spider_id, spider_name=f"spider {spider_id}", get_pipeline=lambda: pipeline_class)
+
+
+def listen(pipeline_class:type[Pipeline], records:list[SpiderData], fail:set[int]=frozenset(), **listener_kwargs) -> ScrapingRegistry:
+    """Runs a PipelineListener over records then the sentinel. Returns the registry with its progress counts."""
+    pipeline_class.saved, pipeline_class.batches, pipeline_class.fail = [], [], set(fail)
+    registry = ScrapingRegistry()
+    for spider_id in {spider_data.spider_id for spider_data in records}:
+        registry.add_spider(spider_id, spider(spider_id, pipeline_class), {})
+
+    async def run():
+        queue = asyncio.Queue()
+        for spider_data in [*records, SENTINEL]:
+            queue.put_nowait(spider_data)
+        await PipelineListener(queue, **listener_kwargs).listen()
+
+    with use_registry(registry):
+        asyncio.run(run())
+    return registry
+
+
+def records(spider_id:int, values) -> list[SpiderData]:
+    return [SpiderData({'value': value}, spider_id) for value in values]
+
+
+def test_batch_registry_flushes_on_size_and_age(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(spider_data_module, 'time', types.SimpleNamespace(monotonic=clock.monotonic))
+    batch_registry = BatchRegistry(batch_size_limit=2, batch_time_limit=5)
+    assert batch_registry.time_until_flush() is None
+
+    batch_registry.add_data(SpiderData({}, 1))
+    clock.now = 2
+    batch_registry.add_data(SpiderData({}, 2))
+    assert not batch_registry.is_batch_full(1)
+    assert batch_registry.time_until_flush() == 3
+
+    batch_registry.add_data(SpiderData({}, 1))
+    assert batch_registry.is_batch_full(1)
+    assert batch_registry.pop_batch(1).count() == 2
+
+    clock.now = 6
+    assert batch_registry.pop_expired() == []
+    clock.now = 7
+    assert [batch.spider_id for batch in batch_registry.pop_expired()] == [2]
+    assert batch_registry.time_until_flush() is None
+
+
+def test_full_batches_are_saved_as_they_fill_and_leftovers_at_the_end():
+    registry = listen(BulkPipeline, records(1, range(7)) + records(2, range(100, 102)), batch_size=3, batch_timeout=60)
+    assert BulkPipeline.batches == [[0, 1, 2], [3, 4, 5], [6], [100, 101]]
+    assert registry.progress['records_saved'] == 9
+    assert registry.progress['records_failed'] == 0
+
+
+def test_waiting_batches_are_saved_after_the_timeout():
+    BulkPipeline.saved, BulkPipeline.batches, BulkPipeline.fail = [], [], set()
+    registry = ScrapingRegistry()
+    registry.add_spider(1, spider(1, BulkPipeline), {})
+
+    async def run():
+        queue = asyncio.Queue()
+        listener = asyncio.create_task(PipelineListener(queue, batch_size=100, batch_timeout=0.05).listen())
+        for spider_data in records(1, range(3)):
+            await queue.put(spider_data)
+        await asyncio.sleep(0.3)
+        assert BulkPipeline.batches == [[0, 1, 2]]  # before the sentinel
+        await queue.put(SENTINEL)
+        await asyncio.wait_for(listener, 1)
+
+    with use_registry(registry):
+        asyncio.run(run())
+    assert registry.progress['records_saved'] == 3
+
+
+def test_failed_batch_falls_back_to_one_record_at_a_time():
+    registry = listen(BulkPipeline, records(1, range(5)), fail={3}, batch_size=5, batch_timeout=60)
+    assert BulkPipeline.batches == [[0, 1, 2, 3, 4]]
+    assert BulkPipeline.saved == [0, 1, 2, 4]
+    assert registry.progress['records_saved'] == 4
+    assert registry.progress['records_failed'] == 1
+
+
+def test_default_save_batch_counts_failed_records():
+    registry = listen(OneByOnePipeline, records(1, range(5)), fail={1, 4}, batch_size=10, batch_timeout=60)
+    assert OneByOnePipeline.saved == [0, 2, 3]
+    assert registry.progress['records_saved'] == 3
+    assert registry.progress['records_failed'] == 2
+
+
+def test_invalid_records_are_counted_and_dropped():
+    batch = records(1, [1, 2]) + [SpiderData({'value': 'not a number'}, 1)]
+    registry = listen(BulkPipeline, batch, batch_size=10, batch_timeout=60)
+    assert BulkPipeline.saved == [1, 2]
+    assert registry.progress['records_invalid'] == 1
+    assert registry.progress['records_saved'] == 2
+
+
+class KeyedRecord(BaseModel):
+    key: str
+    seq: int
+
+
+class KeyedPipeline(Pipeline):
+    """Partitioned by key, saves take a random while so workers interleave."""
+    schema = KeyedRecord
+    saved:list[tuple[str, int, asyncio.Task]] = []
+
+    @classmethod
+    def partition_key(cls, spider_data:SpiderData):
+        return spider_data.data['key']
+
+    async def save_data(self):
+        await asyncio.sleep(random.random() / 1000)
+        self.saved.append((self.data_to_save.key, self.data_to_save.seq, asyncio.current_task()))
+
+
+@pytest.mark.parametrize('batch_size', [1, 4])
+def test_pool_keeps_each_key_in_order_on_one_worker(batch_size):
+    random.seed(0)
+    KeyedPipeline.saved = []
+    keys = [f"product {i}" for i in range(12)]
+    # batches are per spider, so a key is only kept in order within one spider's data
+    sent = [SpiderData({'key': key, 'seq': seq}, 1 + keys.index(key) % 2) for seq in range(400) for key in [random.choice(keys)]]
+    registry = ScrapingRegistry()
+    for spider_id in (1, 2):
+        registry.add_spider(spider_id, spider(spider_id, KeyedPipeline), {})
+
+    async def run():
+        queue = asyncio.Queue()
+        pool = PipelineListenerPool(queue, worker_count=4, worker_queue_size=2, batch_size=batch_size, batch_timeout=60)
+        listening = asyncio.create_task(pool.listen())
+        for spider_data in sent:
+            await queue.put(spider_data)
+        await queue.put(SENTINEL)
+        await asyncio.wait_for(listening, 5)
+        # every worker got the sentinel and drained its queue before listen() returned
+        assert all(worker_queue.empty() for worker_queue in pool.worker_queues)
+        return pool
+
+    with use_registry(registry):
+        pool = asyncio.run(run())
+
+    assert len(KeyedPipeline.saved) == len(sent)
+    assert registry.progress['records_saved'] == len(sent)
+    for key in keys:
+        saved = [(seq, task) for saved_key, seq, task in KeyedPipeline.saved if saved_key == key]
+        assert [seq for seq, _task in saved] == [spider_data.data['seq'] for spider_data in sent if spider_data.data['key'] == key]
+        assert len({task for _seq, task in saved}) == 1, key
+    assert len({task for _key, _seq, task in KeyedPipeline.saved}) > 1
+    assert len(pool.workers) == 4
+
+
+def test_pool_stops_with_nothing_to_save():
+    async def run():
+        queue = asyncio.Queue()
+        pool = PipelineListenerPool(queue, worker_count=3)
+        await queue.put(SENTINEL)
+        await asyncio.wait_for(pool.listen(), 1)
+        assert all(worker_queue.empty() for worker_queue in pool.worker_queues)
+
+    with use_registry(ScrapingRegistry()):
+        asyncio.run(run())
@@ -0,0 +1,110 @@
+import types
+
+import pytest
+
+from webweaver.config import PROXY_COOLDOWN, PROXY_QUARANTINE, PROXY_QUARANTINE_FAILURES
+from webweaver.webscraping.proxy import proxy_health
+from webweaver.webscraping.proxy.proxy_health import ProxyHealthTracker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(proxy_health, 'time', types.SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+def acquire_all(tracker:ProxyHealthTracker) -> list[str]:
+    endpoints = []
+    while (endpoint := tracker.acquire()) is not None:
+        endpoints.append(endpoint)
+    return endpoints
+
+
+def test_acquires_best_score_first(clock):
+    tracker = ProxyHealthTracker(['a', 'b', 'c'])
+    tracker.record_success('a', 3.0)
+    tracker.record_success('b', 0.2)
+    tracker.record_success('c', 1.0)
+    assert acquire_all(tracker) == ['b', 'c', 'a']
+
+
+def test_stale_heap_entries_are_skipped(clock):
+    """Every update of a free endpoint pushes a new heap entry, only the latest counts."""
+    tracker = ProxyHealthTracker(['a', 'b'])
+    for latency in (0.1, 0.1, 5.0, 5.0, 5.0, 5.0, 5.0, 5.0, 5.0, 5.0):
+        tracker.record_success('a', latency)
+    tracker.record_success('b', 1.0)
+    assert len(tracker._available) > 2
+    assert acquire_all(tracker) == ['b', 'a']
+    assert tracker.acquire() is None
+
+
+def test_in_use_endpoint_is_requeued_on_release_only(clock):
+    tracker = ProxyHealthTracker(['a', 'b'])
+    tracker.record_success('b', 0.5)
+    assert tracker.acquire() == 'b'
+    tracker.record_success('b', 0.1)  # in use, must not be handed out again
+    assert acquire_all(tracker) == ['a']
+    tracker.release('b')
+    tracker.release('b')  # double release is ignored
+    assert acquire_all(tracker) == ['b']
+
+
+def test_ban_rests_endpoint_with_doubling_cooldown(clock):
+    tracker = ProxyHealthTracker(['a', 'b'])
+    tracker.record_ban('a', 429)
+    assert acquire_all(tracker) == ['b']
+    assert tracker.time_until_ready() == PROXY_COOLDOWN
+
+    clock.now += PROXY_COOLDOWN
+    assert tracker.acquire() == 'a'
+    tracker.record_ban('a', 403)
+    tracker.release('a')
+    assert tracker.acquire() is None
+    assert tracker.time_until_ready() == PROXY_COOLDOWN * 2
+    assert tracker.snapshot()['resting'] == 1
+
+
+def test_endpoint_banned_while_in_use_rests_after_release(clock):
+    tracker = ProxyHealthTracker(['a'])
+    assert tracker.acquire() == 'a'
+    tracker.record_response('a', 429, 0.3)
+    tracker.release('a')
+    assert tracker.acquire() is None
+    clock.now += PROXY_COOLDOWN
+    assert tracker.acquire() == 'a'
+
+
+def test_quarantine_after_consecutive_failures(clock):
+    tracker = ProxyHealthTracker(['a', 'b'])
+    for _ in range(PROXY_QUARANTINE_FAILURES - 1):
+        tracker.record_failure('a')
+    tracker.record_success('a', 0.1)  # resets the streak
+    for _ in range(PROXY_QUARANTINE_FAILURES - 1):
+        tracker.record_failure('a')
+    assert not tracker.health['a'].is_quarantined
+
+    tracker.record_failure('a')
+    assert tracker.health['a'].is_quarantined
+    assert tracker.snapshot()['quarantined'] == 1
+    assert acquire_all(tracker) == ['b']
+
+    clock.now += PROXY_QUARANTINE
+    assert tracker.acquire() == 'a'
+    assert not tracker.health['a'].is_quarantined
+
+
+def test_untracked_endpoint_is_never_handed_out(clock):
+    tracker = ProxyHealthTracker(['a'])
+    tracker.record_success('rotating:10000', 0.01)
+    assert acquire_all(tracker) == ['a']
+    assert tracker.snapshot()['requests'] == 1
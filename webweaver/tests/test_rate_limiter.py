@@ -0,0 +1,122 @@
+import asyncio
+import json
+import types
+
+import pytest
+
+from webweaver.webscraping.spiders import rate_limiter
+from webweaver.webscraping.spiders.rate_limiter import AdaptiveRateLimiter, TokenBucket, parse_retry_after
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter, 'time', types.SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+def limiter(tmp_path, **kwargs) -> AdaptiveRateLimiter:
+    return AdaptiveRateLimiter(**{
+        'state_path': str(tmp_path / 'rate_limits.json'), 'initial_rate': 2.0, 'min_rate': 0.1, 'max_rate': 20.0, 'burst': 3,
+        'increase': 0.25, 'success_window': 20, 'decrease': 0.5, **kwargs,
+    })
+
+
+def test_token_bucket_burst_then_rate(clock):
+    bucket = TokenBucket(rate=2.0, burst=3)
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, 0]
+    # reserved up front: callers queue up half a second apart
+    assert [bucket.reserve() for _ in range(3)] == [0.5, 1.0, 1.5]
+
+
+def test_token_bucket_refills_up_to_burst(clock):
+    bucket = TokenBucket(rate=2.0, burst=3)
+    for _ in range(3):
+        bucket.reserve()
+    clock.now += 60
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, 0]
+    assert bucket.reserve() == 0.5
+
+
+def test_aimd(clock, tmp_path):
+    rates = limiter(tmp_path)
+    url = 'https://www.example.com/page'
+    for _ in range(40):
+        rates.record(url, 200)
+    assert rates.domains['example.com'].rate == 2.5  # + increase per success_window
+
+    rates.record(url, 429)
+    assert rates.domains['example.com'].rate == 1.25
+    for _ in range(19):
+        rates.record(url, 200)
+    rates.record(url, 503)  # resets the success streak too
+    assert rates.domains['example.com'].rate == 0.625
+
+    for _ in range(10):
+        rates.record(url, 429)
+    assert rates.domains['example.com'].rate == 0.1  # min_rate
+
+    rates.record(url, 404)
+    assert rates.domains['example.com'].successes == 0
+
+
+def test_max_rate(clock, tmp_path):
+    rates = limiter(tmp_path, initial_rate=19.9)
+    for _ in range(200):
+        rates.record('https://example.com/', 200)
+    assert rates.domains['example.com'].rate == 20.0
+
+
+def test_unlimited_until_throttled(clock, tmp_path):
+    """initial_rate=None: no bucket until the first 429/503, which starts from the rate we were going at."""
+    rates = limiter(tmp_path, initial_rate=None)
+
+    async def run():
+        for _ in range(40):
+            await rates.acquire('https://example.com/')
+            clock.now += 0.1  # 10 req/s
+
+    asyncio.run(run())
+    domain_rate = rates.domains['example.com']
+    assert domain_rate.rate is None
+    rates.record('https://example.com/', 200)
+    assert domain_rate.rate is None
+    rates.record('https://example.com/', 429)
+    assert domain_rate.rate == pytest.approx(5.0)
+
+
+def test_retry_after_pauses_domain(clock, tmp_path):
+    rates = limiter(tmp_path)
+    rates.record('https://example.com/', 429, retry_after='30')
+    assert rates.domains['example.com'].blocked_until == clock.now + 30
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
+    assert parse_retry_after('soon') is None
+
+
+def test_save_merges_with_rates_saved_since(clock, tmp_path):
+    state_path = tmp_path / 'rate_limits.json'
+    state_path.write_text(json.dumps({'a.com': 9.0, 'old.com': 1.5}))
+    rates = limiter(tmp_path)
+    assert rates.get_domain_rate('a.com').rate == 9.0
+
+    # another run saved in the meantime
+    state_path.write_text(json.dumps({'a.com': 9.0, 'old.com': 1.5, 'other-run.com': 4.0}))
+    rates.record('https://a.com/', 429)
+    rates.record('https://b.com/', 429)
+    rates.save()
+    assert json.loads(state_path.read_text()) == {'a.com': 4.5, 'b.com': 1.0, 'old.com': 1.5, 'other-run.com': 4.0}
+
+
+def test_save_skips_unthrottled_domains(clock, tmp_path):
+    rates = limiter(tmp_path, initial_rate=None)
+    rates.record('https://example.com/', 200)
+    rates.save()
+    assert not (tmp_path / 'rate_limits.json').exists()
@@ -0,0 +1,57 @@
+import asyncio
+
+from webweaver.webscraping.spiders.spider_queue import SpiderQueue
+
+
+def test_pauses_at_high_watermark_and_resumes_at_low_watermark():
+    async def run():
+        queue = SpiderQueue(high_watermark=4, low_watermark=1)
+        for i in range(3):
+            await queue.put(i)
+        assert not queue.is_paused
+        await queue.put(3)
+        assert queue.is_paused
+
+        blocked = asyncio.create_task(queue.put(4, spider_id=7))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+
+        await queue.get()
+        await queue.get()
+        await asyncio.sleep(0.01)
+        assert not blocked.done()  # depth 2, still above the low watermark
+
+        await queue.get()
+        await asyncio.wait_for(blocked, 1)
+        assert not queue.is_paused
+        assert [queue.get_nowait() for _ in range(queue.qsize())] == [3, 4]
+
+        snapshot = queue.snapshot()
+        assert snapshot['max_depth'] == 4
+        assert snapshot['put_count'] == 5
+        assert snapshot['blocked_count'] == 1
+        assert 7 in snapshot['blocked_seconds_by_spider']
+
+    asyncio.run(run())
+
+
+def test_unbounded_never_pauses():
+    async def run():
+        queue = SpiderQueue(high_watermark=None, low_watermark=None)
+        for i in range(1000):
+            await queue.put(i)
+        assert not queue.is_bounded
+        assert not queue.is_paused
+        assert queue.qsize() == 1000
+
+    asyncio.run(run())
+
+
+def test_low_watermark_above_high_watermark_is_clamped():
+    async def run():
+        queue = SpiderQueue(high_watermark=2, low_watermark=10)
+        assert queue.low_watermark == 2
+        queue = SpiderQueue(high_watermark=2, low_watermark=None)
+        assert queue.low_watermark == 2
+
+    asyncio.run(run())
@@ -0,0 +1,99 @@
+import asyncio
+import random
+
+import aiohttp
+import pytest
+
+from webweaver.webscraping.spiders.spider_retry import (
+    RetryBudget,
+    RetryKind,
+    RetryPolicy,
+    classify_aiohttp_error,
+)
+
+
+def policy(**kwargs) -> RetryPolicy:
+    return RetryPolicy(**{'base_delay': 0.001, 'max_delay': 0.005, 'max_connect_retries': 3, 'max_read_retries': 2, **kwargs})
+
+
+def failing(*errors:Exception, result='ok'):
+    """A request_func raising each of errors in turn, then returning result."""
+    errors = list(errors)
+    calls = []
+
+    async def request():
+        calls.append(1)
+        if errors:
+            raise errors.pop(0)
+        return result
+
+    return request, calls
+
+
+def classify(error:Exception) -> RetryKind | None:
+    if isinstance(error, ConnectionRefusedError):
+        return RetryKind.CONNECT
+    if isinstance(error, ConnectionResetError):
+        return RetryKind.READ
+    return None
+
+
+def test_budget_runs_out():
+    budget = RetryBudget(2)
+    assert budget.try_spend() and budget.try_spend()
+    assert not budget.try_spend()
+    assert budget.remaining == 0 and budget.spent == 2
+
+
+def test_retries_until_success():
+    request, calls = failing(ConnectionRefusedError(), ConnectionResetError(), ConnectionRefusedError())
+    retries = []
+    result = asyncio.run(policy().run(request, classify, on_retry=lambda error, kind, attempt, delay: retries.append((kind, attempt))))
+    assert result == 'ok'
+    assert len(calls) == 4
+    assert retries == [(RetryKind.CONNECT, 1), (RetryKind.READ, 1), (RetryKind.CONNECT, 2)]
+
+
+def test_each_kind_has_its_own_limit():
+    # 2 read retries allowed, the 3rd read error is raised even though connect retries are left
+    request, calls = failing(ConnectionResetError(), ConnectionResetError(), ConnectionResetError())
+    with pytest.raises(ConnectionResetError):
+        asyncio.run(policy().run(request, classify))
+    assert len(calls) == 3
+
+
+def test_unclassified_errors_are_not_retried():
+    request, calls = failing(ValueError('parse error'))
+    with pytest.raises(ValueError):
+        asyncio.run(policy().run(request, classify))
+    assert len(calls) == 1
+
+
+def test_budget_is_shared_between_requests():
+    budget = RetryBudget(3)
+    request, _calls = failing(ConnectionRefusedError(), ConnectionRefusedError())
+    assert asyncio.run(policy().run(request, classify, budget)) == 'ok'
+    assert budget.remaining == 1
+
+    request, calls = failing(ConnectionRefusedError(), ConnectionRefusedError())
+    with pytest.raises(ConnectionRefusedError):
+        asyncio.run(policy().run(request, classify, budget))
+    assert len(calls) == 2
+    assert budget.remaining == 0
+
+
+def test_delays_stay_between_base_and_max():
+    retry_policy = RetryPolicy(base_delay=0.5, max_delay=10)
+    random.seed(0)
+    delay = retry_policy.base_delay
+    for _ in range(1000):
+        delay = retry_policy.next_delay(delay)
+        assert 0.5 <= delay <= 10
+
+
+def test_classify_aiohttp_error():
+    assert classify_aiohttp_error(aiohttp.ServerDisconnectedError()) == RetryKind.READ
+    assert classify_aiohttp_error(asyncio.TimeoutError()) == RetryKind.READ
+    assert classify_aiohttp_error(ConnectionRefusedError()) == RetryKind.CONNECT
+    assert classify_aiohttp_error(aiohttp.ClientConnectionError()) == RetryKind.CONNECT
+    assert classify_aiohttp_error(ValueError()) is None
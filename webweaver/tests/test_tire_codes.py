@@ -0,0 +1,59 @@
+"""parse()/parse_many() vs the format-by-format TireCodeParser they replaced,
+kept as LegacyTireCodeParser in scripts/bench_tire_codes.py.
+"""
+import random
+
+import pytest
+
+from webweaver.modules.project_modules.speed_fanatics.tire_codes import TireCodeParser, TireCodeParsingError, TireSpecs, parse, parse_many
+from webweaver.scripts.bench_tire_codes import ROOT, LegacyTireCodeParser, as_dict, product_names, read_lines
+
+
+CODES = read_lines(ROOT / 'tire_codes.txt')
+PIECES = ['', ' ', '225', '/', '45', 'R', 'ZR', '17', 'LT', 'P', '35X12.50', 'X', '.50', '-', '91', '/', '89', 'W', 'V', '(', ')', 'REINF', 'XL', 'ALL SEASON']
+
+
+def made_up_strings(count:int, seed:int=0) -> list[str]:
+    """Tire codes with noise around them plus random runs of tire code pieces."""
+    rng = random.Random(seed)
+    strings = []
+    for _ in range(count):
+        if rng.random() < 0.5:
+            strings.append(f"{''.join(rng.choices(PIECES, k=rng.randint(0, 3)))} {rng.choice(CODES)} {''.join(rng.choices(PIECES, k=rng.randint(0, 3)))}")
+        else:
+            strings.append(''.join(rng.choices(PIECES, k=rng.randint(1, 10))))
+    return strings
+
+
+@pytest.mark.parametrize('strings, use_search', [
+    (CODES, False),
+    (CODES, True),
+    (product_names(), True),
+    (made_up_strings(3000), False),
+    (made_up_strings(3000), True),
+], ids=['codes', 'codes-search', 'names-search', 'made-up', 'made-up-search'])
+def test_matches_legacy_parser(strings, use_search):
+    for s in strings:
+        assert as_dict(parse(s, use_search, raise_exc=False)) == LegacyTireCodeParser(s, use_search).specs, s
+
+
+def test_parse_many_matches_parse():
+    strings = made_up_strings(500, seed=1) * 2
+    assert parse_many(strings, True, raise_exc=False) == [parse(s, True, raise_exc=False) for s in strings]
+
+
+def test_unparseable():
+    assert parse('not a tire', raise_exc=False) is None
+    with pytest.raises(TireCodeParsingError):
+        parse('not a tire')
+    with pytest.raises(TireCodeParsingError):
+        parse_many(['225/45R17', 'not a tire'])
+    with pytest.raises(ValueError):
+        parse(None)
+
+
+def test_tire_code_parser_wrapper():
+    parser = TireCodeParser('(225/45r17 91w)')
+    assert parser.tire_code == '225/45R17 91W'
+    assert parser.specs_dict == as_dict(parse('225/45R17 91W'))
+    assert TireCodeParser('not a tire', raise_exc=False).specs == TireSpecs()
@@ -0,0 +1,34 @@
+import pytest
+
+from webweaver.webscraping.frontier.url_frontier import canonicalize_url, url_domain, url_shard
+
+
+@pytest.mark.parametrize('url, canonical', [
+    ('HTTPS://Example.COM/Path?b=2&a=1#reviews', 'https://example.com/Path?a=1&b=2'),
+    ('https://example.com:443/', 'https://example.com/'),
+    ('http://example.com:80', 'http://example.com/'),
+    ('http://example.com:8080/x', 'http://example.com:8080/x'),
+    ('https://example.com/p?utm_source=mail&UTM_Medium=x&gclid=1&fbclid=2&id=5', 'https://example.com/p?id=5'),
+    ('https://example.com/p?empty=&id=5', 'https://example.com/p?empty=&id=5'),
+    ('  https://example.com/p  ', 'https://example.com/p'),
+    ('https://example.com/Case/Kept', 'https://example.com/Case/Kept'),
+])
+def test_canonicalize_url(url, canonical):
+    assert canonicalize_url(url) == canonical
+
+
+def test_canonicalize_url_is_idempotent():
+    url = 'HTTPS://www.Example.com:443/a/b?z=1&utm_campaign=x&a=2#top'
+    assert canonicalize_url(canonicalize_url(url)) == canonicalize_url(url)
+
+
+def test_same_page_same_shard():
+    variants = ['https://example.com/p?a=1&b=2', 'HTTPS://EXAMPLE.com/p?b=2&a=1#x', 'https://example.com:443/p?a=1&b=2&utm_source=y']
+    assert len({url_shard(url, 16) for url in variants}) == 1
+    shards = {url_shard(f"https://example.com/p/{i}", 16) for i in range(500)}
+    assert shards == set(range(16))
+
+
+def test_url_domain():
+    assert url_domain('https://WWW.Example.com/x') == 'example.com'
+    assert url_domain('https://shop.example.com:8443/') == 'shop.example.com'
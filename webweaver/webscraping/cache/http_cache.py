@@ -0,0 +1,449 @@
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass, asdict, field
+from email.utils import formatdate, parsedate_to_datetime
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from typing import AsyncIterator
+
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+from webweaver.common.enums import CacheModeEnum
+from webweaver.config import (
+    HTTP_CACHE_DIR,
+    HTTP_CACHE_MODE,
+    HTTP_CACHE_MAX_BYTES,
+    HTTP_CACHE_DEFAULT_TTL,
+)
+
+
+logger = logging.getLogger("scraping")
+
+
+# Headers that describe the transfer rather than the content. The body we store is
+# already decoded, and replaying cookies from a cached response would be a bad idea.
+UNSTORED_HEADERS = frozenset({
+    'connection',
+    'keep-alive',
+    'transfer-encoding',
+    'content-encoding',
+    'content-length',
+    'set-cookie',
+    'proxy-authenticate',
+    'proxy-connection',
+})
+MAX_AGE_REGEX = re.compile(r'(?:s-maxage|max-age)\s*=\s*(\d+)')
+
+
+def storable_headers(headers) -> dict[str, str]:
+    """Lowercased response headers, minus the ones that don't survive being cached."""
+    return {k.lower(): v for k, v in headers.items() if k.lower() not in UNSTORED_HEADERS}
+
+
+@dataclass
+class CacheEntry:
+    """Metadata for one cached response. The body lives next to it on disk."""
+    key:str
+    method:str
+    url:str
+    status:int
+    headers:dict[str, str]
+    vary:dict[str, str|None]
+    stored_at:float
+    expires_at:float
+    size:int
+    last_used:float = field(default_factory=time.time)
+
+    @property
+    def etag(self) -> str|None:
+        return self.headers.get('etag')
+
+    @property
+    def last_modified(self) -> str|None:
+        return self.headers.get('last-modified')
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def conditional_headers(self) -> dict[str, str]:
+        """If-None-Match/If-Modified-Since headers for revalidating this entry."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        elif not self.etag:
+            headers['If-Modified-Since'] = formatdate(self.stored_at, usegmt=True)
+        return headers
+
+
+@dataclass
+class CacheStats:
+    hits:int = 0
+    revalidated:int = 0
+    misses:int = 0
+    stored:int = 0
+    evicted:int = 0
+    bytes_served:int = 0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.hits} hits, {self.revalidated} revalidated (304), {self.misses} misses, "
+            f"{self.stored} stored, {self.evicted} evicted, {self.bytes_served / 1_000_000:.1f}MB served from cache"
+        )
+
+
+class CachedStreamReader:
+    """Just enough of aiohttp's StreamReader for spiders reading a CachedResponse."""
+    def __init__(self, body:bytes):
+        self._body = body
+
+    async def read(self, n:int=-1) -> bytes:
+        return self._body if n < 0 else self._body[:n]
+
+    async def iter_chunked(self, n:int) -> AsyncIterator[bytes]:
+        for i in range(0, len(self._body), n):
+            yield self._body[i:i + n]
+
+
+class CachedResponse:
+    """Stands in for aiohttp's ClientResponse when a response is served from the
+    HttpCache, so spiders don't need to know where the response came from.
+    """
+    from_cache = True
+
+    def __init__(self, entry:CacheEntry, body:bytes, revalidated:bool=False):
+        self.entry = entry
+        self.status = entry.status
+        self.reason = 'OK' if entry.status == 200 else ''
+        self.url = URL(entry.url)
+        self.method = entry.method
+        self.headers = CIMultiDictProxy(CIMultiDict(entry.headers))
+        self.revalidated = revalidated
+        self.content = CachedStreamReader(body)
+        self._body = body
+
+    @property
+    def ok(self) -> bool:
+        return self.status < 400
+
+    @property
+    def content_type(self) -> str:
+        return self.headers.get('content-type', 'application/octet-stream').split(';')[0].strip()
+
+    @property
+    def charset(self) -> str|None:
+        match = re.search(r'charset=([\w-]+)', self.headers.get('content-type', ''))
+        return match.group(1) if match else None
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def text(self, encoding:str=None, errors:str='strict') -> str:
+        return self._body.decode(encoding or self.charset or 'utf-8', errors=errors)
+
+    async def json(self, **kwargs):
+        return json.loads(self._body)
+
+    def raise_for_status(self):
+        return
+
+    def release(self):
+        return
+
+    def close(self):
+        return
+
+    async def __aenter__(self) -> "CachedResponse":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return
+
+
+class HttpCache:
+    """On-disk HTTP response cache shared by every spider, so re-scraping the same
+    catalogs doesn't re-download pages and images that haven't changed.
+
+    Entries are keyed by method+URL, and only match a request whose headers agree
+    with the response's Vary headers. Freshness comes from Cache-Control/Expires
+    (HTTP_CACHE_DEFAULT_TTL otherwise). A stale entry is revalidated with
+    If-None-Match/If-Modified-Since, and a 304 gets served from the cache.
+    Least recently used entries are evicted once the cache is over max_bytes.
+
+    Modes:
+        on      normal caching/revalidation
+        off     no caching at all
+        replay  dev mode, anything in the cache is served without touching the
+                network. Great for iterating on a spider's parsing code.
+
+    AiohttpSpider.get() and SpiderPage.goto_or_error() use the module-level
+    http_cache instance.
+    """
+    def __init__(
+            self,
+            cache_dir:str=HTTP_CACHE_DIR,
+            mode:str=HTTP_CACHE_MODE,
+            max_bytes:int=HTTP_CACHE_MAX_BYTES,
+            default_ttl:float=HTTP_CACHE_DEFAULT_TTL,
+    ):
+        self.cache_dir = cache_dir
+        self.mode = CacheModeEnum(mode)
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.index:OrderedDict[str, CacheEntry] = OrderedDict()  # least recently used first
+        self.total_bytes = 0
+        self.stats = CacheStats()
+        self._index_loaded = False
+        self._index_lock = asyncio.Lock()
+
+
+    @property
+    def is_enabled(self) -> bool:
+        return self.mode != CacheModeEnum.OFF
+
+
+    @staticmethod
+    def cache_key(method:str, url:str) -> str:
+        return hashlib.sha256(f"{method.upper()} {url}".encode()).hexdigest()
+
+
+    def _meta_path(self, key:str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+
+    def _body_path(self, key:str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.body")
+
+
+    def _load_index(self) -> list[CacheEntry]:
+        """Reads every entry's metadata off disk. Runs in a thread."""
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for dirpath, _, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                if not filename.endswith('.json'):
+                    continue
+                try:
+                    with open(os.path.join(dirpath, filename)) as f:
+                        entries.append(CacheEntry(**json.load(f)))
+                except (OSError, ValueError, TypeError):
+                    continue
+        return sorted(entries, key=lambda entry: entry.last_used)
+
+
+    async def _ensure_index(self):
+        if self._index_loaded:
+            return
+        async with self._index_lock:
+            if self._index_loaded:
+                return
+            for entry in await asyncio.to_thread(self._load_index):
+                self.index[entry.key] = entry
+                self.total_bytes += entry.size
+            self._index_loaded = True
+            logger.debug(f"HttpCache loaded {len(self.index)} entries ({self.total_bytes / 1_000_000:.1f}MB)")
+
+
+    def _vary_matches(self, entry:CacheEntry, request_headers:dict) -> bool:
+        request_headers = {k.lower(): v for k, v in (request_headers or {}).items()}
+        return all(request_headers.get(name) == value for name, value in entry.vary.items())
+
+
+    async def lookup(self, method:str, url:str, request_headers:dict=None) -> CacheEntry|None:
+        """Returns the cached entry for this request (fresh or stale), or None."""
+        if not self.is_enabled:
+            return None
+        await self._ensure_index()
+        entry = self.index.get(self.cache_key(method, url))
+        if entry is None or not self._vary_matches(entry, request_headers):
+            self.stats.misses += 1
+            return None
+        return entry
+
+
+    def can_serve(self, entry:CacheEntry) -> bool:
+        """Whether the entry can be served without going to the network."""
+        return self.mode == CacheModeEnum.REPLAY or entry.is_fresh
+
+
+    def _expires_at(self, headers:dict[str, str], now:float) -> float|None:
+        """When a response stops being fresh, or None if it shouldn't be stored."""
+        cache_control = headers.get('cache-control', '').lower()
+        if 'no-store' in cache_control:
+            return None
+        if 'no-cache' in cache_control:
+            return now
+        match = MAX_AGE_REGEX.search(cache_control)
+        if match:
+            age = headers.get('age', '0')
+            age = int(age) if age.isdigit() else 0
+            return now + max(int(match.group(1)) - age, 0)
+        if 'expires' in headers:
+            try:
+                return parsedate_to_datetime(headers['expires']).timestamp()
+            except (TypeError, ValueError):
+                return now
+        return now + self.default_ttl
+
+
+    async def store(
+            self,
+            method:str,
+            url:str,
+            request_headers:dict,
+            status:int,
+            response_headers:dict,
+            body:bytes,
+    ) -> CacheEntry|None:
+        """Stores a 200 response. Responses marked no-store, or that Vary on
+        everything, are skipped.
+        """
+        if not self.is_enabled or status != 200:
+            return None
+        await self._ensure_index()
+        headers = storable_headers(response_headers)
+        vary_names = [name.strip().lower() for name in headers.get('vary', '').split(',') if name.strip()]
+        if '*' in vary_names:
+            return None
+        now = time.time()
+        expires_at = self._expires_at(headers, now)
+        if expires_at is None:
+            return None
+        request_headers = {k.lower(): v for k, v in (request_headers or {}).items()}
+        key = self.cache_key(method, url)
+        entry = CacheEntry(
+            key=key,
+            method=method.upper(),
+            url=url,
+            status=status,
+            headers=headers,
+            vary={name: request_headers.get(name) for name in vary_names},
+            stored_at=now,
+            expires_at=expires_at,
+            size=len(body),
+            last_used=now,
+        )
+        try:
+            await asyncio.to_thread(self._write_entry, entry, body)
+        except OSError as e:
+            logger.warning(f"HttpCache could not store '{url}': {e}")
+            return None
+        previous = self.index.pop(key, None)
+        if previous is not None:
+            self.total_bytes -= previous.size
+        self.index[key] = entry
+        self.total_bytes += entry.size
+        self.stats.stored += 1
+        await self._evict()
+        return entry
+
+
+    async def revalidated(self, entry:CacheEntry, response_headers:dict) -> CacheEntry:
+        """The server answered 304 Not Modified: refresh the entry's headers and
+        expiry, and it's good to be served again.
+        """
+        entry.headers.update(storable_headers(response_headers))
+        now = time.time()
+        entry.expires_at = self._expires_at(entry.headers, now) or now
+        entry.last_used = now
+        self.stats.revalidated += 1
+        try:
+            await asyncio.to_thread(self._write_meta, entry)
+        except OSError:
+            pass
+        return entry
+
+
+    async def read_body(self, entry:CacheEntry) -> bytes|None:
+        """Reads a cached body and marks the entry as recently used."""
+        try:
+            body = await asyncio.to_thread(self._read_body, entry.key)
+        except OSError:
+            self._forget(entry)
+            return None
+        entry.last_used = time.time()
+        self.index.move_to_end(entry.key)
+        self.stats.hits += 1
+        self.stats.bytes_served += len(body)
+        return body
+
+
+    async def response(self, entry:CacheEntry, revalidated:bool=False) -> CachedResponse|None:
+        body = await self.read_body(entry)
+        if body is None:
+            return None
+        return CachedResponse(entry, body, revalidated=revalidated)
+
+
+    def _forget(self, entry:CacheEntry):
+        if self.index.pop(entry.key, None) is not None:
+            self.total_bytes -= entry.size
+
+
+    async def _evict(self):
+        """Drops least recently used entries until we're back under max_bytes."""
+        evicted = []
+        while self.total_bytes > self.max_bytes and self.index:
+            _, entry = self.index.popitem(last=False)
+            self.total_bytes -= entry.size
+            evicted.append(entry.key)
+        if evicted:
+            self.stats.evicted += len(evicted)
+            await asyncio.to_thread(self._delete_entries, evicted)
+
+
+    def _write_entry(self, entry:CacheEntry, body:bytes):
+        os.makedirs(os.path.dirname(self._body_path(entry.key)), exist_ok=True)
+        self._atomic_write(self._body_path(entry.key), body)
+        self._write_meta(entry)
+
+
+    def _write_meta(self, entry:CacheEntry):
+        self._atomic_write(self._meta_path(entry.key), json.dumps(asdict(entry)).encode())
+
+
+    @staticmethod
+    def _atomic_write(path:str, data:bytes):
+        """Write to a temp file then rename it, so a reader never sees half a file.
+        The temp name is unique, two writers of the same entry (threads or 
+        processes) each rename their own complete file.
+        """
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix='.tmp', delete=False) as f:
+            try:
+                f.write(data)
+            except BaseException:
+                f.close()
+                os.remove(f.name)
+                raise
+        os.replace(f.name, path)
+
+
+    def _read_body(self, key:str) -> bytes:
+        with open(self._body_path(key), 'rb') as f:
+            return f.read()
+
+
+    def _delete_entries(self, keys:list[str]):
+        for key in keys:
+            for path in (self._meta_path(key), self._body_path(key)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+
+    def log_stats(self):
+        if self.is_enabled:
+            logger.info(f"HttpCache ({self.mode.value}): {self.stats}")
+
+
+http_cache = HttpCache()
@@ -0,0 +1,143 @@
+import hashlib
+import math
+import os
+import struct
+import tempfile
+import time
+
+from webweaver.webscraping.spiders.rate_limiter import locked
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter for remembering URLs across runs without storing them.
+
+    Sized from the expected number of items (capacity) and the false positive rate
+    we're willing to live with. A false positive means a URL gets skipped when it
+    wasn't actually seen before, so keep error_rate low. There are never false
+    negatives.
+
+    Bit positions come from double hashing one blake2b digest, so adding or
+    checking a URL is a single hash no matter how many hash functions we use.
+    """
+    MAGIC = b'WWBF'
+    HEADER = struct.Struct('>4sQIQd')  # magic, bit count, hash count, item count, created_at
+
+    def __init__(self, capacity:int, error_rate:float, bit_count:int=None, hash_count:int=None):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bit_count = bit_count or self.optimal_bit_count(capacity, error_rate)
+        self.hash_count = hash_count or self.optimal_hash_count(self.bit_count, capacity)
+        self.bits = bytearray((self.bit_count + 7) // 8)
+        self.count = 0
+        self.created_at = time.time()
+
+
+    @staticmethod
+    def optimal_bit_count(capacity:int, error_rate:float) -> int:
+        return max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+
+
+    @staticmethod
+    def optimal_hash_count(bit_count:int, capacity:int) -> int:
+        return max(1, round(bit_count / capacity * math.log(2)))
+
+
+    def _positions(self, item:str) -> list[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1, h2 = struct.unpack('>QQ', digest)
+        return [(h1 + i * h2) % self.bit_count for i in range(self.hash_count)]
+
+
+    def add(self, item:str) -> bool:
+        """Adds the item. Returns False if it was (probably) already in the filter."""
+        is_new = False
+        for position in self._positions(item):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                is_new = True
+        if is_new:
+            self.count += 1
+        return is_new
+
+
+    def __contains__(self, item:str) -> bool:
+        for position in self._positions(item):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                return False
+        return True
+
+
+    def __len__(self) -> int:
+        return self.count
+
+
+    @property
+    def age_days(self) -> float:
+        return (time.time() - self.created_at) / 86400
+
+
+    def save(self, path:str, max_age_days:float=None):
+        """Merges the filter into the one saved at `path`. Under a lock, the
+        saved filter's bits are ORed into this one first, so a job of the same
+        spider that saved in the meantime keeps its seen URLs, then it's written
+        to a temp file and renamed over `path` (a crash can't leave half a filter).
+
+        A saved filter older than max_age_days is the one this filter replaced,
+        it isn't merged. Neither is one of a different size.
+        """
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        with locked(path):
+            self._merge_saved(path, max_age_days)
+            with tempfile.NamedTemporaryFile(dir=directory, suffix='.tmp', delete=False) as f:
+                f.write(self.HEADER.pack(self.MAGIC, self.bit_count, self.hash_count, self.count, self.created_at))
+                f.write(self.bits)
+            try:
+                os.replace(f.name, path)
+            except OSError:
+                os.remove(f.name)
+                raise
+
+
+    def _merge_saved(self, path:str, max_age_days:float=None):
+        try:
+            saved = self.load(path, self.capacity, self.error_rate)
+        except (OSError, ValueError):
+            return
+        if (saved.bit_count, saved.hash_count) != (self.bit_count, self.hash_count):
+            return
+        if max_age_days is not None and saved.age_days > max_age_days:
+            return
+        merged = (int.from_bytes(self.bits, 'big') | int.from_bytes(saved.bits, 'big')).to_bytes(len(self.bits), 'big')
+        if merged != self.bits:
+            self.bits = bytearray(merged)
+            self.count = max(self.count, saved.count, self.estimated_count())
+        self.created_at = min(self.created_at, saved.created_at)
+
+
+    def estimated_count(self) -> int:
+        """Items in the filter, estimated from how many bits are set."""
+        bits_set = int.from_bytes(self.bits, 'big').bit_count()
+        if bits_set >= self.bit_count:
+            return self.capacity
+        return round(-self.bit_count / self.hash_count * math.log(1 - bits_set / self.bit_count))
+
+
+    @classmethod
+    def load(cls, path:str, capacity:int, error_rate:float) -> "BloomFilter":
+        """Reads a filter saved with save(). Raises ValueError if the file isn't one."""
+        with open(path, 'rb') as f:
+            header = f.read(cls.HEADER.size)
+            bits = f.read()
+        if len(header) != cls.HEADER.size:
+            raise ValueError(f"{path} is not a BloomFilter file")
+        magic, bit_count, hash_count, count, created_at = cls.HEADER.unpack(header)
+        if magic != cls.MAGIC or len(bits) != (bit_count + 7) // 8:
+            raise ValueError(f"{path} is not a BloomFilter file")
+        bloom_filter = cls(capacity, error_rate, bit_count=bit_count, hash_count=hash_count)
+        bloom_filter.bits = bytearray(bits)
+        bloom_filter.count = count
+        bloom_filter.created_at = created_at
+        return bloom_filter
@@ -0,0 +1,262 @@
+import asyncio
+from collections import deque
+import hashlib
+import logging
+import os
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from webweaver.config import (
+    FRONTIER_DIR,
+    FRONTIER_BLOOM_CAPACITY,
+    FRONTIER_BLOOM_ERROR_RATE,
+    FRONTIER_BLOOM_MAX_AGE,
+    FRONTIER_DOMAIN_DELAY,
+)
+from webweaver.webscraping.frontier.bloom_filter import BloomFilter
+
+
+logger = logging.getLogger('scraping')
+
+
+TRACKING_PARAMS = frozenset({'gclid', 'fbclid', 'msclkid', 'mc_cid', 'mc_eid', '_ga', 'ref'})
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def canonicalize_url(url:str) -> str:
+    """Normalizes a URL so the same page always dedups to the same string:
+        -lowercase scheme and host, default ports dropped
+        -fragment dropped
+        -tracking params (utm_*, gclid, fbclid...) dropped, the rest sorted
+        -empty path becomes '/'
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or 'https'
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS
+    )
+    return urlunsplit((scheme, host, parts.path or '/', urlencode(query), ''))
+
+
+def url_shard(url:str, shard_count:int) -> int:
+    """Which of shard_count shards a URL belongs to. Stable across processes and
+    runs, unlike hash().
+    """
+    digest = hashlib.blake2b(canonicalize_url(url).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % shard_count
+
+
+def url_domain(url:str) -> str:
+    host = (urlsplit(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+class SpiderFrontierInterface:
+    """Interface to be passed to spiders so that a spider can push/pop URLs and
+    check what it's already seen, without touching any other spider's URLs.
+    """
+    def __init__(self, frontier:"UrlFrontier", spider_id:int, spider_name:str):
+        self.frontier = frontier
+        self.spider_id = spider_id
+        self.spider_name = spider_name
+
+
+    def push(self, url:str, persist:bool=False) -> bool:
+        """Queue a URL for this spider. Returns False (and doesn't queue it) if
+        the spider has already seen it this run, or in a previous run if it was
+        persisted, or if it belongs to another shard of a distributed scrape.
+
+        persist=True remembers the URL across runs. Use it for pages that don't
+        change once scraped (event detail pages), never for listing/pagination
+        pages that get new records every day.
+        """
+        return self.frontier.push(self.spider_id, self.spider_name, url, persist)
+
+
+    async def pop(self) -> str|None:
+        """Next URL for this spider, waiting out the domain's politeness delay.
+        None once the spider's queue is empty.
+        """
+        return await self.frontier.pop(self.spider_id)
+
+
+    def is_seen(self, url:str) -> bool:
+        return self.frontier.is_seen(self.spider_id, self.spider_name, url)
+
+
+    def mark_seen(self, url:str, persist:bool=False) -> bool:
+        """Mark a URL seen without queueing it, e.g. once it's been scraped
+        successfully. Returns False if it was already seen.
+        """
+        return self.frontier.mark_seen(self.spider_id, self.spider_name, url, persist)
+
+
+    def __len__(self) -> int:
+        return self.frontier.queued(self.spider_id)
+
+
+
+class UrlFrontier:
+    """Shared state for every spider's URL queue during a SpiderLauncher run.
+
+    Each spider gets its own queue, split per domain so URLs are handed out
+    politely (domain_delay seconds apart per domain, across all spiders). URLs are
+    deduped exactly within the run, and against a persistent Bloom filter (one
+    file per spider in FRONTIER_DIR) for URLs pushed with persist=True.
+
+    shard=(index, count) is set when the run is one shard of a distributed scrape job
+    (see ScrapeShard). URLs that belong to another shard count as already seen, so
+    each shard's spiders only scrape their own share of the URLs.
+    """
+    def __init__(
+            self,
+            frontier_dir:str=FRONTIER_DIR,
+            domain_delay:float=FRONTIER_DOMAIN_DELAY,
+            bloom_capacity:int=FRONTIER_BLOOM_CAPACITY,
+            bloom_error_rate:float=FRONTIER_BLOOM_ERROR_RATE,
+            bloom_max_age:float=FRONTIER_BLOOM_MAX_AGE,
+            shard:tuple[int, int]=None,
+    ):
+        self.frontier_dir = frontier_dir
+        self.domain_delay = domain_delay
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self.bloom_max_age = bloom_max_age
+        self.seen:dict[int, set[str]] = {}
+        self.queues:dict[int, dict[str, deque[str]]] = {}
+        self.filters:dict[int, BloomFilter] = {}
+        self.filter_paths:dict[int, str] = {}
+        self.dirty_filters:set[int] = set()
+        self.next_allowed:dict[str, float] = {}
+        self.skipped = 0
+        self.shard = shard if shard is not None and shard[1] > 1 else None
+        self.other_shards = 0
+
+
+    def create_interface(self, spider_id:int, spider_name:str) -> SpiderFrontierInterface:
+        return SpiderFrontierInterface(self, spider_id, spider_name)
+
+
+    def _filter_path(self, spider_name:str) -> str:
+        if self.shard is not None:
+            index, count = self.shard
+            return os.path.join(self.frontier_dir, f"{spider_name.lower()}.{index}of{count}.bloom")
+        return os.path.join(self.frontier_dir, f"{spider_name.lower()}.bloom")
+
+
+    def owns(self, url:str) -> bool:
+        """False if the URL belongs to another shard of the scrape job."""
+        if self.shard is None:
+            return True
+        index, count = self.shard
+        return url_shard(url, count) == index
+
+
+    def get_filter(self, spider_id:int, spider_name:str) -> BloomFilter:
+        """The spider's persistent Bloom filter, loaded from disk on first use.
+        Filters older than bloom_max_age days are thrown out and started fresh.
+        """
+        bloom_filter = self.filters.get(spider_id)
+        if bloom_filter is not None:
+            return bloom_filter
+        path = self._filter_path(spider_name)
+        try:
+            bloom_filter = BloomFilter.load(path, self.bloom_capacity, self.bloom_error_rate)
+        except FileNotFoundError:
+            bloom_filter = None
+        except (OSError, ValueError) as e:
+            logger.warning(f"UrlFrontier: could not load {path}, starting fresh ({e})")
+            bloom_filter = None
+        if bloom_filter is not None and bloom_filter.age_days > self.bloom_max_age:
+            logger.info(f"UrlFrontier: {spider_name} Bloom filter is {bloom_filter.age_days:.0f} days old, starting fresh")
+            bloom_filter = None
+        if bloom_filter is None:
+            bloom_filter = BloomFilter(self.bloom_capacity, self.bloom_error_rate)
+        if len(bloom_filter) > self.bloom_capacity:
+            logger.warning(f"UrlFrontier: {spider_name} Bloom filter is over capacity, expect more false positives")
+        self.filters[spider_id] = bloom_filter
+        self.filter_paths[spider_id] = path
+        return bloom_filter
+
+
+    def is_seen(self, spider_id:int, spider_name:str, url:str) -> bool:
+        if not self.owns(url):
+            self.other_shards += 1
+            return True
+        url = canonicalize_url(url)
+        if url in self.seen.get(spider_id, ()) or url in self.get_filter(spider_id, spider_name):
+            self.skipped += 1
+            return True
+        return False
+
+
+    def mark_seen(self, spider_id:int, spider_name:str, url:str, persist:bool=False) -> bool:
+        url = canonicalize_url(url)
+        seen = self.seen.setdefault(spider_id, set())
+        is_new = url not in seen and url not in self.get_filter(spider_id, spider_name)
+        seen.add(url)
+        if persist:
+            self.filters[spider_id].add(url)
+            self.dirty_filters.add(spider_id)
+        return is_new
+
+
+    def push(self, spider_id:int, spider_name:str, url:str, persist:bool=False) -> bool:
+        if not self.owns(url):
+            self.other_shards += 1
+            return False
+        if not self.mark_seen(spider_id, spider_name, url, persist):
+            self.skipped += 1
+            return False
+        url = canonicalize_url(url)
+        domain_queues = self.queues.setdefault(spider_id, {})
+        domain_queues.setdefault(url_domain(url), deque()).append(url)
+        return True
+
+
+    def queued(self, spider_id:int) -> int:
+        return sum(len(queue) for queue in self.queues.get(spider_id, {}).values())
+
+
+    async def pop(self, spider_id:int) -> str|None:
+        """Pops from whichever of the spider's domains is allowed a request
+        soonest. The slot is reserved before sleeping so concurrent pops for the
+        same domain line up one domain_delay apart.
+        """
+        domain_queues = self.queues.get(spider_id)
+        if not domain_queues:
+            return None
+        domain = min(domain_queues, key=lambda d: self.next_allowed.get(d, 0))
+        url = domain_queues[domain].popleft()
+        if not domain_queues[domain]:
+            del domain_queues[domain]
+        now = time.monotonic()
+        allowed_at = max(now, self.next_allowed.get(domain, 0))
+        self.next_allowed[domain] = allowed_at + self.domain_delay
+        if allowed_at > now:
+            await asyncio.sleep(allowed_at - now)
+        return url
+
+
+    def _save(self):
+        for spider_id in list(self.dirty_filters):
+            self.filters[spider_id].save(self.filter_paths[spider_id], self.bloom_max_age)
+            self.dirty_filters.discard(spider_id)
+
+
+    async def save(self):
+        """Writes any Bloom filters that changed this run back to disk."""
+        if self.skipped:
+            logger.info(f"UrlFrontier skipped {self.skipped} URLs that were already seen")
+        if self.other_shards:
+            logger.info(f"UrlFrontier left {self.other_shards} URLs to the other shards (shard {self.shard[0] + 1} of {self.shard[1]})")
+        if not self.dirty_filters:
+            return
+        try:
+            await asyncio.to_thread(self._save)
+        except OSError as e:
+            logger.error(f"UrlFrontier could not save Bloom filters: {e}")
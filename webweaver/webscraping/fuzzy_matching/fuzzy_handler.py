@@ -1,16 +1,36 @@
 from enum import Enum
+from functools import lru_cache
+import os
 import re
+import numpy as np
 from rapidfuzz import process, fuzz
 from tortoise.models import Model
 
+from webweaver.config import FUZZY_MATCH_WORKERS, FUZZY_MATCH_CACHE_SIZE, FUZZY_MATCH_MAX_CELLS
+
 
 
 class FuzzyRegexPatterns:
     preprocess = re.compile(r'[^A-Za-z0-9]+')
 
 
+Match = tuple[str, float, int]  # (choice, score, index in data_set), what process.extractOne() returns
+
+
 class FuzzyHandler:
-    """This class handles all fuzzy string matching efforts."""
+    """This class handles all fuzzy string matching efforts.
+
+    Strings are scored against the data set with fuzz.WRatio. best_match()
+    scores one string (memoized), best_matches() scores a whole list at once
+    with rapidfuzz's process.cdist on worker threads.
+
+    With a score_cutoff, data set strings that can't reach it are skipped
+    based on their length alone. WRatio scales every partial/token score
+    down once the longer string is 1.5x (max 90) or 8x (max 60) the length
+    of the shorter one, so above those cutoffs only strings of about the
+    same length are scored. A cutoff of 100 is an exact match, WRatio only
+    gives 100 to identical strings, so that's a dict lookup.
+    """
 
     REGEX_PATTERNS = FuzzyRegexPatterns
 
@@ -18,13 +38,20 @@ class FuzzyHandler:
         self, 
         data_set:list[str], 
         model_map:dict[str, Model]=None, 
-        preprocess:bool=True
+        preprocess:bool=True,
+        cache_size:int=FUZZY_MATCH_CACHE_SIZE,
     ):
         if preprocess:
             self.data_set = [self.preprocess(s, self.REGEX_PATTERNS.preprocess) for s in data_set]
         else:
             self.data_set = data_set
         self.model_map = model_map
+        self.lengths = np.fromiter((len(s) for s in self.data_set), dtype=np.int64, count=len(self.data_set))
+        self.positions:dict[str, int] = {}
+        for i, s in enumerate(self.data_set):
+            self.positions.setdefault(s, i)
+        self._candidates:dict[tuple[int, float], tuple[np.ndarray, list[str]]] = {}
+        self._best_match = lru_cache(maxsize=cache_size)(self._score_best_match)
 
 
     @classmethod
@@ -100,11 +127,103 @@ class FuzzyHandler:
 
     def exact_match(self, s:str, preprocess:bool=True) -> bool:
         """Check if the string is an exact fuzzy match."""
-        return bool(self.best_match(s=s, preprocess=preprocess)[1] == 100.0) 
+        return self.best_match(s=s, preprocess=preprocess, score_cutoff=100.0) is not None
 
 
-    def best_match(self, s:str, preprocess:bool=True) -> tuple:
+    def best_match(self, s:str, preprocess:bool=True, score_cutoff:float=None) -> Match | None:
+        """(choice, score, index) of the data set string scoring highest against s,
+        same as process.extractOne(). None if nothing scores score_cutoff or more.
+        """
         if preprocess:
             s = self.preprocess(s, pattern=self.REGEX_PATTERNS.preprocess)
+        return self._best_match(s, score_cutoff)
+
+
+    def best_matches(
+            self,
+            strings:list[str],
+            preprocess:bool=True,
+            score_cutoff:float=None,
+            workers:int=FUZZY_MATCH_WORKERS,
+    ) -> list[Match | None]:
+        """best_match() for every string, scored in batches with process.cdist
+        on worker threads. Strings that are the same after preprocessing are only
+        scored once.
+
+        cdist computes every score in full while extractOne() prunes with the
+        best score so far, so with a single worker the strings just go through
+        best_match() one by one.
+        """
+        if preprocess:
+            strings = [self.preprocess(s, pattern=self.REGEX_PATTERNS.preprocess) for s in strings]
+        if (workers if workers > 0 else os.cpu_count() or 1) == 1:
+            return [self._best_match(s, score_cutoff) for s in strings]
+        matches:dict[str, Match | None] = {}
+        batches:dict[tuple[int, float] | None, list[str]] = {}
+        for s in dict.fromkeys(strings):
+            if not self.data_set or (score_cutoff and score_cutoff >= 100):
+                matches[s] = self._exact(s, score_cutoff)
+            else:
+                batches.setdefault(self._band(len(s), score_cutoff), []).append(s)
+
+        for band, queries in batches.items():
+            indexes, choices = self._candidate_set(band)
+            if not choices:
+                matches.update(dict.fromkeys(queries))
+                continue
+            rows = max(FUZZY_MATCH_MAX_CELLS // len(choices), 1)
+            for start in range(0, len(queries), rows):
+                chunk = queries[start:start + rows]
+                scores = process.cdist(chunk, choices, scorer=fuzz.WRatio, score_cutoff=score_cutoff, dtype=np.float64, workers=workers)
+                best = scores.argmax(axis=1)
+                for s, column, row in zip(chunk, best, scores):
+                    score = float(row[column])
+                    if score_cutoff and score < score_cutoff:
+                        matches[s] = None
+                    else:
+                        index = int(indexes[column]) if indexes is not None else int(column)
+                        matches[s] = (self.data_set[index], score, index)
+        return [matches[s] for s in strings]
+
+
+    def _score_best_match(self, s:str, score_cutoff:float=None) -> Match | None:
+        if not self.data_set or (score_cutoff and score_cutoff >= 100):
+            return self._exact(s, score_cutoff)
+        indexes, choices = self._candidate_set(self._band(len(s), score_cutoff))
+        match = process.extractOne(s, choices, scorer=fuzz.WRatio, score_cutoff=score_cutoff)
+        if match is None or indexes is None:
+            return match
+        index = int(indexes[match[2]])
+        return (self.data_set[index], match[1], index)
+
+
+    def _exact(self, s:str, score_cutoff:float=None) -> Match | None:
+        """score_cutoff >= 100 (or an empty data set): only an identical string matches."""
+        index = self.positions.get(s)
+        if not s or index is None or (score_cutoff and score_cutoff > 100):
+            return None
+        return (s, 100.0, index)
+
+
+    @staticmethod
+    def _band(length:int, score_cutoff:float=None) -> tuple[int, float] | None:
+        """Key of the data set strings a string of this length can reach
+        score_cutoff with, None for all of them.
+        """
+        if not score_cutoff or score_cutoff <= 60:
+            return None
+        return (length, 1.5 if score_cutoff > 90 else 8.0)
 
-        return process.extractOne(s, self.data_set, scorer=fuzz.WRatio)
\ No newline at end of file
+
+    def _candidate_set(self, band:tuple[int, float] | None) -> tuple[np.ndarray | None, list[str]]:
+        """(data set indexes, strings) of the candidates for band, in data set
+        order so ties go to the same string extractOne() would pick.
+        """
+        if band is None:
+            return None, self.data_set
+        candidates = self._candidates.get(band)
+        if candidates is None:
+            length, max_ratio = band
+            indexes = np.flatnonzero((self.lengths * max_ratio > length) & (self.lengths < length * max_ratio))
+            candidates = self._candidates[band] = (indexes, [self.data_set[i] for i in indexes])
+        return candidates
@@ -0,0 +1,166 @@
+import asyncio
+from dataclasses import dataclass, asdict, field
+import logging
+from typing import Awaitable, Callable
+
+from arq import create_pool
+from arq.connections import RedisSettings
+
+from webweaver.common.enums import ScrapeBackendEnum
+from webweaver.config import SCRAPE_BACKEND, REDIS_URL, ARQ_QUEUE_NAME, ARQ_MAX_JOBS
+from webweaver.exceptions import WebScrapingError
+from webweaver.webscraping.jobs.job_state import JobStateStore, RedisJobStateStore
+from webweaver.webscraping.spiders.models import SpiderAsset
+
+
+logger = logging.getLogger('scraping')
+
+
+@dataclass
+class ScrapeShard:
+    """One unit of work of a distributed scrape job: a spider, or one of its URL
+    shards if the spider class sets shard_count > 1. Shards travel through Redis
+    as plain dicts (as_dict/from_dict).
+    """
+    scrape_job_id:int
+    spider_id:int
+    params:dict[str, str] = field(default_factory=dict)
+    is_proxy:bool = True
+    project_id:int|None = None
+    shard_index:int = 0
+    shard_count:int = 1
+
+    @property
+    def key(self) -> str:
+        return f"{self.spider_id}.{self.shard_index}of{self.shard_count}"
+
+    @property
+    def shard(self) -> tuple[int, int]:
+        return (self.shard_index, self.shard_count)
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, d:dict) -> "ScrapeShard":
+        return cls(**d)
+
+    @classmethod
+    def split(
+            cls,
+            scrape_job_id:int,
+            spider_asset:SpiderAsset,
+            params:dict[str, str],
+            is_proxy:bool=True,
+            project_id:int|None=None,
+    ) -> list["ScrapeShard"]:
+        """The spider's shards, shard_count of them as set on its Spider class."""
+        SpiderClass = spider_asset.get_spider()
+        shard_count = max(getattr(SpiderClass, 'shard_count', 1), 1) if SpiderClass is not None else 1
+        return [
+            cls(scrape_job_id, spider_asset.id, params, is_proxy, project_id, shard_index, shard_count)
+            for shard_index in range(shard_count)
+        ]
+
+
+ShardRunner = Callable[[ScrapeShard, JobStateStore], Awaitable]
+
+
+class ScrapeJobQueue:
+    """Where WebScrape.enqueue() sends a scrape job's shards."""
+    async def get_state_store(self) -> JobStateStore:
+        raise NotImplementedError
+
+    async def enqueue(self, scrape_job_id:int, shards:list[ScrapeShard]):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class LocalScrapeJobQueue(ScrapeJobQueue):
+    """Stand-in for Redis + arq workers when developing/testing: shards run as
+    background tasks in this process, max_jobs at a time.
+    """
+    def __init__(self, run_shard:ShardRunner, max_jobs:int=ARQ_MAX_JOBS):
+        self.run_shard = run_shard
+        self.state_store = JobStateStore()
+        self.job_slots = asyncio.Semaphore(max_jobs)
+        self.tasks:set[asyncio.Task] = set()
+
+
+    async def get_state_store(self) -> JobStateStore:
+        return self.state_store
+
+
+    async def enqueue(self, scrape_job_id:int, shards:list[ScrapeShard]):
+        await self.state_store.start_job(scrape_job_id, [shard.key for shard in shards])
+        for shard in shards:
+            task = asyncio.create_task(self._run(shard))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+
+    async def _run(self, shard:ScrapeShard):
+        async with self.job_slots:
+            try:
+                await self.run_shard(shard, self.state_store)
+            except (Exception, WebScrapingError) as e:
+                logger.error(f"Shard {shard.key} of ScrapeJob {shard.scrape_job_id} failed: {e!r}")
+
+
+    async def close(self):
+        for task in self.tasks:
+            task.cancel()
+
+
+class ArqScrapeJobQueue(ScrapeJobQueue):
+    """Queues shards in Redis for the arq workers (arq_worker/arq_worker.py),
+    which can run as many processes, on as many hosts, as the campaign needs.
+    """
+    def __init__(self, redis_url:str=REDIS_URL, queue_name:str=ARQ_QUEUE_NAME):
+        self.redis_url = redis_url
+        self.queue_name = queue_name
+        self.pool = None
+
+
+    async def get_pool(self):
+        if self.pool is None:
+            self.pool = await create_pool(
+                RedisSettings.from_dsn(self.redis_url),
+                default_queue_name=self.queue_name,
+            )
+        return self.pool
+
+
+    async def get_state_store(self) -> JobStateStore:
+        return RedisJobStateStore(await self.get_pool())
+
+
+    async def enqueue(self, scrape_job_id:int, shards:list[ScrapeShard]):
+        pool = await self.get_pool()
+        state_store = RedisJobStateStore(pool)
+        await state_store.start_job(scrape_job_id, [shard.key for shard in shards])
+        for shard in shards:
+            await pool.enqueue_job(
+                'run_scrape_shard',
+                shard.as_dict(),
+                _job_id=f"scrape:{scrape_job_id}:{shard.key}",
+            )
+        logger.info(f"ScrapeJob {scrape_job_id}: {len(shards)} shards queued on {self.queue_name}")
+
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+
+def create_scrape_job_queue(run_shard:ShardRunner, backend:str=SCRAPE_BACKEND) -> ScrapeJobQueue|None:
+    """The ScrapeJobQueue for config.SCRAPE_BACKEND, or None for inline scrapes."""
+    backend = ScrapeBackendEnum(backend)
+    if backend == ScrapeBackendEnum.ARQ:
+        return ArqScrapeJobQueue()
+    if backend == ScrapeBackendEnum.LOCAL:
+        return LocalScrapeJobQueue(run_shard)
+    return None
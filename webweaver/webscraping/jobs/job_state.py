@@ -0,0 +1,214 @@
+import asyncio
+from collections import Counter
+import logging
+import time
+
+from webweaver.config import SCRAPE_JOB_STATE_TTL, JOB_PROGRESS_INTERVAL
+from webweaver.webscraping.registry.scraping_registry import SpiderState
+
+
+logger = logging.getLogger('scraping')
+
+
+def job_state(shards:dict[str, str], remaining:int) -> SpiderState:
+    """Overall state of a job from its shards' states."""
+    states = set(shards.values())
+    if remaining > 0:
+        if states <= {SpiderState.QUEUED.value}:
+            return SpiderState.QUEUED
+        return SpiderState.RUNNING
+    if SpiderState.ERROR.value in states:
+        return SpiderState.ERROR
+    return SpiderState.COMPLETE
+
+
+class JobStateStore:
+    """Where the shards of a scrape job report their SpiderState and progress
+    counters, so whoever launched the job can see how it's going. This base
+    class keeps everything in memory, for jobs running in this process (inline
+    background jobs and the LocalScrapeJobQueue).
+    """
+    def __init__(self):
+        self.jobs:dict[int, dict] = {}
+
+
+    async def start_job(self, scrape_job_id:int, shard_keys:list[str]):
+        self.jobs[scrape_job_id] = {
+            'shards': {key: SpiderState.QUEUED.value for key in shard_keys},
+            'remaining': len(shard_keys),
+            'counts': Counter(),
+            'started_at': time.time(),
+            'finished_at': None,
+        }
+
+
+    async def set_state(self, scrape_job_id:int, shard_key:str, state:SpiderState):
+        job = self.jobs.get(scrape_job_id)
+        if job is not None:
+            job['shards'][shard_key] = state.value
+
+
+    async def finish_shard(self, scrape_job_id:int, shard_key:str, state:SpiderState) -> int:
+        """Records the shard's final state. Returns how many shards are still unfinished."""
+        await self.set_state(scrape_job_id, shard_key, state)
+        job = self.jobs.get(scrape_job_id)
+        if job is None:
+            return 0
+        job['remaining'] -= 1
+        return job['remaining']
+
+
+    async def finish_job(self, scrape_job_id:int):
+        job = self.jobs.get(scrape_job_id)
+        if job is not None:
+            job['finished_at'] = time.time()
+
+
+    async def add_counts(self, scrape_job_id:int, counts:dict[str, int]):
+        job = self.jobs.get(scrape_job_id)
+        if job is not None:
+            job['counts'].update(counts)
+
+
+    async def get_states(self, scrape_job_id:int) -> dict[str, str]:
+        """{shard key: SpiderState value} for every shard of the job."""
+        job = self.jobs.get(scrape_job_id)
+        return dict(job['shards']) if job is not None else {}
+
+
+    async def get_job(self, scrape_job_id:int) -> dict|None:
+        """The job's overall state, shard states and progress counters. None if
+        this store doesn't know the job.
+        """
+        job = self.jobs.get(scrape_job_id)
+        if job is None:
+            return None
+        return {
+            'scrape_job_id': scrape_job_id,
+            'state': job_state(job['shards'], job['remaining']).value,
+            'shards': dict(job['shards']),
+            'counts': dict(job['counts']),
+            'started_at': job['started_at'],
+            'finished_at': job['finished_at'],
+        }
+
+
+class RedisJobStateStore(JobStateStore):
+    """JobStateStore in Redis, shared by the API and every arq worker. Each job
+    is one hash: 'shard:<key>' fields hold the states, 'count:<name>' fields the
+    progress counters, and 'remaining' counts down as shards finish (HINCRBY, so
+    two workers finishing at once can't both think they were last).
+    """
+    def __init__(self, redis, ttl:int=SCRAPE_JOB_STATE_TTL):
+        self.redis = redis  # redis.asyncio.Redis, e.g. the ArqRedis pool or ctx['redis'] in a worker
+        self.ttl = ttl
+
+
+    @staticmethod
+    def _key(scrape_job_id:int) -> str:
+        return f"webweaver:scrape_job:{scrape_job_id}"
+
+
+    async def start_job(self, scrape_job_id:int, shard_keys:list[str]):
+        key = self._key(scrape_job_id)
+        mapping = {f"shard:{shard_key}": SpiderState.QUEUED.value for shard_key in shard_keys}
+        mapping['remaining'] = len(shard_keys)
+        mapping['started_at'] = time.time()
+        await self.redis.hset(key, mapping=mapping)
+        await self.redis.expire(key, self.ttl)
+
+
+    async def set_state(self, scrape_job_id:int, shard_key:str, state:SpiderState):
+        await self.redis.hset(self._key(scrape_job_id), f"shard:{shard_key}", state.value)
+
+
+    async def finish_shard(self, scrape_job_id:int, shard_key:str, state:SpiderState) -> int:
+        await self.set_state(scrape_job_id, shard_key, state)
+        return await self.redis.hincrby(self._key(scrape_job_id), 'remaining', -1)
+
+
+    async def finish_job(self, scrape_job_id:int):
+        await self.redis.hset(self._key(scrape_job_id), 'finished_at', time.time())
+
+
+    async def add_counts(self, scrape_job_id:int, counts:dict[str, int]):
+        key = self._key(scrape_job_id)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for name, amount in counts.items():
+                pipe.hincrby(key, f"count:{name}", amount)
+            await pipe.execute()
+
+
+    async def _fields(self, scrape_job_id:int) -> dict[str, str]:
+        fields = await self.redis.hgetall(self._key(scrape_job_id))
+        return {
+            (field.decode() if isinstance(field, bytes) else field): (value.decode() if isinstance(value, bytes) else value)
+            for field, value in fields.items()
+        }
+
+
+    async def get_states(self, scrape_job_id:int) -> dict[str, str]:
+        fields = await self._fields(scrape_job_id)
+        return {field[len('shard:'):]: value for field, value in fields.items() if field.startswith('shard:')}
+
+
+    async def get_job(self, scrape_job_id:int) -> dict|None:
+        fields = await self._fields(scrape_job_id)
+        if not fields:
+            return None
+        shards = {field[len('shard:'):]: value for field, value in fields.items() if field.startswith('shard:')}
+        remaining = int(fields.get('remaining', 0))
+        return {
+            'scrape_job_id': scrape_job_id,
+            'state': job_state(shards, remaining).value,
+            'shards': shards,
+            'counts': {field[len('count:'):]: int(value) for field, value in fields.items() if field.startswith('count:')},
+            'started_at': float(fields['started_at']) if 'started_at' in fields else None,
+            'finished_at': float(fields['finished_at']) if 'finished_at' in fields else None,
+        }
+
+
+class JobProgressReporter:
+    """Copies a running job's progress counters (ScrapingRegistry.progress) to
+    its JobStateStore every `interval` seconds, and once more on exit. Only the
+    change since the last flush is sent, so shards on different workers add up.
+    """
+    def __init__(self, state_store:JobStateStore, scrape_job_id:int, progress:Counter, interval:float=JOB_PROGRESS_INTERVAL):
+        self.state_store = state_store
+        self.scrape_job_id = scrape_job_id
+        self.progress = progress
+        self.interval = interval
+        self.reported:Counter = Counter()
+        self.task:asyncio.Task = None
+
+
+    async def flush(self):
+        counts = {name: count - self.reported[name] for name, count in self.progress.items() if count != self.reported[name]}
+        if not counts:
+            return
+        try:
+            await self.state_store.add_counts(self.scrape_job_id, counts)
+        except Exception as e:
+            logger.warning(f"Could not report progress for ScrapeJob {self.scrape_job_id}: {e!r}")
+        else:
+            self.reported.update(counts)
+
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+
+    async def __aenter__(self) -> "JobProgressReporter":
+        self.task = asyncio.create_task(self._report())
+        return self
+
+
+    async def __aexit__(self, *exc):
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        await self.flush()
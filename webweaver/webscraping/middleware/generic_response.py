@@ -1,16 +1,18 @@
 
 from playwright.async_api import Response as ResponsePlaywright
 from aiohttp import ClientResponse as ResponseAiohttp
+from webweaver.webscraping.cache.http_cache import CachedResponse
 
 class GenericResponse:
     """This class acts as an adapter for transforming Playwright's Response object
     and aiohttp's ClientResponse into a standard object that can be operated on
     by the middleware classes.
     """
-    def __init__(self, url:str, status_code:int, headers:dict):
+    def __init__(self, url:str, status_code:int, headers:dict, from_cache:bool=False):
         self.url = url
         self.status_code = status_code
         self.headers = headers
+        self.from_cache = from_cache
         self.retry_after = None
 
 
@@ -30,4 +32,14 @@ class GenericResponse:
             url=response.url,
             status_code=response.status,
             headers=response.headers
-        )
\ No newline at end of file
+        )
+
+    @classmethod
+    def from_cached(cls, response:CachedResponse) -> "GenericResponse":
+        "Factory method for creating GenericResponse from a CachedResponse served by the HttpCache"
+        return cls(
+            url=response.url,
+            status_code=response.status,
+            headers=response.headers,
+            from_cache=True
+        )
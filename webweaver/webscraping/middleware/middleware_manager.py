@@ -8,6 +8,7 @@ from webweaver.config import REQUEST_MIDDLEWARES, RESPONSE_MIDDLEWARES
 from webweaver.exceptions import ResponseUnsupported, WebScrapingError
 from webweaver.common.enums import LogLevel
 from webweaver.webscraping.middleware.generic_response import GenericResponse
+from webweaver.webscraping.cache.http_cache import CachedResponse
 
 if TYPE_CHECKING:
     from webweaver.webscraping.spiders.spider_base import SpiderInterface
@@ -88,6 +89,8 @@ class MiddlewareManager:
             generic_response = GenericResponse.from_playwright(response)
         elif isinstance(response, ResponseAiohttp):
             generic_response = GenericResponse.from_aiohttp(response)
+        elif isinstance(response, CachedResponse):
+            generic_response = GenericResponse.from_cached(response)
         else:
             spider_interface.log(ResponseUnsupported(
                 f"{type(response)} Unsupported! MiddlewareManager can not generate GenericResponse")
@@ -1,4 +1,3 @@
-import asyncio
 from datetime import datetime, timezone
 import email.utils
 import math
@@ -47,6 +46,11 @@ class StatusCodeMiddleware(MiddlewareBase):
         match self.response.status_code:
             case 200:
                 return
+            case 304:
+                # The HttpCache sends conditional requests and swaps 304s for the cached
+                # copy, so a 304 only gets here if the spider sent its own If-None-Match/
+                # If-Modified-Since headers. Nothing changed on the server, that's a success.
+                return
             case 400| 401 | 403 | 404:
                 msg = f"Status code: {self.response.status_code} from '{self.response.url}'"
                 self.log_error_and_continue(msg)
@@ -62,7 +66,9 @@ class StatusCodeMiddleware(MiddlewareBase):
             if wait_time > REQUEST_WAIT_MAX:
                 self.spider_interface.log(SpiderRetryTimeout(f"Wait time of {wait_time} seconds is too long"))
                 raise SpiderRetryTimeout(f"Wait time of {wait_time} seconds is too long")
-            await asyncio.sleep(wait_time)
+            # Rather than sleeping inside this one request, pause the whole domain in the 
+            # SpiderScheduler's rate limiter so every spider hitting it backs off.
+            self.spider_interface.pause_domain(str(self.response.url), wait_time)
             self.request_interface.increase_retry_count()
 
 
@@ -6,24 +6,37 @@ from pypostalcode import PostalCodeDatabase
 from tortoise import Model, fields
 from tortoise.exceptions import DoesNotExist, IntegrityError, TransactionManagementError
 from tortoise.transactions import in_transaction
-from typing import Awaitable, Type, TypeVar
+from typing import Awaitable, Iterable, NamedTuple, Type, TypeVar
 
 from webweaver.common.enums import CountryEnum
+from webweaver.config import BULK_UPSERT_MAX_PARAMS
 # from common.fields import URLField, EmailField
 from webweaver.exceptions import CountryNotFound
-from webweaver.webscraping.registry.scraping_registry import scraping_registry
+from webweaver.webscraping.registry.scraping_registry import get_registry
 
 logger = logging.getLogger('scraping')
 T = TypeVar('T', bound='ScrapeModel')
 
 
 def get_scrape_job() -> int | None:
+    """Default for ScrapeModel.scrape_job_id: the scrape job running in the
+    current context, so records saved by concurrent jobs land on the right one.
+    """
     try:
-        return scraping_registry.scrape_job.id
+        return get_registry().scrape_job.id
     except AttributeError:
         return
 
 
+class UpsertResult(NamedTuple):
+    """What ScrapeModel.bulk_upsert() did. objects are the saved rows (with
+    their ids) in the order they were given, one per conflict key.
+    """
+    objects: list
+    created: int
+    updated: int
+
+
 class ScrapeModel(Model):
     """All scraped data will be subclassed from the ScrapeModel table class."""
     # spider = fields.ForeignKeyField("models.SpiderAsset", default=get_spider_asset)
@@ -38,6 +51,14 @@ class ScrapeModel(Model):
         return cls.__name__
 
 
+    def clean(self):
+        """Override to normalize field values (strip whitespace etc) before the
+        row is written. Call it from save() overrides, bulk_upsert() calls it
+        for every row since it doesn't go through save().
+        """
+        pass
+
+
     @classmethod
     async def get_create_or_update(cls:Type[T], **kwargs) -> tuple[T, bool, bool]:
         """This method assumes kwargs will ALWAYS contain every unique constraint field.
@@ -76,6 +97,145 @@ class ScrapeModel(Model):
             return obj, created, updated
 
 
+    @classmethod
+    async def bulk_upsert(
+            cls:Type[T],
+            rows:Iterable[T],
+            conflict_fields:Iterable[str]=None,
+            update_fields:Iterable[str]=None,
+            batch_size:int=None,
+            using_db=None,
+    ) -> UpsertResult:
+        """get_create_or_update() for a whole batch of (unsaved) model instances,
+        as INSERT .. ON CONFLICT (conflict_fields) DO UPDATE .. RETURNING statements
+        of batch_size rows instead of a select_for_update() transaction per row.
+
+        - conflict_fields: the unique constraint to upsert on. Defaults to the
+          model's unique constraint, if it only has one.
+        - update_fields: what gets overwritten when the row already exists. Defaults
+          to every field but the pk, conflict fields and auto_now_add ones. [] only inserts.
+
+        Like get_create_or_update(), an existing row is only written (and counted
+        as updated) if one of the update fields changed, auto_now fields are bumped
+        along with it. Rows with the same conflict key: the last one wins.
+        Postgres and SQLite only.
+
+        Rows are written without calling save(), so save() overrides don't run.
+        Each row's clean() is called first (in place), conflict keys are compared
+        after it.
+        """
+        rows = list(rows)
+        if not rows:
+            return UpsertResult([], 0, 0)
+        for row in rows:
+            row.clean()
+        if using_db is not None:
+            return await cls._bulk_upsert(using_db, rows, conflict_fields, update_fields, batch_size)
+        db = cls._choose_db(True)
+        async with in_transaction(connection_name=db.connection_name) as connection:
+            return await cls._bulk_upsert(connection, rows, conflict_fields, update_fields, batch_size)
+
+
+    @classmethod
+    async def _bulk_upsert(cls:Type[T], db, rows:list[T], conflict_fields, update_fields, batch_size) -> UpsertResult:
+        dialect = db.capabilities.dialect
+        if dialect not in ('postgres', 'sqlite'):
+            raise NotImplementedError(f"bulk_upsert() doesn't support {dialect}, use get_create_or_update()")
+        meta = cls._meta
+        columns = [name for name in meta.fields_db_projection if not meta.fields_map[name].generated]
+        conflict = [cls._db_field(name) for name in (conflict_fields or cls._upsert_constraint())]
+        if update_fields is None:
+            update = [name for name in columns if name not in conflict and not getattr(meta.fields_map[name], 'auto_now_add', False)]
+        else:
+            update = [cls._db_field(name) for name in update_fields]
+        auto_now = [name for name in columns if getattr(meta.fields_map[name], 'auto_now', False)]
+        compared = [name for name in update if name not in auto_now]
+        update = compared + auto_now if compared else []
+
+        # the executor's converters are the ones bulk_create() uses: the dialect's own
+        # (sqlite has no Decimal) and they fill in auto_now/auto_now_add fields
+        to_db = db.executor_class(model=cls, db=db).column_map
+        values_by_key:dict[tuple, list] = {}
+        for row in rows:
+            values = [to_db[name](getattr(row, name), row) for name in columns]
+            values_by_key[cls._upsert_key(row, conflict, to_db)] = values
+
+        quote = lambda name: f'"{name}"'
+        table = quote(meta.db_table)
+        pk = quote(meta.db_pk_column)
+        column_list = ', '.join(quote(meta.fields_db_projection[name]) for name in columns)
+        if update:
+            distinct = 'IS NOT' if dialect == 'sqlite' else 'IS DISTINCT FROM'
+            set_list = ', '.join(f"{quote(meta.fields_db_projection[name])} = EXCLUDED.{quote(meta.fields_db_projection[name])}" for name in update)
+            changed = ' OR '.join(
+                f"{table}.{quote(meta.fields_db_projection[name])} {distinct} EXCLUDED.{quote(meta.fields_db_projection[name])}" for name in compared
+            )
+            action = f"DO UPDATE SET {set_list} WHERE {changed}"
+        else:
+            action = "DO NOTHING"
+        # postgres: a row the INSERT created has no xmax yet. sqlite has no such thing, but
+        # only this transaction writes to the table, so new rows are the ones past the old MAX(pk)
+        returning = "RETURNING *, (xmax = 0) AS _created" if dialect == 'postgres' else "RETURNING *"
+        conflict_list = ', '.join(quote(meta.fields_db_projection[name]) for name in conflict)
+
+        batch_size = batch_size or max(BULK_UPSERT_MAX_PARAMS // len(columns), 1)
+        keys = list(values_by_key)
+        saved:dict[tuple, T] = {}
+        created = updated = 0
+        for start in range(0, len(keys), batch_size):
+            batch = [values_by_key[key] for key in keys[start:start + batch_size]]
+            if dialect == 'postgres':
+                placeholders = ', '.join(
+                    '(' + ', '.join(f"${i * len(columns) + j + 1}" for j in range(len(columns))) + ')' for i in range(len(batch))
+                )
+            else:
+                placeholders = ', '.join(['(' + ', '.join('?' * len(columns)) + ')'] * len(batch))
+                _, max_pk = await db.execute_query(f"SELECT MAX({pk}) FROM {table}")
+                last_pk = max_pk[0][0] or 0
+            query = f"INSERT INTO {table} ({column_list}) VALUES {placeholders} ON CONFLICT ({conflict_list}) {action} {returning}"
+            _, returned = await db.execute_query(query, [value for values in batch for value in values])
+            for record in returned:
+                record = dict(record)
+                obj = cls._init_from_db(**record)
+                is_created = record['_created'] if dialect == 'postgres' else obj.pk > last_pk
+                created += is_created
+                updated += not is_created
+                saved[cls._upsert_key(obj, conflict, to_db)] = obj
+
+        # the rows that were already up to date aren't returned
+        unchanged = [key for key in keys if key not in saved]
+        if unchanged:
+            filters = {f"{name}__in": {key[i] for key in unchanged} for i, name in enumerate(conflict)}
+            for obj in await cls.filter(**filters).using_db(db):
+                saved.setdefault(cls._upsert_key(obj, conflict, to_db), obj)
+
+        logger.debug(f"bulk_upsert {cls.__name__}: {len(keys)} rows, {created} created, {updated} updated")
+        return UpsertResult([saved[key] for key in keys if key in saved], created, updated)
+
+
+    @classmethod
+    def _upsert_constraint(cls) -> tuple[str]:
+        # a unique foreign key shows up twice, as 'product' and as its 'product_id' column
+        unique_constraints = list(dict.fromkeys(tuple(cls._db_field(name) for name in constraint) for constraint in cls._unique_constraints()))
+        if len(unique_constraints) != 1:
+            raise ValueError(f"Model `{cls.__name__}` has {len(unique_constraints)} unique constraints, pass conflict_fields to bulk_upsert()")
+        return unique_constraints[0]
+
+
+    @classmethod
+    def _db_field(cls, field_name:str) -> str:
+        """The field holding the column, 'product' -> 'product_id' for foreign keys."""
+        if field_name in cls._meta.fields_db_projection:
+            return field_name
+        return cls._meta.fields_map[field_name].source_field
+
+
+    @staticmethod
+    def _upsert_key(obj:Model, conflict:list[str], to_db:dict) -> tuple:
+        """The conflict fields' DB values, so rows given and rows read back compare equal."""
+        return tuple(to_db[name](getattr(obj, name), obj) for name in conflict)
+
+
     @classmethod
     def _validate_unique_constraints(cls, kwargs: dict, unique_constraints: set):
         """This method ensures that every unique constraint in unique_constraints
@@ -0,0 +1,425 @@
+import csv
+import datetime
+from decimal import Decimal
+from enum import Enum
+import json
+from pathlib import Path
+import sqlite3
+from uuid import UUID
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from tortoise.fields import Field
+from tortoise.models import Model
+
+
+def json_default(value):
+    """json.dumps() fallback for the types Tortoise hands back from .values()."""
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (Decimal, UUID, datetime.timedelta)):
+        return str(value)
+    if isinstance(value, bytes):
+        return value.hex()
+    raise TypeError(f"Object of type {value.__class__.__name__} is not JSON serializable")
+
+
+def plain_value(value):
+    """Enums to their values and JSON fields to JSON text. Everything else as is."""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=json_default)
+    return value
+
+
+def field_python_type(field:Field) -> type:
+    """The python type of a Tortoise field. JSONField's is Union[dict, list]
+    (a (dict, list) tuple in older Tortoise), we call that dict.
+    """
+    field_type = field.field_type
+    if not isinstance(field_type, type):
+        return dict
+    return field_type
+
+
+def arrow_type(field:Field) -> pa.DataType:
+    """Parquet column type for a Tortoise field."""
+    t = field_python_type(field)
+    if issubclass(t, bool):
+        return pa.bool_()
+    if issubclass(t, Enum):
+        return pa.int64() if issubclass(t, int) else pa.string()
+    if issubclass(t, int):
+        return pa.int64()
+    if issubclass(t, float):
+        return pa.float64()
+    if issubclass(t, Decimal):
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    if issubclass(t, datetime.datetime):
+        return pa.timestamp('us', tz='UTC')
+    if issubclass(t, datetime.date):
+        return pa.date32()
+    if issubclass(t, datetime.time):
+        return pa.time64('us')
+    if issubclass(t, datetime.timedelta):
+        return pa.duration('us')
+    if issubclass(t, bytes):
+        return pa.binary()
+    return pa.string()  # str, UUID, JSON
+
+
+def sqlite_type(field:Field) -> str:
+    """SQLite column affinity for a Tortoise field."""
+    t = field_python_type(field)
+    if issubclass(t, Enum) and not issubclass(t, int):
+        return "TEXT"
+    if issubclass(t, int):
+        return "INTEGER"
+    if issubclass(t, float):
+        return "REAL"
+    if issubclass(t, Decimal):
+        return "NUMERIC"
+    if issubclass(t, bytes):
+        return "BLOB"
+    return "TEXT"
+
+
+def sqlite_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, UUID, datetime.timedelta)):
+        return str(value)
+    return plain_value(value)
+
+
+class ChunkWriter:
+    """Writes one ScrapeModel table at a time, a chunk of rows (dicts from
+    .values()) at a time, so only the current chunk is ever in memory.
+
+        writer.begin_table(table_name, model, columns)
+        writer.write(rows)  # as many times as there are chunks
+        writer.end_table()
+        ...
+        writer.close()
+
+    Single table formats get a new file per table from path_for(table_name).
+    Multi tabbed formats (SQLite) put every table in path_for(None).
+    The writes are blocking, StreamingOutFile runs them in a thread.
+    """
+    extension:str = None
+    multi_tabbed:bool = False
+    dataset:bool = False
+
+    def __init__(self, path_for):
+        self.path_for = path_for
+        self.paths:list[Path] = []
+        self.table_name:str = None
+        self.model:type[Model] = None
+        self.columns:list[str] = []
+
+    def begin_table(self, table_name:str, model:type[Model], columns:list[str]):
+        self.table_name = table_name
+        self.model = model
+        self.columns = columns
+
+    def table_path(self, table_name:str) -> Path:
+        path = self.path_for(table_name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.paths.append(path)
+        return path
+
+    def field(self, column:str) -> Field:
+        return self.model._meta.fields_map[column]
+
+    def write(self, rows:list[dict]):
+        raise NotImplementedError
+
+    def end_table(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class CsvChunkWriter(ChunkWriter):
+    extension = "csv"
+
+    def begin_table(self, table_name:str, model:type[Model], columns:list[str]):
+        super().begin_table(table_name, model, columns)
+        path = self.table_path(table_name)
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.file, fieldnames=columns)
+        self.writer.writeheader()
+
+    def write(self, rows:list[dict]):
+        self.writer.writerows({key: plain_value(value) for key, value in row.items()} for row in rows)
+
+    def end_table(self):
+        self.file.close()
+
+
+class JsonLinesChunkWriter(ChunkWriter):
+    """One JSON object per line."""
+    extension = "jsonl"
+
+    def begin_table(self, table_name:str, model:type[Model], columns:list[str]):
+        super().begin_table(table_name, model, columns)
+        path = self.table_path(table_name)
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write(self, rows:list[dict]):
+        self.file.writelines(json.dumps(row, default=json_default) + "\n" for row in rows)
+
+    def end_table(self):
+        self.file.close()
+
+
+class JsonChunkWriter(JsonLinesChunkWriter):
+    """A JSON array of records, same as the old df.to_json(orient="records"),
+    written a chunk at a time.
+    """
+    extension = "json"
+
+    def begin_table(self, table_name:str, model:type[Model], columns:list[str]):
+        super().begin_table(table_name, model, columns)
+        self.file.write("[")
+        self.first = True
+
+    def write(self, rows:list[dict]):
+        for row in rows:
+            self.file.write(("\n" if self.first else ",\n") + json.dumps(row, default=json_default))
+            self.first = False
+
+    def end_table(self):
+        self.file.write("\n]\n")
+        self.file.close()
+
+
+class ParquetChunkWriter(ChunkWriter):
+    """Every chunk becomes a row group. The schema comes from the model's fields,
+    not from the first chunk, so a column that happens to be all NULL in the
+    first chunk doesn't end up typed as null.
+    """
+    extension = "parquet"
+
+    def schema(self) -> pa.Schema:
+        return pa.schema([pa.field(column, arrow_type(self.field(column))) for column in self.columns])
+
+    def begin_table(self, table_name:str, model:type[Model], columns:list[str]):
+        super().begin_table(table_name, model, columns)
+        path = self.table_path(table_name)
+        self.arrow_schema = self.schema()
+        self.writer = pq.ParquetWriter(path, self.arrow_schema)
+
+    def record_batch(self, rows:list[dict]) -> pa.RecordBatch:
+        arrays = []
+        for arrow_field in self.arrow_schema:
+            values = [row[arrow_field.name] for row in rows]
+            if pa.types.is_string(arrow_field.type):
+                values = [None if v is None else str(plain_value(v)) for v in values]
+            else:
+                values = [plain_value(v) for v in values]
+            arrays.append(pa.array(values, type=arrow_field.type))
+        return pa.RecordBatch.from_arrays(arrays, schema=self.arrow_schema)
+
+    def write(self, rows:list[dict]):
+        self.writer.write_batch(self.record_batch(rows))
+
+    def end_table(self):
+        self.writer.close()
+
+
+class ParquetDatasetChunkWriter(ParquetChunkWriter):
+    """ParquetChunkWriter for a hive partitioned dataset: StreamingOutFile gives
+    it paths like dataset/<table>/scrape_date=<date>/scrape_job_<id>.parquet, so
+    every export of a module adds to the same dataset and pyarrow/duckdb/spark
+    can read a table's directory as one dataset, pruning on scrape_date.
+    """
+    extension = "parquet"
+    dataset = True
+
+
+def quote(name:str) -> str:
+    """Quotes an identifier, same rules for SQLite and Postgres."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def index_columns(model:type[Model], columns:list[str]) -> list[tuple[tuple[str, ...], bool]]:
+    """(columns, unique) for every index the model declares on the exported
+    columns: index=True/unique=True fields, Meta.unique_together and Meta.indexes.
+    The primary key is left out, the writers handle it themselves.
+    """
+    meta = model._meta
+    def db_column(field_name:str) -> str:
+        field = meta.fields_map[field_name]
+        return getattr(field, 'source_field', None) or field_name
+
+    indexes = []
+    for column in columns:
+        field = meta.fields_map.get(column)
+        if field is None or column == meta.pk_attr:
+            continue
+        if field.unique:
+            indexes.append(((column,), True))
+        elif field.index:
+            indexes.append(((column,), False))
+    for together, unique in [(meta.unique_together or (), True), (meta.indexes or (), False)]:
+        for index in together:
+            if not isinstance(index, (tuple, list)):
+                continue  # Index objects, db specific
+            index_columns = tuple(db_column(name) for name in index)
+            if set(index_columns) <= set(columns):
+                indexes.append((index_columns, unique))
+    return indexes
+
+
+class SqliteChunkWriter(ChunkWriter):
+    """All the tables in one SQLite file, tuned for a bulk load: no journal, no
+    fsyncs (a crashed export is just re-run), one transaction per table with a
+    executemany() per chunk, and the secondary indexes built once the table is
+    loaded instead of being updated on every insert. Rows come in primary key
+    order, so the INTEGER PRIMARY KEY (rowid) is only ever appended to.
+    """
+    extension = "sqlite"
+    multi_tabbed = True
+    PRAGMAS = {
+        'journal_mode': 'OFF',
+        'synchronous': 'OFF',
+        'locking_mode': 'EXCLUSIVE',
+        'temp_store': 'MEMORY',
+        'cache_size': -64000,  # KiB
+    }
+
+    def __init__(self, path_for):
+        super().__init__(path_for)
+        path = self.path_for(None)
+        self.paths.append(path)
+        path.unlink(missing_ok=True)
+        self.connection = sqlite3.connect(path, isolation_level=None)  # we BEGIN/COMMIT ourselves
+        for pragma, value in self.PRAGMAS.items():
+            self.connection.execute(f"PRAGMA {pragma} = {value}")
+
+    def column_def(self, column:str) -> str:
+        column_type = sqlite_type(self.field(column))
+        if column == self.model._meta.pk_attr:
+            return f"{quote(column)} {column_type} PRIMARY KEY"
+        return f"{quote(column)} {column_type}"
+
+    def begin_table(self, table_name:str, model:type[Model], columns:list[str]):
+        super().begin_table(table_name, model, columns)
+        column_defs = ", ".join(self.column_def(column) for column in columns)
+        self.connection.execute(f"CREATE TABLE {quote(table_name)} ({column_defs})")
+        placeholders = ", ".join("?" for _ in columns)
+        self.insert_sql = f"INSERT INTO {quote(table_name)} VALUES ({placeholders})"
+        self.connection.execute("BEGIN")
+
+    def write(self, rows:list[dict]):
+        self.connection.executemany(
+            self.insert_sql,
+            ([sqlite_value(row[column]) for column in self.columns] for row in rows),
+        )
+
+    def end_table(self):
+        for i, (columns, unique) in enumerate(index_columns(self.model, self.columns)):
+            index_name = quote(f"idx_{self.table_name}_{i}")
+            self.connection.execute(
+                f"CREATE {'UNIQUE ' if unique else ''}INDEX {index_name} "
+                f"ON {quote(self.table_name)} ({', '.join(quote(c) for c in columns)})"
+            )
+        self.connection.execute("COMMIT")
+
+    def close(self):
+        if self.connection.in_transaction:
+            self.connection.execute("ROLLBACK")
+        self.connection.execute("PRAGMA optimize")
+        self.connection.close()
+
+
+def postgres_type(field:Field) -> str:
+    """Postgres column type for a Tortoise field, as Tortoise itself would create it."""
+    try:
+        return field.get_for_dialect("postgres", "SQL_TYPE")
+    except (AttributeError, KeyError):
+        t = field_python_type(field)
+        if issubclass(t, bool):
+            return "BOOL"
+        if issubclass(t, int) and not issubclass(t, Enum):
+            return "BIGINT"
+        if issubclass(t, float):
+            return "DOUBLE PRECISION"
+        if issubclass(t, Decimal):
+            return "NUMERIC"
+        if issubclass(t, datetime.datetime):
+            return "TIMESTAMPTZ"
+        if issubclass(t, datetime.date):
+            return "DATE"
+        if issubclass(t, bytes):
+            return "BYTEA"
+        if issubclass(t, dict):
+            return "JSONB"
+        return "TEXT"
+
+
+COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def copy_value(value) -> str:
+    """A value in COPY's text format."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, bytes):
+        return '\\\\x' + value.hex()
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(plain_value(value)).translate(COPY_ESCAPES)
+
+
+class SqlDumpChunkWriter(ChunkWriter):
+    """A plain SQL script for psql: for each table a CREATE TABLE, the rows as a
+    COPY ... FROM stdin block, then the primary key and indexes, added after the
+    data like pg_dump does. Load it with `psql -f <file> <db>`.
+    """
+    extension = "sql"
+    multi_tabbed = True
+
+    def __init__(self, path_for):
+        super().__init__(path_for)
+        path = self.path_for(None)
+        self.paths.append(path)
+        self.file = open(path, "w", encoding="utf-8")
+        self.file.write("SET client_encoding = 'UTF8';\nSET standard_conforming_strings = on;\n\n")
+
+    def begin_table(self, table_name:str, model:type[Model], columns:list[str]):
+        super().begin_table(table_name, model, columns)
+        column_defs = ",\n    ".join(f"{quote(column)} {postgres_type(self.field(column))}" for column in columns)
+        self.file.write(f"DROP TABLE IF EXISTS {quote(table_name)};\n")
+        self.file.write(f"CREATE TABLE {quote(table_name)} (\n    {column_defs}\n);\n\n")
+        self.file.write(f"COPY {quote(table_name)} ({', '.join(quote(c) for c in columns)}) FROM stdin;\n")
+
+    def write(self, rows:list[dict]):
+        self.file.writelines(
+            "\t".join(copy_value(row[column]) for column in self.columns) + "\n"
+            for row in rows
+        )
+
+    def end_table(self):
+        table = quote(self.table_name)
+        self.file.write("\\.\n\n")
+        pk = self.model._meta.pk_attr
+        if pk in self.columns:
+            self.file.write(f"ALTER TABLE {table} ADD PRIMARY KEY ({quote(pk)});\n")
+        for i, (columns, unique) in enumerate(index_columns(self.model, self.columns)):
+            index_name = quote(f"idx_{self.table_name}_{i}")
+            self.file.write(
+                f"CREATE {'UNIQUE ' if unique else ''}INDEX {index_name} "
+                f"ON {table} ({', '.join(quote(c) for c in columns)});\n"
+            )
+        self.file.write(f"ANALYZE {table};\n\n")
+
+    def close(self):
+        self.file.close()
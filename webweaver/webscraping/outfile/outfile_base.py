@@ -73,16 +73,17 @@ class FormatInfo:
 
 
 class OutFile:
-    """Class for creating outfiles to send to customer"""
+    """Class for creating outfiles to send to customer. 
+    SQLite, SQL dump and Parquet dataset outfiles are written by StreamingOutFile.
+    """
     def __init__(self, outfile_data:OutFileData):
         self.outfile_data = outfile_data
         self.FILE_FORMAT_MAP = {
             FileFormatEnum.JSON: FormatInfo("json", self.to_json),
+            FileFormatEnum.JSONL: FormatInfo("jsonl", self.to_json_lines),
             FileFormatEnum.CSV: FormatInfo("csv", self.to_csv),
             FileFormatEnum.EXCEL: FormatInfo("xlsx", self.to_excel, True),
             FileFormatEnum.GOOGLE_SHEETS: FormatInfo(".xlsx", self.to_google_sheets, True),
-            FileFormatEnum.SQL: FormatInfo("dump", self.to_sql_dump, True),
-            FileFormatEnum.SQLITE: FormatInfo("sqlite", self.to_sqlite, True),
             FileFormatEnum.FEATHER: FormatInfo("feather", self.to_feather),
             FileFormatEnum.PARQUET: FormatInfo("parquet", self.to_parquet),
             FileFormatEnum.XML: FormatInfo("xml", self.to_xml),
@@ -117,12 +118,6 @@ class OutFile:
     def to_google_sheets(self):
         ...
 
-    def to_sqlite(self):
-        ...
-
-    def to_sql_dump(self):
-        ...
-
     def to_feather(self):
         for table_name, df in self.outfile_data.dataframes.items():
             df.to_feather(self.dir/self.file_name(table_name))
@@ -137,8 +132,12 @@ class OutFile:
             df.to_json(self.dir/self.file_name(table_name), orient="records")
         return
 
+    def to_json_lines(self):
+        for table_name, df in self.outfile_data.dataframes.items():
+            df.to_json(self.dir/self.file_name(table_name), orient="records", lines=True)
+
     def to_excel(self):
-        full_path = self.dir/self.file_name(table_name)
+        full_path = self.dir/self.file_name()
         with pd.ExcelWriter(full_path) as writer:
             for table_name, df in self.outfile_data.dataframes.items():
                 df.to_excel(writer, sheet_name=table_name, index=False)
@@ -0,0 +1,195 @@
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+from typing import AsyncIterator
+
+from tortoise.models import Model
+
+from webweaver.config import OUTFILE_CHUNK_SIZE
+from webweaver.common.enums import FileFormatEnum
+from webweaver.exceptions import OutFileFormatNotFound
+from webweaver.webscraping.campaigns.models import ScrapeJob
+from webweaver.webscraping.models import ScrapeModel
+from webweaver.webscraping.outfile.campaign_hook import CampaignHook
+from webweaver.webscraping.outfile.chunk_writers import (
+    ChunkWriter,
+    CsvChunkWriter,
+    JsonChunkWriter,
+    JsonLinesChunkWriter,
+    ParquetChunkWriter,
+    ParquetDatasetChunkWriter,
+    SqlDumpChunkWriter,
+    SqliteChunkWriter,
+)
+
+
+logger = logging.getLogger('scraping')
+
+
+def table_columns(model:type[Model]) -> list[str]:
+    """The columns .values() would return for the model, minus scrape_job_id_id."""
+    return [column for column in model._meta.fields_db_projection if column != 'scrape_job_id_id']
+
+
+async def iter_table_chunks(
+        model:type[Model],
+        scrape_job_id:int,
+        columns:list[str],
+        chunk_size:int=OUTFILE_CHUNK_SIZE,
+) -> AsyncIterator[list[dict]]:
+    """Yields the job's rows of one table, chunk_size rows at a time, using
+    keyset pagination on the primary key (WHERE pk > last ORDER BY pk LIMIT n).
+    Each page is an index range scan, unlike OFFSET which rescans everything
+    before it, and no connection is held open between chunks.
+    """
+    pk = model._meta.pk_attr
+    select = columns if pk in columns else [pk, *columns]
+    last_pk = None
+    while True:
+        query = model.filter(scrape_job_id=scrape_job_id)
+        if last_pk is not None:
+            query = query.filter(**{f"{pk}__gt": last_pk})
+        rows = await query.order_by(pk).limit(chunk_size).values(*select)
+        if not rows:
+            return
+        last_pk = rows[-1][pk]
+        if pk not in columns:
+            for row in rows:
+                del row[pk]
+        yield rows
+        if len(rows) < chunk_size:
+            return
+
+
+class RowDeduper:
+    """Drops rows already seen, the streaming version of df.drop_duplicates().
+    Rows are compared on every column except the ignored ones (the primary key,
+    which is always unique), and only an 8 byte digest per distinct row is kept.
+    """
+    def __init__(self, ignore:tuple[str, ...]=('id',)):
+        self.ignore = set(ignore)
+        self.seen:set[bytes] = set()
+        self.dropped = 0
+
+    def digest(self, row:dict) -> bytes:
+        values = tuple(value for key, value in row.items() if key not in self.ignore)
+        return hashlib.blake2b(repr(values).encode(), digest_size=8).digest()
+
+    def __call__(self, rows:list[dict]) -> list[dict]:
+        unique = []
+        for row in rows:
+            digest = self.digest(row)
+            if digest in self.seen:
+                self.dropped += 1
+                continue
+            self.seen.add(digest)
+            unique.append(row)
+        return unique
+
+
+class StreamingOutFile:
+    """Writes a scrape job's outfile straight from the database, chunk by chunk,
+    instead of loading every table into pandas first like OutFileData/OutFile.
+    Memory stays at about one chunk plus the dedup digests, whatever the size
+    of the job.
+
+    Campaigns with an outfile_hook.py need the whole DataFrames, so those jobs
+    (and formats without a chunk writer) still go through OutFile. The database
+    formats (SQLite, SQL dump, Parquet dataset) only exist here, hooks are not
+    applied to them.
+    """
+    WRITERS:dict[FileFormatEnum, type[ChunkWriter]] = {
+        FileFormatEnum.CSV: CsvChunkWriter,
+        FileFormatEnum.JSON: JsonChunkWriter,
+        FileFormatEnum.JSONL: JsonLinesChunkWriter,
+        FileFormatEnum.PARQUET: ParquetChunkWriter,
+        FileFormatEnum.SQLITE: SqliteChunkWriter,
+        FileFormatEnum.SQL: SqlDumpChunkWriter,
+        FileFormatEnum.PARQUET_DATASET: ParquetDatasetChunkWriter,
+    }
+    STREAM_ONLY = {FileFormatEnum.SQLITE, FileFormatEnum.SQL, FileFormatEnum.PARQUET_DATASET}
+
+    def __init__(
+            self,
+            scrape_job:ScrapeJob,
+            file_format:FileFormatEnum,
+            chunk_size:int=OUTFILE_CHUNK_SIZE,
+            dedup:bool=True,
+    ):
+        self.scrape_job = scrape_job
+        self.file_format = file_format
+        self.chunk_size = chunk_size
+        self.dedup = dedup
+        self.time_scraped = self.scrape_job.date_scraped.strftime("%Y-%m-%d_%H:%M:%S")
+        try:
+            self.Writer = self.WRITERS[file_format]
+        except KeyError:
+            raise OutFileFormatNotFound
+        self.dir:Path = None
+        self.rows_written:dict[str, int] = {}
+
+
+    @classmethod
+    async def can_stream(cls, scrape_job:ScrapeJob, file_format:FileFormatEnum) -> bool:
+        """True if this job/format can skip the DataFrame path."""
+        if file_format not in cls.WRITERS:
+            return False
+        hook_file = await CampaignHook.campaign_hook_file(scrape_job)
+        if hook_file is None:
+            return True
+        if file_format in cls.STREAM_ONLY:
+            logger.warning(f"ScrapeJob {scrape_job.id}: {hook_file} is not applied to {file_format.value} outfiles")
+            return True
+        return False
+
+
+    async def tables(self) -> list[type[ScrapeModel]]:
+        """The ScrapeModel classes the job scraped into."""
+        table_names = {table.table_name for table in await self.scrape_job.scraped_tables()}
+        return [cls for cls in ScrapeModel.__subclasses__() if cls.__name__ in table_names]
+
+
+    def file_name(self, table_name:str=None) -> Path:
+        if self.Writer.dataset:
+            scrape_date = self.scrape_job.date_scraped.strftime("%Y-%m-%d")
+            return Path("dataset", table_name, f"scrape_date={scrape_date}", f"scrape_job_{self.scrape_job.id}.{self.Writer.extension}")
+        if self.Writer.multi_tabbed:
+            return Path(f"scraped_data__{self.time_scraped}.{self.Writer.extension}")
+        return Path(f"scraped_data__{table_name}_{self.time_scraped}.{self.Writer.extension}")
+
+
+    def path_for(self, table_name:str=None) -> Path:
+        return self.dir/self.file_name(table_name)
+
+
+    async def save(self) -> list[Path]:
+        """Writes the outfile(s) and returns their paths."""
+        self.dir = await self.scrape_job.module_scraped_data_path()
+        writer = await asyncio.to_thread(self.Writer, self.path_for)
+        try:
+            for model in await self.tables():
+                await self.write_table(writer, model)
+        finally:
+            await asyncio.to_thread(writer.close)
+        return writer.paths
+
+
+    async def write_table(self, writer:ChunkWriter, model:type[ScrapeModel]):
+        table_name = model.table_name()
+        columns = table_columns(model)
+        deduper = RowDeduper(ignore=(model._meta.pk_attr,)) if self.dedup else None
+        written = 0
+        await asyncio.to_thread(writer.begin_table, table_name, model, columns)
+        try:
+            async for rows in iter_table_chunks(model, self.scrape_job.id, columns, self.chunk_size):
+                if deduper is not None:
+                    rows = deduper(rows)
+                if rows:
+                    await asyncio.to_thread(writer.write, rows)
+                    written += len(rows)
+        finally:
+            await asyncio.to_thread(writer.end_table)
+        self.rows_written[table_name] = written
+        dropped = deduper.dropped if deduper is not None else 0
+        logger.info(f"ScrapeJob {self.scrape_job.id}: wrote {written} {table_name} rows ({dropped} duplicates dropped)")
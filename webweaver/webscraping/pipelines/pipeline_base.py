@@ -4,13 +4,13 @@ from pydantic import BaseModel#, ValidationError
 from pydantic_core import ValidationError
 from tortoise.transactions import atomic
 from tortoise.models import Model
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Hashable, Type
 
 # from webscraping.pipelines.pipeline_cleaner import PipelineCleaner
 from webweaver.exceptions import SchemaValidationError, MethodNotSubclassed, SchemaNotFound
 from webweaver.project.project_base import ProjectHandler
-from webweaver.webscraping.registry.scraping_registry import scraping_registry, SpiderState
-from webweaver.webscraping.spiders.spider_data import SpiderData#, SpiderDataBatch
+from webweaver.webscraping.registry.scraping_registry import ScrapingRegistry, SpiderState, get_registry
+from webweaver.webscraping.spiders.spider_data import SpiderData, SpiderDataBatch
 
 
 
@@ -25,35 +25,125 @@ class Pipeline:
 
     schema = None #override this in child class with pydantic schema
 
-    def __init__(self, spider_asset:"SpiderAsset", spider_data:SpiderData, project_handler:ProjectHandler=None):
+    def __init__(
+            self, 
+            spider_asset:"SpiderAsset", 
+            spider_data:SpiderData=None, 
+            project_handler:ProjectHandler=None,
+            spider_data_batch:SpiderDataBatch=None,
+    ):
         # self.spider_id:int = spider_data.spider_id
         self.spider_data = spider_data
+        self.spider_data_batch = spider_data_batch
         self.spider_asset = spider_asset
         self.data_to_save = None
+        self.batch_data_to_save:list[BaseModel] = []
         self.project_handler = project_handler
+        self.registry:ScrapingRegistry = get_registry()
+
+
+    @classmethod
+    def partition_key(cls, spider_data:SpiderData) -> Hashable:
+        """Key used by PipelineListenerPool to route SpiderData to a worker.
+        SpiderData sharing a key is always saved by the same worker, in the 
+        order it was scraped. With batching, batches are per spider, so that 
+        order only holds between records of the same spider.
+        
+        Defaults to the spider's ID. Subclass this method with something 
+        finer-grained (ie: a product name) to spread one spider's data 
+        across several workers.
+        """
+        return spider_data.spider_id
 
 
     def get_spider_asset(self) -> "SpiderAsset":
-        return scraping_registry.get_spider_asset(self.spider_asset.id)
+        return self.registry.get_spider_asset(self.spider_asset.id)
 
 
     async def validate_data(self):
         if self.schema is None:
             message = f"SchemaNotFound({self.__class__.__name__})"
             logger.error(SchemaNotFound(message))
-            await scraping_registry.set_spider_state(self.spider_asset.id, SpiderState.ERROR)
+            await self.registry.set_spider_state(self.spider_asset.id, SpiderState.ERROR)
             return
         else:        
             self.data_to_save = await self.validate(self.spider_data.data, self.schema)
+            if self.data_to_save is not None:
+                self.batch_data_to_save = [self.data_to_save]
+
+
+    async def validate_batch(self):
+        """Validates every record in self.spider_data_batch in a single pass.
+        Valid records are stored in self.batch_data_to_save. Records failing 
+        validation are dropped, and the spider's state is set to ERROR so it 
+        will not continue scraping.
+        """
+        if self.schema is None:
+            message = f"SchemaNotFound({self.__class__.__name__})"
+            logger.error(SchemaNotFound(message))
+            await self.registry.set_spider_state(self.spider_asset.id, SpiderState.ERROR)
+            return
+
+        error_count = 0
+        for spider_data in self.spider_data_batch.batch_data:
+            try:
+                self.batch_data_to_save.append(self._validate_or_log(spider_data.data, self.schema))
+            except SchemaValidationError:
+                error_count += 1
+        if error_count:
+            logger.error(f"{error_count}/{self.spider_data_batch.count()} records failed validation ({self.spider_asset.spider_name})")
+            await self.registry.set_spider_state(self.spider_asset.id, SpiderState.ERROR)
 
 
     async def save_data(self):
         """Subclass this method to write pipeline DB-saving logic"""
-        spider_name = scraping_registry.get_spider_name(self.spider_asset.id)
+        spider_name = self.registry.get_spider_name(self.spider_asset.id)
         logger.error(repr(MethodNotSubclassed(f"{spider_name} has no save_data() method!")))
         return
 
 
+    async def save_batch(self) -> tuple[int, int]:
+        """Subclass this method to write bulk DB-saving logic for every record
+        in self.batch_data_to_save, typically with Model.bulk_create(). Returns
+        the (saved, failed) counts, (len(self.batch_data_to_save), 0) once the
+        whole batch is in.
+
+        By default each record is passed to self.save_data() one at a time, so
+        pipelines without a save_batch() method still work in batching mode.
+        """
+        return await self.save_one_by_one()
+
+
+    async def save_one_by_one(self) -> tuple[int, int]:
+        """Passes every record in self.batch_data_to_save to self.save_data() 
+        on its own, so a record that can't be saved doesn't take the rest 
+        with it. Also what PipelineListener falls back to when save_batch() 
+        raises. Returns the (saved, failed) counts.
+        """
+        saved = failed = 0
+        batch_data_to_save = self.batch_data_to_save
+        for data_to_save in batch_data_to_save:
+            self.data_to_save = data_to_save
+            self.batch_data_to_save = [data_to_save]
+            try:
+                await self.save_data()
+            except Exception as e:
+                logger.error(f"{e.__class__.__name__} ({self.spider_asset.spider_name}): {e}")
+                failed += 1
+            else:
+                saved += 1
+        self.batch_data_to_save = batch_data_to_save
+        return saved, failed
+
+
+    @staticmethod
+    def model_kwargs(model:Type[Model], data:dict) -> dict:
+        """Drops any keys in the validated data which are not fields on the model,
+        so the result can be passed straight into the model's constructor for bulk_create().
+        """
+        return {key: value for key, value in data.items() if key in model._meta.fields_map}
+
+
     def _validate(self, data:dict, schema:BaseModel) -> BaseModel:
         """Validate the scraped data against the appropriate pydantic schema"""
         # print(data)
@@ -88,7 +178,7 @@ class Pipeline:
         try:
             return self._validate_or_log(data, schema)
         except SchemaValidationError:
-            await scraping_registry.set_spider_state(self.spider_asset.id, SpiderState.ERROR)
+            await self.registry.set_spider_state(self.spider_asset.id, SpiderState.ERROR)
 
         return
     
\ No newline at end of file
@@ -5,12 +5,18 @@ from pydantic import ValidationError
 import traceback
 from tortoise.exceptions import TransactionManagementError, IntegrityError
 
-from webweaver.config import SENTINEL
+from webweaver.config import (
+    SENTINEL, 
+    SPIDER_DATA_BATCH_SIZE, 
+    SPIDER_DATA_BATCH_TIMEOUT, 
+    PIPELINE_WORKER_COUNT,
+    PIPELINE_WORKER_QUEUE_SIZE,
+)
 from webweaver.project.project_base import ProjectHandler
 from webweaver.webscraping.spiders.models import SpiderAsset
 from webweaver.webscraping.pipelines.pipeline_base import Pipeline
-from webweaver.webscraping.registry.scraping_registry import scraping_registry
-from webweaver.webscraping.spiders.spider_data import SpiderData#, SpiderDataBatch, BatchRegistry
+from webweaver.webscraping.registry.scraping_registry import ScrapingRegistry, get_registry
+from webweaver.webscraping.spiders.spider_data import SpiderData, SpiderDataBatch, BatchRegistry
 
 
 logger = logging.getLogger("scraping")
@@ -21,27 +27,56 @@ class PipelineListener:
     and then passing it to the appropriate Pineline subclass.
     """
 
-    def __init__(self, queue:asyncio.Queue, project_handler:ProjectHandler=None):
+    def __init__(
+            self, 
+            queue:asyncio.Queue, 
+            project_handler:ProjectHandler=None,
+            batch_size:int=SPIDER_DATA_BATCH_SIZE,
+            batch_timeout:float=SPIDER_DATA_BATCH_TIMEOUT,
+    ):
         self.queue = queue
         self.sentinel = SENTINEL
-        # self.batch_registry = BatchRegistry()
+        self.batch_registry = BatchRegistry(batch_size, batch_timeout)
         self.project_handler = project_handler
+        self.registry:ScrapingRegistry = get_registry()
+
+
+    @property
+    def is_batching(self) -> bool:
+        """Records are grouped into per-spider batches when the batch size is above 1."""
+        return self.batch_registry.batch_size_limit > 1
 
 
     def get_spider_asset(self, spider_id:int) -> SpiderAsset:
         """Returns the SpiderAsset from the spider registry"""
-        return scraping_registry.registry[spider_id].spider_asset
+        return self.registry.registry[spider_id].spider_asset
+
+
+    def get_pipeline_class(self, sa:SpiderAsset) -> type[Pipeline] | None:
+        """Returns the project's pipeline class if a project is running, 
+        otherwise the SpiderAsset's own pipeline class.
+        """
+        if self.project_handler:
+            return self.project_handler.pipeline_class
+        return sa.get_pipeline()
 
 
-    def get_pipeline_object(self, sa:SpiderAsset, spider_data:SpiderData=None) -> Pipeline | None:
+    def get_pipeline_object(
+            self, 
+            sa:SpiderAsset, 
+            spider_data:SpiderData=None, 
+            spider_data_batch:SpiderDataBatch=None
+    ) -> Pipeline | None:
         """Retrieves the pipeline class for the SpiderAsset"""
         pipeline = None
-        if self.project_handler:
-            PipelineClass = self.project_handler.pipeline_class
-        else:
-            PipelineClass = sa.get_pipeline()
+        PipelineClass = self.get_pipeline_class(sa)
         if PipelineClass:
-            pipeline = PipelineClass(spider_asset=sa, spider_data=spider_data, project_handler=self.project_handler)
+            pipeline = PipelineClass(
+                spider_asset=sa, 
+                spider_data=spider_data, 
+                project_handler=self.project_handler,
+                spider_data_batch=spider_data_batch,
+            )
         return pipeline
 
 
@@ -54,6 +89,8 @@ class PipelineListener:
         pipeline = self.get_pipeline_object(sa=spider_asset, spider_data=spider_data)
         if pipeline is not None:
             await pipeline.validate_data()
+            if pipeline.data_to_save is None:
+                self.registry.count('records_invalid')
             try:
                 await pipeline.save_data()
             except Exception as e:
@@ -61,11 +98,38 @@ class PipelineListener:
                 logger.error(f"{e.__class__.__name__} ({spider_asset.spider_name})")
                 print('oopsie')
                 traceback.print_exception(e)
+                self.registry.count('records_failed')
                 # print("FAILED: ", pipeline.data_to_save.product.product_name)
+            else:
+                if pipeline.data_to_save is not None:
+                    self.registry.count('records_saved')
         # spider_data_batch.reset_batch()
         return
 
 
+    async def process_pipeline_batch(self, spider_data_batch:SpiderDataBatch):
+        """Retrieve the pipeline object, validate the whole batch in one pass
+        and hand it to the pipeline's save_batch() method. If that fails, the
+        batch is saved again one record at a time with save_data().
+        """
+        spider_asset = self.get_spider_asset(spider_data_batch.spider_id)
+        pipeline = self.get_pipeline_object(sa=spider_asset, spider_data_batch=spider_data_batch)
+        if pipeline is not None:
+            await pipeline.validate_batch()
+            self.registry.count('records_invalid', spider_data_batch.count() - len(pipeline.batch_data_to_save))
+            if pipeline.batch_data_to_save:
+                try:
+                    saved, failed = await pipeline.save_batch()
+                except Exception as e:
+                    # the bulk save is all or nothing, retry record by record so only the bad record is lost
+                    logger.error(f"{e.__class__.__name__} ({spider_asset.spider_name}): batch of {spider_data_batch.count()} failed, saving one record at a time")
+                    traceback.print_exception(e)
+                    saved, failed = await pipeline.save_one_by_one()
+                self.registry.count('records_saved', saved)
+                self.registry.count('records_failed', failed)
+        return
+
+
     # async def record_validation_error(self, e:ValidationError, spider_module_path:Path):
     #     """Called when the data sent to the pipeline module fails its 
     #     schema validation and raises a pydantic ValidationError.
@@ -75,34 +139,138 @@ class PipelineListener:
     #         f.write("\n")
 
 
-    # async def process_leftover_pipeline_data(self):
-    #     """Process remaining batch data.. for the leftover batches that didn't
-    #     hit the batch_size_limit threshold.
-    #     """
-    #     for spider_id, spider_data_batch in self.batch_registry.batches.items():
-    #         if spider_data_batch.count() > 0:
-    #             spider_asset = self.get_spider_asset(spider_id)
-    #             await self.process_pipeline_batch(spider_asset, spider_data_batch)
-    #     return
+    async def process_leftover_pipeline_data(self):
+        """Process remaining batch data.. for the leftover batches that didn't
+        hit the batch_size_limit threshold.
+        """
+        for spider_data_batch in self.batch_registry.pop_all():
+            await self.process_pipeline_batch(spider_data_batch)
+        return
+
+
+    async def process_expired_pipeline_data(self):
+        """Process the batches that have been waiting longer than the batch_time_limit."""
+        for spider_data_batch in self.batch_registry.pop_expired():
+            await self.process_pipeline_batch(spider_data_batch)
+        return
+
+
+    async def get_next(self) -> SpiderData | str | None:
+        """Waits on the queue, but only until the oldest waiting batch is due
+        to be flushed. Returns None if the wait timed out.
+        """
+        timeout = self.batch_registry.time_until_flush()
+        if timeout is None:
+            return await self.queue.get()
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
 
 
     async def listen(self):
         """Checking the queue for data and instantiating the 
         appropriate Pipeline subclass for processing.
         """
+        if self.is_batching:
+            return await self.listen_batched()
+
         while True:
             spider_data:SpiderData = await self.queue.get()
             if spider_data == self.sentinel:
                 logger.info("Pipeline sentinel value received")
                 break
-
-            # self.batch_registry.add_data(spider_data)
-            # if self.batch_registry.is_batch_full(spider_data.spider_id):
-            #     spider_data_batch = self.batch_registry.batches[spider_data.spider_id]
-            # spider_asset = self.get_spider_asset(spider_data.spider_id)
-            # data = spider_data.data
             await self.process_pipeline_data(spider_data)  
 
-        # await self.process_leftover_pipeline_data()
+        logger.info("Pipeline terminated")
 
+
+    async def listen_batched(self):
+        """Same as listen(), but SpiderData is grouped per spider and passed to
+        the pipeline once a batch is full or has waited batch_time_limit seconds.
+        """
+        while True:
+            spider_data:SpiderData = await self.get_next()
+            if spider_data == self.sentinel:
+                logger.info("Pipeline sentinel value received")
+                break
+            if spider_data is not None:
+                self.batch_registry.add_data(spider_data)
+                if self.batch_registry.is_batch_full(spider_data.spider_id):
+                    spider_data_batch = self.batch_registry.pop_batch(spider_data.spider_id)
+                    await self.process_pipeline_batch(spider_data_batch)
+            await self.process_expired_pipeline_data()
+
+        await self.process_leftover_pipeline_data()
         logger.info("Pipeline terminated")
+
+
+class PipelineListenerPool:
+    """Runs several PipelineListener workers against the same scrape queue, so 
+    one slow save does not hold back every spider.
+
+    The pool reads from the scrape queue and routes each SpiderData to a worker 
+    by hashing the pipeline's partition_key(). Data sharing a key always lands 
+    on the same worker and is saved in order, so upserts on the same row never
+    race each other. When the sentinel value arrives, it is forwarded to every
+    worker so they all drain their queues and exit.
+    """
+    def __init__(
+            self, 
+            queue:asyncio.Queue, 
+            project_handler:ProjectHandler=None,
+            worker_count:int=PIPELINE_WORKER_COUNT,
+            worker_queue_size:int=PIPELINE_WORKER_QUEUE_SIZE,
+            **listener_kwargs,
+    ):
+        self.queue = queue
+        self.sentinel = SENTINEL
+        self.project_handler = project_handler
+        self.worker_queues:list[asyncio.Queue] = [
+            asyncio.Queue(maxsize=worker_queue_size) for _ in range(max(worker_count, 1))
+        ]
+        self.workers:list[PipelineListener] = [
+            PipelineListener(worker_queue, project_handler=project_handler, **listener_kwargs) 
+            for worker_queue in self.worker_queues
+        ]
+        self._pipeline_classes:dict[int, type[Pipeline] | None] = {}
+
+
+    def get_pipeline_class(self, spider_id:int) -> type[Pipeline] | None:
+        """Cached lookup of the pipeline class for the spider."""
+        if spider_id not in self._pipeline_classes:
+            worker = self.workers[0]
+            self._pipeline_classes[spider_id] = worker.get_pipeline_class(worker.get_spider_asset(spider_id))
+        return self._pipeline_classes[spider_id]
+
+
+    def get_worker_index(self, spider_data:SpiderData) -> int:
+        """Picks the worker responsible for the SpiderData's partition key."""
+        PipelineClass = self.get_pipeline_class(spider_data.spider_id)
+        if PipelineClass is None:
+            key = spider_data.spider_id
+        else:
+            key = PipelineClass.partition_key(spider_data)
+        return hash(key) % len(self.workers)
+
+
+    async def dispatch(self):
+        """Routes SpiderData from the scrape queue to the worker queues until 
+        the sentinel value is received, then stops every worker.
+        """
+        while True:
+            spider_data:SpiderData = await self.queue.get()
+            if spider_data == self.sentinel:
+                logger.info("Pipeline sentinel value received")
+                break
+            await self.worker_queues[self.get_worker_index(spider_data)].put(spider_data)
+
+        for worker_queue in self.worker_queues:
+            await worker_queue.put(self.sentinel)
+
+
+    async def listen(self):
+        """Runs the dispatcher and all workers until every worker has drained its queue."""
+        logger.debug(f"Starting {len(self.workers)} pipeline workers")
+        await asyncio.gather(self.dispatch(), *(worker.listen() for worker in self.workers))
+        logger.info("Pipeline pool terminated")
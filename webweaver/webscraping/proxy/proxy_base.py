@@ -1,5 +1,4 @@
 from datetime import datetime
-import os
 import random
 from typing import TYPE_CHECKING, Optional
 # from exceptions import SpiderRetryTimeout
@@ -7,6 +6,7 @@ from typing import TYPE_CHECKING, Optional
 # from webscraping.proxy.request_handler import ProxyRequestHandler
 
 if TYPE_CHECKING:
+    from webweaver.webscraping.proxy.proxy_endpoints import ProxyEndpoint
     from webweaver.webscraping.proxy.proxy_manager import SessionProxyManagerInterface
 
 
@@ -55,27 +55,58 @@ class ProxySession:
     """
     def __init__(
             self, 
-            endpoint:str,
+            endpoint:"ProxyEndpoint",
             manager_interface:"SessionProxyManagerInterface", 
+            lease_id:int=None,
             # request_context:Optional[RequestContext],
             ):
-        self.endpoint = endpoint
+        self.proxy_endpoint = endpoint
+        self.endpoint = endpoint.url
         self.manager_interface = manager_interface
+        self.lease_id = lease_id  # set for sticky endpoints leased from the ProxyManager
         # self.request_context = request_context
 
 
     @property
     def full_endpoint(self) -> str:
         """Includes the username/pass in the proxy endpoint"""
-        return f"http://{os.getenv('PROXY_USER')}:{os.getenv('PROXY_PASS')}@{self.endpoint.replace('http://','')}"
+        return self.proxy_endpoint.credential_url
+
+
+    @property
+    def host(self) -> str:
+        """The endpoint without its scheme, as the ProxyManager knows it"""
+        return self.proxy_endpoint.host
+
+
+    @property
+    def username(self) -> str|None:
+        return self.proxy_endpoint.username
+
+
+    @property
+    def password(self) -> str|None:
+        return self.proxy_endpoint.password
 
 
     async def release(self):
         """Releases the proxy endpoint so that other proxysession objects
         may use it.
         """
-        await self.manager_interface.release_endpoint(self.endpoint)
-        return
+        if self.lease_id is None:
+            return
+        await self.manager_interface.release_endpoint(self.host, self.lease_id)
+        self.lease_id = None
+
+
+    def record_response(self, status:int, latency:float):
+        """Report how a request through this endpoint went, for the ProxyManager's health scores."""
+        self.manager_interface.report_response(self.host, status, latency)
+
+
+    def record_error(self):
+        """Report a connection/read error through this endpoint."""
+        self.manager_interface.report_error(self.host)
 
 
     def jitter(self) -> int:
@@ -1,111 +1,120 @@
+from dataclasses import dataclass, field
+import itertools
+import logging
+import time
+from typing import TYPE_CHECKING
+from urllib.parse import quote
+
+from webweaver.config import PROXY_LEASE_TIMEOUT
+
+if TYPE_CHECKING:
+    from webweaver.webscraping.proxy.providers import ProxyProvider
+
+
+logger = logging.getLogger('scraping')
+
+
+@dataclass(frozen=True)
+class ProxyEndpoint:
+    """One proxy host:port from a ProxyProvider. The URLs are built once here
+    instead of on every request.
+    """
+    host:str
+    provider:str
+    username:str|None = None
+    password:str|None = None
+    is_sticky:bool = True
+    url:str = field(init=False)
+    credential_url:str = field(init=False, repr=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'url', f"http://{self.host}")
+        if self.username:
+            credentials = f"{quote(self.username, safe='')}:{quote(self.password or '', safe='')}"
+            object.__setattr__(self, 'credential_url', f"http://{credentials}@{self.host}")
+        else:
+            object.__setattr__(self, 'credential_url', self.url)
+
+
+@dataclass
+class ProxyLease:
+    host:str
+    lease_id:int
+    leased_at:float
 
 
 class ProxyEndpoints:
+    """Every endpoint from every ProxyProvider, and the leases on the sticky ones.
+
+    A lease is just a dict entry, so leasing and releasing are O(1). Leases older
+    than lease_timeout are reclaimed by the ProxyManager, which frees endpoints
+    leaked by spiders that crashed before calling ProxySession.release(). Each
+    lease has an id, so a late release() from a reclaimed lease can't free the
+    endpoint out from under its new owner.
+    """
+    def __init__(self, providers:list["ProxyProvider"], lease_timeout:float=PROXY_LEASE_TIMEOUT):
+        self.lease_timeout = lease_timeout
+        self.by_host:dict[str, ProxyEndpoint] = {}
+        self.sticky:list[str] = []
+        rotating:list[ProxyEndpoint] = []
+        for provider in providers:
+            for endpoint in provider.sticky():
+                if endpoint.host not in self.by_host:
+                    self.by_host[endpoint.host] = endpoint
+                    self.sticky.append(endpoint.host)
+            for endpoint in provider.rotating():
+                self.by_host.setdefault(endpoint.host, endpoint)
+                rotating.append(endpoint)
+        if not rotating:
+            # providers with no rotating gateway: stateless sessions share the sticky endpoints
+            rotating = [self.by_host[host] for host in self.sticky]
+        self.rotating_endpoints = rotating
+        self._rotating = itertools.cycle(rotating) if rotating else None
+        self.leases:dict[str, ProxyLease] = {}
+        self._lease_ids = itertools.count(1)
+        logger.debug(f"ProxyEndpoints: {len(self.sticky)} sticky, {len(rotating)} rotating from {len(providers)} providers")
+        if not self.by_host:
+            logger.warning("ProxyEndpoints: the proxy providers returned no endpoints")
+
+
+    @property
+    def in_use(self) -> set[str]:
+        return set(self.leases)
+
+
+    @property
+    def rotating(self) -> ProxyEndpoint|None:
+        """Rotating endpoints, round robin across providers."""
+        return next(self._rotating) if self._rotating is not None else None
+
+
+    def lease(self, host:str) -> ProxyLease:
+        lease = ProxyLease(host=host, lease_id=next(self._lease_ids), leased_at=time.monotonic())
+        self.leases[host] = lease
+        return lease
+
+
+    def release(self, host:str, lease_id:int=None) -> bool:
+        """Ends the lease. Returns False if there was no such lease (e.g. it was
+        already reclaimed).
+        """
+        lease = self.leases.get(host)
+        if lease is None or (lease_id is not None and lease.lease_id != lease_id):
+            return False
+        del self.leases[host]
+        return True
+
+
+    def expired(self) -> list[str]:
+        """Hosts whose lease has outlived lease_timeout."""
+        if self.lease_timeout is None:
+            return []
+        cutoff = time.monotonic() - self.lease_timeout
+        return [host for host, lease in self.leases.items() if lease.leased_at < cutoff]
+
 
-    def __init__(self, PROXY_USER:str, PROXY_PASS:str):
-        self.PROXY_USER = PROXY_USER
-        self.PROXY_PASS = PROXY_PASS
-        self.rotating = f"dc.smartproxy.com:10000"
-        self.in_use = set()
-        self.sticky = [
-            f"dc.smartproxy.com:10001",
-            f"dc.smartproxy.com:10002",
-            f"dc.smartproxy.com:10003",
-            f"dc.smartproxy.com:10004",
-            f"dc.smartproxy.com:10005",
-            f"dc.smartproxy.com:10006",
-            f"dc.smartproxy.com:10007",
-            f"dc.smartproxy.com:10008",
-            f"dc.smartproxy.com:10009",
-            f"dc.smartproxy.com:10010",
-            f"dc.smartproxy.com:10011",
-            f"dc.smartproxy.com:10012",
-            f"dc.smartproxy.com:10013",
-            f"dc.smartproxy.com:10014",
-            f"dc.smartproxy.com:10015",
-            f"dc.smartproxy.com:10016",
-            f"dc.smartproxy.com:10017",
-            f"dc.smartproxy.com:10018",
-            f"dc.smartproxy.com:10019",
-            f"dc.smartproxy.com:10020",
-            f"dc.smartproxy.com:10021",
-            f"dc.smartproxy.com:10022",
-            f"dc.smartproxy.com:10023",
-            f"dc.smartproxy.com:10024",
-            f"dc.smartproxy.com:10025",
-            f"dc.smartproxy.com:10026",
-            f"dc.smartproxy.com:10027",
-            f"dc.smartproxy.com:10028",
-            f"dc.smartproxy.com:10029",
-            f"dc.smartproxy.com:10030",
-            f"dc.smartproxy.com:10031",
-            f"dc.smartproxy.com:10032",
-            f"dc.smartproxy.com:10033",
-            f"dc.smartproxy.com:10034",
-            f"dc.smartproxy.com:10035",
-            f"dc.smartproxy.com:10036",
-            f"dc.smartproxy.com:10037",
-            f"dc.smartproxy.com:10038",
-            f"dc.smartproxy.com:10039",
-            f"dc.smartproxy.com:10040",
-            f"dc.smartproxy.com:10041",
-            f"dc.smartproxy.com:10042",
-            f"dc.smartproxy.com:10043",
-            f"dc.smartproxy.com:10044",
-            f"dc.smartproxy.com:10045",
-            f"dc.smartproxy.com:10046",
-            f"dc.smartproxy.com:10047",
-            f"dc.smartproxy.com:10048",
-            f"dc.smartproxy.com:10049",
-            f"dc.smartproxy.com:10050",
-            f"dc.smartproxy.com:10051",
-            f"dc.smartproxy.com:10052",
-            f"dc.smartproxy.com:10053",
-            f"dc.smartproxy.com:10054",
-            f"dc.smartproxy.com:10055",
-            f"dc.smartproxy.com:10056",
-            f"dc.smartproxy.com:10057",
-            f"dc.smartproxy.com:10058",
-            f"dc.smartproxy.com:10059",
-            f"dc.smartproxy.com:10060",
-            f"dc.smartproxy.com:10061",
-            f"dc.smartproxy.com:10062",
-            f"dc.smartproxy.com:10063",
-            f"dc.smartproxy.com:10064",
-            f"dc.smartproxy.com:10065",
-            f"dc.smartproxy.com:10066",
-            f"dc.smartproxy.com:10067",
-            f"dc.smartproxy.com:10068",
-            f"dc.smartproxy.com:10069",
-            f"dc.smartproxy.com:10070",
-            f"dc.smartproxy.com:10071",
-            f"dc.smartproxy.com:10072",
-            f"dc.smartproxy.com:10073",
-            f"dc.smartproxy.com:10074",
-            f"dc.smartproxy.com:10075",
-            f"dc.smartproxy.com:10076",
-            f"dc.smartproxy.com:10077",
-            f"dc.smartproxy.com:10078",
-            f"dc.smartproxy.com:10079",
-            f"dc.smartproxy.com:10080",
-            f"dc.smartproxy.com:10081",
-            f"dc.smartproxy.com:10082",
-            f"dc.smartproxy.com:10083",
-            f"dc.smartproxy.com:10084",
-            f"dc.smartproxy.com:10085",
-            f"dc.smartproxy.com:10086",
-            f"dc.smartproxy.com:10087",
-            f"dc.smartproxy.com:10088",
-            f"dc.smartproxy.com:10089",
-            f"dc.smartproxy.com:10090",
-            f"dc.smartproxy.com:10091",
-            f"dc.smartproxy.com:10092",
-            f"dc.smartproxy.com:10093",
-            f"dc.smartproxy.com:10094",
-            f"dc.smartproxy.com:10095",
-            f"dc.smartproxy.com:10096",
-            f"dc.smartproxy.com:10097",
-            f"dc.smartproxy.com:10098",
-            f"dc.smartproxy.com:10099",
-            f"dc.smartproxy.com:10100",
-        ]
\ No newline at end of file
+    def time_until_expiry(self) -> float|None:
+        if self.lease_timeout is None or not self.leases:
+            return None
+        oldest = min(lease.leased_at for lease in self.leases.values())
+        return max(oldest + self.lease_timeout - time.monotonic(), 0)
@@ -0,0 +1,211 @@
+from dataclasses import dataclass
+import heapq
+import itertools
+import logging
+import time
+
+from webweaver.config import (
+    PROXY_LATENCY_ALPHA,
+    PROXY_DEFAULT_LATENCY,
+    PROXY_COOLDOWN,
+    PROXY_MAX_COOLDOWN,
+    PROXY_QUARANTINE_FAILURES,
+    PROXY_QUARANTINE,
+)
+
+
+logger = logging.getLogger('scraping')
+
+
+BAN_STATUS_CODES = frozenset({403, 429})  # the status codes StatusCodeMiddleware treats as us being blocked
+
+
+@dataclass
+class EndpointHealth:
+    """Running health numbers for one proxy endpoint."""
+    endpoint:str
+    latency:float|None = None  # EWMA, seconds
+    error_rate:float = 0.0  # EWMA of failures (0-1)
+    requests:int = 0
+    errors:int = 0
+    bans:int = 0
+    consecutive_failures:int = 0
+    ready_at:float = 0.0  # monotonic time the endpoint's cooldown/quarantine ends
+    is_quarantined:bool = False
+    in_use:bool = False
+
+    @property
+    def score(self) -> float:
+        """Lower is better: expected latency, inflated by how often the endpoint fails."""
+        latency = self.latency if self.latency is not None else PROXY_DEFAULT_LATENCY
+        return latency * (1 + 4 * self.error_rate)
+
+    @property
+    def is_resting(self) -> bool:
+        return self.ready_at > time.monotonic()
+
+    def as_dict(self) -> dict:
+        return {
+            'endpoint': self.endpoint,
+            'score': round(self.score, 3),
+            'latency': round(self.latency, 3) if self.latency is not None else None,
+            'error_rate': round(self.error_rate, 3),
+            'requests': self.requests,
+            'errors': self.errors,
+            'bans': self.bans,
+            'in_use': self.in_use,
+            'resting_for': max(round(self.ready_at - time.monotonic(), 1), 0),
+            'is_quarantined': self.is_quarantined and self.is_resting,
+        }
+
+
+class ProxyHealthTracker:
+    """Tracks the health of every proxy endpoint and hands out the best free
+    sticky endpoint.
+
+    Free endpoints sit in a min-heap ordered by score, so picking one is O(log n).
+    Heap entries are invalidated lazily: an endpoint's latest entry is the only
+    valid one, older entries are skipped when popped. Endpoints that are cooling
+    down after a ban, or quarantined after too many failures in a row, wait in a
+    second heap ordered by when they're allowed back.
+    """
+    def __init__(self, sticky_endpoints:list[str], alpha:float=PROXY_LATENCY_ALPHA):
+        self.alpha = alpha
+        self.health:dict[str, EndpointHealth] = {}
+        self._available:list[tuple[float, int, str]] = []
+        self._resting:list[tuple[float, int, str]] = []
+        self._valid:dict[str, int] = {}  # endpoint -> sequence number of its valid heap entry
+        self._counter = itertools.count()
+        for endpoint in sticky_endpoints:
+            self.health[endpoint] = EndpointHealth(endpoint)
+            self._push(endpoint)
+
+
+    def get(self, endpoint:str) -> EndpointHealth:
+        health = self.health.get(endpoint)
+        if health is None:
+            health = EndpointHealth(endpoint)  # e.g. the rotating endpoint, tracked but never selected
+            self.health[endpoint] = health
+        return health
+
+
+    def _push(self, endpoint:str):
+        """(Re)queue a free endpoint, in the resting heap if it's still cooling down."""
+        health = self.health[endpoint]
+        sequence = next(self._counter)
+        self._valid[endpoint] = sequence
+        if health.is_resting:
+            heapq.heappush(self._resting, (health.ready_at, sequence, endpoint))
+        else:
+            heapq.heappush(self._available, (health.score, sequence, endpoint))
+
+
+    def _wake_rested(self):
+        now = time.monotonic()
+        while self._resting and self._resting[0][0] <= now:
+            _, sequence, endpoint = heapq.heappop(self._resting)
+            if self._valid.get(endpoint) == sequence:
+                self.health[endpoint].is_quarantined = False
+                self._push(endpoint)
+
+
+    def acquire(self) -> str|None:
+        """The free sticky endpoint with the best score, or None if every endpoint
+        is in use or resting.
+        """
+        self._wake_rested()
+        while self._available:
+            _, sequence, endpoint = heapq.heappop(self._available)
+            if self._valid.get(endpoint) != sequence:
+                continue
+            del self._valid[endpoint]
+            health = self.health[endpoint]
+            if health.is_resting:
+                self._push(endpoint)
+                continue
+            health.in_use = True
+            return endpoint
+        return None
+
+
+    def release(self, endpoint:str):
+        health = self.health.get(endpoint)
+        if health is None or not health.in_use:
+            return
+        health.in_use = False
+        self._push(endpoint)
+
+
+    def time_until_ready(self) -> float|None:
+        """Seconds until the next resting endpoint is allowed back, if any are resting."""
+        self._wake_rested()
+        if not self._resting:
+            return None
+        return max(self._resting[0][0] - time.monotonic(), 0)
+
+
+    def _updated(self, health:EndpointHealth):
+        """Requeue a free endpoint so its heap entry reflects its new score."""
+        if not health.in_use and health.endpoint in self._valid:
+            self._push(health.endpoint)
+
+
+    def record_success(self, endpoint:str, latency:float):
+        health = self.get(endpoint)
+        health.requests += 1
+        health.consecutive_failures = 0
+        health.latency = latency if health.latency is None else (
+            self.alpha * latency + (1 - self.alpha) * health.latency
+        )
+        health.error_rate = (1 - self.alpha) * health.error_rate
+        self._updated(health)
+
+
+    def record_failure(self, endpoint:str):
+        """Connection/read error through this endpoint."""
+        health = self.get(endpoint)
+        health.requests += 1
+        health.errors += 1
+        health.consecutive_failures += 1
+        health.error_rate = self.alpha + (1 - self.alpha) * health.error_rate
+        if health.consecutive_failures >= PROXY_QUARANTINE_FAILURES:
+            health.ready_at = time.monotonic() + PROXY_QUARANTINE
+            health.is_quarantined = True
+            health.consecutive_failures = 0
+            logger.warning(f"Proxy {endpoint} quarantined for {PROXY_QUARANTINE}s after {PROXY_QUARANTINE_FAILURES} failures in a row")
+        self._updated(health)
+
+
+    def record_ban(self, endpoint:str, status:int):
+        """The site refused us (403/429) through this endpoint, so rest it for a
+        while. Repeat bans double the cooldown.
+        """
+        health = self.get(endpoint)
+        health.requests += 1
+        health.bans += 1
+        health.error_rate = self.alpha + (1 - self.alpha) * health.error_rate
+        cooldown = min(PROXY_COOLDOWN * 2 ** (health.bans - 1), PROXY_MAX_COOLDOWN)
+        health.ready_at = max(health.ready_at, time.monotonic() + cooldown)
+        logger.debug(f"Proxy {endpoint} got {status}, cooling down for {cooldown}s")
+        self._updated(health)
+
+
+    def record_response(self, endpoint:str, status:int, latency:float):
+        if status in BAN_STATUS_CODES:
+            self.record_ban(endpoint, status)
+        else:
+            self.record_success(endpoint, latency)
+
+
+    def snapshot(self) -> dict:
+        """Metrics for every endpoint, best first, plus pool totals."""
+        endpoints = sorted((h.as_dict() for h in self.health.values()), key=lambda h: h['score'])
+        return {
+            'in_use': sum(1 for h in self.health.values() if h.in_use),
+            'resting': sum(1 for h in self.health.values() if h.is_resting and not h.is_quarantined),
+            'quarantined': sum(1 for h in self.health.values() if h.is_resting and h.is_quarantined),
+            'requests': sum(h.requests for h in self.health.values()),
+            'errors': sum(h.errors for h in self.health.values()),
+            'bans': sum(h.bans for h in self.health.values()),
+            'endpoints': endpoints,
+        }
@@ -1,14 +1,16 @@
 
 import asyncio 
 import logging
-import os
 
-from webweaver.config import PROXY
+from webweaver.config import PROXY, PROXY_PROVIDERS, PROXY_LEASE_TIMEOUT
+from webweaver.exceptions import ProxyEndpointNotFound
 from webweaver.webscraping.proxy.proxy_base import (
     # RequestContext, 
     ProxySession 
 )
-from webweaver.webscraping.proxy.proxy_endpoints import ProxyEndpoints
+from webweaver.webscraping.proxy.proxy_endpoints import ProxyEndpoints, ProxyLease
+from webweaver.webscraping.proxy.proxy_health import ProxyHealthTracker
+from webweaver.webscraping.proxy.providers import ProxyProvider, load_providers
 
 
 logger = logging.getLogger('scraping')
@@ -39,8 +41,14 @@ class SessionProxyManagerInterface:
         self.manager = manager
 
 
-    async def release_endpoint(self, endpoint:str):
-        await self.manager.release_sticky_endpoint(endpoint)
+    async def release_endpoint(self, endpoint:str, lease_id:int):
+        await self.manager.release_sticky_endpoint(endpoint, lease_id)
+
+    def report_response(self, endpoint:str, status:int, latency:float):
+        self.manager.health.record_response(endpoint, status, latency)
+
+    def report_error(self, endpoint:str):
+        self.manager.health.record_failure(endpoint)
 
 
     # def is_url_scraped(self, url:str) -> bool:
@@ -54,15 +62,18 @@ class SessionProxyManagerInterface:
 
 
 class ProxyManager:
-    """This is the shared-state between all instances of ProxySession."""
-    def __init__(self):
-        PROXY_USER = os.environ.get('PROXY_USER')
-        PROXY_PASS = os.environ.get('PROXY_PASS')
+    """This is the shared-state between all instances of ProxySession.
+    Endpoints come from the providers in config.PROXY_PROVIDERS (or the ones passed in).
+    """
+    def __init__(self, providers:list[ProxyProvider]=None, lease_timeout:float=PROXY_LEASE_TIMEOUT):
         self.endpoint_lock = asyncio.Lock()
         self.endpoint_condition = asyncio.Condition(self.endpoint_lock)
         self.spider_manager_interface = self._create_spider_interface()
         self.session_manager_interface = self._create_session_interface()
-        self.endpoints = ProxyEndpoints(PROXY_USER, PROXY_PASS)
+        if providers is None:
+            providers = load_providers(PROXY_PROVIDERS)
+        self.endpoints = ProxyEndpoints(providers, lease_timeout)
+        self.health = ProxyHealthTracker(self.endpoints.sticky)
 
 
     def _create_session_interface(self) -> SessionProxyManagerInterface:
@@ -78,27 +89,47 @@ class ProxyManager:
         return SpiderProxyManagerInterface(proxy_manager=self) if PROXY else None
 
 
-    async def get_sticky_endpoint(self) -> str:
-        """Retrieve a sticky endpoint. If all endpoints are in use (in the self.endpoints.in_use set)
-        then this function will perform an async wait() until the resource has been freed.
+    def _reclaim_expired_leases(self):
+        """Take back sticky endpoints whose lease timed out, e.g. from a spider
+        that crashed without calling ProxySession.release(). Call with endpoint_lock held.
         """
+        for endpoint in self.endpoints.expired():
+            self.endpoints.release(endpoint)
+            self.health.release(endpoint)
+            logger.warning(f"Proxy {endpoint} lease expired after {self.endpoints.lease_timeout}s, reclaiming it")
+
+
+    async def get_sticky_endpoint(self) -> ProxyLease:
+        """Lease the healthiest free sticky endpoint (see ProxyHealthTracker). If all
+        endpoints are in use or resting this function will perform an async wait() until
+        one has been freed, a resting one's cooldown is up or a lease expires.
+        Raises ProxyEndpointNotFound if there are no sticky endpoints at all, 
+        instead of waiting for one forever.
+        """
+        if not self.endpoints.sticky:
+            raise ProxyEndpointNotFound("No sticky proxy endpoints, check config.PROXY_PROVIDERS")
         async with self.endpoint_condition:
             while True:
-                for endpoint in self.endpoints.sticky:
-                    if endpoint not in self.endpoints.in_use:
-                        self.endpoints.in_use.add(endpoint)
-                        return endpoint
-                await self.endpoint_condition.wait()
-
-
-    async def release_sticky_endpoint(self, endpoint:str):
-        """Release the sticky endpoint so that other ProxySessions can use it."""
+                self._reclaim_expired_leases()
+                endpoint = self.health.acquire()
+                if endpoint is not None:
+                    return self.endpoints.lease(endpoint)
+                timeouts = [t for t in (self.health.time_until_ready(), self.endpoints.time_until_expiry()) if t is not None]
+                try:
+                    await asyncio.wait_for(self.endpoint_condition.wait(), min(timeouts) if timeouts else None)
+                except asyncio.TimeoutError:
+                    pass
+
+
+    async def release_sticky_endpoint(self, endpoint:str, lease_id:int=None):
+        """Release the sticky endpoint so that other ProxySessions can use it.
+        A release for a lease that was already reclaimed is ignored.
+        """
         async with self.endpoint_lock:
-            try:
-                self.endpoints.in_use.remove(endpoint)
-            except KeyError as e:
-                logger.error(e)
-                raise e
+            if not self.endpoints.release(endpoint, lease_id):
+                logger.warning(f"Proxy {endpoint} released without a current lease (lease {lease_id} expired?)")
+                return
+            self.health.release(endpoint)
             self.endpoint_condition.notify()
 
 
@@ -108,13 +139,39 @@ class ProxyManager:
         Then create the ProxySession, passing in the
         manager interface object so that the proxy session can query/update the 
         proxy manager.
+        A stateful session falls back to a rotating endpoint when the providers 
+        have no sticky ones, and ProxyEndpointNotFound is raised when there are 
+        no endpoints at all.
         """
         if stateful:
-            endpoint = await self.get_sticky_endpoint()
-        else:
-            endpoint = self.endpoints.rotating
+            if self.endpoints.sticky:
+                lease = await self.get_sticky_endpoint()
+                return ProxySession(
+                    endpoint=self.endpoints.by_host[lease.host],
+                    manager_interface=self.session_manager_interface,
+                    lease_id=lease.lease_id,
+                )
+            logger.warning("No sticky proxy endpoints, stateful ProxySession is using a rotating endpoint")
+        endpoint = self.endpoints.rotating
+        if endpoint is None:
+            raise ProxyEndpointNotFound("No proxy endpoints, check config.PROXY_PROVIDERS")
         return ProxySession(
-            endpoint=f"http://{endpoint}",
+            endpoint=endpoint,
             manager_interface=self.session_manager_interface,
         )
-        
+
+
+    def metrics(self) -> dict:
+        """Snapshot of every endpoint's health, best first."""
+        return self.health.snapshot()
+
+
+    def log_metrics(self):
+        metrics = self.metrics()
+        logger.info(
+            f"Proxies: {metrics['requests']} requests, {metrics['errors']} errors, {metrics['bans']} bans, "
+            f"{metrics['resting']} cooling down, {metrics['quarantined']} quarantined, "
+            f"{len(self.endpoints.leases)} still leased"
+        )
+        for endpoint in metrics['endpoints'][:5]:
+            logger.debug(f"Proxy {endpoint['endpoint']}: {endpoint}")
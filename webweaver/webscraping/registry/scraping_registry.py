@@ -1,9 +1,11 @@
 from __future__ import annotations
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass
 from enum import Enum
-from asyncio import Lock
 import logging
-from typing import Optional
+from typing import Awaitable, Callable, Iterator, Optional
 # from tortoise.exceptions import DoesNotExist
 from webweaver.webscraping.registry.builders import CampaignBuilder, SoloSpiderBuilder
 from webweaver.webscraping.campaigns.models import Campaign, ScrapeJob
@@ -11,10 +13,10 @@ from webweaver.webscraping.spiders.models import SpiderAsset, ScrapeModuleTable
 
 
 logger = logging.getLogger('scraping')
-lock = Lock()
 
 
 class SpiderState(Enum):
+    QUEUED = "QUEUED"  # distributed scrapes: waiting for a worker
     RUNNING = "RUNNING"
     COMPLETE = "COMPLETE"
     ERROR = "ERROR"
@@ -33,6 +35,11 @@ class ScrapingRegistry:
     to stop scraping, it can inform the spider by updating the spider's state in the ScrapingRegistry. 
     The Spider can check this state periodically as it scrapes.
 
+    Every scrape job gets its own ScrapingRegistry, made current for the job's
+    tasks with use_registry(). Code running inside the job finds it with
+    get_registry() (or the scraping_registry stand-in), so several jobs can run
+    in one process.
+
     Example self.registry:
     {
         1: SpiderRegistryItem(spider_asset=ABCSpider, params={"search":"bakeries, NY"}, SpiderState.RUNNING)
@@ -40,18 +47,27 @@ class ScrapingRegistry:
     }
     -The keys (ints) are the SpiderAsset IDs. The values are the SpiderAssets and their states.
     -Spider's check_state() method checks the state and Pipeline's update_state() updates it.
+    State reads and writes are plain attribute access on the job's own registry, no lock needed.
+    -progress counts records as they go through the job (records_scraped, records_saved...), 
+    for the job status endpoint.
+    -on_state_change, if set, is awaited with (spider_id, state) on every state change. The arq
+    worker uses it to report shard states back to the job's JobStateStore.
     """
-    registry: dict[int, SpiderRegistryItem] = {}
-    campaign: Optional[Campaign] = None
-    scrape_job: Optional[ScrapeJob] = None
-    spiders: list[SpiderAsset] = None
-    scrape_table_names:list[str] = []
-    scrape_table_models:list[ScrapeModuleTable] = []
+    def __init__(self):
+        self.registry: dict[int, SpiderRegistryItem] = {}
+        self.campaign: Optional[Campaign] = None
+        self.scrape_job: Optional[ScrapeJob] = None
+        self.spiders: list[SpiderAsset] = None
+        self.scrape_table_names:list[str] = []
+        self.scrape_table_models:list[ScrapeModuleTable] = []
+        self.progress:Counter = Counter()
+        self.on_state_change:Optional[Callable[[int, SpiderState], Awaitable]] = None
 
     async def build(self,
             campaign_builder: CampaignBuilder = None,
             solospider_builder: SoloSpiderBuilder = None,
     ):
+        self.progress = Counter()
         if campaign_builder:
             self.add_campaign(campaign_builder.campaign)
             self.add_scrape_job(campaign_builder.scrape_job)
@@ -163,12 +179,12 @@ class ScrapingRegistry:
         """When a spider causes pipeline errors, the pipeline listener can
         set the spider's state the ERROR to stop webscraping from proceeding.
         """
-        async with lock:
-            self._get_sri(spider_id).state = SpiderState.ERROR
+        await self.set_spider_state(spider_id, SpiderState.ERROR)
 
     async def set_spider_state(self, spider_id: int, state: SpiderState):
-        async with lock:
-            self._get_sri(spider_id).state = state
+        self._get_sri(spider_id).state = state
+        if self.on_state_change is not None:
+            await self.on_state_change(spider_id, state)
 
     def get_spider_name(self, spider_id: int) -> str:
         return self._get_sri(spider_id).spider_asset.spider_name
@@ -176,6 +192,10 @@ class ScrapingRegistry:
     def get_spider_state(self, spider_id: int) -> SpiderState:
         return self._get_sri(spider_id).state
 
+    def count(self, name:str, amount:int=1):
+        """Adds to one of the job's progress counters."""
+        self.progress[name] += amount
+
 
     async def roll_back(self):
         """Deletes the ScrapeJob (and all associated scraped data!) 
@@ -193,11 +213,10 @@ class ScrapingRegistry:
         Increase the scrape_finish_count of all the tables, 
         and clear the registry.
         """
-        async with lock:
-            # await self.increase_scrape_count(scrape_finished=True)
-            self.clear()
-            logger.info("Scraping successful")
-            logger.info("Scraping registry cleared")
+        # await self.increase_scrape_count(scrape_finished=True)
+        self.clear()
+        logger.info("Scraping successful")
+        logger.info("Scraping registry cleared")
 
 
     def clear(self):
@@ -208,7 +227,44 @@ class ScrapingRegistry:
         self.spiders = None
         self.scrape_table_names = []
         self.scrape_table_models = []
+        self.progress = Counter()
+        self.on_state_change = None
         return
 
 
-scraping_registry = ScrapingRegistry()
+
+current_registry:ContextVar[ScrapingRegistry] = ContextVar('current_registry')
+default_registry = ScrapingRegistry()  # used outside of any scrape job, e.g. scripts and the shell
+
+
+def get_registry() -> ScrapingRegistry:
+    """The ScrapingRegistry of the scrape job running in this context."""
+    return current_registry.get(default_registry)
+
+
+@contextmanager
+def use_registry(registry:ScrapingRegistry) -> Iterator[ScrapingRegistry]:
+    """Makes the registry current for the block. Tasks created inside it (the
+    SpiderLauncher's spiders, the pipeline workers...) copy the context, so they
+    keep seeing this registry.
+    """
+    token = current_registry.set(registry)
+    try:
+        yield registry
+    finally:
+        current_registry.reset(token)
+
+
+class CurrentScrapingRegistry:
+    """Stand-in for the old process-wide scraping_registry: every attribute is
+    looked up on get_registry(), so `scraping_registry.x` follows the job it's
+    called from.
+    """
+    def __getattr__(self, name:str):
+        return getattr(get_registry(), name)
+
+    def __setattr__(self, name:str, value):
+        setattr(get_registry(), name, value)
+
+
+scraping_registry = CurrentScrapingRegistry()
@@ -0,0 +1,86 @@
+import aiohttp
+import logging
+
+from webweaver.config import (
+    AIOHTTP_CONNECTION_LIMIT,
+    AIOHTTP_LIMIT_PER_HOST,
+    AIOHTTP_DNS_CACHE_TTL,
+    AIOHTTP_KEEPALIVE_TIMEOUT,
+)
+
+
+logger = logging.getLogger("scraping")
+
+
+class AiohttpSessionManager:
+    """Process-wide owner of the aiohttp ClientSession shared by every spider.
+
+    One tuned TCPConnector means spiders reuse keep-alive connections (no new
+    TCP+TLS handshake per request), share a DNS cache resolved through aiodns, 
+    and respect a per-host connection limit.
+
+    SpiderLauncher calls open() when it starts and close() when it finishes.
+    Launches are counted, so the session is only closed once the last 
+    SpiderLauncher using it has finished.
+    """
+    def __init__(
+            self,
+            limit:int=AIOHTTP_CONNECTION_LIMIT,
+            limit_per_host:int=AIOHTTP_LIMIT_PER_HOST,
+            dns_cache_ttl:int=AIOHTTP_DNS_CACHE_TTL,
+            keepalive_timeout:float=AIOHTTP_KEEPALIVE_TIMEOUT,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self._session:aiohttp.ClientSession|None = None
+        self._users = 0
+
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        """Creates the ClientSession and its TCPConnector. Must be called 
+        from within the running event loop.
+        """
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl,
+            resolver=aiohttp.AsyncResolver(),
+            keepalive_timeout=self.keepalive_timeout,
+            enable_cleanup_closed=True,
+        )
+        logger.debug(f"aiohttp session created (limit={self.limit}, limit_per_host={self.limit_per_host})")
+        return aiohttp.ClientSession(connector=connector)
+
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """The shared ClientSession, created on first use."""
+        if self._session is None or self._session.closed:
+            self._session = self._create_session()
+        return self._session
+
+
+    async def open(self) -> aiohttp.ClientSession:
+        """Registers a new user of the shared session."""
+        self._users += 1
+        return self.session
+
+
+    async def close(self, force:bool=False):
+        """Unregisters a user of the shared session, closing it once nobody
+        is using it anymore (or immediately if force=True).
+        """
+        self._users = max(self._users - 1, 0)
+        if self._users > 0 and not force:
+            return
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.debug("aiohttp session closed")
+        self._session = None
+        self._users = 0
+
+
+aiohttp_session_manager = AiohttpSessionManager()
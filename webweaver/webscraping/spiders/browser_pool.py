@@ -0,0 +1,290 @@
+import asyncio
+from dataclasses import dataclass, field
+import logging
+
+from playwright._impl._api_types import Error as PlaywrightError
+from playwright.async_api import Browser, BrowserContext, Page
+from playwright.async_api._generated import Playwright as AsyncPlaywright
+
+from webweaver.config import (
+    BROWSER_POOL_SIZE,
+    BROWSER_MAX_PAGES,
+    BROWSER_CONTEXT_MAX_USES,
+    BROWSER_MAX_CONTEXTS,
+    BROWSER_MAX_IDLE_CONTEXTS,
+)
+
+
+logger = logging.getLogger("scraping")
+
+
+BrowserKey = tuple[str, bool]  # (browser type, headless)
+
+
+@dataclass(eq=False)
+class PooledBrowser:
+    """A browser owned by the BrowserPool, plus the counters used to decide
+    when it gets recycled.
+    """
+    browser:Browser
+    key:BrowserKey
+    open_contexts:int = 0
+    contexts_created:int = 0
+    is_alive:bool = True
+    is_retired:bool = False
+
+
+@dataclass(eq=False)
+class ContextLease:
+    """A BrowserContext leased out of the BrowserPool. The context is bound to
+    the proxy endpoint it was created with, so it only ever gets leased again
+    to a spider asking for that same endpoint.
+    """
+    context:BrowserContext
+    pooled_browser:PooledBrowser
+    proxy_endpoint:str|None
+    uses:int = 0
+    is_crashed:bool = False
+    pages:set[Page] = field(default_factory=set)
+
+    @property
+    def is_usable(self) -> bool:
+        return self.pooled_browser.is_alive and not self.is_crashed
+
+
+class BrowserPool:
+    """Shares a handful of Playwright browsers between every PlaywrightSpider
+    instead of each spider launching its own Chromium.
+
+    SpiderLauncher owns the pool. Spiders lease BrowserContexts from it
+    (bound to a proxy endpoint) and open pages through it. Total open pages are
+    capped across all browsers. A released context is cleared and reused until
+    it hits max_context_uses, and a browser is retired after creating
+    max_browser_contexts contexts. If a page or browser crashes its contexts
+    are thrown away instead of reused.
+    """
+    def __init__(
+            self,
+            p:AsyncPlaywright,
+            browser_count:int=BROWSER_POOL_SIZE,
+            max_pages:int=BROWSER_MAX_PAGES,
+            max_context_uses:int=BROWSER_CONTEXT_MAX_USES,
+            max_browser_contexts:int=BROWSER_MAX_CONTEXTS,
+            max_idle_contexts:int=BROWSER_MAX_IDLE_CONTEXTS,
+    ):
+        self.p = p
+        self.browser_count = browser_count
+        self.max_pages = max_pages
+        self.max_context_uses = max_context_uses
+        self.max_browser_contexts = max_browser_contexts
+        self.max_idle_contexts = max_idle_contexts
+        self.browsers:dict[BrowserKey, list[PooledBrowser]] = {}
+        self.idle_contexts:dict[tuple[BrowserKey, str|None], list[ContextLease]] = {}
+        self.page_slots = asyncio.Semaphore(max_pages)
+        self.open_pages:dict[Page, ContextLease] = {}
+        self.lock = asyncio.Lock()
+        self.is_closed = False
+
+
+    @staticmethod
+    def browser_key(browser_type:str, headless:bool) -> BrowserKey:
+        """Anything other than firefox or webkit gets chromium, same as
+        PlaywrightSpider.start() always did.
+        """
+        if browser_type not in ('firefox', 'webkit'):
+            browser_type = 'chromium'
+        return (browser_type, headless)
+
+
+    @property
+    def idle_count(self) -> int:
+        return sum(len(leases) for leases in self.idle_contexts.values())
+
+
+    async def _launch_browser(self, key:BrowserKey) -> PooledBrowser:
+        browser_type, headless = key
+        browser = await getattr(self.p, browser_type).launch(headless=headless)
+        pooled_browser = PooledBrowser(browser=browser, key=key)
+        browser.on("disconnected", lambda _: self._browser_disconnected(pooled_browser))
+        self.browsers.setdefault(key, []).append(pooled_browser)
+        logger.debug(f"BrowserPool launched {browser_type} (headless={headless})")
+        return pooled_browser
+
+
+    async def _get_browser(self, key:BrowserKey) -> PooledBrowser:
+        """Returns the least busy browser for this key, launching a new one
+        if we're still under browser_count. Call while holding self.lock.
+        """
+        browsers = [
+            b for b in self.browsers.get(key, []) if b.is_alive and not b.is_retired
+        ]
+        if len(browsers) < self.browser_count:
+            return await self._launch_browser(key)
+        return min(browsers, key=lambda b: b.open_contexts)
+
+
+    def _browser_disconnected(self, pooled_browser:PooledBrowser):
+        """Browser crashed or was closed. Forget it and free up its page slots."""
+        if not pooled_browser.is_alive:
+            return
+        pooled_browser.is_alive = False
+        browsers = self.browsers.get(pooled_browser.key, [])
+        if pooled_browser in browsers:
+            browsers.remove(pooled_browser)
+        for page, lease in list(self.open_pages.items()):
+            if lease.pooled_browser is pooled_browser:
+                self._page_closed(page)
+        if not self.is_closed and not pooled_browser.is_retired:
+            logger.warning(f"BrowserPool: {pooled_browser.key[0]} browser disconnected")
+
+
+    async def lease_context(
+            self,
+            browser_type:str='chromium',
+            headless:bool=True,
+            proxy_endpoint:str|None=None,
+            **context_kwargs,
+    ) -> ContextLease:
+        """Leases a BrowserContext bound to proxy_endpoint. An idle context
+        with the same browser and endpoint is reused when there is one,
+        otherwise a new context is created with context_kwargs.
+        """
+        key = self.browser_key(browser_type, headless)
+        discarded:list[ContextLease] = []
+        try:
+            async with self.lock:
+                idle = self.idle_contexts.get((key, proxy_endpoint), [])
+                while idle:
+                    lease = idle.pop()
+                    if lease.is_usable:
+                        return lease
+                    discarded.append(lease)
+                pooled_browser = await self._get_browser(key)
+                pooled_browser.open_contexts += 1
+                pooled_browser.contexts_created += 1
+                if pooled_browser.contexts_created >= self.max_browser_contexts:
+                    pooled_browser.is_retired = True
+                    # its idle contexts (maybe for endpoints nobody asks for again) would keep it open forever
+                    discarded.extend(self._take_idle_contexts(pooled_browser))
+        finally:
+            for lease in discarded:
+                await self._close_context(lease)
+        try:
+            context = await pooled_browser.browser.new_context(**context_kwargs)
+        except PlaywrightError:
+            await self._context_closed(pooled_browser)
+            raise
+        return ContextLease(
+            context=context,
+            pooled_browser=pooled_browser,
+            proxy_endpoint=proxy_endpoint,
+        )
+
+
+    async def release_context(self, lease:ContextLease, crashed:bool=False):
+        """Returns a leased context to the pool. Its pages are closed and
+        cookies cleared. If it's crashed, used up, or its browser is being
+        recycled, the context gets closed instead.
+        """
+        lease.uses += 1
+        lease.is_crashed = lease.is_crashed or crashed
+        recycle = (
+            not lease.is_usable
+            or lease.pooled_browser.is_retired
+            or lease.uses >= self.max_context_uses
+            or self.idle_count >= self.max_idle_contexts
+            or self.is_closed
+        )
+        if not recycle:
+            try:
+                for page in list(lease.pages):
+                    await page.close()
+                await lease.context.clear_cookies()
+            except PlaywrightError:
+                recycle = True
+        if recycle:
+            await self._close_context(lease)
+            return
+        key = (lease.pooled_browser.key, lease.proxy_endpoint)
+        self.idle_contexts.setdefault(key, []).append(lease)
+
+
+    def _take_idle_contexts(self, pooled_browser:PooledBrowser) -> list[ContextLease]:
+        """Removes the browser's idle contexts from the pool and returns them."""
+        taken = []
+        for key, leases in list(self.idle_contexts.items()):
+            taken.extend(l for l in leases if l.pooled_browser is pooled_browser)
+            self.idle_contexts[key] = [l for l in leases if l.pooled_browser is not pooled_browser]
+        return taken
+
+
+    async def _close_context(self, lease:ContextLease):
+        try:
+            await lease.context.close()
+        except PlaywrightError:
+            pass  # browser is already gone
+        for page in list(lease.pages):
+            self._page_closed(page)
+        await self._context_closed(lease.pooled_browser)
+
+
+    async def _context_closed(self, pooled_browser:PooledBrowser):
+        """Closes a retired browser once its last context is gone."""
+        pooled_browser.open_contexts = max(pooled_browser.open_contexts - 1, 0)
+        if pooled_browser.is_retired and pooled_browser.open_contexts == 0:
+            await self._close_browser(pooled_browser)
+
+
+    async def _close_browser(self, pooled_browser:PooledBrowser):
+        self._take_idle_contexts(pooled_browser)
+        try:
+            await pooled_browser.browser.close()
+        except PlaywrightError:
+            pass
+        self._browser_disconnected(pooled_browser)
+        logger.debug(f"BrowserPool recycled {pooled_browser.key[0]} browser after {pooled_browser.contexts_created} contexts")
+
+
+    async def new_page(self, lease:ContextLease) -> Page:
+        """Opens a page in a leased context. Waits here if the pool is already
+        at max_pages open pages.
+        """
+        await self.page_slots.acquire()
+        try:
+            page = await lease.context.new_page()
+        except PlaywrightError:
+            self.page_slots.release()
+            lease.is_crashed = True
+            raise
+        self.open_pages[page] = lease
+        lease.pages.add(page)
+        page.once("close", lambda page: self._page_closed(page))
+        page.once("crash", lambda page: self._page_crashed(page))
+        return page
+
+
+    def _page_closed(self, page:Page):
+        lease = self.open_pages.pop(page, None)
+        if lease is not None:
+            lease.pages.discard(page)
+            self.page_slots.release()
+
+
+    def _page_crashed(self, page:Page):
+        lease = self.open_pages.get(page)
+        if lease is not None:
+            logger.warning(f"BrowserPool: page crashed ({page.url})")
+            lease.is_crashed = True
+
+
+    async def close(self):
+        """Closes every browser in the pool. Called by SpiderLauncher before
+        Playwright is stopped.
+        """
+        self.is_closed = True
+        for browsers in list(self.browsers.values()):
+            for pooled_browser in list(browsers):
+                pooled_browser.is_retired = True
+                await self._close_browser(pooled_browser)
+        self.idle_contexts.clear()
+        logger.debug("BrowserPool closed")
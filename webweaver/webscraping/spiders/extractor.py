@@ -0,0 +1,250 @@
+from functools import lru_cache
+import logging
+import re
+from typing import Any, Callable
+
+from cssselect import HTMLTranslator, SelectorError
+from lxml import etree
+import lxml.html
+
+from webweaver.exceptions import BadMarkupError
+
+
+logger = logging.getLogger('scraping')
+
+
+translator = HTMLTranslator()
+
+
+@lru_cache(maxsize=None)
+def compile_selector(selector:str, first:bool=False) -> etree.XPath:
+    """CSS selector -> compiled XPath, matching like SpiderTag.select() does:
+    descendants of the element it's run on, in document order. first=True
+    only keeps the first match, like select_one().
+    """
+    try:
+        xpath = translator.css_to_xpath(selector, prefix='descendant::')
+    except SelectorError as e:
+        raise ValueError(f"Can't compile selector '{selector}': {e}") from e
+    if first:
+        xpath = f"({xpath})[1]"
+    return etree.XPath(xpath)
+
+
+# bs4 keeps the text of these as Script/Stylesheet/TemplateString, which get_text() leaves out
+UNTEXTED_TAGS = ('script', 'style', 'template')
+text_nodes = etree.XPath(
+    f".//text()[not({' or '.join(f'ancestor::{tag}' for tag in UNTEXTED_TAGS)})]",
+    smart_strings=False,
+)
+
+
+def get_text(element, separator:str="", strip:bool=False) -> str:
+    """BeautifulSoup's get_text() for lxml elements. Comments and the contents
+    of script/style/template tags are skipped, like bs4 does (unless the 
+    element is one of those).
+    """
+    strings = element.itertext() if element.tag in UNTEXTED_TAGS else text_nodes(element)
+    if not separator and not strip:
+        return "".join(strings)
+    if strip:
+        strings = (string.strip() for string in strings)
+        strings = (string for string in strings if string)
+    return separator.join(strings)
+
+
+class Field:
+    """One value of a record. selector is a CSS selector relative to the row
+    (or the document when the Extractor has no rows), None for the row itself.
+
+    Missing elements give default. So do blank values unless keep_blank, like
+    SpiderTag.select_one_text() and select_one_attr() turn '' into None.
+    convert is called on the value when it isn't the default.
+    """
+    first = True
+
+    def __init__(
+            self,
+            selector:str|None,
+            default:Any=None,
+            keep_blank:bool=False,
+            convert:Callable[[Any], Any]|None=None,
+    ):
+        self.selector = selector
+        self.default = default
+        self.keep_blank = keep_blank
+        self.convert = convert
+        self.name:str = None
+        self.xpath = compile_selector(selector, self.first) if selector is not None else None
+
+    def __set_name__(self, owner, name:str):
+        self.name = name
+
+    def elements(self, row) -> list:
+        return self.xpath(row) if self.xpath is not None else [row]
+
+    def value(self, element) -> Any:
+        raise NotImplementedError
+
+    def extract(self, row) -> Any:
+        elements = self.elements(row)
+        if not elements:
+            return self.default
+        value = self.value(elements[0])
+        return self.finish(value)
+
+    def finish(self, value:Any) -> Any:
+        if value is None or (value == '' and not self.keep_blank):
+            return self.default
+        if self.convert is not None:
+            value = self.convert(value)
+            if value is None or (value == '' and not self.keep_blank):
+                return self.default
+        return value
+
+
+class Text(Field):
+    """The element's text, get_text(separator, strip) style. Text(selector) is
+    SpiderTag.select_one_text(), Text(selector, keep_blank=True, default=x) is
+    spider_text(selector, x).
+    """
+    def __init__(self, selector:str|None, default:Any=None, separator:str="", strip:bool=False, **kwargs):
+        super().__init__(selector, default, **kwargs)
+        self.separator = separator
+        self.strip = strip
+
+    def value(self, element) -> str:
+        return get_text(element, self.separator, self.strip)
+
+
+class Attr(Field):
+    """An attribute of the element, select_one_attr(selector, attr, strip_text)
+    style. A missing attribute gives default too.
+    """
+    def __init__(self, selector:str|None, attr:str, default:Any=None, strip_text:str=None, **kwargs):
+        super().__init__(selector, default, **kwargs)
+        self.attr = attr
+        self.strip_text = strip_text
+
+    def value(self, element) -> str|None:
+        value = element.get(self.attr)
+        if value is not None and self.strip_text:
+            value = value.replace(self.strip_text, '')
+        return value
+
+
+class Exists(Field):
+    """True if the selector matches anything, bool(select_one(selector))."""
+    def __init__(self, selector:str):
+        super().__init__(selector, default=False)
+
+    def extract(self, row) -> bool:
+        return bool(self.elements(row))
+
+
+class TextList(Text):
+    """Text of every match, [e.text for e in select(selector)]. Blank ones are
+    left out unless keep_blank.
+    """
+    first = False
+
+    def extract(self, row) -> list:
+        values = (self.finish(self.value(element)) for element in self.elements(row))
+        return [value for value in values if value is not None]
+
+
+class Hrefs(Field):
+    """get_hrefs(substring, regex_pattern): the href of every <a> matching."""
+    first = False
+
+    def __init__(self, selector:str='a[href]', substring:str=None, regex_pattern:re.Pattern=None):
+        super().__init__(selector, default=None)
+        self.substring = substring
+        self.regex_pattern = regex_pattern
+
+    def extract(self, row) -> list[str]:
+        hrefs = [element.get('href') for element in self.elements(row) if element.get('href') is not None]
+        if self.substring:
+            hrefs = [href for href in hrefs if self.substring in href]
+        elif self.regex_pattern:
+            hrefs = [href for href in hrefs if self.regex_pattern.search(href)]
+        return hrefs
+
+
+class Nested(Field):
+    """Records of another Extractor, one per match of its rows selector
+    within this row. E.g. an event's organizers.
+    """
+    first = False
+
+    def __init__(self, extractor:type["Extractor"]):
+        super().__init__(extractor.rows, default=None)
+        self.extractor = extractor
+
+    def extract(self, row) -> list[dict]:
+        return [self.extractor.extract_row(element) for element in self.elements(row)]
+
+
+class Extractor:
+    """Declarative alternative to picking values out of a SpiderSoup one
+    select_one() at a time. Fields are declared on the class, usually with the
+    spider's Selectors class:
+
+        class FastcoTireRow(Extractor):
+            rows = FastcoSelectors.product_rows
+            product_code = Text(FastcoSelectors.tire_product_code)
+            cost = Attr(FastcoSelectors.tire_msrp, 'data-original-title')
+
+        FastcoTireRow.extract(markup)  # -> [{'product_code': ..., 'cost': ...}, ...]
+
+    Every selector is compiled to an lxml XPath once, when the class is
+    defined, and a row is a straight pass over the fields on the lxml tree, no
+    BeautifulSoup tree and no CSS matching at scrape time. Without rows,
+    extract() returns a single dict for the whole document.
+
+    Extractor classes are module level and return plain dicts, so
+    Spider.extract() can run them in the parse pool.
+    """
+    rows:str|None = None
+    fields:dict[str, Field] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        fields = {}
+        for klass in reversed(cls.__mro__):
+            for name, value in vars(klass).items():
+                if isinstance(value, Field):
+                    fields[name] = value
+        cls.fields = fields
+        cls.rows_xpath = compile_selector(cls.rows) if cls.rows is not None else None
+
+
+    @staticmethod
+    def parse(markup:str|bytes, spider_name:str=None):
+        """The lxml document for markup. Raises BadMarkupError like SpiderSoup."""
+        try:
+            return lxml.html.document_fromstring(markup)
+        except (etree.ParserError, ValueError) as e:
+            raise BadMarkupError(spider_name or "Extractor", str(e))
+
+
+    @classmethod
+    def extract_row(cls, row) -> dict:
+        return {name: field.extract(row) for name, field in cls.fields.items()}
+
+
+    @classmethod
+    def extract_tree(cls, root) -> list[dict]|dict:
+        if cls.rows_xpath is None:
+            return cls.extract_row(root)
+        return [cls.extract_row(row) for row in cls.rows_xpath(root)]
+
+
+    @classmethod
+    def extract(cls, markup:str|bytes, spider_name:str=None) -> list[dict]|dict:
+        return cls.extract_tree(cls.parse(markup, spider_name))
+
+
+def run_extractor(extractor:type[Extractor], spider_name:str, markup:str|bytes) -> list[dict]|dict:
+    """Runs in a parse pool worker, see Spider.extract()."""
+    return extractor.extract(markup, spider_name)
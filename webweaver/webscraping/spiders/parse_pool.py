@@ -0,0 +1,112 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import logging
+import multiprocessing
+from typing import Any, Callable
+
+from webweaver.config import PARSE_POOL_WORKERS, PARSE_POOL_INLINE_BELOW, PARSE_POOL_START_METHOD
+from webweaver.webscraping.spiders.soup_base import SpiderSoup
+
+
+logger = logging.getLogger("scraping")
+
+
+Extract = Callable[..., Any]  # extract(soup:SpiderSoup, **kwargs) -> plain data
+
+
+def parse_and_extract(extract:Extract, spider_name:str, markup:str|bytes, kwargs:dict) -> Any:
+    """Runs in a worker process: builds the SpiderSoup and hands it to extract().
+    Only extract's return value goes back to the spider, never the soup.
+    """
+    soup = SpiderSoup(spider_name=spider_name, markup=markup, features='lxml')
+    return extract(soup, **kwargs)
+
+
+class ParsePoolManager:
+    """Process-wide owner of the ProcessPoolExecutor that spiders parse HTML in.
+
+    BeautifulSoup/lxml parsing is CPU bound and holds the GIL, so a big page
+    parsed on the event loop (a 1000 row Fastco product table) stalls every
+    other spider's I/O for as long as it takes. Spider.parse() sends the markup
+    and an extract function to a worker process instead and awaits the result.
+
+    extract functions have to be module level (they're pickled by reference)
+    and return plain data, dicts/lists/str. Markup shorter than inline_below
+    is parsed on the loop, pickling it back and forth would cost more.
+
+    SpiderLauncher calls open() when it starts and close() when it finishes,
+    same as the AiohttpSessionManager. The pool is started on first use.
+    """
+    def __init__(
+            self,
+            workers:int=PARSE_POOL_WORKERS,
+            inline_below:int=PARSE_POOL_INLINE_BELOW,
+            start_method:str=PARSE_POOL_START_METHOD,
+    ):
+        self.workers = workers
+        self.inline_below = inline_below
+        self.start_method = start_method
+        self._executor:ProcessPoolExecutor|None = None
+        self._users = 0
+
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn, not fork: forking a process that runs playwright/aiohttp threads is asking for trouble
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context(self.start_method),
+            )
+            logger.debug(f"Parse pool started ({self.workers} workers)")
+        return self._executor
+
+
+    async def run(self, extract:Extract, spider_name:str, markup:str|bytes, **kwargs) -> Any:
+        """extract(SpiderSoup(markup), **kwargs), in a worker process if the
+        markup is big enough to be worth it. Raises BadMarkupError like SpiderSoup.
+        """
+        return await self.call(len(markup), parse_and_extract, extract, spider_name, markup, kwargs)
+
+
+    async def call(self, size:int, func:Callable, *args) -> Any:
+        """func(*args) in a worker process, or right here if size (of the
+        markup func parses) is under inline_below.
+        """
+        if self.workers < 1 or size < self.inline_below:
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.executor, func, *args)
+        except BrokenProcessPool as e:
+            # a worker died (OOM killer...). Start a fresh pool next time, parse this one here.
+            logger.warning(f"Parse pool broken, running {func.__name__} inline: {e!r}")
+            self._shutdown()
+            return func(*args)
+
+
+    async def open(self):
+        """Registers a new user of the pool."""
+        self._users += 1
+
+
+    async def close(self, force:bool=False):
+        """Unregisters a user of the pool, shutting it down once nobody is
+        using it anymore (or immediately if force=True).
+        """
+        self._users = max(self._users - 1, 0)
+        if self._users > 0 and not force:
+            return
+        self._shutdown()
+        self._users = 0
+
+
+    def _shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            logger.debug("Parse pool shut down")
+
+
+parse_pool = ParsePoolManager()
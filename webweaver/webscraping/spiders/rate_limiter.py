@@ -0,0 +1,256 @@
+import asyncio
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import email.utils
+import json
+import logging
+import os
+import time
+from urllib.parse import urlparse
+
+try:
+    import fcntl
+except ImportError:  # Windows, saves just aren't locked
+    fcntl = None
+
+from webweaver.config import (
+    RATE_LIMIT_STATE_PATH,
+    RATE_LIMIT_INITIAL,
+    RATE_LIMIT_MIN,
+    RATE_LIMIT_MAX,
+    RATE_LIMIT_BURST,
+    RATE_LIMIT_INCREASE,
+    RATE_LIMIT_SUCCESS_WINDOW,
+    RATE_LIMIT_DECREASE,
+)
+
+
+logger = logging.getLogger("scraping")
+
+
+THROTTLE_STATUS_CODES = frozenset({429, 503})
+
+
+def parse_retry_after(value:str|None) -> float|None:
+    """Seconds to wait from a Retry-After header (either seconds or an HTTP-date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_time = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_time.tzinfo is None:
+        retry_time = retry_time.replace(tzinfo=timezone.utc)
+    return max((retry_time - datetime.now(timezone.utc)).total_seconds(), 0)
+
+
+@contextmanager
+def locked(path:str):
+    """Exclusive lock on `path`.lock for a read-modify-write of `path`, so
+    concurrent runs don't overwrite each other's saves.
+    """
+    with open(f"{path}.lock", 'w') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class TokenBucket:
+    """Token bucket refilling at `rate` tokens/second, holding at most `burst`.
+    Tokens are reserved up front (the count can go negative), so concurrent
+    callers queue up one token apart instead of all waking at once.
+    """
+    def __init__(self, rate:float, burst:int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+
+    def reserve(self) -> float:
+        """Takes a token and returns how many seconds to wait before using it."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0
+        return -self.tokens / self.rate
+
+
+class DomainRate:
+    """A domain's bucket plus the AIMD state driving its rate. A domain with no
+    rate yet has no bucket and isn't limited at all, the requests it lets
+    through are counted so the first 429/503 can start from the rate we were
+    actually going at.
+    """
+    def __init__(self, rate:float|None, burst:int):
+        self.burst = burst
+        self.bucket = TokenBucket(rate, burst) if rate is not None else None
+        self.successes = 0
+        self.blocked_until = 0.0
+        self.throttled = 0
+        self.started = time.monotonic()
+        self.requests = 0
+
+    @property
+    def rate(self) -> float|None:
+        return self.bucket.rate if self.bucket is not None else None
+
+    @rate.setter
+    def rate(self, value:float):
+        if self.bucket is None:
+            self.bucket = TokenBucket(value, self.burst)
+        else:
+            self.bucket.rate = value
+
+    @property
+    def observed_rate(self) -> float:
+        """Requests/second let through so far, at least over the first second."""
+        return self.requests / max(time.monotonic() - self.started, 1.0)
+
+
+class AdaptiveRateLimiter:
+    """Per-domain token buckets whose rates adapt to how the site responds (AIMD):
+        -every `success_window` successful responses in a row adds `increase` req/s,
+        -a 429/503 multiplies the rate by `decrease`, and a Retry-After header
+        pauses the whole domain until it's up.
+
+    With `initial_rate` None (the default) a new domain isn't limited until it
+    first throttles us, its rate then starts at `decrease` times the rate we
+    were going at.
+
+    Learned rates are merged into `state_path` at the end of a run and used as
+    the starting rates next time, so we don't have to re-learn them every run.
+    The SpiderScheduler owns the limiter and every request slot acquires from it.
+    """
+    def __init__(
+            self,
+            state_path:str=RATE_LIMIT_STATE_PATH,
+            initial_rate:float|None=RATE_LIMIT_INITIAL,
+            min_rate:float=RATE_LIMIT_MIN,
+            max_rate:float=RATE_LIMIT_MAX,
+            burst:int=RATE_LIMIT_BURST,
+            increase:float=RATE_LIMIT_INCREASE,
+            success_window:int=RATE_LIMIT_SUCCESS_WINDOW,
+            decrease:float=RATE_LIMIT_DECREASE,
+    ):
+        self.state_path = state_path
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.success_window = success_window
+        self.decrease = decrease
+        self.domains:dict[str, DomainRate] = {}
+        self.learned_rates:dict[str, float] = self.load()
+
+
+    @staticmethod
+    def get_domain(url:str) -> str:
+        domain = urlparse(url).netloc.lower()
+        return domain[4:] if domain.startswith("www.") else domain
+
+
+    def get_domain_rate(self, domain:str) -> DomainRate:
+        domain_rate = self.domains.get(domain)
+        if domain_rate is None:
+            rate = self.learned_rates.get(domain, self.initial_rate)
+            domain_rate = DomainRate(self.clamp(rate) if rate is not None else None, self.burst)
+            self.domains[domain] = domain_rate
+        return domain_rate
+
+
+    def clamp(self, rate:float) -> float:
+        return min(max(rate, self.min_rate), self.max_rate)
+
+
+    async def acquire(self, url:str):
+        """Waits until the URL's domain is allowed another request."""
+        domain_rate = self.get_domain_rate(self.get_domain(url))
+        blocked_for = domain_rate.blocked_until - time.monotonic()
+        while blocked_for > 0:
+            await asyncio.sleep(blocked_for)
+            blocked_for = domain_rate.blocked_until - time.monotonic()
+        if domain_rate.bucket is None:
+            domain_rate.requests += 1
+            return
+        wait = domain_rate.bucket.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+    def record(self, url:str, status:int, retry_after:str|None=None):
+        """Feeds a response's status code back into the domain's rate."""
+        domain = self.get_domain(url)
+        domain_rate = self.get_domain_rate(domain)
+        if status in THROTTLE_STATUS_CODES:
+            domain_rate.successes = 0
+            domain_rate.throttled += 1
+            previous = domain_rate.rate if domain_rate.rate is not None else domain_rate.observed_rate
+            domain_rate.rate = self.clamp(previous * self.decrease)
+            logger.warning(f"{domain} throttled us ({status}), rate {previous:.2f} -> {domain_rate.rate:.2f} req/s")
+            self.pause(url, parse_retry_after(retry_after))
+        elif status < 400 and domain_rate.rate is not None:
+            domain_rate.successes += 1
+            if domain_rate.successes >= self.success_window:
+                domain_rate.successes = 0
+                domain_rate.rate = min(self.max_rate, domain_rate.rate + self.increase)
+
+
+    def pause(self, url:str, seconds:float|None):
+        """Stops all requests to the URL's domain for `seconds`."""
+        if not seconds:
+            return
+        domain_rate = self.get_domain_rate(self.get_domain(url))
+        domain_rate.blocked_until = max(domain_rate.blocked_until, time.monotonic() + seconds)
+
+
+    def load(self) -> dict[str, float]:
+        return self.read_rates(self.state_path)
+
+
+    @staticmethod
+    def read_rates(state_path:str) -> dict[str, float]:
+        try:
+            with open(state_path) as f:
+                rates = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"AdaptiveRateLimiter could not load {state_path}: {e}")
+            return {}
+        return {domain: float(rate) for domain, rate in rates.items()}
+
+
+    def save(self):
+        """Merges the rate of every domain that has one into `state_path` for
+        the next run. The file is re-read under a lock, so rates saved by other
+        runs in the meantime are kept, only this run's domains are overwritten.
+        """
+        rates = {domain: round(d.rate, 3) for domain, d in self.domains.items() if d.rate is not None}
+        if not rates:
+            return
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        try:
+            with locked(self.state_path):
+                self.learned_rates = {**self.read_rates(self.state_path), **rates}
+                with open(tmp_path, 'w') as f:
+                    json.dump(self.learned_rates, f, indent=2, sort_keys=True)
+                os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            logger.error(f"AdaptiveRateLimiter could not save {self.state_path}: {e}")
+
+
+    def log_rates(self):
+        for domain, domain_rate in sorted(self.domains.items()):
+            rate = f"{domain_rate.rate:.2f} req/s" if domain_rate.rate is not None else f"unlimited ({domain_rate.observed_rate:.2f} req/s)"
+            logger.info(f"Rate limit {domain}: {rate} ({domain_rate.throttled} throttled responses)")
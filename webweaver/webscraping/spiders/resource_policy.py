@@ -0,0 +1,154 @@
+from dataclasses import dataclass, field
+from fnmatch import translate
+import logging
+import re
+
+from playwright._impl._api_types import Error as PlaywrightError
+from playwright.async_api import Page, Route
+
+from webweaver.config import BLOCKED_RESOURCE_BYTES
+
+
+logger = logging.getLogger("scraping")
+
+
+@dataclass
+class ResourceStats:
+    """Counts what a ResourcePolicy blocked. Bytes saved is an estimate based on
+    BLOCKED_RESOURCE_BYTES, since an aborted request has no response.
+    """
+    allowed:int = 0
+    blocked:int = 0
+    bytes_saved:int = 0
+    blocked_by_type:dict[str, int] = field(default_factory=dict)
+
+    def record_blocked(self, resource_type:str):
+        self.blocked += 1
+        self.bytes_saved += BLOCKED_RESOURCE_BYTES.get(resource_type, BLOCKED_RESOURCE_BYTES['other'])
+        self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+
+    def __str__(self) -> str:
+        return (
+            f"{self.blocked} requests blocked, {self.allowed} allowed, "
+            f"~{self.bytes_saved / 1_000_000:.1f}MB saved {self.blocked_by_type}"
+        )
+
+
+class ResourcePolicy:
+    """Decides which requests a Playwright page is allowed to make.
+
+    Requests are aborted if their resource type is in block_types (Playwright's
+    request.resource_type: image, font, stylesheet, media, script, ...) or their
+    URL matches one of the glob patterns in block_urls. Anything matching
+    allow_urls is never blocked, and neither is the document itself.
+
+    Declare one on a spider class:
+        resource_policy = ResourcePolicy(block_types=['image', 'font', 'media'])
+
+    or in the module's config.toml:
+        [resources]
+        block_types = ["image", "font", "media"]
+        block_urls = ["*google-analytics.com*", "*doubleclick.net*"]
+
+    *Note that Chromium skips its HTTP cache for pages with routes on them, so
+    only block what the spider really doesn't need.
+    """
+    NEVER_BLOCKED = frozenset({'document'})
+
+    def __init__(
+            self,
+            block_types:list[str]=None,
+            block_urls:list[str]=None,
+            allow_urls:list[str]=None,
+    ):
+        self.block_types = frozenset(block_types or []) - self.NEVER_BLOCKED
+        self.block_urls = tuple(block_urls or [])
+        self.allow_urls = tuple(allow_urls or [])
+        self._block_url_regex = self._compile(self.block_urls)
+        self._allow_url_regex = self._compile(self.allow_urls)
+
+
+    @staticmethod
+    def _compile(patterns:tuple[str]) -> re.Pattern|None:
+        """Joins all the glob patterns into one regex so each request is a single match."""
+        if not patterns:
+            return None
+        return re.compile('|'.join(translate(pattern) for pattern in patterns))
+
+
+    @classmethod
+    def from_config(cls, module_config:dict) -> "ResourcePolicy|None":
+        """Builds a policy from the [resources] table of a module's config.toml,
+        or returns None if there isn't one.
+        """
+        resources = module_config.get('resources')
+        if not resources:
+            return None
+        return cls(
+            block_types=resources.get('block_types'),
+            block_urls=resources.get('block_urls'),
+            allow_urls=resources.get('allow_urls'),
+        )
+
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.block_types and not self.block_urls
+
+
+    def should_block(self, resource_type:str, url:str) -> bool:
+        if resource_type in self.NEVER_BLOCKED:
+            return False
+        if self._allow_url_regex is not None and self._allow_url_regex.match(url):
+            return False
+        if resource_type in self.block_types:
+            return True
+        return self._block_url_regex is not None and self._block_url_regex.match(url) is not None
+
+
+    def __repr__(self) -> str:
+        return f"ResourcePolicy(block_types={sorted(self.block_types)}, block_urls={list(self.block_urls)})"
+
+
+class PageRouter:
+    """Applies a ResourcePolicy to one Playwright Page through page.route().
+    Counters are kept per page and also added to the spider-wide stats.
+    """
+    def __init__(self, page:Page, policy:ResourcePolicy, spider_stats:ResourceStats=None):
+        self.page = page
+        self.policy = policy
+        self.stats = ResourceStats()
+        self.spider_stats = spider_stats
+        self.is_routed = False
+
+
+    async def handle(self, route:Route):
+        request = route.request
+        if self.policy.should_block(request.resource_type, request.url):
+            self.stats.record_blocked(request.resource_type)
+            if self.spider_stats is not None:
+                self.spider_stats.record_blocked(request.resource_type)
+            try:
+                await route.abort('blockedbyclient')
+            except PlaywrightError:
+                pass  # page closed while the request was in flight
+            return
+        self.stats.allowed += 1
+        if self.spider_stats is not None:
+            self.spider_stats.allowed += 1
+        try:
+            await route.fallback()
+        except PlaywrightError:
+            pass
+
+
+    async def route(self):
+        if not self.is_routed and not self.policy.is_empty:
+            await self.page.route("**/*", self.handle)
+            self.is_routed = True
+
+
+    async def unroute(self):
+        if self.is_routed:
+            await self.page.unroute("**/*", self.handle)
+            self.is_routed = False
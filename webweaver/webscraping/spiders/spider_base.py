@@ -1,16 +1,17 @@
 from __future__ import annotations
 import aiodns
 import aiohttp
-from aiohttp.client_exceptions import ClientHttpProxyError, ClientPayloadError
+from aiohttp.client_exceptions import ClientPayloadError
 import asyncio
+from contextlib import AbstractAsyncContextManager, nullcontext
 import logging
 import os
 from pathlib import Path
 import random
 import requests
-from typing import Any, TYPE_CHECKING
-import ua_generator
 import time
+from typing import Any, Awaitable, Callable, TYPE_CHECKING
+import ua_generator
 import validators
 
 from playwright.async_api._generated import (
@@ -28,17 +29,32 @@ from webweaver.exceptions import (
     BadMarkupError, 
     SpiderHttpError, 
     ElementNotFound,
-    SpiderSoupError
+    SpiderSoupError,
+    ConfigModuleNotFound,
 )
-from webweaver.config import PROXY, SENTINEL
+from webweaver.config import PROXY, SENTINEL, SPIDER_RETRY_BUDGET
 from webweaver.webscraping.spiders.spider_fuzzer import SpiderFuzzer
 from webweaver.webscraping.spiders.spider_regex import SpiderRegex
+from webweaver.webscraping.spiders.aiohttp_session import aiohttp_session_manager
+from webweaver.webscraping.cache.http_cache import HttpCache, CachedResponse, http_cache
+from webweaver.webscraping.spiders.spider_retry import (
+    RetryBudget, 
+    RetryKind, 
+    RetryPolicy, 
+    classify_aiohttp_error
+)
 from webweaver.webscraping.spiders.soup_base import SpiderSoup
+from webweaver.webscraping.spiders.parse_pool import parse_pool, Extract
+from webweaver.webscraping.spiders.extractor import Extractor, run_extractor
 from webweaver.webscraping.spiders.spider_page import SpiderPage, SpiderContext, RequestContext, RequestContextInterface
 from webweaver.webscraping.middleware.middleware_manager import SpiderMiddlewareManagerInterface
 from webweaver.webscraping.proxy.proxy_base import ProxySession
 from webweaver.webscraping.proxy.proxy_manager import SpiderProxyManagerInterface
-from webweaver.webscraping.registry.scraping_registry import scraping_registry, SpiderState
+from webweaver.webscraping.spiders.spider_scheduler import SpiderSchedulerInterface
+from webweaver.webscraping.frontier.url_frontier import SpiderFrontierInterface
+from webweaver.webscraping.spiders.browser_pool import BrowserPool
+from webweaver.webscraping.spiders.resource_policy import ResourcePolicy, ResourceStats
+from webweaver.webscraping.registry.scraping_registry import ScrapingRegistry, SpiderState, get_registry
 if TYPE_CHECKING:
     from webweaver.webscraping.spiders.models import SpiderAsset
     from webweaver.webscraping.spiders.soup_base import SpiderTag
@@ -68,6 +84,11 @@ class SpiderInterface:
             request_interface=request_interface
         )
 
+    def pause_domain(self, url:str, seconds:float):
+        """Middleware asks for the URL's domain to be left alone for a while."""
+        if self.spider.scheduler_interface is not None:
+            self.spider.scheduler_interface.pause_domain(url, seconds)
+
 
 
 
@@ -112,7 +133,13 @@ class AiohttpSpider():
 
     def __init__(self, spider:Spider):
         self.spider = spider
-        self.session = aiohttp.ClientSession()
+        self.session_manager = aiohttp_session_manager
+
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """The ClientSession shared by all spiders, borrowed from the AiohttpSessionManager."""
+        return self.session_manager.session
 
 
     async def test_scrape(self, url:str, outfile_name:str=None):
@@ -152,19 +179,30 @@ class AiohttpSpider():
 
 
     async def scrape_image_url(self, url:str, use_proxy:bool=True, raise_exc:bool=True) -> bytes | None:
-        """Scrape the binary data tha represents the product image
+        """Scrape the binary data tha represents the product image.
+        The request and the body read are retried together, since most
+        failures on large images happen part way through the download.
         
-        *NOTE This method makes an HTTP request.
+        *NOTE This method makes an HTTP request (unless the image is in the HttpCache).
         """
         url = self.spider.clean_url(url, raise_exc)
-        response = await self.get(url, use_proxy=use_proxy)
-        if response.status == 200:
-            image_chunks = []
-            async for chunk in response.content.iter_chunked(1024):  # Adjust chunk size as needed
-                image_chunks.append(chunk)
-            image = b''.join(image_chunks)
-            return image
-            # return await response.read()
+        if self.spider.http_cache is not None:
+            response = await self.get(url, use_proxy=use_proxy)
+            if response.status == 200:
+                return await response.read()
+            return None
+
+        async def fetch_image() -> bytes | None:
+            response = await self._get(url, use_proxy=use_proxy)
+            if response.status == 200:
+                image_chunks = []
+                async for chunk in response.content.iter_chunked(1024):  # Adjust chunk size as needed
+                    image_chunks.append(chunk)
+                image = b''.join(image_chunks)
+                return image
+                # return await response.read()
+
+        return await self.spider.retry(fetch_image, url=url, classify=classify_aiohttp_error)
 
 
     async def get_or_error(self, url:str, use_proxy:bool=True, **kwargs) -> aiohttp.ClientResponse:
@@ -174,68 +212,86 @@ class AiohttpSpider():
         return res
 
 
-    async def get(self, url:str, use_proxy:bool=True, **kwargs) -> aiohttp.ClientResponse:
+    async def get(self, url:str, use_proxy:bool=True, **kwargs) -> aiohttp.ClientResponse | CachedResponse:
         """Sends an HTTP request using aiohttp's session.get() method.
         The difference is this function will automatically use the proxy and
         will also automatically randomize the headers (well, the UA of the headers).
+
+        Connection and read errors are retried with the spider's RetryPolicy.
+
+        If the spider uses the HttpCache, a fresh cached response is returned as a 
+        CachedResponse without any request. A stale one is revalidated, and if the 
+        server says 304 Not Modified we get the CachedResponse back too.
         """
-        if use_proxy:
-            proxy_retry_base_time = 2
-            max_wait_time = 60
-            # max_wait_time = 3
-            retry_count = 0
-            while True:
-                try:
-                    proxy = await self.spider.get_proxy(stateful=False)
-                    res = await self.session.get(
-                        url=url,
-                        proxy = proxy.full_endpoint,
-                        headers = self.spider.random_headers(),
-                        **kwargs
-                    )
-                except aiohttp.ClientConnectionError as error:
-                    msg = f"{error.__class__.__name__}: '{self.spider.spider_asset.spider_name}' URL: '{url}'  RETRYING..."
-                    self.spider.log(
-                        e = error,
-                        level = LogLevel.WARNING,
-                        msg = msg
-                    )
-                    retry_count += 1
-                    exponential_backoff = proxy_retry_base_time * (2 ** retry_count)
-                    if exponential_backoff > max_wait_time:
-                        self.spider.log(e=error)
-                        raise error
-                    else:
-                        logger.info(msg)
-                        logger.info(f"Retrying in {exponential_backoff} seconds...")
-                        await asyncio.sleep(exponential_backoff) 
-                    continue
-
-                except (ClientHttpProxyError, ClientPayloadError, ConnectionResetError) as error:
-                    self.spider.log(
-                        e = error,
-                        level = LogLevel.WARNING,
-                        msg = f"{error.__class__.__name__} '{self.spider.spider_asset.spider_name}' URL: '{url} Retrying..."
-                    )
-                    retry_count += 1
-                    exponential_backoff = proxy_retry_base_time * (2 ** retry_count)
-                    if exponential_backoff > max_wait_time:
-                        self.spider.log(e=error)
-                        raise error
-                    else:
-                        time.sleep(exponential_backoff) #synchronous otherwise other connections will keep trying.
-                    continue
-
-                else: 
-                    break
+        cache = self.spider.http_cache
+        if cache is None:
+            return await self.spider.retry(
+                lambda: self._get(url, use_proxy=use_proxy, **kwargs), 
+                url=url, 
+                classify=classify_aiohttp_error
+            )
+
+        headers = kwargs.pop('headers', None) or self.spider.random_headers()
+        entry = await cache.lookup('GET', url, headers)
+        if entry is not None:
+            if cache.can_serve(entry):
+                cached_response = await cache.response(entry)
+                if cached_response is not None:
+                    return cached_response
+            headers = {**headers, **entry.conditional_headers()}
+
+        async def fetch() -> aiohttp.ClientResponse:
+            response = await self._get(url, use_proxy=use_proxy, headers=headers, **kwargs)
+            if response.status == 200:
+                await response.read()  # body is read inside the retry, like scrape_image_url()
+            return response
+
+        response = await self.spider.retry(fetch, url=url, classify=classify_aiohttp_error)
+        if response.status == 304 and entry is not None:
+            response.release()
+            entry = await cache.revalidated(entry, response.headers)
+            cached_response = await cache.response(entry, revalidated=True)
+            if cached_response is not None:
+                return cached_response
+            return await self.spider.retry(
+                lambda: self._get(url, use_proxy=use_proxy, **kwargs), 
+                url=url, 
+                classify=classify_aiohttp_error
+            )
+        if response.status == 200:
+            await cache.store('GET', url, headers, response.status, response.headers, await response.read())
+        return response
 
-        else:
-            res = await self.session.get(url=url, **kwargs)
-        return res
+
+    async def _get(self, url:str, use_proxy:bool=True, **kwargs) -> aiohttp.ClientResponse:
+        """A single request attempt, without any retrying. How the request went
+        is reported to the proxy's health scores and the domain's rate limiter.
+        """
+        proxy = None
+        if use_proxy:
+            proxy = await self.spider.get_proxy(stateful=False)
+            if proxy is not None:
+                kwargs['proxy'] = proxy.full_endpoint
+            kwargs.setdefault('headers', self.spider.random_headers())
+        async with self.spider.request_slot(url):
+            start = time.monotonic()
+            try:
+                response = await self.session.get(url=url, **kwargs)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if proxy is not None:
+                    proxy.record_error()
+                raise
+        if proxy is not None:
+            proxy.record_response(response.status, time.monotonic() - start)
+        self.spider.record_response(url, response.status, response.headers)
+        return response
 
 
     async def close_session(self):
-        await self.session.close()
+        """The session is shared with every other spider, so it is not closed
+        here. SpiderLauncher closes it once all spiders have finished.
+        """
+        return
 
 
 class Spider:
@@ -244,6 +300,9 @@ class Spider:
     url = None
     is_error = False
     error = None
+    priority = 100  # SpiderScheduler starts waiting spiders with lower values first
+    use_http_cache = True  # set False on spiders whose responses should never come from the HttpCache
+    shard_count = 1  # distributed scrapes split the spider into this many jobs. Only for spiders that check their detail URLs with self.frontier
 
     def __init__(
                 self,
@@ -252,6 +311,9 @@ class Spider:
                 proxy_manager_interface:SpiderProxyManagerInterface,
                 p:Optional[AsyncPlaywright]=None,
                 test_env:bool = False,
+                scheduler_interface:SpiderSchedulerInterface=None,
+                browser_pool:Optional[BrowserPool]=None,
+                frontier_interface:SpiderFrontierInterface=None,
                 ):
         self.ua:str = ua_generator.generate(device="desktop").text
         self.headers:dict = self.create_headers()
@@ -264,9 +326,16 @@ class Spider:
         self.module_logger = SpiderModuleLog(spider_asset.module_dir_path(), spider_asset.spider_name)
         self.middleware_manager_interface = middleware_manager_interface
         self.proxy_manager_interface = proxy_manager_interface
+        self.scheduler_interface = scheduler_interface
+        self.frontier = frontier_interface
+        self.registry:ScrapingRegistry = get_registry()  # the scrape job this spider belongs to
+        self.retry_policy = RetryPolicy()
+        self.retry_budget = RetryBudget(SPIDER_RETRY_BUDGET)
+        self.http_cache:HttpCache|None = http_cache if self.use_http_cache and http_cache.is_enabled else None
         self.spider_interface = SpiderInterface(self)
         self.fuzzing = SpiderFuzzer
         self.p = p
+        self.browser_pool = browser_pool
         self.aio = AiohttpSpider(self) 
         # self.interface = SpiderInterface(self)
         # self.middleware = MiddlewareManager(self.interface)
@@ -323,12 +392,62 @@ class Spider:
             "Accept-Encoding": "gzip, deflate, br",
             "Accept-Language": "en-US,en;q=0.9",
             "DNT": "1",  # Do Not Track Request Header
-            "Connection": "close",
+            "Connection": "keep-alive",
             "Upgrade-Insecure-Requests": "1",   
         }
         return headers
 
 
+    def request_slot(self, url:str) -> AbstractAsyncContextManager:
+        """Async context manager holding one of the SpiderScheduler's request 
+        slots for the URL's domain. A no-op if the spider was launched without
+        a scheduler.
+        """
+        if self.scheduler_interface is None:
+            return nullcontext()
+        return self.scheduler_interface.domain_slot(url)
+
+
+    def record_response(self, url:str, status:int, headers:dict=None):
+        """Reports a response's status to the SpiderScheduler's rate limiter so
+        the domain's request rate can speed up or back off.
+        """
+        if self.scheduler_interface is None:
+            return
+        retry_after = (headers.get('Retry-After') or headers.get('retry-after')) if headers else None
+        self.scheduler_interface.record_response(url, status, retry_after)
+
+
+    async def retry(
+            self, 
+            request_func:Callable[[], Awaitable[Any]], 
+            url:str, 
+            classify:Callable[[Exception], RetryKind | None]
+    ) -> Any:
+        """Runs request_func() under the spider's RetryPolicy, charging every
+        retry to the spider's RetryBudget.
+        """
+        def on_retry(error:Exception, kind:RetryKind, attempt:int, delay:float):
+            self.log(
+                e = error,
+                level = LogLevel.WARNING,
+                msg = f"{error.__class__.__name__} ({kind.value}) '{self.spider_asset.spider_name}' URL: '{url}' "
+                      f"retry #{attempt} in {delay:.1f}s ({self.retry_budget.remaining} left in budget)"
+            )
+
+        try:
+            return await self.retry_policy.run(
+                request_func, 
+                classify=classify, 
+                budget=self.retry_budget, 
+                on_retry=on_retry
+            )
+        except Exception as error:
+            if classify(error) is not None:
+                self.log(e=error)
+            raise
+
+
     async def get_proxy(self, stateful:bool=False) -> ProxySession | None:
         """Create a new ProxySession object"""
         try:
@@ -338,7 +457,7 @@ class Spider:
 
     def get_params(self) -> dict[str, str]:
         """Retrieves the spider's params from the registry."""
-        return scraping_registry.registry[self.spider_id].params
+        return self.registry.registry[self.spider_id].params
 
 
     def soup_check(self, soup:SpiderSoup):
@@ -362,16 +481,43 @@ class Spider:
         return soup
 
 
+    async def parse(self, extract:Extract, markup:str|bytes, **kwargs) -> Any:
+        """Async get_soup(): parses the markup and returns extract(soup, **kwargs),
+        running both in the parse pool's worker processes so a big page doesn't
+        block the event loop (and every other spider's requests) while it's parsed.
+
+        extract must be a module level function that returns plain data (dicts,
+        lists, strings...), not tags. Returns None and logs if the markup is bad.
+        """
+        try:
+            return await parse_pool.run(extract, self.__class__.__name__, markup, **kwargs)
+        except BadMarkupError as e:
+            self.log(f"{e.__class__.__name__}({e.spider_name}): {e.error_details}")
+            return None
+
+
+    async def extract(self, extractor:type[Extractor], markup:str|bytes) -> list[dict]|dict|None:
+        """parse() with an Extractor class instead of an extract function: the
+        records of extractor's rows (or one dict for the whole page), straight
+        off the lxml tree. Returns None and logs if the markup is bad.
+        """
+        try:
+            return await parse_pool.call(len(markup), run_extractor, extractor, self.__class__.__name__, markup)
+        except BadMarkupError as e:
+            self.log(f"{e.__class__.__name__}({e.spider_name}): {e.error_details}")
+            return None
+
+
     def spider_state(self) -> SpiderState:
         """NOTE DEPRECATED!! use get_state() instead
         Gets the current state of the spider in the spider registry.
         """
-        return scraping_registry.get_spider_state(self.spider_id)
+        return self.registry.get_spider_state(self.spider_id)
 
 
     def get_state(self) -> SpiderState:
         """Gets the current state of the spider in the spider registry."""
-        return scraping_registry.get_spider_state(self.spider_id)
+        return self.registry.get_spider_state(self.spider_id)
 
 
     def shuffle(self, list_to_shuffle:list) -> None:
@@ -400,7 +546,7 @@ class Spider:
             "Accept-Encoding": "gzip, deflate, br",
             "Accept-Language": "en-US,en;q=0.9",
             "DNT": "1",  # Do Not Track Request Header
-            "Connection": "close",
+            "Connection": "keep-alive",
             "Upgrade-Insecure-Requests": "1",   
         }
         return headers
@@ -465,16 +611,45 @@ class Spider:
 
 
 class PlaywrightSpider(Spider):
-    """This class adds playwright functionality to our spider class."""
+    """This class adds playwright functionality to our spider class.
+
+    When SpiderLauncher hands us a BrowserPool, contexts and pages are leased
+    from its shared browsers. Without one (e.g. running a spider on its own),
+    the spider launches its own browser like it used to.
+
+    Set resource_policy on the subclass (or a [resources] table in the module's
+    config.toml) to stop every page loading images/fonts/trackers we don't need.
+    """
+    resource_policy:ResourcePolicy|None = None
     
     def __init__(self, spider_asset, **kwargs):
         super().__init__(spider_asset, **kwargs)
         self.p:AsyncPlaywright = kwargs.get('p', None)
         self.browser:Browser = None
+        self.browser_type = 'chromium'
+        self.headless = True
+        self.spider_contexts:list[SpiderContext] = []
+        if self.resource_policy is None:
+            self.resource_policy = self._config_resource_policy()
+        self.resource_stats = ResourceStats()
+
+
+    def _config_resource_policy(self) -> ResourcePolicy|None:
+        """ResourcePolicy from the [resources] table in the module's config.toml"""
+        try:
+            return ResourcePolicy.from_config(self.spider_asset.module_config)
+        except ConfigModuleNotFound:
+            return None
 
 
     async def start(self, browser:str='chromium', headless:bool=True):
-        """Launch async webdriver and get a blank page."""
+        """Launch async webdriver and get a blank page. With a BrowserPool this 
+        just records which browser we want, the pool launches it on first use.
+        """
+        self.browser_type = browser
+        self.headless = headless
+        if self.browser_pool is not None:
+            return
         match browser:
             case 'firefox':
                 self.browser = await self.p.firefox.launch(headless=headless)
@@ -484,20 +659,44 @@ class PlaywrightSpider(Spider):
                 self.browser = await self.p.chromium.launch(headless=headless)
         return
     
-    
+
+    async def close(self):
+        """Release every context this spider still has open, and close its own
+        browser if it launched one. SpiderLauncher calls this when the spider finishes.
+        """
+        for spider_context in list(self.spider_contexts):
+            await spider_context.close()
+        if self.resource_stats.blocked > 0:
+            logger.info(f"{self.spider_asset.spider_name} resources: {self.resource_stats}")
+        if self.browser is not None:
+            await self.browser.close()
+            self.browser = None
+        return
+
+
+    def forget_context(self, spider_context:SpiderContext):
+        """Called by SpiderContext.close()"""
+        if spider_context in self.spider_contexts:
+            self.spider_contexts.remove(spider_context)
+
+
+    @staticmethod
+    def _context_options(proxy:ProxySession=None) -> dict:
+        """kwargs for Browser.new_context(), with proxy config details if proxied."""
+        if proxy:
+            proxy_config = {'server': proxy.endpoint}
+            if proxy.username:
+                proxy_config['username'] = proxy.username
+                proxy_config['password'] = proxy.password or ''
+            return {'proxy': proxy_config}
+        return {}
+
 
     async def _new_browser_context(self, proxy:ProxySession=None) -> BrowserContext:
         """Create a new Playwright BrowserContext, either with proxy config details
         or without proxy entirely.
         """
-        if proxy:
-            browser_context = await self.browser.new_context(proxy={
-                'server': proxy.endpoint,
-                'username': os.getenv("PROXY_USER"),
-                'password': os.getenv("PROXY_PASS"),
-            })
-        else:
-            browser_context = await self.browser.new_context()
+        browser_context = await self.browser.new_context(**self._context_options(proxy))
         return browser_context
 
 
@@ -505,7 +704,8 @@ class PlaywrightSpider(Spider):
         """Factory method for creating new SpiderContext objects:
             -creates RequestContext if request is stateful,
             -creates ProxySession object if request is proxied, 
-            -creates the underlying Playwright BrowserContext object,
+            -creates (or leases from the BrowserPool) the underlying Playwright 
+            BrowserContext object,
         then passes it all into SpiderContext along with its self.
         """
         if PROXY and proxy:
@@ -518,13 +718,27 @@ class PlaywrightSpider(Spider):
         else:
             proxy = None
             request_context = RequestContext()
-        browser_context = await self._new_browser_context(proxy=proxy)
-        return SpiderContext.create(
+        lease = None
+        if self.browser_pool is not None:
+            lease = await self.browser_pool.lease_context(
+                browser_type=self.browser_type,
+                headless=self.headless,
+                proxy_endpoint=proxy.endpoint if proxy else None,
+                **self._context_options(proxy),
+            )
+            browser_context = lease.context
+        else:
+            browser_context = await self._new_browser_context(proxy=proxy)
+        spider_context = SpiderContext.create(
             self, 
             context=browser_context, 
             request_context=request_context,
             proxy=proxy, 
+            browser_pool=self.browser_pool,
+            lease=lease,
         )
+        self.spider_contexts.append(spider_context)
+        return spider_context
 
 
     async def new_page(self, spider_context:SpiderContext=None) -> SpiderPage:
@@ -533,7 +747,10 @@ class PlaywrightSpider(Spider):
         having to import SpiderPage on every new webscraping module we make.
         """
         if spider_context:
-            new_page = await spider_context.context.new_page()
+            new_page = await spider_context.new_page()
+        elif self.browser_pool is not None:
+            spider_context = await self.new_context(proxy=False)
+            new_page = await spider_context.new_page()
         else:
             new_page = await self.browser.new_page()
         return await SpiderPage.create(self, new_page, spider_context)
@@ -1,7 +1,7 @@
-from collections import defaultdict
 from dataclasses import dataclass
+import time
 from typing import Any
-from webweaver.config import SPIDER_DATA_BATCH_SIZE
+from webweaver.config import SPIDER_DATA_BATCH_SIZE, SPIDER_DATA_BATCH_TIMEOUT
 
 
 @dataclass
@@ -14,45 +14,90 @@ class SpiderData:
     spider_id: int
 
 
-# class SpiderDataBatch:
-#     """This class holds batches of SpiderData, received in the PipelineListener.
-#     When a batch reaches the batch size limit, it is passed to the appropriate
-#     pipeline module for processing.
-#     """
-#     batch_data:list[SpiderData] = []
-
-#     def count(self) -> int:
-#         """Counts the # of SpiderData objects in the batch"""
-#         return len(self.batch_data)
-
-#     def reset_batch(self):
-#         """Empties the list of SpiderData"""
-#         self.batch_data = []
-#         return
-
-
-# class BatchRegistry:
-#     """Registry of SpiderDataBatches to be used by the PipelineListener. As data 
-#     comes in from the queue, it will be stored in batches before being processed
-#     and saved in the DB. This registry will allow the PipelineListener to know
-#     which pipeline module to instantiate for each batch. 
-#     """
-
-#     batch_size_limit = SPIDER_DATA_BATCH_SIZE #100, for now
-
-#     def __init__(self):
-#         self.batches = defaultdict(SpiderDataBatch)
-
-#     def add_data(self, spider_data:SpiderData):
-#         """Appends SpiderData to the appropriate SpiderDataBatch."""
-#         self.batches[spider_data.spider_id].batch_data.append(spider_data.data)
-#         return
-
-#     def is_batch_full(self, spider_id:int) -> bool:
-#         """Check if the SpiderDataBatch has reached the batch_size_limit value."""
-#         if self.batches[spider_id].count() >= self.batch_size_limit:
-#             return True
-#         return False
+class SpiderDataBatch:
+    """This class holds batches of SpiderData, received in the PipelineListener.
+    When a batch reaches the batch size limit (or has been waiting longer than the
+    batch time limit), it is passed to the appropriate pipeline module for processing.
+    """
+    def __init__(self, spider_id:int):
+        self.spider_id = spider_id
+        self.batch_data:list[SpiderData] = []
+        self.created_at:float = time.monotonic()
+
+    def count(self) -> int:
+        """Counts the # of SpiderData objects in the batch"""
+        return len(self.batch_data)
+
+    def add_data(self, spider_data:SpiderData):
+        """Appends SpiderData to the batch."""
+        self.batch_data.append(spider_data)
+        return
+
+    def age(self) -> float:
+        """Seconds elapsed since the batch was created."""
+        return time.monotonic() - self.created_at
+
+    def reset_batch(self):
+        """Empties the list of SpiderData"""
+        self.batch_data = []
+        self.created_at = time.monotonic()
+        return
+
+
+class BatchRegistry:
+    """Registry of SpiderDataBatches to be used by the PipelineListener. As data 
+    comes in from the queue, it will be stored in batches (one per spider) before 
+    being processed and saved in the DB. This registry will allow the PipelineListener 
+    to know which pipeline module to instantiate for each batch. 
+    """
+    def __init__(
+            self, 
+            batch_size_limit:int=SPIDER_DATA_BATCH_SIZE, 
+            batch_time_limit:float=SPIDER_DATA_BATCH_TIMEOUT
+    ):
+        self.batch_size_limit = batch_size_limit
+        self.batch_time_limit = batch_time_limit
+        self.batches:dict[int, SpiderDataBatch] = {}
+
+    def add_data(self, spider_data:SpiderData) -> SpiderDataBatch:
+        """Appends SpiderData to the appropriate SpiderDataBatch."""
+        batch = self.batches.get(spider_data.spider_id)
+        if batch is None:
+            batch = SpiderDataBatch(spider_data.spider_id)
+            self.batches[spider_data.spider_id] = batch
+        batch.add_data(spider_data)
+        return batch
+
+    def is_batch_full(self, spider_id:int) -> bool:
+        """Check if the SpiderDataBatch has reached the batch_size_limit value."""
+        batch = self.batches.get(spider_id)
+        if batch is not None and batch.count() >= self.batch_size_limit:
+            return True
+        return False
+
+    def pop_batch(self, spider_id:int) -> SpiderDataBatch:
+        """Removes the spider's SpiderDataBatch from the registry and returns it."""
+        return self.batches.pop(spider_id)
+
+    def pop_expired(self) -> list[SpiderDataBatch]:
+        """Removes and returns every batch older than batch_time_limit."""
+        expired = [spider_id for spider_id, batch in self.batches.items() if batch.age() >= self.batch_time_limit]
+        return [self.batches.pop(spider_id) for spider_id in expired]
+
+    def pop_all(self) -> list[SpiderDataBatch]:
+        """Removes and returns all remaining non-empty batches."""
+        batches = [batch for batch in self.batches.values() if batch.count() > 0]
+        self.batches = {}
+        return batches
+
+    def time_until_flush(self) -> float | None:
+        """Seconds until the oldest batch hits batch_time_limit. Returns None
+        if there are no batches waiting.
+        """
+        if not self.batches:
+            return None
+        oldest = max(batch.age() for batch in self.batches.values())
+        return max(self.batch_time_limit - oldest, 0)
 
 
 
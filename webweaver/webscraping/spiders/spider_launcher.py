@@ -13,7 +13,15 @@ from webweaver.exceptions import BrokenSpidersError, WebScrapingError
 from webweaver.webscraping.middleware.middleware_manager import SpiderMiddlewareManagerInterface
 from webweaver.webscraping.proxy.proxy_manager import SpiderProxyManagerInterface
 from webweaver.webscraping.spiders.spider_base import Spider, PlaywrightSpider
+from webweaver.webscraping.spiders.aiohttp_session import aiohttp_session_manager
+from webweaver.webscraping.spiders.parse_pool import parse_pool
+from webweaver.webscraping.spiders.browser_pool import BrowserPool
+from webweaver.webscraping.cache.http_cache import http_cache
+from webweaver.webscraping.frontier.url_frontier import UrlFrontier
+from webweaver.webscraping.registry.scraping_registry import ScrapingRegistry, get_registry
 from webweaver.webscraping.spiders.spider_data import SpiderData
+from webweaver.webscraping.spiders.spider_queue import SpiderQueue
+from webweaver.webscraping.spiders.spider_scheduler import SpiderScheduler
 
 
 logger = logging.getLogger("scraping")
@@ -33,10 +41,12 @@ class SpiderLauncher:
     """
     def __init__(
             self, 
-            queue:asyncio.Queue, 
+            queue:SpiderQueue, 
             spiders:list[SpiderAsset],
             middleware_manager_interface:SpiderMiddlewareManagerInterface,
-            proxy_manager_interface:SpiderProxyManagerInterface
+            proxy_manager_interface:SpiderProxyManagerInterface,
+            scheduler:SpiderScheduler=None,
+            frontier:UrlFrontier=None,
             ):
         self.spiders = spiders
         # self.spiders = [spider for spider in self.spiders if spider.id == 3] 
@@ -46,9 +56,13 @@ class SpiderLauncher:
         self.broken_spiders:list[BrokenSpider] = []
         self.middleware_manager_interface = middleware_manager_interface
         self.proxy_manager_interface = proxy_manager_interface
+        self.scheduler = scheduler if scheduler is not None else SpiderScheduler()
+        self.frontier = frontier if frontier is not None else UrlFrontier()
         self.p = None  # AyncPlaywright
+        self.browser_pool:BrowserPool = None
         self.queue = queue
         self.sentinel = SENTINEL
+        self.registry:ScrapingRegistry = get_registry()
 
 
     def spider_broke(self, spider_asset_id:int, error:WebScrapingError):
@@ -63,11 +77,15 @@ class SpiderLauncher:
 
     async def send_to_queue(self, spider_id:int, data:dict):
         """Pass a spider's scraped data into the asyncio Queue, 
-        to be consumed by the PipelineListener
+        to be consumed by the PipelineListener.
+
+        If the queue is bounded and full, this waits for the pipeline to catch 
+        up, which pauses the spider producing the data.
         """
         if bool(data):
             sd = SpiderData(data=data, spider_id=spider_id)
-            await self.queue.put(sd)
+            await self.queue.put(sd, spider_id=spider_id)
+            self.registry.count('records_scraped')
         return
 
 
@@ -78,11 +96,12 @@ class SpiderLauncher:
 
 
     async def start_playwright(self):
-        """Launches Async Playwright and returns its instance. Each 
-        spider will create its own browser/context/pages, but the 
-        SpiderLauncher will start/stop Playwright. 
+        """Launches Async Playwright and the BrowserPool. Spiders lease their
+        contexts/pages from the pool's shared browsers, and the SpiderLauncher
+        will start/stop Playwright and the pool.
         """
         self.p = await async_playwright().start()
+        self.browser_pool = BrowserPool(self.p)
         logger.debug("Playwright starting...")
 
         # print('any: ', any(issubclass(spider.__class__, PlaywrightSpider) for spider in self.spiders))
@@ -109,52 +128,97 @@ class SpiderLauncher:
 
 
     async def launch(self): 
-        """Iterates through all the spiders and calls launch_spider()"""
+        """Iterates through all the spiders and calls launch_spider(). Every 
+        spider gets its own task, but the SpiderScheduler decides when each 
+        one actually starts scraping.
+        """
         tasks = []
         await self.start_playwright()
+        await aiohttp_session_manager.open()
+        await parse_pool.open()
         start_time = datetime.now()
         logger.info(f"{start_time.strftime('%H:%M:%S.%f')} Launching {len(self.spiders)} spiders...")
         for spider in self.spiders:
-            task = asyncio.create_task(self.launch_spider(spider))
-            logger.debug(f">>>> {spider.spider_name}Spider launched")
+            task = asyncio.create_task(self.schedule_spider(spider))
+            logger.debug(f">>>> {spider.spider_name}Spider queued")
             tasks.append(task)
-        # await asyncio.gather(*tasks, return_exceptions=RETURN_EXCEPTIONS)
-        await asyncio.gather(*tasks, return_exceptions=False)
-        await self.close_queue()
+        try:
+            # await asyncio.gather(*tasks, return_exceptions=RETURN_EXCEPTIONS)
+            await asyncio.gather(*tasks, return_exceptions=False)
+        finally:
+            # if a spider raised, its siblings are still running: stop them before their session and browsers go away
+            unfinished = [task for task in tasks if not task.done()]
+            for task in unfinished:
+                task.cancel()
+            await asyncio.gather(*unfinished, return_exceptions=True)
+            try:
+                await self.close_queue()
+                await aiohttp_session_manager.close()
+                await parse_pool.close()
+                await self.frontier.save()
+                self.scheduler.rate_limiter.save()
+            finally:
+                await self.stop_playwright()
         self.record_timing(start_time)
+        self.log_queue_metrics()
+        http_cache.log_stats()
+        self.scheduler.rate_limiter.log_rates()
         if len(self.broken_spiders) > 0:
             self.log_errors()
             await self.record_errors()
         else:
             logger.info(f"Broken spiders: 0")
-        await self.stop_playwright()
         return
 
 
-    async def launch_spider(self, sa:SpiderAsset):
+    async def schedule_spider(self, sa:SpiderAsset):
+        """Waits for the SpiderScheduler to grant the spider a slot, then 
+        launches it. Spiders with a lower priority value are started first.
+        """
+        SpiderClass = sa.get_spider()
+        if SpiderClass is None:
+            return
+        async with self.scheduler.spider_slot(
+            spider_name=sa.spider_name,
+            priority=SpiderClass.priority,
+            is_playwright=self.is_playwright_spider(SpiderClass),
+        ):
+            logger.debug(f">>>> {sa.spider_name}Spider launched")
+            return await self.launch_spider(sa, SpiderClass)
+
+
+    async def launch_spider(self, sa:SpiderAsset, SpiderClass:type[Spider]=None):
         """Dynamically import the spider module and instantiate the class
         associated with spider_name. Spiders are configured to run on
         instantiation.
         """
-        SpiderClass = sa.get_spider()
+        if SpiderClass is None:
+            SpiderClass = sa.get_spider()
         if SpiderClass is not None:
-            p = self.p if self.is_playwright_spider(SpiderClass) else None
+            is_playwright = self.is_playwright_spider(SpiderClass)
             spider:Spider = SpiderClass(
                 spider_asset = sa,
                 middleware_manager_interface = self.middleware_manager_interface,
                 proxy_manager_interface = self.proxy_manager_interface,
-                p=p
+                scheduler_interface = self.scheduler.spider_scheduler_interface,
+                p=self.p if is_playwright else None,
+                browser_pool=self.browser_pool if is_playwright else None,
+                frontier_interface=self.frontier.create_interface(sa.id, sa.spider_name),
             )
-            async for scraped_data in spider.run():
-                if spider.check_state():
-                    await self.send_to_queue(
-                        spider_id=sa.id, 
-                        data=scraped_data
-                    )
-                else:
-                    logger.warning(f"{sa.spider_name} SpiderState: {spider.get_state().value}")
-                    await spider.aio.close_session()                    
-                    return spider.sentinel
+            try:
+                async for scraped_data in spider.run():
+                    if spider.check_state():
+                        await self.send_to_queue(
+                            spider_id=sa.id, 
+                            data=scraped_data
+                        )
+                    else:
+                        logger.warning(f"{sa.spider_name} SpiderState: {spider.get_state().value}")
+                        await spider.aio.close_session()                    
+                        return spider.sentinel
+            finally:
+                if is_playwright:
+                    await spider.close()
             # if spider.is_error == True:
             #     self.spider_broke(sa.id, spider.error)
             #     logger.error(f"\033[1mBROKEN SPIDER\033[0m - {sa.spider_name}")
@@ -168,10 +232,28 @@ class SpiderLauncher:
 
 
     async def stop_playwright(self):
-        """Shuts down playwright and the webdriver"""
+        """Shuts down the BrowserPool, playwright and the webdriver"""
+        if self.browser_pool is not None:
+            await self.browser_pool.close()
+            self.browser_pool = None
         if self.p is not None:
             logger.debug("Playwright stopped")
             await self.p.stop()
+            self.p = None
+        return
+
+
+    def log_queue_metrics(self):
+        """Logs how deep the queue got and how long spiders were paused by backpressure."""
+        metrics = self.queue.snapshot()
+        logger.info(
+            f"Queue max depth: {metrics['max_depth']}, "
+            f"spiders paused {metrics['blocked_count']} times for {metrics['blocked_seconds']}s total"
+        )
+        for spider in self.spiders:
+            blocked_seconds = metrics['blocked_seconds_by_spider'].get(spider.id)
+            if blocked_seconds:
+                logger.debug(f"{spider.spider_name} paused for {blocked_seconds}s by backpressure")
         return
 
 
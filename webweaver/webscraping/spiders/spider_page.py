@@ -2,6 +2,7 @@ from asyncio import sleep as async_sleep
 # from datetime import datetime, timedelta
 import logging
 import random
+import time
 from typing import TYPE_CHECKING
 
 from playwright._impl._api_types import (
@@ -12,10 +13,13 @@ from playwright.async_api import (
     Page, 
     BrowserContext,
     ElementHandle, 
+    Route,
     Response as ResponsePlaywright
 )
 from webweaver.common.utils import VIEWPORTS
 from webweaver.exceptions import SpiderHttpError, ClickLinkError
+from webweaver.webscraping.spiders.spider_retry import classify_playwright_error
+from webweaver.webscraping.spiders.resource_policy import PageRouter, ResourcePolicy
 from webweaver.webscraping.spiders.dom import (
     PageConfig,
     PageCursor,
@@ -24,6 +28,7 @@ from webweaver.webscraping.spiders.dom import (
 )
 if TYPE_CHECKING:
     from webweaver.webscraping.proxy.proxy_base import ProxySession
+    from webweaver.webscraping.spiders.browser_pool import BrowserPool, ContextLease
     from webweaver.webscraping.spiders.spider_base import Spider
 
 
@@ -64,6 +69,10 @@ class SpiderContext():
     When using a proxy in Playwright, the proxy is passed into the BrowserContext object
     upon instantiation. The SpiderContext object will keep the ProxySession object for
     as long as the session is needed.
+
+    When the context was leased from the BrowserPool, close() hands it back to the 
+    pool instead of closing it. Use it as an async context manager, or call close(),
+    when you're done with it.
     """
     def __init__(
             self, 
@@ -71,6 +80,8 @@ class SpiderContext():
             context:BrowserContext,
             request_context:RequestContext=None,
             proxy:"ProxySession"=None,
+            browser_pool:"BrowserPool"=None,
+            lease:"ContextLease"=None,
             ):
         logger.debug(f"init proxy: {proxy}")
         logger.debug(f"init request_context: {request_context}")
@@ -79,6 +90,9 @@ class SpiderContext():
         self.context = context
         self.proxy = proxy
         self.request_context = request_context
+        self.browser_pool = browser_pool
+        self.lease = lease
+        self.is_closed = False
         if self.request_context:
             self.request_interface = RequestContextInterface(request_context)
         else:
@@ -88,9 +102,41 @@ class SpiderContext():
     def is_stateful(self) -> bool:
         return self.request_context is not None
 
+    async def __aenter__(self) -> "SpiderContext":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close(crashed=isinstance(exc, PlaywrightError) and not isinstance(exc, PlaywrightTimeoutError))
+
+    async def new_page(self) -> Page:
+        """Open a Playwright Page in this context. Pages opened from a pooled
+        context count against the BrowserPool's page cap.
+        """
+        if self.lease is not None:
+            return await self.browser_pool.new_page(self.lease)
+        return await self.context.new_page()
+
+    async def close(self, crashed:bool=False):
+        """Release the context back to the BrowserPool (or close it outright 
+        if it didn't come from one). Safe to call more than once.
+        """
+        if self.is_closed:
+            return
+        self.is_closed = True
+        self.spider.forget_context(self)
+        if self.proxy is not None and self.is_stateful:
+            await self.proxy.release()  # sticky endpoint goes back to the ProxyManager
+        if self.lease is not None:
+            await self.browser_pool.release_context(self.lease, crashed=crashed)
+        else:
+            try:
+                await self.context.close()
+            except PlaywrightError:
+                pass
+
     async def new_spider_page(self) -> "SpiderPage":
         """Create a new SpiderPage object, controlled by this SpiderContext."""
-        page = await self.context.new_page()
+        page = await self.new_page()
         return await SpiderPage.create(
             spider = self.spider, 
             page = page, 
@@ -104,13 +150,17 @@ class SpiderContext():
             context:BrowserContext, 
             request_context:RequestContext=None,
             proxy:"ProxySession"=None, 
+            browser_pool:"BrowserPool"=None,
+            lease:"ContextLease"=None,
         ) -> "SpiderContext":
         """Factory method for creating new SpiderContext objects."""
         spider_context = SpiderContext(
             spider=spider, 
             context=context, 
             request_context=request_context,
-            proxy=proxy
+            proxy=proxy,
+            browser_pool=browser_pool,
+            lease=lease,
         )
         return spider_context
 
@@ -124,6 +174,7 @@ class SpiderPage():
         self.spider = spider
         self.page = page
         self.spider_context = spider_context
+        self.router:PageRouter|None = None
 
         self.config = PageConfig(self.page)
         self.cursor = PageCursor(self.page)
@@ -138,9 +189,23 @@ class SpiderPage():
         """
         spider_page = SpiderPage(spider, page, spider_context)
         await spider_page.config.set_page_config()
+        await spider_page.set_resource_policy(getattr(spider, 'resource_policy', None))
         return spider_page
 
 
+    async def set_resource_policy(self, policy:ResourcePolicy|None):
+        """Route this page's requests through a ResourcePolicy, replacing any
+        policy already on it. Pass None to load everything again.
+        """
+        if self.router is not None:
+            await self.router.unroute()
+            self.router = None
+        if policy is not None and not policy.is_empty:
+            self.router = PageRouter(self.page, policy, getattr(self.spider, 'resource_stats', None))
+            await self.router.route()
+        return
+
+
     # async def jitter(self, low:float=0, high:float=2):
     #     """A randomized delay that can be made between requests"""
     #     await async_sleep(random.uniform(low, high))
@@ -289,9 +354,74 @@ class SpiderPage():
 
         *timeout is in milliseconds.
         *Ensure this method returns a ResponsePlaywright object, and not None!
+        *Connection and timeout errors are retried with the spider's RetryPolicy.
         """
+        proxy = self.spider_context.proxy if self.spider_context is not None else None
+
+        async def goto() -> ResponsePlaywright:
+            async with self.spider.request_slot(url):
+                start = time.monotonic()
+                try:
+                    response = await self.page.goto(url, timeout=timeout, **kwargs)
+                except PlaywrightError as e:
+                    if proxy is not None and classify_playwright_error(e) is not None:
+                        proxy.record_error()
+                    raise
+            if response is not None:
+                if proxy is not None:
+                    proxy.record_response(response.status, time.monotonic() - start)
+                self.spider.record_response(url, response.status, response.headers)
+            return response
+
+        cache = getattr(self.spider, 'http_cache', None)
+        if cache is not None:
+            await self.page.route("**/*", self._cache_route)
         try:
-            return await self.page.goto(url, timeout=timeout, **kwargs)
+            return await self.spider.retry(goto, url=url, classify=classify_playwright_error)
         except (PlaywrightError, PlaywrightTimeoutError) as e:
             logger.error(SpiderHttpError(f"{repr(e)}"))
             raise SpiderHttpError(repr(e))
+        finally:
+            if cache is not None:
+                try:
+                    await self.page.unroute("**/*", self._cache_route)
+                except PlaywrightError:
+                    pass
+
+
+    async def _cache_route(self, route:Route):
+        """Serves the main document of a goto() through the spider's HttpCache.
+        Fresh entries are fulfilled straight from disk, stale ones are revalidated 
+        with route.fetch() and a 304 is answered with the cached copy. Every other 
+        request falls through to the page's other routes (e.g. its ResourcePolicy).
+        """
+        request = route.request
+        if (
+            request.resource_type != 'document' 
+            or request.method != 'GET' 
+            or request.frame != self.page.main_frame
+        ):
+            return await route.fallback()
+        cache = self.spider.http_cache
+        request_headers = request.headers
+        entry = await cache.lookup('GET', request.url, request_headers)
+        if entry is not None and cache.can_serve(entry):
+            body = await cache.read_body(entry)
+            if body is not None:
+                return await route.fulfill(status=entry.status, headers=entry.headers, body=body)
+
+        fetch_headers = {**request_headers, **entry.conditional_headers()} if entry is not None else None
+        try:
+            response = await route.fetch(headers=fetch_headers, max_redirects=0)
+        except PlaywrightError as e:
+            return await route.abort('timedout' if isinstance(e, PlaywrightTimeoutError) else 'connectionreset')
+
+        if response.status == 304 and entry is not None:
+            entry = await cache.revalidated(entry, response.headers)
+            body = await cache.read_body(entry)
+            if body is not None:
+                return await route.fulfill(status=entry.status, headers=entry.headers, body=body)
+            return await route.fallback()
+        body = await response.body()
+        await cache.store('GET', request.url, request_headers, response.status, response.headers, body)
+        await route.fulfill(response=response, body=body)
@@ -0,0 +1,114 @@
+import asyncio
+from dataclasses import dataclass, field
+import logging
+import time
+from typing import Any
+
+from webweaver.config import QUEUE_HIGH_WATERMARK, QUEUE_LOW_WATERMARK
+
+
+logger = logging.getLogger("scraping")
+
+
+@dataclass
+class QueueMetrics:
+    """Counters describing how full the SpiderQueue got and how long 
+    spiders spent paused waiting for the PipelineListener to catch up.
+    """
+    put_count: int = 0
+    max_depth: int = 0
+    blocked_count: int = 0
+    blocked_seconds: float = 0.0
+    blocked_seconds_by_spider: dict[int, float] = field(default_factory=dict)
+
+    def record_depth(self, depth:int):
+        self.put_count += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def record_blocked(self, spider_id:int|None, seconds:float):
+        self.blocked_count += 1
+        self.blocked_seconds += seconds
+        if spider_id is not None:
+            self.blocked_seconds_by_spider[spider_id] = self.blocked_seconds_by_spider.get(spider_id, 0.0) + seconds
+
+
+class SpiderQueue(asyncio.Queue):
+    """The async Queue between SpiderLauncher and PipelineListener.
+
+    When high_watermark is set the queue is bounded: once its depth reaches the 
+    high watermark, put() blocks (pausing whichever spider is producing) until 
+    the pipeline has drained it down to the low watermark. The gap between the
+    two watermarks stops spiders from waking up and pausing again on every record.
+
+    high_watermark=None gives the old unbounded behavior.
+    """
+    def __init__(
+            self, 
+            high_watermark:int|None=QUEUE_HIGH_WATERMARK, 
+            low_watermark:int|None=QUEUE_LOW_WATERMARK
+    ):
+        super().__init__()
+        self.high_watermark = high_watermark
+        if low_watermark is None or (high_watermark and low_watermark > high_watermark):
+            low_watermark = high_watermark
+        self.low_watermark = low_watermark
+        self.metrics = QueueMetrics()
+        self._accepting = asyncio.Event()
+        self._accepting.set()
+
+
+    @property
+    def is_bounded(self) -> bool:
+        return bool(self.high_watermark)
+
+
+    @property
+    def is_paused(self) -> bool:
+        """True while producers are being held back."""
+        return not self._accepting.is_set()
+
+
+    async def put(self, item:Any, spider_id:int|None=None):
+        """Puts the item in the queue, first waiting for the queue to drain to 
+        the low watermark if it is paused. spider_id is only used for metrics.
+        """
+        if self.is_bounded and self.is_paused:
+            start = time.monotonic()
+            await self._accepting.wait()
+            self.metrics.record_blocked(spider_id, time.monotonic() - start)
+        self.put_nowait(item)
+
+
+    def put_nowait(self, item:Any):
+        super().put_nowait(item)
+        depth = self.qsize()
+        self.metrics.record_depth(depth)
+        if self.is_bounded and depth >= self.high_watermark and not self.is_paused:
+            logger.debug(f"SpiderQueue reached high watermark ({depth}), pausing spiders")
+            self._accepting.clear()
+
+
+    def get_nowait(self) -> Any:
+        item = super().get_nowait()
+        if self.is_paused and self.qsize() <= self.low_watermark:
+            logger.debug(f"SpiderQueue drained to low watermark ({self.qsize()}), resuming spiders")
+            self._accepting.set()
+        return item
+
+
+    def snapshot(self) -> dict[str, Any]:
+        """Current depth plus the accumulated QueueMetrics, as a dict."""
+        return {
+            "depth": self.qsize(),
+            "high_watermark": self.high_watermark,
+            "low_watermark": self.low_watermark,
+            "is_paused": self.is_paused,
+            "put_count": self.metrics.put_count,
+            "max_depth": self.metrics.max_depth,
+            "blocked_count": self.metrics.blocked_count,
+            "blocked_seconds": round(self.metrics.blocked_seconds, 3),
+            "blocked_seconds_by_spider": {
+                spider_id: round(seconds, 3) for spider_id, seconds in self.metrics.blocked_seconds_by_spider.items()
+            },
+        }
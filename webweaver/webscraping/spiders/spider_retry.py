@@ -0,0 +1,151 @@
+import aiohttp
+import asyncio
+from enum import Enum
+import logging
+import random
+from typing import Any, Awaitable, Callable
+
+from playwright._impl._api_types import (
+    TimeoutError as PlaywrightTimeoutError, 
+    Error as PlaywrightError
+)
+from webweaver.config import (
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+    RETRY_MAX_CONNECT,
+    RETRY_MAX_READ,
+)
+
+
+logger = logging.getLogger('scraping')
+
+
+class RetryKind(Enum):
+    CONNECT = "CONNECT"  # never reached the server (DNS, refused, proxy failure)
+    READ = "READ"  # connected, but the response was cut off or timed out
+
+
+class RetryBudget:
+    """The total number of retries a spider may spend across all of its 
+    requests. Stops one flaky proxy or site from eating the whole run.
+    """
+    def __init__(self, max_retries:int):
+        self.max_retries = max_retries
+        self.spent = 0
+
+    @property
+    def remaining(self) -> int:
+        return max(self.max_retries - self.spent, 0)
+
+    def try_spend(self) -> bool:
+        """Uses up one retry. Returns False if the budget is exhausted."""
+        if self.spent >= self.max_retries:
+            return False
+        self.spent += 1
+        return True
+
+
+class RetryPolicy:
+    """Async retry loop with decorrelated jitter backoff:
+
+        delay = min(max_delay, uniform(base_delay, previous_delay * 3))
+
+    Connect errors and read errors each have their own per-request retry limit,
+    and every retry is also charged to the spider's RetryBudget. Waiting is
+    done with asyncio.sleep() so the rest of the event loop keeps running.
+    """
+    def __init__(
+            self,
+            base_delay:float=RETRY_BASE_DELAY,
+            max_delay:float=RETRY_MAX_DELAY,
+            max_connect_retries:int=RETRY_MAX_CONNECT,
+            max_read_retries:int=RETRY_MAX_READ,
+    ):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retries = {
+            RetryKind.CONNECT: max_connect_retries,
+            RetryKind.READ: max_read_retries,
+        }
+
+
+    def next_delay(self, previous_delay:float) -> float:
+        """Decorrelated jitter, capped at max_delay."""
+        return min(self.max_delay, random.uniform(self.base_delay, previous_delay * 3))
+
+
+    async def run(
+            self,
+            request_func:Callable[[], Awaitable[Any]],
+            classify:Callable[[Exception], RetryKind | None],
+            budget:RetryBudget=None,
+            on_retry:Callable[[Exception, RetryKind, int, float], None]=None,
+    ) -> Any:
+        """Awaits request_func() until it succeeds. Errors that classify() 
+        returns None for are not retried. Once a limit or the budget runs out, 
+        the last error is re-raised.
+        """
+        attempts = {RetryKind.CONNECT: 0, RetryKind.READ: 0}
+        delay = self.base_delay
+        while True:
+            try:
+                return await request_func()
+            except Exception as error:
+                kind = classify(error)
+                if kind is None:
+                    raise
+                attempts[kind] += 1
+                if attempts[kind] > self.max_retries[kind]:
+                    raise
+                if budget is not None and not budget.try_spend():
+                    logger.warning(f"Retry budget exhausted ({budget.max_retries} retries)")
+                    raise
+                delay = self.next_delay(delay)
+                if on_retry is not None:
+                    on_retry(error, kind, attempts[kind], delay)
+                await asyncio.sleep(delay)
+
+
+def classify_aiohttp_error(error:Exception) -> RetryKind | None:
+    """Sorts aiohttp errors into connect errors and read errors."""
+    if isinstance(error, (aiohttp.ClientConnectorError, aiohttp.ClientHttpProxyError, ConnectionRefusedError)):
+        return RetryKind.CONNECT
+    if isinstance(error, (
+        aiohttp.ClientPayloadError, 
+        aiohttp.ServerDisconnectedError, 
+        asyncio.TimeoutError, 
+        ConnectionResetError
+    )):
+        return RetryKind.READ
+    if isinstance(error, aiohttp.ClientConnectionError):
+        return RetryKind.CONNECT
+    return None
+
+
+PLAYWRIGHT_CONNECT_ERRORS = (
+    "net::ERR_PROXY_CONNECTION_FAILED",
+    "net::ERR_TUNNEL_CONNECTION_FAILED",
+    "net::ERR_CONNECTION_REFUSED",
+    "net::ERR_CONNECTION_TIMED_OUT",
+    "net::ERR_NAME_NOT_RESOLVED",
+    "net::ERR_ADDRESS_UNREACHABLE",
+)
+PLAYWRIGHT_READ_ERRORS = (
+    "net::ERR_CONNECTION_RESET",
+    "net::ERR_CONNECTION_CLOSED",
+    "net::ERR_EMPTY_RESPONSE",
+    "net::ERR_TIMED_OUT",
+)
+
+
+def classify_playwright_error(error:Exception) -> RetryKind | None:
+    """Sorts Playwright navigation errors into connect errors and read errors."""
+    if isinstance(error, PlaywrightTimeoutError):
+        return RetryKind.READ
+    if isinstance(error, PlaywrightError):
+        message = str(error)
+        if any(code in message for code in PLAYWRIGHT_CONNECT_ERRORS):
+            return RetryKind.CONNECT
+        if any(code in message for code in PLAYWRIGHT_READ_ERRORS):
+            return RetryKind.READ
+    return None
@@ -0,0 +1,166 @@
+import asyncio
+from contextlib import asynccontextmanager
+import heapq
+import itertools
+import logging
+from typing import AsyncIterator
+from urllib.parse import urlparse
+
+from webweaver.config import SEMAPHORE_COUNT, PLAYWRIGHT_COUNT, DOMAIN_CONCURRENCY
+from webweaver.webscraping.spiders.rate_limiter import AdaptiveRateLimiter
+
+
+logger = logging.getLogger("scraping")
+
+
+class PrioritySemaphore:
+    """A semaphore whose waiters are woken in priority order (lowest value
+    first), and in FIFO order for waiters sharing the same priority.
+    """
+    def __init__(self, value:int):
+        self.limit = value
+        self._value = value
+        self._waiters:list[tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+
+
+    @property
+    def in_use(self) -> int:
+        return self.limit - self._value
+
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+
+    async def acquire(self, priority:int=0):
+        if self._value > 0 and not self._waiters:
+            self._value -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._counter), future)
+        heapq.heappush(self._waiters, entry)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # the slot was handed over just as we were cancelled, pass it on.
+                self.release()
+            else:
+                try:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                except ValueError:
+                    pass
+            raise
+
+
+    def release(self):
+        """Hands the slot to the highest-priority waiter, or frees it."""
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._value += 1
+
+
+    @asynccontextmanager
+    async def slot(self, priority:int=0) -> AsyncIterator[None]:
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class SpiderSchedulerInterface:
+    """Interface to be passed to spiders so they can acquire per-domain
+    request slots from the SpiderScheduler.
+    """
+    def __init__(self, scheduler:"SpiderScheduler"):
+        self.scheduler = scheduler
+
+    def domain_slot(self, url:str):
+        """Async context manager holding one of the URL's domain request slots."""
+        return self.scheduler.domain_slot(url)
+
+    def record_response(self, url:str, status:int, retry_after:str|None=None):
+        """Lets the rate limiter adapt the domain's rate to the response."""
+        self.scheduler.rate_limiter.record(url, status, retry_after)
+
+    def pause_domain(self, url:str, seconds:float):
+        """Holds off every request to the URL's domain for a while."""
+        self.scheduler.rate_limiter.pause(url, seconds)
+
+
+class SpiderScheduler:
+    """Decides when spiders are allowed to run. It enforces:
+        -a global cap on the number of spiders running at once (SEMAPHORE_COUNT),
+        -a separate cap on running Playwright spiders, since each one keeps a 
+        browser open (PLAYWRIGHT_COUNT),
+        -a cap on concurrent requests to any single domain (DOMAIN_CONCURRENCY),
+        -an adaptive requests/second rate per domain (AdaptiveRateLimiter).
+
+    Spiders waiting for a slot are started in order of their priority 
+    (lowest value first).
+    """
+    def __init__(
+            self,
+            spider_limit:int=SEMAPHORE_COUNT,
+            playwright_limit:int=PLAYWRIGHT_COUNT,
+            domain_limit:int=DOMAIN_CONCURRENCY,
+            rate_limiter:AdaptiveRateLimiter=None,
+    ):
+        self.spider_slots = PrioritySemaphore(spider_limit)
+        self.playwright_slots = PrioritySemaphore(playwright_limit)
+        self.domain_limit = domain_limit
+        self.domain_slots:dict[str, asyncio.Semaphore] = {}
+        self.rate_limiter = rate_limiter if rate_limiter is not None else AdaptiveRateLimiter()
+        self.spider_scheduler_interface = SpiderSchedulerInterface(self)
+
+
+    @asynccontextmanager
+    async def spider_slot(self, spider_name:str, priority:int=0, is_playwright:bool=False) -> AsyncIterator[None]:
+        """Waits until the spider is allowed to run and holds its slot(s) until
+        the spider finishes. The scarcer Playwright slot is acquired first so
+        a spider never sits on a global slot while waiting for a browser.
+        """
+        if is_playwright:
+            await self.playwright_slots.acquire(priority)
+        try:
+            await self.spider_slots.acquire(priority)
+            try:
+                logger.debug(f"{spider_name}Spider scheduled ({self.spider_slots.in_use}/{self.spider_slots.limit} running)")
+                yield
+            finally:
+                self.spider_slots.release()
+        finally:
+            if is_playwright:
+                self.playwright_slots.release()
+
+
+    @staticmethod
+    def get_domain(url:str) -> str:
+        domain = urlparse(url).netloc.lower()
+        return domain[4:] if domain.startswith("www.") else domain
+
+
+    def get_domain_slots(self, url:str) -> asyncio.Semaphore:
+        domain = self.get_domain(url)
+        semaphore = self.domain_slots.get(domain)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.domain_limit)
+            self.domain_slots[domain] = semaphore
+        return semaphore
+
+
+    @asynccontextmanager
+    async def domain_slot(self, url:str) -> AsyncIterator[None]:
+        """Holds one of the domain's concurrent request slots, once the domain's
+        rate limiter allows another request.
+        """
+        async with self.get_domain_slots(url):
+            await self.rate_limiter.acquire(url)
+            yield
@@ -2,15 +2,21 @@ import asyncio
 import logging
 from fastapi import HTTPException
 
-from webweaver.exceptions import CampaignBuilderError
+from webweaver.exceptions import CampaignBuilderError, WebScrapingError
 from webweaver.project.models import Project
+from webweaver.webscraping.campaigns.models import ScrapeJob
+from webweaver.webscraping.frontier.url_frontier import UrlFrontier
+from webweaver.webscraping.jobs.job_queue import ScrapeShard, create_scrape_job_queue
+from webweaver.webscraping.jobs.job_state import JobStateStore, JobProgressReporter
 from webweaver.webscraping.middleware.middleware_manager import MiddlewareManager
-from webweaver.webscraping.pipelines.pipeline_listener import PipelineListener
+from webweaver.webscraping.pipelines.pipeline_listener import PipelineListenerPool
 from webweaver.webscraping.proxy.proxy_manager import ProxyManager
-from webweaver.schema.pydantic_schemas import LaunchSpiderSchema, LaunchCampaignSchema
+from webweaver.schema.pydantic_schemas import LaunchSpiderSchema, LaunchCampaignSchema, ParamKeyValueSchema
 from webweaver.webscraping.registry.builders import CampaignBuilder, SoloSpiderBuilder
-from webweaver.webscraping.registry.scraping_registry import scraping_registry
+from webweaver.webscraping.registry.scraping_registry import ScrapingRegistry, SpiderState, use_registry
+from webweaver.webscraping.spiders.models import SpiderAsset
 from webweaver.webscraping.spiders.spider_launcher import SpiderLauncher
+from webweaver.webscraping.spiders.spider_queue import SpiderQueue
 
 
 logger = logging.getLogger('scraping')
@@ -20,14 +26,236 @@ class WebScrape:
     """Class for any scraping-related views/routes. Mainly created to keep
     route files clean and standardize the logic between launching spiders
     and launching campaigns.
+
+    launch() returns the ScrapeJob id straight away. The scrape then runs in a
+    background task in this process, or is split into ScrapeShards and queued for
+    the arq workers (enqueue()), depending on config.SCRAPE_BACKEND. Either way it
+    reports to a JobStateStore, which job_status() reads.
     """
+    async def launch(
+        self,
+        launch_data:LaunchSpiderSchema|LaunchCampaignSchema,
+        is_proxy:bool=True,
+        is_campaign:bool=False,
+        project_id:int|None = None,
+    ) -> int:
+        """Starts the scrape without waiting for it. Returns the ScrapeJob id."""
+        if scrape_job_queue is not None:
+            return await self.enqueue(launch_data, is_proxy, is_campaign, project_id)
+        builder = await self.get_builder(launch_data, is_campaign)
+        scrape_job_id = builder.scrape_job.id
+        shard_keys = {
+            spider_detail['spider'].id: ScrapeShard(scrape_job_id, spider_detail['spider'].id).key
+            for spider_detail in builder.spider_details
+        }
+        await local_job_states.start_job(scrape_job_id, list(shard_keys.values()))
+        task = asyncio.create_task(self.run_in_background(builder, shard_keys, is_proxy, project_id))
+        background_jobs.add(task)
+        task.add_done_callback(background_jobs.discard)
+        logger.info(f"ScrapeJob {scrape_job_id} launched in the background")
+        return scrape_job_id
+
+
     async def scrape(
         self, 
         launch_data:LaunchSpiderSchema|LaunchCampaignSchema,
         is_proxy:bool=True,
         is_campaign:bool=False,
         project_id:int|None = None,
+    ) -> int:
+        """Runs the whole scrape job and waits for it, returning the ScrapeJob id once it's done."""
+        builder = await self.get_builder(launch_data, is_campaign)
+        with use_registry(ScrapingRegistry()) as registry:
+            await self.build_registry(builder, registry)
+            scrape_job_id = registry.scrape_job.id
+            await self.run(registry.spiders, is_proxy=is_proxy, project_id=project_id)
+            await registry.finish()
+        return scrape_job_id
+
+
+    async def run_in_background(
+        self,
+        builder:CampaignBuilder|SoloSpiderBuilder,
+        shard_keys:dict[int, str],
+        is_proxy:bool=True,
+        project_id:int|None = None,
+    ):
+        """Background task started by launch()."""
+        try:
+            await self.run_tracked(builder, local_job_states, shard_keys, is_proxy, project_id)
+        except (Exception, WebScrapingError) as e:
+            logger.error(f"ScrapeJob {builder.scrape_job.id} failed: {e!r}")
+
+
+    async def enqueue(
+        self,
+        launch_data:LaunchSpiderSchema|LaunchCampaignSchema,
+        is_proxy:bool=True,
+        is_campaign:bool=False,
+        project_id:int|None = None,
+    ) -> int:
+        """Creates the ScrapeJob, splits it into ScrapeShards (one per spider, or
+        more for spiders with shard_count > 1) and queues them. Returns the
+        ScrapeJob id right away; the shards report back to the queue's JobStateStore.
+        """
+        builder = await self.get_builder(launch_data, is_campaign)
+        scrape_job_id = builder.scrape_job.id
+        shards = []
+        for spider_detail in builder.spider_details:
+            shards.extend(ScrapeShard.split(
+                scrape_job_id,
+                spider_detail['spider'],
+                spider_detail['params'],
+                is_proxy=is_proxy,
+                project_id=project_id,
+            ))
+        await scrape_job_queue.enqueue(scrape_job_id, shards)
+        logger.info(f"ScrapeJob {scrape_job_id} queued as {len(shards)} shards")
+        return scrape_job_id
+
+
+    async def run_shard(self, shard:ScrapeShard, state_store:JobStateStore):
+        """Runs one ScrapeShard (in an arq worker, or the LocalScrapeJobQueue)."""
+        launch_data = LaunchSpiderSchema(
+            id=shard.spider_id,
+            file_format=None,
+            scrape_job_id=shard.scrape_job_id,
+            params=[ParamKeyValueSchema(param_name=k, param_value=v) for k, v in shard.params.items()],
+        )
+        try:
+            builder = SoloSpiderBuilder(launch_data)
+            await builder.initialize_solo_scrape()
+        except (Exception, WebScrapingError):
+            await self.finish_shards(shard.scrape_job_id, state_store, {shard.key: SpiderState.ERROR})
+            raise
+        await self.run_tracked(
+            builder,
+            state_store,
+            {shard.spider_id: shard.key},
+            is_proxy=shard.is_proxy,
+            project_id=shard.project_id,
+            frontier=UrlFrontier(shard=shard.shard),
+        )
+
+
+    async def run_tracked(
+        self,
+        builder:CampaignBuilder|SoloSpiderBuilder,
+        state_store:JobStateStore,
+        shard_keys:dict[int, str],
+        is_proxy:bool=True,
+        project_id:int|None = None,
+        frontier:UrlFrontier=None,
     ):
+        """Runs the builder's spiders, reporting each spider's state (under its
+        shard key in shard_keys) and the job's progress counters to state_store.
+        """
+        scrape_job_id = builder.scrape_job.id
+        final_states = {key: SpiderState.ERROR for key in shard_keys.values()}
+
+        async def report_state(spider_id:int, state:SpiderState):
+            if spider_id in shard_keys:
+                await state_store.set_state(scrape_job_id, shard_keys[spider_id], state)
+
+        registry = ScrapingRegistry()
+        try:
+            with use_registry(registry):
+                await self.build_registry(builder, registry)
+                registry.on_state_change = report_state
+                for key in shard_keys.values():
+                    await state_store.set_state(scrape_job_id, key, SpiderState.RUNNING)
+                async with JobProgressReporter(state_store, scrape_job_id, registry.progress):
+                    await self.run(registry.spiders, is_proxy=is_proxy, project_id=project_id, frontier=frontier)
+                for spider_id, key in shard_keys.items():
+                    state = registry.get_spider_state(spider_id)
+                    final_states[key] = SpiderState.COMPLETE if state == SpiderState.RUNNING else state
+        finally:
+            registry.clear()
+            await self.finish_shards(scrape_job_id, state_store, final_states)
+
+
+    async def finish_shards(self, scrape_job_id:int, state_store:JobStateStore, final_states:dict[str, SpiderState]):
+        """Records the shards' final states. Whoever finishes the job's last shard
+        calls finish_job().
+        """
+        remaining = None
+        for key, state in final_states.items():
+            remaining = await state_store.finish_shard(scrape_job_id, key, state)
+            logger.info(f"ScrapeJob {scrape_job_id} shard {key}: {state.value} ({remaining} shards left)")
+        if remaining is not None and remaining <= 0:
+            await self.finish_job(scrape_job_id, state_store)
+
+
+    async def finish_job(self, scrape_job_id:int, state_store:JobStateStore):
+        """Called once every shard of the scrape job has finished."""
+        await state_store.finish_job(scrape_job_id)
+        states = await state_store.get_states(scrape_job_id)
+        errors = [key for key, state in states.items() if state == SpiderState.ERROR.value]
+        if errors:
+            await ScrapeJob.filter(id=scrape_job_id).update(is_error=True)
+            logger.error(f"ScrapeJob {scrape_job_id} finished with {len(errors)} of {len(states)} shards in error: {', '.join(errors)}")
+        else:
+            logger.info(f"ScrapeJob {scrape_job_id} finished: {len(states)} shards complete")
+
+
+    async def job_status(self, scrape_job_id:int) -> dict|None:
+        """State, shard states and progress counters of a launched job. Jobs the
+        JobStateStore has forgotten (e.g. from before a restart) fall back to the
+        ScrapeJob row. None if there's no such job.
+        """
+        state_store = await scrape_job_queue.get_state_store() if scrape_job_queue is not None else local_job_states
+        status = await state_store.get_job(scrape_job_id)
+        if status is not None:
+            return status
+        scrape_job = await ScrapeJob.get_or_none(id=scrape_job_id)
+        if scrape_job is None:
+            return None
+        return {
+            'scrape_job_id': scrape_job_id,
+            'state': SpiderState.ERROR.value if scrape_job.is_error else None,
+            'shards': {},
+            'counts': {},
+            'started_at': scrape_job.date_scraped.timestamp(),
+            'finished_at': None,
+        }
+
+
+    async def get_builder(
+        self,
+        launch_data:LaunchSpiderSchema|LaunchCampaignSchema,
+        is_campaign:bool=False,
+    ) -> CampaignBuilder|SoloSpiderBuilder:
+        """Gathers the campaign/spider details and creates the ScrapeJob."""
+        if is_campaign:
+            try:
+                return await CampaignBuilder.build_campaign(launch_data)
+            except CampaignBuilderError:
+                raise HTTPException(status_code=404, detail="Could not launch campaign with information provided.")
+        builder = SoloSpiderBuilder(launch_data)
+        await builder.initialize_solo_scrape()
+        return builder
+
+
+    async def build_registry(self, builder:CampaignBuilder|SoloSpiderBuilder, registry:ScrapingRegistry):
+        if isinstance(builder, CampaignBuilder):
+            await registry.build(campaign_builder=builder)
+        else:
+            await registry.build(solospider_builder=builder)
+        logger.info('Scraping registry built')
+        logger.info(f"Tables: {', '.join(sorted(registry.scrape_table_names))}")
+        logger.debug(f'Table instances: {registry.scrape_table_models}')
+
+
+    async def run(
+        self,
+        spiders:list[SpiderAsset],
+        is_proxy:bool=True,
+        project_id:int|None = None,
+        frontier:UrlFrontier=None,
+    ):
+        """Launches the spiders and the pipelines for the scrape job whose
+        ScrapingRegistry is current (see use_registry()).
+        """
 
         # Initialize middleware
         middleware_manager = MiddlewareManager()
@@ -42,22 +270,6 @@ class WebScrape:
             proxy_manager_interface = None
         logger.debug(f'ProxyManagerInterface: {proxy_manager_interface}')
 
-
-        # Intialize scraping registry
-        if is_campaign:
-            try:
-                builder = await CampaignBuilder.build_campaign(launch_data)
-            except CampaignBuilderError:
-                raise HTTPException(status_code=404, detail="Could not launch campaign with information provided.")
-            await scraping_registry.build(campaign_builder=builder)
-        else:
-            builder = SoloSpiderBuilder(launch_data)
-            await builder.initialize_solo_scrape()
-            await scraping_registry.build(solospider_builder=builder)
-        logger.info('Scraping registry built')
-        logger.info(f"Tables: {', '.join(sorted(scraping_registry.scrape_table_names))}")
-        logger.debug(f'Table instances: {scraping_registry.scrape_table_models}')
-
         # Initialize Project, if required
         project_id = 3 # speed fanatics
         # project_id = None
@@ -79,20 +291,27 @@ class WebScrape:
             project_handler = None
 
 
-        queue = asyncio.Queue()
-        logger.debug('Async Queue object created')
+        queue = SpiderQueue()
+        logger.debug(f'SpiderQueue object created (high watermark: {queue.high_watermark}, low watermark: {queue.low_watermark})')
         sl = SpiderLauncher(
             queue, 
-            scraping_registry.spiders,
+            spiders,
             middleware_manager_interface=middleware_manager_interface,
-            proxy_manager_interface=proxy_manager_interface
+            proxy_manager_interface=proxy_manager_interface,
+            frontier=frontier,
         )
         logger.debug('Initialized Spider Launcher')
-        pl = PipelineListener(queue, project_handler=project_handler)
-        logger.debug('Initialized Pipeline Listener')
+        pl = PipelineListenerPool(queue, project_handler=project_handler)
+        logger.debug(f'Initialized Pipeline Listener pool ({len(pl.workers)} workers)')
 
         await asyncio.gather(sl.launch(), pl.listen())
+        if is_proxy:
+            proxy_manager.log_metrics()
 
-        await scraping_registry.finish()
         if project_handler:
-            project_handler.finish()
\ No newline at end of file
+            project_handler.finish()
+
+
+scrape_job_queue = create_scrape_job_queue(run_shard=WebScrape().run_shard)
+local_job_states = JobStateStore()  # jobs launched in the background of this process
+background_jobs:set[asyncio.Task] = set()  # keeps a reference to running background jobs
\ No newline at end of file